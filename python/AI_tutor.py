@@ -1,17 +1,20 @@
 import os
+import uuid
 import logging
 import base64
 import asyncio
 from io import BytesIO
 from datetime import datetime
-from typing import List, Optional, Tuple, Dict, Union, AsyncGenerator, TypedDict, Annotated, Any
-from dataclasses import field, dataclass
+from typing import List, Optional, Tuple, Dict, Set, Union, AsyncGenerator, TypedDict, Annotated, Any, Callable
+from dataclasses import field, dataclass, replace
 import concurrent.futures
 import inspect
 from functools import wraps
 import tempfile
 import shutil
+import sqlite3
 
+import numpy as np
 from PIL import Image
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
@@ -23,6 +26,7 @@ from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 
@@ -31,22 +35,25 @@ try:
     from langchain_qdrant import QdrantVectorStore
     from qdrant_client import QdrantClient, models
     from qdrant_client.models import Distance, VectorParams, PointStruct
+    from qdrant_client.http.exceptions import ResponseHandlingException
     QDRANT_AVAILABLE = True
+    # Transport failures (refused, DNS, timeouts), as opposed to errors returned by a live server.
+    QDRANT_UNREACHABLE_ERRORS = (ResponseHandlingException, ConnectionError, TimeoutError)
 except ImportError:
     QDRANT_AVAILABLE = False
+    QDRANT_UNREACHABLE_ERRORS = ()
     logging.warning("Qdrant packages not found. Vector storage features will be disabled.")
 
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough, RunnableConfig
 
 # Add error handling for retriever imports
 try:
-    from langchain_community.retrievers import BM25Retriever
     from langchain.retrievers import EnsembleRetriever
     RETRIEVER_AVAILABLE = True
 except ImportError:
     RETRIEVER_AVAILABLE = False
-    logging.warning("BM25Retriever or EnsembleRetriever not available. Hybrid search will be disabled.")
+    logging.warning("EnsembleRetriever not available. Hybrid search will be disabled.")
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
@@ -54,7 +61,7 @@ from langgraph.graph.message import add_messages
 from langsmith import traceable
 
 from langchain_community.document_loaders import (
-    PDFPlumberLoader, Docx2txtLoader, BSHTMLLoader, TextLoader, UnstructuredURLLoader, JSONLoader
+    UnstructuredURLLoader
 )
 
 # Import the web search tool
@@ -66,6 +73,22 @@ from enum import Enum
 from typing import Literal
 from langgraph.prebuilt.tool_node import ToolNode
 from media_toolkit.image_generation_model import ImageGenerator
+from serving_toolkit.provider_executor import get_provider_executor
+from serving_toolkit.session_store import SessionRecord, SessionStore
+from serving_toolkit.fast_router import FastRouter, FastRouterConfig, FILLER, GREETING, IMAGE, image_parameters_from_query
+from rag_toolkit.chunking import DocumentChunker
+from rag_toolkit.embedding_cache import CachedEmbeddings, get_embedding_cache
+from rag_toolkit.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig, IngestionReport
+from rag_toolkit.bm25_index import BM25Index, BM25IndexRetriever
+from rag_toolkit.tokenizers import get_tokenizer
+from rag_toolkit.local_vector_index import LocalVectorIndex, LocalVectorStore
+from rag_toolkit.parsing import get_document_parser
+from rag_toolkit.image_ingestion import ImageDescriber, ImageIngestionConfig, get_vision_cache
+from rag_toolkit.streaming_ingestion import StreamingIngestion, StreamingIngestionConfig, IngestionProgress
+from rag_toolkit.dedup import DedupPlan, NearDuplicateIndex
+from rag_toolkit.fusion import FusionConfig, FusionRetriever
+from rag_toolkit.retrieval_cache import RetrievalCache, RetrievalCacheConfig, get_retrieval_cache_metrics
+from rag_toolkit.speculative_retrieval import SpeculativeRetrieval, SpeculativeRetrievalConfig, get_speculative_retrieval_metrics
 
 # Add import for LangGraph streaming
 from langgraph.config import get_stream_writer
@@ -78,12 +101,36 @@ class OrchestratorState(TypedDict):
     image_generation_params: Optional[dict]
     teaching_data: Optional[dict]
     history: Optional[list]
+    plan: Optional[dict]
 
 # Define the action types
 class ActionType(str, Enum):
     USE_LLM_WITH_TOOLS = "use_llm_with_tools"
     GENERATE_IMAGE = "generate_image"
 
+class ImageGenerationParameters(BaseModel):
+    """Generate an educational image, chart or diagram. Use ONLY when the user explicitly asks for a visual."""
+    topic: str = Field(description="The main subject of the image.")
+    grade_level: str = Field(description='Educational level, e.g. "elementary", "middle school", "high school".')
+    preferred_visual_type: str = Field(description='Type of visual, e.g. "diagram", "chart", "infographic".')
+    subject: str = Field(description='Academic subject, e.g. "biology", "physics".')
+    language: str = Field(default="English", description="Language for any text in the image.")
+    instructions: str = Field(description="Specific requirements for the image.")
+    difficulty_flag: str = Field(default="false", description='"true" for advanced visuals, "false" for simpler ones.')
+
+class PlannedToolCall(BaseModel):
+    name: str = Field(description="Name of one of the available tools.")
+    query: str = Field(description="The query to send to the tool.")
+
+class TurnPlan(BaseModel):
+    """The standalone query, the action and the tool calls for one chat turn."""
+    standalone_query: str = Field(description="The user's message rewritten as a clear, standalone instruction.")
+    action: Literal["answer", "generate_image"] = Field(description='"generate_image" ONLY for explicit requests for a visual, otherwise "answer".')
+    image_parameters: Optional[ImageGenerationParameters] = Field(default=None, description='Required when action is "generate_image".')
+    tool_calls: List[PlannedToolCall] = Field(default_factory=list, description="Tools to call before answering; empty to answer directly.")
+
+IMAGE_GENERATOR_TOOL_NAME = "image_generator"
+
 # Image generation tool function
 @tool
 async def image_generation_tool(schema: dict) -> str:
@@ -105,7 +152,7 @@ async def image_generation_tool(schema: dict) -> str:
     """
     try:
         generator = ImageGenerator()
-        image_base64 = generator.generate_image_from_schema(schema)
+        image_base64 = await get_provider_executor().run("openai", generator.generate_image_from_schema, schema)
         if image_base64:
             return f"![Generated Image](data:image/png;base64,{image_base64})"
         else:
@@ -123,9 +170,13 @@ LANGSMITH_ENDPOINT="https://api.smith.langchain.com"
 LANGSMITH_API_KEY=os.getenv("LANGSMITH_API_KEY")
 LANGSMITH_PROJECT="Vamshi-test"
 
-QDRANT_VECTOR_PARAMS = VectorParams(size=1536, distance=Distance.COSINE)
+# Output size of text-embedding-3-small when no reduced `dimensions` are requested.
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+QDRANT_QUANTIZATION_MODES = ("none", "int8")
 CONTENT_PAYLOAD_KEY = "page_content"
 METADATA_PAYLOAD_KEY = "metadata"
+# Top-level payload field naming the owning session in a shared collection.
+SESSION_PAYLOAD_KEY = "session_id"
 
 default_qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
 default_qdrant_api_key = os.getenv("QDRANT_API_KEY")
@@ -159,46 +210,169 @@ def async_error_handler(func):
                 raise
         return coroutine_wrapper
 
+def qdrant_vector_params(config) -> "VectorParams":
+    """Vector size, distance and storage for new collections, from the tutor config."""
+    return VectorParams(
+        size=config.embedding_dimensions or DEFAULT_EMBEDDING_DIMENSIONS,
+        distance=Distance.COSINE,
+        on_disk=config.qdrant_on_disk_vectors or None
+    )
+
+def qdrant_quantization_config(config) -> Optional["models.ScalarQuantization"]:
+    """
+    int8 scalar quantization: Qdrant searches 1-byte-per-dimension copies kept in RAM and
+    rescores the best candidates with the original vectors (which can then live on disk).
+    """
+    if config.qdrant_quantization not in QDRANT_QUANTIZATION_MODES:
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION '{config.qdrant_quantization}'; use one of {QDRANT_QUANTIZATION_MODES}.")
+    if config.qdrant_quantization == "none":
+        return None
+    return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+        type=models.ScalarType.INT8,
+        quantile=config.qdrant_quantization_quantile,
+        always_ram=True
+    ))
+
+def qdrant_search_params(config) -> Optional["models.SearchParams"]:
+    """Query-time settings: oversample and rescore quantized searches with the original vectors."""
+    if config.qdrant_quantization == "none":
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=True,
+        oversampling=config.qdrant_rescore_oversampling
+    ))
+
+def create_embeddings(config) -> OpenAIEmbeddings:
+    """The OpenAI embeddings client, requesting reduced dimensions when configured."""
+    options = {"dimensions": config.embedding_dimensions} if config.embedding_dimensions else {}
+    return OpenAIEmbeddings(model=config.embedding_model, openai_api_key=config.openai_api_key, **options)
+
+def create_qdrant_client(config) -> Optional["QdrantClient"]:
+    """Creates a Qdrant client for the configured URL (':memory:' runs Qdrant in-process)."""
+    if not QDRANT_AVAILABLE:
+        return None
+    if config.qdrant_url == ":memory:":
+        return QdrantClient(location=":memory:")
+    return QdrantClient(
+        url=config.qdrant_url,
+        api_key=config.qdrant_api_key,
+        timeout=20.0
+    )
+
 class VectorStoreManager:
-    """Manages the Qdrant vector store operations."""
-    def __init__(self, config):
+    """
+    Manages the Qdrant vector store operations.
+
+    In "collection" storage mode every session gets its own Qdrant collection. In "shared"
+    mode all sessions live in one collection: each point carries the session's namespace
+    (its `qdrant_collection_name`) in an indexed `session_id` payload field, retrieval is
+    filtered on it and clearing a session is a filtered delete.
+
+    When Qdrant cannot be used (packages missing, server unreachable, or
+    VECTOR_BACKEND=local) the session is stored in an embedded LocalVectorIndex under
+    `local_vector_dir` instead, behind the same methods.
+    """
+    # Shared collections already created/validated by this process, keyed by (client, name).
+    _ready_shared_collections = set()
+    # Clients whose server could not be reached, and when to try them again.
+    _unreachable_until: Dict[int, float] = {}
+    UNREACHABLE_RETRY_SECONDS = 60.0
+    # Deletions that failed because the server was unreachable, keyed by client:
+    # (collection, session namespace in shared mode or None for the whole collection).
+    _pending_deletions: Dict[int, Set[Tuple[str, Optional[str]]]] = {}
+
+    def __init__(self, config, embeddings: Optional[OpenAIEmbeddings] = None, qdrant_client: Optional["QdrantClient"] = None):
         self.config = config
-        self.qdrant_client = None
         self.vector_store = None
-        self.embeddings = OpenAIEmbeddings(
-            model=self.config.embedding_model,
-            openai_api_key=self.config.openai_api_key
-        )
-        if QDRANT_AVAILABLE:
-            self.qdrant_client = QdrantClient(
-                url=self.config.qdrant_url, 
-                api_key=self.config.qdrant_api_key,
-                timeout=20.0
-            )
+        # Clients are shared across sessions when passed in by the TutorEngine.
+        self.embeddings = embeddings or create_embeddings(self.config)
+        self.qdrant_client = qdrant_client or create_qdrant_client(self.config)
+        self.local_index: Optional[LocalVectorIndex] = None
+
+    @property
+    def shared(self) -> bool:
+        return self.config.qdrant_storage_mode == "shared" and self.local_index is None
+
+    @property
+    def local_index_path(self) -> str:
+        return os.path.join(self.config.local_vector_dir, self.config.qdrant_collection_name)
+
+    def _qdrant_configured(self) -> bool:
+        return self.config.vector_backend != "local" and bool(self.qdrant_client)
+
+    def _qdrant_usable(self) -> bool:
+        if not self._qdrant_configured():
+            return False
+        return time.time() >= self._unreachable_until.get(id(self.qdrant_client), 0.0)
+
+    async def _initialize_local_index(self):
+        path = self.local_index_path
+        options = {"ivf_lists": self.config.local_vector_ivf_lists}
+        if LocalVectorIndex.exists(path):
+            self.local_index = await asyncio.to_thread(LocalVectorIndex.load, path, **options)
+        else:
+            self.local_index = LocalVectorIndex(path=path, dtype=self.config.local_vector_dtype, **options)
+        self.vector_store = LocalVectorStore(self.local_index, self.embeddings)
+        logging.info(f"Local vector index initialized at: {path} ({len(self.local_index)} vectors)")
+
+    async def _save_local_index(self):
+        await asyncio.to_thread(self.local_index.save)
+
+    @property
+    def collection_name(self) -> Optional[str]:
+        """The physical Qdrant collection this session's points are stored in."""
+        return self.config.qdrant_shared_collection if self.shared else self.config.qdrant_collection_name
+
+    def session_filter(self, *conditions) -> Optional["models.Filter"]:
+        """Restricts a query to this session's points (and any extra conditions)."""
+        must = list(conditions)
+        if self.shared:
+            must.append(models.FieldCondition(
+                key=SESSION_PAYLOAD_KEY, match=models.MatchValue(value=self.config.qdrant_collection_name)
+            ))
+        return models.Filter(must=must) if must else None
 
     async def initialize_collection(self):
         """Initializes the Qdrant collection, creating it if it doesn't exist."""
-        if not self.qdrant_client:
-            logging.error("Qdrant client not available.")
-            return
-
-        target_collection = self.config.qdrant_collection_name
-        if not target_collection:
+        if not self.config.qdrant_collection_name:
             logging.error("Qdrant collection name is not set.")
             raise ValueError("Cannot initialize collection without a name.")
-            
+        if self.local_index is not None or not self._qdrant_usable():
+            if self.config.vector_backend == "qdrant":
+                raise RuntimeError("Qdrant is not available and VECTOR_BACKEND=qdrant disables the local fallback.")
+            await self._initialize_local_index()
+            return
+        target_collection = self.collection_name
+
         try:
-            collections = await asyncio.to_thread(self.qdrant_client.get_collections)
-            collection_names = [col.name for col in collections.collections]
-
-            if target_collection not in collection_names:
-                logging.info(f"Creating Qdrant collection: {target_collection}")
-                await asyncio.to_thread(
-                    self.qdrant_client.create_collection,
-                    collection_name=target_collection,
-                    vectors_config=QDRANT_VECTOR_PARAMS
-                )
-            
+            ready_key = (id(self.qdrant_client), target_collection)
+            if not (self.shared and ready_key in self._ready_shared_collections):
+                collections = await asyncio.to_thread(self.qdrant_client.get_collections)
+                collection_names = [col.name for col in collections.collections]
+
+                if target_collection not in collection_names:
+                    logging.info(f"Creating Qdrant collection: {target_collection}")
+                    await asyncio.to_thread(
+                        self.qdrant_client.create_collection,
+                        collection_name=target_collection,
+                        vectors_config=qdrant_vector_params(self.config),
+                        # Per-tenant HNSW graphs: searches filtered to one session stay fast.
+                        hnsw_config=models.HnswConfigDiff(payload_m=16, m=0) if self.shared else None,
+                        quantization_config=qdrant_quantization_config(self.config),
+                        on_disk_payload=self.config.qdrant_on_disk_payload or None
+                    )
+                else:
+                    await self._check_vector_size(target_collection)
+                if self.shared:
+                    await asyncio.to_thread(
+                        self.qdrant_client.create_payload_index,
+                        collection_name=target_collection,
+                        field_name=SESSION_PAYLOAD_KEY,
+                        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+                        wait=True
+                    )
+                    self._ready_shared_collections.add(ready_key)
+
             self.vector_store = QdrantVectorStore(
                 client=self.qdrant_client,
                 collection_name=target_collection,
@@ -207,33 +381,93 @@ class VectorStoreManager:
                 metadata_payload_key=METADATA_PAYLOAD_KEY
             )
             logging.info(f"Vector store initialized for collection: {target_collection}")
+            await self._retry_pending_deletions_async()
 
+        except QDRANT_UNREACHABLE_ERRORS as e:
+            if self.config.vector_backend == "qdrant":
+                logging.error(f"Failed to initialize Qdrant collection: {e}")
+                raise
+            logging.warning(f"Qdrant at {self.config.qdrant_url} is unreachable ({e}); using the local vector index.")
+            self._unreachable_until[id(self.qdrant_client)] = time.time() + self.UNREACHABLE_RETRY_SECONDS
+            await self._initialize_local_index()
         except Exception as e:
             logging.error(f"Failed to initialize Qdrant collection: {e}")
             raise
-            
+
     def get_retriever(self, k: int):
         """Gets a retriever from the initialized vector store."""
         if not self.vector_store:
             raise RuntimeError("Vector store is not initialized. Call initialize_collection first.")
-        return self.vector_store.as_retriever(search_kwargs={"k": k})
-        
-    async def aadd_documents(self, documents: List[Document]):
-        """Asynchronously adds documents to the vector store."""
+        search_kwargs = {"k": k}
+        if self.shared:
+            search_kwargs["filter"] = self.session_filter()
+        if self.local_index is None and qdrant_search_params(self.config) is not None:
+            search_kwargs["search_params"] = qdrant_search_params(self.config)
+        return self.vector_store.as_retriever(search_kwargs=search_kwargs)
+
+    def point_ids(self, documents: List[Document]) -> List[str]:
+        """
+        Qdrant point ids for the chunks. In a shared collection they are scoped to the
+        session, so two sessions uploading the same file do not overwrite each other.
+        """
+        ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+        if not self.shared:
+            return ids
+        return [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.config.qdrant_collection_name}|{point_id}")) for point_id in ids]
+
+    async def aadd_documents(self, documents: List[Document], persist: bool = True) -> IngestionReport:
+        """
+        Embeds and upserts documents in batches: embedding runs with bounded parallelism
+        and rate-limit-aware retries while earlier batches are being written to Qdrant.
+        Chunks carry deterministic ids, so re-ingesting a file overwrites its points.
+        With persist=False a local index is only written by a later save_async().
+        """
         if not self.vector_store:
             raise RuntimeError("Vector store is not initialized. Call initialize_collection first.")
-        await self.vector_store.aadd_documents(documents)
+        pipeline = EmbeddingPipeline(
+            embeddings=self.embeddings,
+            qdrant_client=self.qdrant_client,
+            collection_name=self.collection_name,
+            config=EmbeddingPipelineConfig(
+                embed_batch_size=self.config.embedding_batch_size,
+                embed_concurrency=self.config.embedding_concurrency,
+                upsert_batch_size=self.config.upsert_batch_size
+            ),
+            content_payload_key=CONTENT_PAYLOAD_KEY,
+            metadata_payload_key=METADATA_PAYLOAD_KEY,
+            extra_payload={SESSION_PAYLOAD_KEY: self.config.qdrant_collection_name} if self.shared else None,
+            vector_sink=self.local_index
+        )
+        report = await pipeline.run(documents, self.point_ids(documents))
+        if persist:
+            await self.save_async()
+        return report
+
+    async def save_async(self):
+        """Persists the local vector index; Qdrant stores every upsert as it happens."""
+        if self.local_index is not None:
+            await self._save_local_index()
     
 
     @async_error_handler
     async def clear_collection_async(self):
         """
         Deletes and immediately recreates the collection to wipe all its data.
+        In shared mode only this session's points are deleted.
         """
+        if self.local_index is not None:
+            self.local_index.clear()
+            await self._save_local_index()
+            return
         if not self.qdrant_client:
             logging.error("Qdrant client not available. Cannot clear collection.")
             return
 
+        if self.shared:
+            logging.warning(f"Clearing all documents of session {self.config.qdrant_collection_name} from {self.collection_name}")
+            await self._delete_points_async(self.session_filter())
+            return
+
         target_collection = self.config.qdrant_collection_name
         logging.warning(f"Clearing all documents from Qdrant collection: {target_collection}")
         
@@ -251,6 +485,161 @@ class VectorStoreManager:
             logging.error(f"Error during collection clearing for {target_collection}, attempting to re-initialize. Error: {e}")
             await self.initialize_collection()
 
+    async def _delete_points_async(self, points_filter: "models.Filter"):
+        await asyncio.to_thread(
+            self.qdrant_client.delete,
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(filter=points_filter),
+            wait=True
+        )
+
+    async def search_with_vectors_async(self, query_vector: List[float], k: int) -> List[Tuple[Document, np.ndarray]]:
+        """The k nearest chunks to `query_vector` with their stored vectors, so callers can rerank without re-embedding."""
+        return await asyncio.to_thread(self.search_with_vectors, query_vector, k)
+
+    def search_with_vectors(self, query_vector: List[float], k: int) -> List[Tuple[Document, np.ndarray]]:
+        """Blocking version of search_with_vectors_async."""
+        if self.local_index is not None:
+            hits = self.local_index.search(query_vector, k)
+            vectors = self.local_index.vectors(self.point_ids([doc for doc, _ in hits]))
+            return [(doc, vector) for (doc, _), vector in zip(hits, vectors) if vector is not None]
+        response = self.qdrant_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            query_filter=self.session_filter(),
+            search_params=qdrant_search_params(self.config),
+            limit=k,
+            with_payload=True,
+            with_vectors=True
+        )
+        return [(self._point_document(point), np.asarray(point.vector, dtype=np.float32)) for point in response.points]
+
+    async def fetch_vectors_async(self, documents: List[Document]) -> List[Optional[np.ndarray]]:
+        """The stored vectors of already indexed chunks (None for chunks that are not stored)."""
+        return await asyncio.to_thread(self.fetch_vectors, documents)
+
+    def fetch_vectors(self, documents: List[Document]) -> List[Optional[np.ndarray]]:
+        """Blocking version of fetch_vectors_async."""
+        ids = self.point_ids(documents)
+        if self.local_index is not None:
+            return self.local_index.vectors(ids)
+        points = self.qdrant_client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=False,
+            with_vectors=True
+        )
+        vectors = {str(point.id): np.asarray(point.vector, dtype=np.float32) for point in points}
+        return [vectors.get(point_id) for point_id in ids]
+
+    @staticmethod
+    def _point_document(point) -> Document:
+        payload = point.payload or {}
+        return Document(page_content=payload.get(CONTENT_PAYLOAD_KEY, ""), metadata=payload.get(METADATA_PAYLOAD_KEY) or {})
+
+    async def _check_vector_size(self, collection_name: str):
+        """Fails clearly when an existing collection was created for a different embedding size."""
+        info = await asyncio.to_thread(self.qdrant_client.get_collection, collection_name)
+        vectors = info.config.params.vectors
+        size = getattr(vectors, "size", None)
+        expected = self.config.embedding_dimensions or DEFAULT_EMBEDDING_DIMENSIONS
+        if size is not None and size != expected:
+            raise ValueError(
+                f"Qdrant collection '{collection_name}' stores {size}-dimensional vectors but embeddings have "
+                f"{expected} dimensions; use another collection when changing EMBEDDING_DIMENSIONS."
+            )
+
+    async def load_documents_async(self, batch_size: int = 256) -> List[Document]:
+        """Reads every stored document back out of the collection (used to rebuild sparse indexes)."""
+        if self.local_index is not None:
+            return self.local_index.documents()
+        if not self.qdrant_client:
+            return []
+        documents = []
+        offset = None
+        while True:
+            points, offset = await asyncio.to_thread(
+                self.qdrant_client.scroll,
+                collection_name=self.collection_name,
+                scroll_filter=self.session_filter(),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            documents.extend(self._point_document(point) for point in points)
+            if offset is None:
+                return documents
+
+    async def delete_source_async(self, source: str):
+        """Deletes every point that was ingested from `source`."""
+        if self.local_index is not None:
+            await asyncio.to_thread(self.local_index.delete_where, lambda metadata: metadata.get("source") == source)
+            await self._save_local_index()
+            return
+        if not self.qdrant_client:
+            return
+        await self._delete_points_async(self.session_filter(
+            models.FieldCondition(key=f"{METADATA_PAYLOAD_KEY}.source", match=models.MatchValue(value=source))
+        ))
+
+    async def delete_collection_async(self):
+        """
+        Permanently deletes the collection without recreating it. In shared mode the
+        collection stays and only this session's points are deleted.
+        """
+        if self.local_index is not None or not self._qdrant_configured():
+            if self.local_index is not None:
+                self.local_index.clear()
+            await asyncio.to_thread(shutil.rmtree, self.local_index_path, True)
+            self.local_index = None
+            self.vector_store = None
+            return
+
+        # Attempted even while Qdrant is in its unreachable back-off, so evicted sessions
+        # never leak their collections; a failed attempt is queued and retried later.
+        deletion = (self.collection_name, self.config.qdrant_collection_name if self.shared else None)
+        try:
+            await self._delete_from_qdrant_async(*deletion)
+            await self._retry_pending_deletions_async()
+        except QDRANT_UNREACHABLE_ERRORS as e:
+            logging.warning(f"Qdrant is unreachable ({e}); will retry deleting {self.config.qdrant_collection_name} later.")
+            self._pending_deletions.setdefault(id(self.qdrant_client), set()).add(deletion)
+        except Exception as e:
+            logging.error(f"Failed to delete Qdrant collection {self.config.qdrant_collection_name}: {e}")
+        finally:
+            self.vector_store = None
+
+    async def _delete_from_qdrant_async(self, collection_name: str, session: Optional[str]):
+        """Deletes a whole collection, or only one session's points when `session` is given."""
+        if session is not None:
+            await asyncio.to_thread(
+                self.qdrant_client.delete,
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter(must=[
+                    models.FieldCondition(key=SESSION_PAYLOAD_KEY, match=models.MatchValue(value=session))
+                ])),
+                wait=True
+            )
+            logging.info(f"Deleted points of session {session} from {collection_name}")
+        else:
+            await asyncio.to_thread(self.qdrant_client.delete_collection, collection_name=collection_name)
+            logging.info(f"Deleted Qdrant collection: {collection_name}")
+
+    async def _retry_pending_deletions_async(self):
+        """Retries deletions queued while Qdrant was unreachable, now that it answered."""
+        pending = self._pending_deletions.pop(id(self.qdrant_client), None)
+        while pending:
+            deletion = pending.pop()
+            try:
+                await self._delete_from_qdrant_async(*deletion)
+            except QDRANT_UNREACHABLE_ERRORS:
+                pending.add(deletion)
+                self._pending_deletions.setdefault(id(self.qdrant_client), set()).update(pending)
+                return
+            except Exception as e:
+                logging.error(f"Failed to delete queued Qdrant data {deletion}: {e}")
+
 class TutorState(TypedDict):
     """State for the AI tutor agent."""
     messages: Annotated[list, add_messages]
@@ -265,16 +654,52 @@ class RAGTutorConfig:
     temperature: float = 0.2
     max_tokens: int = 2000
     embedding_model: str = "text-embedding-3-small"
-    chunk_size: int = 1000
-    chunk_overlap: int = 200
+    # Reduced output size for text-embedding-3 models (e.g. 512 or 256); None keeps 1536.
+    embedding_dimensions: Optional[int] = field(default_factory=lambda: int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None)
+    # Chunk sizes are measured in tokens of `tokenizer_encoding`.
+    chunk_size: int = 512
+    chunk_overlap: int = 64
+    tokenizer_encoding: str = "cl100k_base"
+    embedding_batch_size: int = field(default_factory=lambda: int(os.getenv("EMBEDDING_BATCH_SIZE", "128")))
+    embedding_concurrency: int = field(default_factory=lambda: int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+    upsert_batch_size: int = field(default_factory=lambda: int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256")))
+    bm25_index_dir: str = field(default_factory=lambda: os.getenv("BM25_INDEX_DIR", "tutor_session_data/bm25"))
+    # "simple", "arabic" or "multilingual" (Arabic normalization + English/Arabic light stemming).
+    bm25_tokenizer: str = field(default_factory=lambda: os.getenv("BM25_TOKENIZER", "multilingual"))
+    # Chunks whose estimated Jaccard similarity to an already indexed chunk reaches the
+    # threshold are dropped at ingestion time and recorded as merged sources.
+    dedup_enabled: bool = field(default_factory=lambda: os.getenv("CHUNK_DEDUP_ENABLED", "true").lower() == "true")
+    dedup_threshold: float = field(default_factory=lambda: float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.85")))
     retrieval_k: int = 5
+    # "rrf" (reciprocal rank fusion + MMR, returns retrieval_k chunks) or "ensemble"
+    # (weighted EnsembleRetriever, up to 2 x retrieval_k chunks).
+    retrieval_fusion: str = field(default_factory=lambda: os.getenv("RETRIEVAL_FUSION", "rrf"))
     image_extensions: Tuple[str, ...] = field(default_factory=lambda: (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"))
     max_workers: int = 2
     qdrant_url: str = field(default_factory=lambda: default_qdrant_url)
     qdrant_api_key: Optional[str] = field(default_factory=lambda: default_qdrant_api_key)
+    # Logical per-session namespace; in "collection" mode it is also the Qdrant collection.
     qdrant_collection_name: Optional[str] = None
+    # "collection" (one Qdrant collection per session) or "shared" (one payload-filtered collection).
+    qdrant_storage_mode: str = field(default_factory=lambda: os.getenv("QDRANT_STORAGE_MODE", "collection"))
+    qdrant_shared_collection: str = field(default_factory=lambda: os.getenv("QDRANT_SHARED_COLLECTION", "rag_sessions"))
+    # "auto" (Qdrant, falling back to the local index when unavailable), "qdrant" or "local".
+    vector_backend: str = field(default_factory=lambda: os.getenv("VECTOR_BACKEND", "auto"))
+    # Qdrant storage: "none" or "int8" (scalar quantization, rescored with the originals),
+    # and whether original vectors and payloads are kept on disk instead of in RAM.
+    qdrant_quantization: str = field(default_factory=lambda: os.getenv("QDRANT_QUANTIZATION", "none"))
+    qdrant_quantization_quantile: float = field(default_factory=lambda: float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", "0.99")))
+    qdrant_rescore_oversampling: float = field(default_factory=lambda: float(os.getenv("QDRANT_RESCORE_OVERSAMPLING", "2.0")))
+    qdrant_on_disk_vectors: bool = field(default_factory=lambda: os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true")
+    qdrant_on_disk_payload: bool = field(default_factory=lambda: os.getenv("QDRANT_ON_DISK_PAYLOAD", "false").lower() == "true")
+    local_vector_dir: str = field(default_factory=lambda: os.getenv("LOCAL_VECTOR_DIR", "tutor_session_data/vectors"))
+    local_vector_dtype: str = field(default_factory=lambda: os.getenv("LOCAL_VECTOR_DTYPE", "float32"))
+    local_vector_ivf_lists: int = field(default_factory=lambda: int(os.getenv("LOCAL_VECTOR_IVF_LISTS", "0")))
     web_search_enabled: bool = False
-    
+    # One structured-output call plans each follow-up turn (standalone query, route and tool
+    # calls) instead of separate rephrase, router and tool-selection calls.
+    turn_planner_enabled: bool = field(default_factory=lambda: os.getenv("TUTOR_TURN_PLANNER", "true").lower() == "true")
+
     initial_system_prompt: str = """You are an expert AI Assistant for educators. Your primary role is to support teachers by analyzing student performance data, enhancing lesson materials, and providing pedagogical insights.
 ** reply in the language in which teacher interact **
 **Teaching Data Schema:**
@@ -331,81 +756,7 @@ Your ultimate goal is to empower the teacher to be more effective and efficient.
         """Create configuration from environment variables."""
         return cls()
 
-class AsyncRAGTutor:
-    def __init__(self, storage_manager: Any, config: Optional[RAGTutorConfig] = None):
-        self.config = config or RAGTutorConfig()
-        
-        unique_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-        self.config.qdrant_collection_name = f"rag_session_{unique_id}"
-        logging.info(f"Initialized new tutor instance with collection: {self.config.qdrant_collection_name}")
-
-        try:
-            logging.info("Initializing response through OpenAI's API model ( GPT-4o).")
-            self.llm = ChatOpenAI(
-                model=self.config.llm_model,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                streaming=self.config.streaming,
-                openai_api_key=self.config.openai_api_key,
-            )
-        except Exception as e:
-            logging.error(f"Error initializing ChatOpenAI: {e}")
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash-latest",
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                google_api_key=self.config.google_api_key,
-                streaming=self.config.streaming
-            )
-        
-        self.storage_manager = storage_manager
-
-        self.retriever_tool = Tool(
-            name="knowledge_base_retriever",
-            func=self.knowledge_base_retrieval_tool,
-            coroutine=self.knowledge_base_retrieval_tool,
-            description=(
-                "Use this tool to answer questions about any uploaded documents (generated_content), including text, PDFs, and images. "
-                "This is your primary tool for retrieving information to enhance or explain the teacher's content. "
-                "If the teacher's query mentions a specific filename or asks to improve their lesson plan, you MUST use this tool."
-            )
-        )
-        
-        self.tools = [self.retriever_tool]
-        
-        if self.config.web_search_enabled:
-            if os.getenv("PPLX_API_KEY"):
-                logging.info("Web search is enabled and PPLX_API_KEY is set.")
-                websearch_tool = PerplexityWebSearchTool(
-                    max_results=5, 
-                    model="sonar", 
-                    include_links=True
-                ).get_tool()
-                self.tools.append(websearch_tool)
-            else:
-                logging.warning("Web search is enabled in config, but PPLX_API_KEY is not set. Web search will be disabled.")
-                
-        self.tool_map = {tool.name: tool for tool in self.tools}
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
-        
-        self.image_generation_tool = ToolNode(
-            name="image_generator",
-            tools=[image_generation_tool]
-        )
-        
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.config.chunk_size,
-            chunk_overlap=self.config.chunk_overlap
-        )
-        
-        self.vectorstore_manager = VectorStoreManager(self.config) if QDRANT_AVAILABLE else None
-        self.ensemble_retriever = None
-        self.graph = None
-        self.short_responses = ["ok", "okay", "thanks", "thank you", "great", "good", "cool","hello", "hi", "hey", "greetings", "yo", "sup", "good morning", "good afternoon", "good evening"]
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers)
-
-        self.rephrase_prompt = PromptTemplate.from_template(
-            """Given a chat history and a follow-up question, rephrase the follow-up question into a clear, standalone instruction.
+REPHRASE_PROMPT_TEMPLATE = """Given a chat history and a follow-up question, rephrase the follow-up question into a clear, standalone instruction.
 
 **Instructions:**
 1.  **Handle Conversational Fillers First:** If the `Follow-up Question` is a simple, common conversational phrase (e.g., "okay", "great", "thanks"), your most important task is to return it **UNCHANGED**. This rule overrides all others.
@@ -430,11 +781,8 @@ class AsyncRAGTutor:
  Follow-up Question: {question}
  
  Standalone Question:"""
-        )
-        self.rephrase_chain = self.rephrase_prompt | self.llm | StrOutputParser()
-        
-        self.router_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an intelligent router that determines which action to take based on user input.
+
+ROUTER_SYSTEM_PROMPT = """You are an intelligent router that determines which action to take based on user input.
             
 ONLY respond with one of the following options:
 1. "use_llm_with_tools" - Use this when the user is asking a question that can be answered with standard tools like knowledge base retrieval, web search, or conversation.
@@ -453,11 +801,365 @@ IMPORTANT: For image generation requests, return your decision as a valid JSON o
 1. "action": "generate_image"
 2. "parameters": {{ all the extracted parameters as described above }}
 
-For regular queries that don't need image generation, simply respond with "use_llm_with_tools"."""),
+For regular queries that don't need image generation, simply respond with "use_llm_with_tools"."""
+
+TURN_PLANNER_SYSTEM_PROMPT = """You plan a single turn of an AI assistant for teachers. Given the chat history and the teacher's latest message, return the standalone query, the action and the tool calls for this turn.
+
+**standalone_query:**
+1.  If the message is a simple conversational phrase (e.g., "okay", "great", "thanks"), return it UNCHANGED.
+2.  If the message asks for a visual of something discussed earlier (e.g., "can you draw that?"), combine it with the topic from the chat history, e.g. "Generate a diagram that explains the water cycle."
+3.  If the chat history contains a `System Note` listing uploaded files, rewrite the message to be specifically about those files, including the filename(s).
+4.  Otherwise use the chat history to make the message a clear, standalone question. If it already is, return it as is.
+
+**action:**
+- "generate_image" ONLY when the teacher explicitly asks to generate or create an image, diagram, chart or visual representation. Fill in `image_parameters` (language defaults to "English", difficulty_flag to "false").
+- "answer" for everything else.
+
+**tool_calls** (only for "answer"; leave empty to answer directly from the conversation):
+{tools}
+
+Knowledge base: {knowledge_base}."""
+
+SHORT_RESPONSES = ["ok", "okay", "thanks", "thank you", "great", "good", "cool","hello", "hi", "hey", "greetings", "yo", "sup", "good morning", "good afternoon", "good evening"]
+
+def build_retriever_tool(coroutine) -> Tool:
+    """Builds the knowledge base retriever tool around a session's retrieval coroutine."""
+    return Tool(
+        name="knowledge_base_retriever",
+        func=coroutine,
+        coroutine=coroutine,
+        description=(
+            "Use this tool to answer questions about any uploaded documents (generated_content), including text, PDFs, and images. "
+            "This is your primary tool for retrieving information to enhance or explain the teacher's content. "
+            "If the teacher's query mentions a specific filename or asks to improve their lesson plan, you MUST use this tool."
+        )
+    )
+
+class TutorEngine:
+    """
+    Process-wide owner of the tutor's heavy objects: the LLM, embeddings and Qdrant
+    clients, the executor, the rephrase/router/turn-planner chains, the tool-bound LLMs and the
+    compiled orchestrator graph. Sessions borrow these instead of building their own.
+    """
+    _engines: Dict[Tuple, 'TutorEngine'] = {}
+
+    def __init__(self, config: Optional[RAGTutorConfig] = None):
+        self.config = config or RAGTutorConfig()
+
+        try:
+            logging.info("Initializing response through OpenAI's API model ( GPT-4o).")
+            self.llm = ChatOpenAI(
+                model=self.config.llm_model,
+                temperature=self.config.temperature,
+                max_tokens=self.config.max_tokens,
+                streaming=self.config.streaming,
+                openai_api_key=self.config.openai_api_key,
+            )
+        except Exception as e:
+            logging.error(f"Error initializing ChatOpenAI: {e}")
+            self.llm = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash-latest",
+                temperature=self.config.temperature,
+                max_tokens=self.config.max_tokens,
+                google_api_key=self.config.google_api_key,
+                streaming=self.config.streaming
+            )
+
+        self.embeddings = create_embeddings(self.config)
+        # Chunks embedded by any session are reused instead of being re-sent to the API.
+        try:
+            self.embedding_cache = get_embedding_cache()
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache unavailable, embedding without it: {e}")
+            self.embedding_cache = None
+        if self.embedding_cache is not None:
+            self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache, model=self.config.embedding_model)
+        self.qdrant_client = create_qdrant_client(self.config)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers)
+        self.image_describer = self._build_image_describer()
+
+        self.chunker = DocumentChunker(
+            chunk_size_tokens=self.config.chunk_size,
+            chunk_overlap_tokens=self.config.chunk_overlap,
+            encoding_name=self.config.tokenizer_encoding
+        )
+        self.text_splitter = self.chunker.splitter
+        self.image_generation_tool = ToolNode(
+            name="image_generator",
+            tools=[image_generation_tool]
+        )
+
+        self.fast_router = FastRouter(FastRouterConfig.from_env(), keywords=SHORT_RESPONSES)
+        self.speculative_retrieval_config = SpeculativeRetrievalConfig.from_env()
+        self._schema_retriever_tool = build_retriever_tool(self._unbound_retrieval_tool)
+        self._websearch_tool = None
+        self._websearch_tool_loaded = False
+        self.build_chains()
+
+        self.graph = self._build_orchestrator_graph()
+        logging.info("Tutor engine initialized with shared clients, chains and orchestrator graph.")
+
+    def build_chains(self):
+        """(Re)builds the chains and tool-bound LLMs on top of `self.llm`."""
+        self.rephrase_prompt = PromptTemplate.from_template(REPHRASE_PROMPT_TEMPLATE)
+        self.rephrase_chain = self.rephrase_prompt | self.llm | StrOutputParser()
+        self.router_prompt = ChatPromptTemplate.from_messages([
+            ("system", ROUTER_SYSTEM_PROMPT),
             ("human", "{input}")
         ])
-        
         self.router_chain = self.router_prompt | self.llm | StrOutputParser()
+        self.turn_planner_prompt = ChatPromptTemplate.from_messages([
+            ("system", TURN_PLANNER_SYSTEM_PROMPT),
+            ("human", "Chat History:\n{chat_history}\n\nLatest Message: {question}")
+        ])
+        self.turn_planner_chain = self.turn_planner_prompt | self.llm.with_structured_output(TurnPlan, method="function_calling")
+        self.final_chain = self.llm | StrOutputParser()
+
+        # Tool schemas are identical for every session, so the tool-bound LLMs are
+        # built once per tool set. Sessions execute tools from their own tool_map.
+        self._llms_with_tools: Dict[Tuple[bool, bool], Any] = {}
+
+    def _build_image_describer(self) -> ImageDescriber:
+        """Vision clients are shared by every session: OpenAI first, then Gemini as the fallback."""
+        models = []
+        try:
+            models.append((self.config.llm_model, ChatOpenAI(
+                model=self.config.llm_model,
+                max_tokens=1024,
+                openai_api_key=self.config.openai_api_key
+            )))
+        except Exception as e:
+            logging.error(f"Error initializing the OpenAI vision model: {e}")
+        try:
+            models.append(("gemini-1.5-flash-latest", ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash-latest",
+                max_tokens=self.config.max_tokens,
+                google_api_key=self.config.google_api_key,
+            )))
+        except Exception as e:
+            logging.warning(f"Gemini vision fallback unavailable: {e}")
+        try:
+            cache = get_vision_cache()
+        except sqlite3.Error as e:
+            logging.warning(f"Vision description cache unavailable, describing images without it: {e}")
+            cache = None
+        return ImageDescriber(models, config=ImageIngestionConfig.from_env(), cache=cache)
+
+    @classmethod
+    def for_config(cls, config: RAGTutorConfig) -> 'TutorEngine':
+        """Returns the shared engine for this configuration, creating it on first use."""
+        key = cls._engine_key(config)
+        engine = cls._engines.get(key)
+        if engine is None:
+            engine = cls(config)
+            cls._engines[key] = engine
+        return engine
+
+    @staticmethod
+    def _engine_key(config: RAGTutorConfig) -> Tuple:
+        return (
+            config.openai_api_key, config.google_api_key, config.llm_model, config.streaming,
+            config.temperature, config.max_tokens, config.embedding_model, config.embedding_dimensions, config.chunk_size,
+            config.chunk_overlap, config.tokenizer_encoding, config.max_workers, config.qdrant_url, config.qdrant_api_key,
+        )
+
+    @staticmethod
+    async def _unbound_retrieval_tool(query: str) -> str:
+        return "No knowledge base has been configured. Please upload documents to create one."
+
+    @property
+    def websearch_tool(self):
+        """The shared Perplexity search tool, or None when PPLX_API_KEY is not set."""
+        if not self._websearch_tool_loaded:
+            self._websearch_tool_loaded = True
+            if os.getenv("PPLX_API_KEY"):
+                self._websearch_tool = PerplexityWebSearchTool(
+                    max_results=5,
+                    model="sonar",
+                    include_links=True
+                ).get_tool()
+        return self._websearch_tool
+
+    def get_llm_with_tools(self, web_search_enabled: bool, image_generation: bool = False):
+        """
+        Returns the LLM bound to the tool schemas for the given web-search setting. With
+        `image_generation` the image generator is offered as a tool too, so the same call
+        also routes image requests.
+        """
+        web_search_enabled = web_search_enabled and self.websearch_tool is not None
+        key = (web_search_enabled, image_generation)
+        if key not in self._llms_with_tools:
+            tools = [self._schema_retriever_tool]
+            if web_search_enabled:
+                tools.append(self.websearch_tool)
+            if image_generation:
+                image_tool = convert_to_openai_tool(ImageGenerationParameters)
+                image_tool["function"]["name"] = IMAGE_GENERATOR_TOOL_NAME
+                tools.append(image_tool)
+            self._llms_with_tools[key] = self.llm.bind_tools(tools)
+        return self._llms_with_tools[key]
+
+    def warm_up(self):
+        """Pre-builds the lazily created tool bindings so the first request pays nothing extra."""
+        for web_search_enabled in (False, True):
+            for image_generation in (False, True):
+                self.get_llm_with_tools(web_search_enabled, image_generation)
+        return self
+
+    def _build_orchestrator_graph(self):
+        """Compiles the orchestrator graph once; the session is passed in through the run config."""
+
+        async def router_node(state: OrchestratorState, config: RunnableConfig) -> dict:
+            """Determine which action to take based on the user query."""
+            tutor = config["configurable"]["tutor"]
+            plan = state.get("plan")
+            if plan is not None:
+                if plan["action"] == ActionType.GENERATE_IMAGE:
+                    return {"action": ActionType.GENERATE_IMAGE, "image_generation_params": plan["image_parameters"]}
+                return {"action": ActionType.USE_LLM_WITH_TOOLS}
+
+            last_message = state["messages"][-1]
+            routing_decision = await tutor._route_query(last_message.content)
+
+            if routing_decision["action"] == ActionType.GENERATE_IMAGE:
+                return {"action": ActionType.GENERATE_IMAGE, "image_generation_params": routing_decision["parameters"]}
+            else:
+                return {"action": ActionType.USE_LLM_WITH_TOOLS}
+
+        async def llm_with_tools_node(state: OrchestratorState, config: RunnableConfig):
+            """Process the query with the standard LLM and tools using streaming."""
+            tutor = config["configurable"]["tutor"]
+            last_message = state["messages"][-1]
+            history = state.get("history", [])
+            teaching_data = state.get("teaching_data")
+            plan = state.get("plan")
+
+            formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            writer = get_stream_writer()
+
+            async for chunk in tutor._agent_executor_stream_async(
+                query=last_message.content,
+                formatted_time=formatted_time,
+                is_knowledge_base_ready=(tutor.ensemble_retriever is not None),
+                teaching_data=teaching_data,
+                history=history,
+                plan=plan,
+                speculative_retrieval=config["configurable"].get("speculative_retrieval")
+            ):
+                writer(chunk)
+
+            return {"messages": [AIMessage(content="")]}
+
+        def route_by_action(state: OrchestratorState):
+            """Route to the next node based on the action determined by the router."""
+            action = state.get("action")
+            if action == ActionType.GENERATE_IMAGE:
+                return "image_generator"
+            else:
+                return "llm_with_tools"
+
+        workflow = StateGraph(OrchestratorState)
+        workflow.add_node("router", router_node)
+        workflow.add_node("llm_with_tools", llm_with_tools_node)
+        workflow.add_node("image_generator", image_generator_node)
+        workflow.add_edge(START, "router")
+        workflow.add_conditional_edges("router", route_by_action)
+        workflow.add_edge("image_generator", END)
+        workflow.add_edge("llm_with_tools", END)
+
+        graph = workflow.compile()
+        logging.info("LangGraph orchestrator workflow created successfully.")
+        return graph
+
+@dataclass
+class TutorSessionState:
+    """The per-session part of a tutor: its settings and its retrievers."""
+    collection_name: str
+    web_search_enabled: bool = False
+    retrieval_k: int = 5
+    ingested_files: List[str] = field(default_factory=list)
+    retriever: Any = None
+    ensemble_retriever: Any = None
+    bm25_index: Any = None
+    dedup_index: Any = None
+    retrieval_cache: Any = None
+
+class AsyncRAGTutor:
+    """
+    A single tutor session. Heavy objects live on the shared TutorEngine; the session
+    itself only holds its TutorSessionState, tool map and a thin VectorStoreManager.
+    """
+    def __init__(self, storage_manager: Any, config: Optional[RAGTutorConfig] = None, engine: Optional[TutorEngine] = None, session_id: Optional[str] = None, session_store: Optional[SessionStore] = None):
+        self.config = replace(config) if config else RAGTutorConfig()
+        self.engine = engine or TutorEngine.for_config(self.config)
+        self.session_id = session_id
+        self.session_store = session_store
+
+        unique_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self.config.qdrant_collection_name = f"rag_session_{unique_id}"
+        logging.info(f"Initialized new tutor instance with collection: {self.config.qdrant_collection_name}")
+
+        self.state = TutorSessionState(
+            collection_name=self.config.qdrant_collection_name,
+            retrieval_k=self.config.retrieval_k,
+            retrieval_cache=RetrievalCache(RetrievalCacheConfig.from_env(), shared_metrics=get_retrieval_cache_metrics()),
+        )
+        self.storage_manager = storage_manager
+        self.retriever_tool = build_retriever_tool(self.knowledge_base_retrieval_tool)
+        self.short_responses = SHORT_RESPONSES
+
+        self.vectorstore_manager = VectorStoreManager(
+            self.config,
+            embeddings=self.engine.embeddings,
+            qdrant_client=self.engine.qdrant_client
+        )
+
+        self.update_web_search_status(self.config.web_search_enabled)
+
+    # Shared objects are read from the engine so existing callers keep working.
+    @property
+    def llm(self):
+        return self.engine.llm
+
+    @property
+    def rephrase_chain(self):
+        return self.engine.rephrase_chain
+
+    @property
+    def router_chain(self):
+        return self.engine.router_chain
+
+    @property
+    def text_splitter(self):
+        return self.engine.text_splitter
+
+    @property
+    def chunker(self):
+        return self.engine.chunker
+
+    @property
+    def executor(self):
+        return self.engine.executor
+
+    @property
+    def graph(self):
+        return self.engine.graph
+
+    @property
+    def retriever(self):
+        return self.state.retriever
+
+    @retriever.setter
+    def retriever(self, value):
+        self.state.retriever = value
+
+    @property
+    def ensemble_retriever(self):
+        return self.state.ensemble_retriever
+
+    @ensemble_retriever.setter
+    def ensemble_retriever(self, value):
+        self.state.ensemble_retriever = value
 
     @async_error_handler
     async def clear_knowledge_base_async(self):
@@ -466,49 +1168,210 @@ For regular queries that don't need image generation, simply respond with "use_l
         if self.vectorstore_manager:
             await self.vectorstore_manager.clear_collection_async()
         self.ensemble_retriever = None
+        self.state.ingested_files = []
+        self.state.bm25_index = None
+        self.state.dedup_index = None
+        self.state.retrieval_cache.invalidate()
+        await asyncio.to_thread(self._delete_bm25_index_file)
+
+        def _clear(record: SessionRecord):
+            record.ingested_files = []
+            record.bm25_corpus_ref = None
+        await self._update_record_async(_clear)
+
+    async def remove_document_async(self, source: str) -> bool:
+        """Removes one ingested file from the knowledge base (vector and BM25 indexes)."""
+        if source not in self.state.ingested_files:
+            return False
+        await self._remove_source_async(source)
+        self.state.ingested_files.remove(source)
+        await self.vectorstore_manager.save_async()
+        await self._save_sparse_indexes_async()
+        if self._has_indexed_chunks():
+            self._build_retrievers()
+        else:
+            self.ensemble_retriever = None
+            self.retriever = None
+
+        def _remove(record: SessionRecord):
+            record.ingested_files = [f for f in record.ingested_files if f != source]
+        await self._update_record_async(_remove)
+        return True
+
+    async def _remove_source_async(self, source: str):
+        self.state.retrieval_cache.invalidate()
+        if self.vectorstore_manager and self.vectorstore_manager.vector_store:
+            await self.vectorstore_manager.delete_source_async(source)
+        if self.state.bm25_index is not None:
+            removed = await asyncio.to_thread(self.state.bm25_index.remove_source, source)
+            logging.info(f"Removed {removed} chunks of '{source}' from the knowledge base.")
+        if self.state.dedup_index is not None:
+            # Near-duplicates from other files that were merged into the removed chunks
+            # now stand on their own and have to be indexed.
+            promoted = await asyncio.to_thread(self.state.dedup_index.remove_source, source)
+            if promoted:
+                await self.vectorstore_manager.aadd_documents(promoted, persist=False)
+                await self._index_sparse_async(promoted, persist=False)
+                logging.info(f"Indexed {len(promoted)} chunks that were merged into '{source}'.")
+
+    async def close_async(self, drop_collection: bool = True):
+        """
+        Releases the session's resources. With drop_collection=False only this worker's
+        in-memory retrievers are dropped and the session can be rebuilt from the store.
+        """
+        logging.info(f"Closing tutor session with collection: {self.config.qdrant_collection_name}")
+        if drop_collection and self.vectorstore_manager:
+            await self.vectorstore_manager.delete_collection_async()
+        if drop_collection:
+            await asyncio.to_thread(self._delete_bm25_index_file)
+        self.ensemble_retriever = None
+        self.retriever = None
+        self.state.bm25_index = None
+        self.state.dedup_index = None
+        self.state.retrieval_cache.invalidate()
+
+    def session_record(self) -> SessionRecord:
+        """Describes this session's state so that any worker can rebuild it."""
+        return SessionRecord(
+            session_id=self.session_id,
+            collection_name=self.state.collection_name,
+            ingested_files=list(self.state.ingested_files),
+            bm25_corpus_ref=self.bm25_index_path if self._has_indexed_chunks() else None,
+            web_search_enabled=self.state.web_search_enabled,
+        )
+
+    async def _update_record_async(self, mutate: Callable[[SessionRecord], None]):
+        """
+        Applies `mutate` to the stored session record as a compare-and-set, so that a change
+        made here never overwrites what another worker wrote in the meantime (e.g. the files
+        it ingested). Registers the session if the store does not know it yet.
+        """
+        if not (self.session_store and self.session_id):
+            return
+        if await self.session_store.update(self.session_id, mutate) is None:
+            await self.session_store.get_or_create(self.session_record())
+
+    async def restore_or_register_async(self):
+        """
+        Adopts the stored state for this session if another worker created it,
+        otherwise registers this instance's state as the session's record.
+        """
+        if not (self.session_store and self.session_id):
+            return
+        record = await self.session_store.get_or_create(self.session_record())
+        if record.collection_name != self.state.collection_name:
+            await self.restore_async(record)
+
+    async def sync_state_async(self, web_search_enabled: Optional[bool] = None):
+        """
+        Applies the request's web-search setting, picks up changes another worker made to
+        the session (e.g. newly ingested files) and marks the session as active in the store.
+        """
+        if web_search_enabled is not None:
+            self.update_web_search_status(web_search_enabled)
+        if not (self.session_store and self.session_id):
+            return
+        record = await self.session_store.get(self.session_id)
+        if record is None:
+            await self.session_store.get_or_create(self.session_record())
+            return
+        if record.collection_name != self.state.collection_name or set(record.ingested_files) != set(self.state.ingested_files):
+            requested_web_search = self.state.web_search_enabled
+            await self.restore_async(record)
+            self.update_web_search_status(requested_web_search)
+        if record.web_search_enabled != self.state.web_search_enabled:
+            web_search_enabled = self.state.web_search_enabled
+            await self._update_record_async(lambda stored: setattr(stored, "web_search_enabled", web_search_enabled))
+        else:
+            # Only the activity timestamp changes, which the store bumps without a read-modify-write.
+            await self.session_store.touch(self.session_id)
+
+    @async_error_handler
+    async def restore_async(self, record: SessionRecord):
+        """Rebuilds this session from a stored record, reloading its knowledge base from Qdrant."""
+        logging.info(f"Restoring tutor session '{record.session_id}' from collection: {record.collection_name}")
+        self.config.qdrant_collection_name = record.collection_name
+        self.state.collection_name = record.collection_name
+        self.state.ingested_files = list(record.ingested_files)
+        self.update_web_search_status(record.web_search_enabled)
+
+        self.state.bm25_index = None
+        self.state.dedup_index = None
+        self.state.retrieval_cache.invalidate()
+        if not (record.ingested_files or record.bm25_corpus_ref) or not self.vectorstore_manager:
+            return
+        await self.vectorstore_manager.initialize_collection()
+
+        index_path = record.bm25_corpus_ref
+        if index_path and os.path.exists(index_path):
+            try:
+                self.state.bm25_index = await asyncio.to_thread(
+                    BM25Index.load, index_path, get_tokenizer(self.config.bm25_tokenizer)
+                )
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not load BM25 index {index_path}, rebuilding it: {e}")
+        if self.state.bm25_index is None:
+            # The index file lives on another host (or was lost); rebuild it from Qdrant.
+            documents = await self.vectorstore_manager.load_documents_async()
+            if documents:
+                await self._index_sparse_async(documents)
+        if self.config.dedup_enabled and self.state.bm25_index is not None:
+            self.state.dedup_index = await asyncio.to_thread(self._load_dedup_index, self.state.bm25_index.documents())
+        if self.state.bm25_index is not None and len(self.state.bm25_index):
+            self._build_retrievers()
+            logging.info(f"Restored knowledge base with {len(self.state.bm25_index)} chunks for session '{record.session_id}'.")
 
     async def knowledge_base_retrieval_tool(self, query: str) -> str:
         """Use this tool to answer questions by retrieving relevant information from the knowledge base."""
         if not self.ensemble_retriever:
             return "No knowledge base has been configured. Please upload documents to create one."
         logging.info(f"Activating knowledge base tool for query: {query}")
-        retrieved_docs = await self.ensemble_retriever.ainvoke(query)
+        retrieved_docs = self._cached_retrieval(query)
+        if retrieved_docs is None:
+            version = self.state.retrieval_cache.version
+            retrieved_docs = await self.ensemble_retriever.ainvoke(query)
+            chunk_ids = [doc.metadata.get("chunk_id") for doc in retrieved_docs]
+            if self.state.bm25_index is not None and all(chunk_ids):
+                self.state.retrieval_cache.put(query, chunk_ids, version)
         if not retrieved_docs:
             return "No relevant information was found in the knowledge base for this query. You can try rephrasing the question."
         return self.format_docs(retrieved_docs)
 
+    def _cached_retrieval(self, query: str) -> Optional[List[Document]]:
+        """
+        The chunks retrieved earlier for the same normalized query, resolved through the
+        session's BM25 index (which holds every indexed chunk), or None on a miss.
+        """
+        if self.state.bm25_index is None:
+            return None
+        chunk_ids = self.state.retrieval_cache.get(query)
+        if chunk_ids is None:
+            return None
+        documents = self.state.bm25_index.get_documents(chunk_ids)
+        return documents if all(doc is not None for doc in documents) else None
+
     def update_web_search_status(self, web_search_enabled: bool):
         """Dynamically enables or disables the web search tool without re-initializing."""
+        if web_search_enabled and self.engine.websearch_tool is None:
+            logging.warning("Cannot enable web search: PPLX_API_KEY is not set.")
+            web_search_enabled = False
+        if web_search_enabled == self.state.web_search_enabled and hasattr(self, "tools"):
+            return
+
         self.config.web_search_enabled = web_search_enabled
+        self.state.web_search_enabled = web_search_enabled
         logging.info(f"Updating web search status to: {self.config.web_search_enabled}")
 
-        websearch_tool_present = any(tool.name == 'perplexity_search' for tool in self.tools)
-
-        if self.config.web_search_enabled and not websearch_tool_present:
-            if os.getenv("PPLX_API_KEY"):
-                logging.info("Enabling and adding web search tool.")
-                websearch_tool = PerplexityWebSearchTool(
-                    max_results=5, 
-                    model="sonar", 
-                    include_links=True
-                ).get_tool()
-                self.tools.append(websearch_tool)
-            else:
-                logging.warning("Cannot enable web search: PPLX_API_KEY is not set.")
-                self.config.web_search_enabled = False
-
-        elif not self.config.web_search_enabled and websearch_tool_present:
-            logging.info("Disabling and removing web search tool.")
-            self.tools = [tool for tool in self.tools if tool.name != 'perplexity_search']
-
+        self.tools = [self.retriever_tool]
+        if web_search_enabled:
+            self.tools.append(self.engine.websearch_tool)
         self.tool_map = {tool.name: tool for tool in self.tools}
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.llm_with_tools = self.engine.get_llm_with_tools(web_search_enabled)
         logging.info(f"Tools updated. Current tools: {[tool.name for tool in self.tools]}")
 
     def _is_greeting_or_short_response(self, query: str) -> bool:
         """Checks if the query is a simple greeting or a short, common response."""
-        normalized_query = query.strip().lower()
-        return normalized_query in self.short_responses
+        return self.engine.fast_router.is_short_response(query)
 
     @staticmethod
     async def encode_image_async(image_path: str) -> str:
@@ -526,7 +1389,17 @@ For regular queries that don't need image generation, simply respond with "use_l
         """Format documents for the prompt."""
         if not docs:
             return "No relevant documents found in the knowledge base."
-        return "\n\n".join(f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in docs)
+        return "\n\n".join(f"Source: {self._describe_source(doc)}\nContent: {doc.page_content}" for doc in docs)
+
+    def _describe_source(self, doc: Document) -> str:
+        source = doc.metadata.get('source', 'N/A')
+        page = doc.metadata.get('page')
+        description = f"{source} (page {page + 1})" if isinstance(page, int) else source
+        if self.state.dedup_index is not None:
+            merged = self.state.dedup_index.merged_sources(doc)
+            if merged:
+                description += f" (also in: {', '.join(merged)})"
+        return description
 
     @traceable(name="initialize_vectorstore")
     async def initialize_vectorstore_async(self, documents: List[Document]):
@@ -536,186 +1409,273 @@ For regular queries that don't need image generation, simply respond with "use_l
                 logging.info("No documents to initialize vector store with.")
                 return False
 
-            if not QDRANT_AVAILABLE:
-                logging.warning("Qdrant is not available. Vector store will not be initialized.")
-                return False
-
-            if self.vectorstore_manager is None:
-                if self.config.qdrant_collection_name is None:
-                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-                    self.config.qdrant_collection_name = f"rag_session_{timestamp}"
-                
-                config = {
-                    'url': self.config.qdrant_url,
-                    'api_key': self.config.qdrant_api_key,
-                    'collection_name': self.config.qdrant_collection_name
-                }
-                self.vectorstore_manager = VectorStoreManager(config)
-                await self.vectorstore_manager.initialize_collection()
-                logging.info(f"Vector store initialized for collection: {self.config.qdrant_collection_name}")
-            
+            await self._ensure_vector_store_async()
             await self.vectorstore_manager.aadd_documents(documents)
-            
-            self.retriever = self.vectorstore_manager.get_retriever(k=self.config.retrieval_k)
-            
-            if RETRIEVER_AVAILABLE:
-                try:
-                    bm25_retriever = BM25Retriever.from_documents(
-                        documents, preprocess_func=lambda text: text.split()
-                    )
-                    bm25_retriever.k = self.config.retrieval_k
-                    
-                    self.ensemble_retriever = EnsembleRetriever(
-                        retrievers=[self.retriever, bm25_retriever],
-                        weights=[0.7, 0.3]
-                    )
-                    logging.info("Ensemble retriever configured with vector + BM25")
-                except Exception as e:
-                    logging.error(f"Error setting up hybrid retriever: {e}. Falling back to vector retriever.")
-                    self.ensemble_retriever = self.retriever
-            else:
-                self.ensemble_retriever = self.retriever
-            
+            await self._index_sparse_async(documents)
+            self.state.retrieval_cache.invalidate()
+            self._build_retrievers()
             return True
         except Exception as e:
             logging.error(f"Error initializing vector store: {e}")
             return False
 
-    @async_error_handler
-    async def ingest_async(self, storage_keys: List[str]) -> bool:
-        """Concurrently ingests documents from storage keys, now with image support."""
-        if not storage_keys:
-            logging.warning("No storage keys provided for ingestion.")
-            return False
+    async def _ensure_vector_store_async(self):
+        if self.vectorstore_manager is None:
+            if self.config.qdrant_collection_name is None:
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+                self.config.qdrant_collection_name = f"rag_session_{timestamp}"
+            self.vectorstore_manager = VectorStoreManager(
+                self.config,
+                embeddings=self.engine.embeddings,
+                qdrant_client=self.engine.qdrant_client
+            )
 
-        logging.info(f"Starting concurrent ingestion for {len(storage_keys)} storage keys.")
+        # The session's collection is only created once it has something to store.
+        if self.vectorstore_manager.vector_store is None:
+            await self.vectorstore_manager.initialize_collection()
+            logging.info(f"Vector store initialized for collection: {self.config.qdrant_collection_name}")
 
-        async def _process_single_key(key: str) -> List[Document]:
-            """Fetches a file from storage and processes it as a document or image."""
-            try:
-                file_content = await self.storage_manager.get_file_content_bytes_async(key)
-                if not file_content:
-                    logging.error(f"Failed to get content for key: {key}")
-                    return []
+    @property
+    def bm25_index_path(self) -> str:
+        return os.path.join(self.config.bm25_index_dir, f"{self.state.collection_name}.json.gz")
 
-                filename = os.path.basename(key)
+    @property
+    def dedup_index_path(self) -> str:
+        return os.path.join(self.config.bm25_index_dir, f"{self.state.collection_name}.dedup.json.gz")
+
+    def _delete_bm25_index_file(self):
+        for path in (self.bm25_index_path, self.dedup_index_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _load_dedup_index(self, documents: List[Document]) -> NearDuplicateIndex:
+        """Restores the session's near-duplicate index, or rebuilds it (without merge history) from its chunks."""
+        if os.path.exists(self.dedup_index_path):
+            try:
+                return NearDuplicateIndex.load(self.dedup_index_path, documents, threshold=self.config.dedup_threshold)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Could not load dedup index {self.dedup_index_path}, rebuilding it: {e}")
+        index = NearDuplicateIndex(threshold=self.config.dedup_threshold)
+        index.add_documents(documents)
+        return index
+
+    async def _match_duplicates_async(self, documents: List[Document]) -> DedupPlan:
+        """
+        Finds the chunks that nearly duplicate one already in the session's knowledge base.
+        The plan's `kept` chunks are the ones to index; commit it once they are indexed.
+        """
+        if self.state.dedup_index is None:
+            self.state.dedup_index = NearDuplicateIndex(threshold=self.config.dedup_threshold)
+        return await asyncio.to_thread(self.state.dedup_index.match, documents)
+
+    async def _commit_duplicates_async(self, plan: DedupPlan):
+        if self.state.dedup_index is not None:
+            await asyncio.to_thread(self.state.dedup_index.commit, plan)
+
+    def _has_indexed_chunks(self) -> bool:
+        """Whether the knowledge base holds anything to retrieve, whatever the file list says."""
+        return self.state.bm25_index is not None and len(self.state.bm25_index) > 0
+
+    async def _save_sparse_indexes_async(self):
+        """Persists the BM25 index and the near-duplicate index next to it."""
+        if self.state.bm25_index is not None:
+            await asyncio.to_thread(self.state.bm25_index.save, self.bm25_index_path)
+        if self.state.dedup_index is not None:
+            await asyncio.to_thread(self.state.dedup_index.save, self.dedup_index_path)
+
+    async def _index_sparse_async(self, documents: List[Document], persist: bool = True):
+        """Adds chunks to the session's incremental BM25 index and, by default, persists it."""
+        if self.state.bm25_index is None:
+            self.state.bm25_index = BM25Index(tokenizer=get_tokenizer(self.config.bm25_tokenizer))
+        await asyncio.to_thread(self.state.bm25_index.add_documents, documents)
+        if persist:
+            await asyncio.to_thread(self.state.bm25_index.save, self.bm25_index_path)
+
+    def _build_retrievers(self):
+        """
+        Builds the vector retriever and the hybrid retriever the knowledge-base tool uses:
+        RRF + MMR fusion by default, or the weighted vector + BM25 ensemble. Both sides
+        cover everything the session has ingested.
+        """
+        self.retriever = self.vectorstore_manager.get_retriever(k=self.config.retrieval_k)
+
+        if self.config.retrieval_fusion == "rrf":
+            self.ensemble_retriever = FusionRetriever(
+                embeddings=self.vectorstore_manager.embeddings,
+                vector_search=self.vectorstore_manager.search_with_vectors_async,
+                vector_lookup=self.vectorstore_manager.fetch_vectors_async,
+                sync_vector_search=self.vectorstore_manager.search_with_vectors,
+                sync_vector_lookup=self.vectorstore_manager.fetch_vectors,
+                bm25_index=self.state.bm25_index,
+                k=self.config.retrieval_k,
+                config=FusionConfig.from_env()
+            )
+        elif RETRIEVER_AVAILABLE and self.state.bm25_index is not None:
+            try:
+                bm25_retriever = BM25IndexRetriever(index=self.state.bm25_index, k=self.config.retrieval_k)
                 
-                if filename.lower().endswith(self.config.image_extensions):
-                    logging.info(f"🖼️ Detected image file: {filename}. Analyzing with vision model.")
-                    image_description = await self._process_image_from_bytes_async(file_content, filename)
-                    if image_description:
-                        return [Document(page_content=image_description, metadata={'source': filename, 'type': 'image'})]
-                else:
-                    return await self._process_document_from_bytes_async(file_content, filename)
+                self.ensemble_retriever = EnsembleRetriever(
+                    retrievers=[self.retriever, bm25_retriever],
+                    weights=[0.7, 0.3]
+                )
+                logging.info("Ensemble retriever configured with vector + BM25")
             except Exception as e:
-                logging.error(f"Exception while processing file for key {key}: {e}", exc_info=True)
-            return []
-
-        tasks = [_process_single_key(key) for key in storage_keys]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+                logging.error(f"Error setting up hybrid retriever: {e}. Falling back to vector retriever.")
+                self.ensemble_retriever = self.retriever
+        else:
+            self.ensemble_retriever = self.retriever
 
-        all_processed_docs = []
-        for res in results:
-            if isinstance(res, list):
-                all_processed_docs.extend(res)
-            elif isinstance(res, Exception):
-                logging.error(f"Error during concurrent ingestion task: {res}")
+    @async_error_handler
+    async def ingest_async(self, storage_keys: List[str]) -> bool:
+        """Ingests documents and images from storage keys; True if the upload made it into the knowledge base."""
+        chunks_ingested = 0
+        async for event in self.ingest_stream_async(storage_keys):
+            if event["type"] == "done":
+                # Chunks merged into ones already indexed count too: their text is searchable.
+                chunks_ingested = event["chunks_indexed"] + event["duplicates_dropped"]
+        return chunks_ingested > 0 and self._has_indexed_chunks()
+
+    async def ingest_stream_async(self, storage_keys: List[str]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Ingests files through the staged, streaming pipeline and yields its progress events.
+        Pages are parsed lazily, chunked and indexed batch by batch, and the retrievers are
+        rebuilt after every indexed batch, so the session can answer questions about the
+        first pages of a large upload while the rest is still being processed. Indexes are
+        persisted and the session record is saved once, at the end. Near-duplicate chunks
+        (repeated headers, another version of the same worksheet) are dropped before they
+        are embedded.
+        """
+        if not storage_keys:
+            logging.warning("No storage keys provided for ingestion.")
+            yield {"type": "done", **IngestionProgress().as_dict()}
+            return
 
-        if all_processed_docs:
-            logging.info(f"Ingesting {len(all_processed_docs)} processed documents into vector store.")
-            return await self.initialize_vectorstore_async(all_processed_docs)
-        else:
-            logging.warning("No documents were successfully processed for ingestion.")
-            return False
+        logging.info(f"Starting streaming ingestion for {len(storage_keys)} storage keys.")
+        replaced_sources: set = set()
+
+        async def _replace_previous_versions(chunks: List[Document]):
+            await self._ensure_vector_store_async()
+            # A re-uploaded file replaces its previous version instead of being merged with it.
+            for source in {doc.metadata.get('source') for doc in chunks} - replaced_sources:
+                replaced_sources.add(source)
+                if source in self.state.ingested_files:
+                    await self._remove_source_async(source)
+
+        # The index stage handles one batch at a time: match, index, then commit.
+        dedup_plan: Optional[DedupPlan] = None
+
+        def _record_sources(chunks: List[Document]):
+            for source in {doc.metadata.get('source') for doc in chunks}:
+                if source and source not in self.state.ingested_files:
+                    self.state.ingested_files.append(source)
+
+        async def _deduplicate(chunks: List[Document]) -> List[Document]:
+            nonlocal dedup_plan
+            # The previous version goes first, so its chunks are not mistaken for duplicates.
+            await _replace_previous_versions(chunks)
+            plan = await self._match_duplicates_async(chunks)
+            if plan.kept:
+                dedup_plan = plan
+            else:
+                # Every chunk merged into one already indexed; nothing will be indexed, but
+                # the file is part of the knowledge base and can be removed like any other.
+                await self._commit_duplicates_async(plan)
+                _record_sources(chunks)
+            return plan.kept
+
+        async def _index(chunks: List[Document]):
+            nonlocal dedup_plan
+            await _replace_previous_versions(chunks)
+            await self.vectorstore_manager.aadd_documents(chunks, persist=False)
+            await self._index_sparse_async(chunks, persist=False)
+            # Only now that the kept chunks are indexed do their signatures and merges count.
+            plan, dedup_plan = dedup_plan, None
+            if plan is not None:
+                await self._commit_duplicates_async(plan)
+            _record_sources(chunks)
+            if plan is not None:
+                _record_sources([document for _, document in plan.duplicates])
+            self.state.retrieval_cache.invalidate()
+            self._build_retrievers()
+
+        pipeline = StreamingIngestion(
+            load_pages=self._load_pages_async,
+            chunk=self.chunker.asplit_documents,
+            index=_index,
+            config=StreamingIngestionConfig.from_env(),
+            deduplicate=_deduplicate if self.config.dedup_enabled else None
+        )
+        try:
+            async for event in pipeline.run(storage_keys):
+                yield event
+        except Exception as e:
+            logging.error(f"Streaming ingestion failed: {e}", exc_info=True)
+            yield {"type": "error", "message": str(e)}
+        finally:
+            if replaced_sources:
+                await self.vectorstore_manager.save_async()
+                await self._save_sparse_indexes_async()
+                ingested = [source for source in self.state.ingested_files if source in replaced_sources]
+                bm25_corpus_ref = self.bm25_index_path if self._has_indexed_chunks() else None
+
+                def _merge(record: SessionRecord):
+                    # Only the sources this run touched; files other workers added stay as they are.
+                    kept = [f for f in record.ingested_files if f not in replaced_sources]
+                    record.ingested_files = kept + ingested
+                    record.bm25_corpus_ref = bm25_corpus_ref
+                await self._update_record_async(_merge)
+
+    async def _load_pages_async(self, key: str) -> AsyncGenerator[List[Document], None]:
+        """Fetches a file from storage and yields its pages (or its image description) in batches."""
+        file_content = await self.storage_manager.get_file_content_bytes_async(key)
+        if not file_content:
+            raise ValueError(f"Failed to get content for key: {key}")
+
+        filename = os.path.basename(key)
+        if filename.lower().endswith(self.config.image_extensions):
+            logging.info(f"🖼️ Detected image file: {filename}. Analyzing with vision model.")
+            image_description = await self._process_image_from_bytes_async(file_content, filename)
+            if image_description:
+                yield [Document(page_content=image_description, metadata={'source': filename, 'type': 'image'})]
+            return
+        async for pages in get_document_parser().iter_parse(file_content, filename):
+            yield pages
 
     async def _process_image_from_bytes_async(self, image_bytes: bytes, filename: str) -> Optional[str]:
         """
-        Processes an image from bytes, generating a description using a vision model.
+        Describes an image with the shared vision models. The image is downscaled first,
+        and a description cached for the same image, or for a visually identical one
+        uploaded to this session, is reused.
         """
         try:
-            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-            prompt_text = "Describe this image for a search index. Be detailed about any objects, text, people, and the overall scene or context. This description will be used to find this image in a knowledge base."
-            image_url = f"data:image/jpeg;base64,{base64_image}"
-
-            try:
-                logging.info(f"Attempting to generate description for '{filename}' with OpenAI's model.")
-                vision_model_openai = ChatOpenAI(
-                    model=self.config.llm_model,
-                    max_tokens=1024,
-                    openai_api_key=self.config.openai_api_key
-                    )
-                response = await vision_model_openai.ainvoke([
-                    HumanMessage(content=[
-                        {"type": "text", "text": prompt_text},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ])
-                ])
-                description = f"Image Content (from file: {filename}):\n{response.content}"
-                logging.info(f"Successfully generated description for '{filename}' using OpenAI's model.")
-                return description
-
-            except Exception as e_openai:
-                logging.error(f"Error using OpenAI's model for '{filename}': {e_openai}. Falling back to Google's model.")
-                try:
-                    logging.info(f"Attempting to generate description for '{filename}' with Google's model.")
-                    vision_model = ChatGoogleGenerativeAI(
-                    model="gemini-1.5-flash-latest",
-                    max_tokens=self.config.max_tokens,
-                    google_api_key=self.config.google_api_key,
-                )
-                    response = await vision_model.ainvoke([
-                    HumanMessage(content=[
-                        {"type": "text", "text": prompt_text},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ])
-                ])
-                    description = f"Image Content (from file: {filename}):\n{response.content}"
-                    logging.info(f"Successfully generated description for '{filename}' using Google's model.")
-                    return description
-
-                except Exception as e_google:
-                    logging.error(f"Error processing image '{filename}' with fallback Google model: {e_google}", exc_info=True)
-                    return None
-
-        except Exception as e_initial:
-            logging.error(f"An initial error occurred while processing '{filename}': {e_initial}", exc_info=True)
+            description = await self.engine.image_describer.describe(
+                image_bytes, filename, scope=self.session_id or self.state.collection_name
+            )
+        except Exception as e:
+            logging.error(f"An error occurred while processing '{filename}': {e}", exc_info=True)
             return None
-            
+        if description is None:
+            logging.error(f"Could not generate a description for '{filename}' with any vision model.")
+            return None
+        return f"Image Content (from file: {filename}):\n{description}"
+
     async def _process_document_from_bytes_async(self, file_bytes: bytes, filename: str) -> List[Document]:
-        """Processes a standard document from bytes by writing to a temp file for loading."""
-        temp_file_path = None
+        """Parses a standard document from its bytes in the shared document-parser process pool."""
         try:
-            file_extension = os.path.splitext(filename)[1].lower()
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-                temp_file.write(file_bytes)
-                temp_file_path = temp_file.name
-            
-            loader = None
-            if file_extension == '.pdf': loader = PDFPlumberLoader(temp_file_path)
-            elif file_extension == '.docx': loader = Docx2txtLoader(temp_file_path)
-            elif file_extension == '.json': loader = JSONLoader(temp_file_path, jq_schema='.[*]', text_content=False)
-            elif file_extension in ['.html', '.htm', '.xhtml']: loader = BSHTMLLoader(temp_file_path)
-            elif file_extension in ['.txt', '.md']: loader = TextLoader(temp_file_path, autodetect_encoding=True)
-            
-            if loader:
-                logging.info(f"📄 Loading document: {filename}")
-                docs = await asyncio.to_thread(loader.load)
-                for doc in docs:
-                    doc.metadata['source'] = filename 
-                return docs
-            else:
-                logging.warning(f"No loader available for file extension {file_extension} of file {filename}")
-
+            return await get_document_parser().parse(file_bytes, filename)
         except Exception as e:
             logging.error(f"Error processing document {filename}: {e}", exc_info=True)
-        finally:
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
         return []
 
     @async_error_handler
-    async def _agent_executor_stream_async(self, query: str, formatted_time: str, image_path: Optional[str] = None, is_knowledge_base_ready: bool = False, teaching_data: Optional[Dict[str, Any]] = None, history: Optional[List[Dict[str, Any]]] = None) -> AsyncGenerator[str, None]:
-        """Private method to invoke the tool-enabled LLM with a finalized query."""
+    async def _agent_executor_stream_async(self, query: str, formatted_time: str, image_path: Optional[str] = None, is_knowledge_base_ready: bool = False, teaching_data: Optional[Dict[str, Any]] = None, history: Optional[List[Dict[str, Any]]] = None, plan: Optional[Dict[str, Any]] = None, speculative_retrieval: Optional[SpeculativeRetrieval] = None) -> AsyncGenerator[str, None]:
+        """
+        Private method to invoke the tool-enabled LLM with a finalized query. When the turn
+        planner already chose the tool calls they are executed directly; when the plan
+        leaves them open (first messages), the tool-bound call may also pick the image generator.
+        Tool calls run concurrently; a knowledge-base call may be answered by the turn's
+        speculative retrieval.
+        """
         teaching_data_str = "No teaching data provided. Please provide teacher name and student reports for analysis."
         if teaching_data:
             try:
@@ -758,30 +1718,89 @@ For regular queries that don't need image generation, simply respond with "use_l
             )
 
         messages = [SystemMessage(content=system_prompt_text), HumanMessage(content=message_content)]
-        ai_response_with_tool = await self.llm_with_tools.ainvoke(messages)
-        
-        if not ai_response_with_tool.tool_calls:
-            logging.info("LLM provided a direct answer without tool usage. Invoking a new stream for the response.")
-            final_chain = self.llm | StrOutputParser()
-            async for chunk in final_chain.astream(messages):
-                yield chunk
-            return
+        planned_calls = plan.get("tool_calls") if plan else None
+        if planned_calls is None:
+            llm_with_tools = self.engine.get_llm_with_tools(self.config.web_search_enabled, image_generation=True) if plan else self.llm_with_tools
+            # Streamed: a direct answer goes to the client as it is generated, while
+            # tool-call deltas are accumulated and only lead to a second completion
+            # when the model actually requested tools.
+            ai_response_with_tool = None
+            async for chunk in llm_with_tools.astream(messages):
+                ai_response_with_tool = chunk if ai_response_with_tool is None else ai_response_with_tool + chunk
+                text = chunk.text()
+                if text:
+                    yield text
+            if ai_response_with_tool is None:
+                return
+            if ai_response_with_tool.invalid_tool_calls:
+                logging.warning(f"Ignoring malformed tool calls: {ai_response_with_tool.invalid_tool_calls}")
+
+            image_call = next((call for call in ai_response_with_tool.tool_calls if call["name"] == IMAGE_GENERATOR_TOOL_NAME), None)
+            if image_call:
+                logging.info(f"LLM routed the query to the image generator with args {image_call['args']}")
+                async for chunk in generate_image_chunks(image_call["args"]):
+                    yield chunk
+                return
 
-        messages.append(ai_response_with_tool)
-        for tool_call in ai_response_with_tool.tool_calls:
-            tool_name = tool_call["name"]
-            logging.info(f"LLM decided to call tool: {tool_name} with args {tool_call['args']}")
-            if tool_name in self.tool_map:
-                selected_tool = self.tool_map[tool_name]
-                tool_output = await selected_tool.ainvoke(tool_call["args"])
-            else:
-                tool_output = f"Error: Tool '{tool_name}' not found."
-            messages.append(ToolMessage(content=str(tool_output), tool_call_id=tool_call["id"]))
+            if not ai_response_with_tool.tool_calls:
+                logging.info("LLM provided a direct answer without tool usage.")
+                return
+            tool_calls = ai_response_with_tool.tool_calls
+            messages.append(AIMessage(content=ai_response_with_tool.content, tool_calls=tool_calls))
+        else:
+            tool_calls = [
+                {"name": call["name"], "args": self._planned_tool_args(call["name"], call["query"]), "id": f"call_{uuid.uuid4().hex[:24]}"}
+                for call in planned_calls
+            ]
+            if tool_calls:
+                messages.append(AIMessage(content="", tool_calls=tool_calls))
+
+        # Independent tool calls run concurrently; results keep the order of the calls.
+        messages.extend(await asyncio.gather(*(self._run_tool_call(tool_call, speculative_retrieval) for tool_call in tool_calls)))
 
         final_chain = self.llm | StrOutputParser()
         async for chunk in final_chain.astream(messages):
             yield chunk
 
+    async def _run_tool_call(self, tool_call: Dict[str, Any], speculative_retrieval: Optional[SpeculativeRetrieval] = None) -> ToolMessage:
+        """Executes one tool call; failures are reported to the model instead of failing the turn."""
+        tool_name = tool_call["name"]
+        logging.info(f"LLM decided to call tool: {tool_name} with args {tool_call['args']}")
+        try:
+            if tool_name not in self.tool_map:
+                tool_output = f"Error: Tool '{tool_name}' not found."
+            else:
+                args = tool_call["args"]
+                speculative_result = None
+                if speculative_retrieval is not None and tool_name == self.retriever_tool.name:
+                    requested_query = next(iter(args.values()), "") if isinstance(args, dict) else str(args)
+                    speculative_result = speculative_retrieval.claim(str(requested_query))
+                if speculative_result is not None:
+                    tool_output = await speculative_result
+                else:
+                    tool_output = await self.tool_map[tool_name].ainvoke(args)
+        except Exception as e:
+            logging.error(f"Tool {tool_name} failed: {e}")
+            tool_output = f"Error: Tool '{tool_name}' failed: {e}"
+        return ToolMessage(content=str(tool_output), tool_call_id=tool_call["id"])
+
+    def _start_speculative_retrieval(self, query: str) -> Optional[SpeculativeRetrieval]:
+        """Starts retrieving for the user's message while the turn is planned, if a knowledge base is ready."""
+        if not self.engine.speculative_retrieval_config.enabled or self.ensemble_retriever is None:
+            return None
+        return SpeculativeRetrieval(
+            query,
+            self.knowledge_base_retrieval_tool,
+            config=self.engine.speculative_retrieval_config,
+            metrics=get_speculative_retrieval_metrics(),
+        )
+
+    def _planned_tool_args(self, tool_name: str, query: str) -> Dict[str, Any]:
+        """Maps a planned tool query onto the tool's single argument."""
+        selected_tool = self.tool_map.get(tool_name)
+        arg_name = next(iter(selected_tool.args), "query") if selected_tool else "query"
+        return {arg_name: query}
+
     async def _route_query(self, query: str) -> dict:
         """Determine which action to take based on the user query."""
         try:
@@ -830,86 +1849,42 @@ For regular queries that don't need image generation, simply respond with "use_l
             return {"action": ActionType.USE_LLM_WITH_TOOLS}
 
     async def setup_langgraph_async(self):
-        """Set up the LangGraph orchestrator workflow asynchronously."""
-        
-        async def router_node(state: OrchestratorState) -> dict:
-            """Determine which action to take based on the user query."""
-            last_message = state["messages"][-1]
-            routing_decision = await self._route_query(last_message.content)
-            
-            if routing_decision["action"] == ActionType.GENERATE_IMAGE:
-                return {"action": ActionType.GENERATE_IMAGE, "image_generation_params": routing_decision["parameters"]}
-            else:
-                return {"action": ActionType.USE_LLM_WITH_TOOLS}
-        
-        async def llm_with_tools_node(state: OrchestratorState):
-            """Process the query with the standard LLM and tools using streaming."""
-            from langgraph.config import get_stream_writer
-            
-            last_message = state["messages"][-1]
-            history = state.get("history", [])
-            teaching_data = state.get("teaching_data")
-            
-            formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            writer = get_stream_writer()
-            
-            async for chunk in self._agent_executor_stream_async(
-                query=last_message.content,
-                formatted_time=formatted_time,
-                is_knowledge_base_ready=(self.ensemble_retriever is not None),
-                teaching_data=teaching_data,
-                history=history
-            ):
-                writer(chunk)
-            
-            return {"messages": [AIMessage(content="")]}
-        
-        def route_by_action(state: OrchestratorState):
-            """Route to the next node based on the action determined by the router."""
-            action = state.get("action")
-            if action == ActionType.GENERATE_IMAGE:
-                return "image_generator"
-            else:
-                return "llm_with_tools"
-        
-        workflow = StateGraph(OrchestratorState)
-        workflow.add_node("router", router_node)
-        workflow.add_node("llm_with_tools", llm_with_tools_node)
-        workflow.add_node("image_generator", image_generator_node)
-        workflow.add_edge(START, "router")
-        workflow.add_conditional_edges("router", route_by_action)
-        workflow.add_edge("image_generator", END)
-        workflow.add_edge("llm_with_tools", END)
-        
-        self.graph = workflow.compile()
-        logging.info("LangGraph orchestrator workflow created successfully.")
-        return self.graph
-    
+        """Returns the orchestrator graph, which is compiled once on the shared engine."""
+        return self.engine.graph
+
     @async_error_handler
     async def run_agent_async(self, query: str, history: List[Dict[str, Any]], image_storage_key: Optional[str] = None, is_knowledge_base_ready: bool = False, uploaded_files: Optional[List[str]] = None, teaching_data: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
         """Run the agent with a query and history, using the orchestrator graph with streaming."""
         formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        rephrased_query = await self._rephrase_query_with_history_async(query, history, uploaded_files)
+        plan = self._fast_route_turn(query, standalone=not history and not uploaded_files)
+        # Retrieval for the user's message overlaps with planning and tool selection.
+        speculative_retrieval = self._start_speculative_retrieval(query) if plan is None else None
         temp_image_path = None
-        
-        if image_storage_key:
-            try:
-                image_bytes = await self.storage_manager.get_file_content_bytes_async(image_storage_key)
-                if image_bytes:
-                    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(image_storage_key)[1], delete=False) as temp_file:
-                        temp_file.write(image_bytes)
-                        temp_image_path = temp_file.name
-                    logging.info(f"Loaded image from storage key '{image_storage_key}' for processing.")
-                else:
-                    logging.error(f"Failed to load image from storage key: {image_storage_key}")
-            except Exception as e:
-                logging.error(f"Error handling image storage key {image_storage_key}: {e}")
 
         try:
-            if self.graph is None:
-                await self.setup_langgraph_async()
-                
+            if plan is None and self.config.turn_planner_enabled:
+                plan = await self._plan_turn_async(query, history, uploaded_files)
+            if plan is not None:
+                rephrased_query = plan["standalone_query"]
+            else:
+                rephrased_query = await self._rephrase_query_with_history_async(query, history, uploaded_files)
+                # The rephrased query is standalone, so an explicit image request can skip the LLM router.
+                plan = self._fast_route_turn(rephrased_query, standalone=True)
+
+            if image_storage_key:
+                try:
+                    image_bytes = await self.storage_manager.get_file_content_bytes_async(image_storage_key)
+                    if image_bytes:
+                        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(image_storage_key)[1], delete=False) as temp_file:
+                            temp_file.write(image_bytes)
+                            temp_image_path = temp_file.name
+                        logging.info(f"Loaded image from storage key '{image_storage_key}' for processing.")
+                    else:
+                        logging.error(f"Failed to load image from storage key: {image_storage_key}")
+                except Exception as e:
+                    logging.error(f"Error handling image storage key {image_storage_key}: {e}")
+
             logging.info(f"Processing query via orchestrator graph: {rephrased_query}")
             
             messages = [
@@ -920,13 +1895,15 @@ For regular queries that don't need image generation, simply respond with "use_l
             initial_state = {
                 "messages": messages,
                 "teaching_data": teaching_data,
-                "history": history
+                "history": history,
+                "plan": plan
             }
 
             is_image_response = False
             
             async for chunk in self.graph.astream(
                 initial_state,
+                config={"configurable": {"tutor": self, "speculative_retrieval": speculative_retrieval}},
                 stream_mode="custom"
             ):
                 if isinstance(chunk, dict) and "content" in chunk and "exclude_from_history" in chunk:
@@ -940,6 +1917,8 @@ For regular queries that don't need image generation, simply respond with "use_l
                     yield str(chunk)
                 
         finally:
+            if speculative_retrieval is not None:
+                speculative_retrieval.close()
             if temp_image_path and os.path.exists(temp_image_path):
                 try:
                     os.unlink(temp_image_path)
@@ -947,22 +1926,89 @@ For regular queries that don't need image generation, simply respond with "use_l
                 except Exception as e:
                     logging.error(f"Error cleaning up temporary image file: {e}")
 
+    @staticmethod
+    def _chat_history_context(query: str, history: List[Dict[str, Any]], uploaded_files: Optional[List[str]] = None) -> str:
+        """The uploaded-files note and the previous user message, as given to the rephrase and planner prompts."""
+        chat_history_str = ""
+        if uploaded_files:
+            files_str = "', '".join(uploaded_files)
+            chat_history_str += f"System Note: The user has just uploaded the following file(s): '{files_str}'. The follow-up question likely refers to these files.\n\n"
+
+        for msg in reversed(history):
+            if msg.get("role", "") == "user":
+                content = msg.get("content", "")
+                if content and content != query:
+                    chat_history_str += f"User: {content}\n"
+                    break
+        return chat_history_str
+
+    def _fast_route_turn(self, query: str, standalone: bool) -> Optional[Dict[str, Any]]:
+        """
+        Routes the turn locally when the fast router is confident: greetings and fillers
+        are answered directly without tools, and explicit image requests go straight to the
+        image generator when `query` is standalone (a follow-up such as "draw that" needs
+        the history). Returns None to leave the turn to the planner or the LLM router.
+        """
+        route = self.engine.fast_router.classify(query)
+        if route is None:
+            return None
+        if route.label in (GREETING, FILLER):
+            logging.info(f"Fast route: '{query}' is a {route.label} ({route.source}, {route.confidence:.2f}); answering without tools.")
+            return {"standalone_query": query, "action": ActionType.USE_LLM_WITH_TOOLS, "image_parameters": None, "tool_calls": []}
+        if route.label == IMAGE and standalone:
+            logging.info(f"Fast route: '{query}' is an image request ({route.source}, {route.confidence:.2f}).")
+            return {"standalone_query": query, "action": ActionType.GENERATE_IMAGE, "image_parameters": image_parameters_from_query(query), "tool_calls": []}
+        return None
+
+    async def _plan_turn_async(self, query: str, history: List[Dict[str, Any]], uploaded_files: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Plans the turn in one structured-output call: the standalone query, the route and
+        the tool calls. No call is made for fillers (answered directly, without tools) or
+        for first messages, which are already standalone; their route and tools are left
+        to the tool-bound call. Returns None if planning fails, so the caller falls back
+        to the rephrase and router chains.
+        """
+        if self._is_greeting_or_short_response(query):
+            return {"standalone_query": query, "action": ActionType.USE_LLM_WITH_TOOLS, "image_parameters": None, "tool_calls": []}
+        chat_history_str = self._chat_history_context(query, history, uploaded_files)
+        if not chat_history_str:
+            return {"standalone_query": query, "action": ActionType.USE_LLM_WITH_TOOLS, "image_parameters": None, "tool_calls": None}
+
+        tools = [f"- `{self.retriever_tool.name}`: the teacher's uploaded documents (generated_content)."]
+        if self.config.web_search_enabled:
+            tools.append(f"- `{self.engine.websearch_tool.name}`: web search for new information, examples and resources.")
+        knowledge_base = "AVAILABLE" if self.ensemble_retriever is not None else f"NOT AVAILABLE, do not call `{self.retriever_tool.name}`"
+        try:
+            plan: TurnPlan = await self.engine.turn_planner_chain.ainvoke({
+                "chat_history": chat_history_str,
+                "question": query,
+                "tools": "\n".join(tools),
+                "knowledge_base": knowledge_base,
+            })
+        except Exception as e:
+            logging.error(f"Error planning turn, falling back to the rephrase and router chains: {e}")
+            return None
+
+        logging.info(f"Turn planned: '{query}' -> '{plan.standalone_query}', action={plan.action}, tools={[call.name for call in plan.tool_calls]}")
+        if plan.action == "generate_image" and plan.image_parameters is not None:
+            return {
+                "standalone_query": plan.standalone_query,
+                "action": ActionType.GENERATE_IMAGE,
+                "image_parameters": plan.image_parameters.model_dump(),
+                "tool_calls": [],
+            }
+        return {
+            "standalone_query": plan.standalone_query,
+            "action": ActionType.USE_LLM_WITH_TOOLS,
+            "image_parameters": None,
+            "tool_calls": [call.model_dump() for call in plan.tool_calls if call.name in self.tool_map],
+        }
+
     @async_error_handler
     async def _rephrase_query_with_history_async(self, query: str, history: List[Dict[str, Any]], uploaded_files: Optional[List[str]] = None) -> str:
         """Rephrase the query using chat history to make it standalone."""
         try:
-            chat_history_str = ""
-            if uploaded_files:
-                files_str = "', '".join(uploaded_files)
-                chat_history_str += f"System Note: The user has just uploaded the following file(s): '{files_str}'. The follow-up question likely refers to these files.\n\n"
-            
-            for msg in reversed(history):
-                if msg.get("role", "") == "user":
-                    content = msg.get("content", "")
-                    if content and content != query:
-                        chat_history_str += f"User: {content}\n"
-                        break
-            
+            chat_history_str = self._chat_history_context(query, history, uploaded_files)
             rephrased = await self.rephrase_chain.ainvoke({
                 "chat_history": chat_history_str,
                 "question": query
@@ -973,33 +2019,36 @@ For regular queries that don't need image generation, simply respond with "use_l
             logging.error(f"Error rephrasing query: {e}")
             return query
 
-    def __del__(self):
-        """Clean up the executor on deletion."""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True)
-
-async def image_generator_node(state: OrchestratorState):
-    """Generate an image based on the parameters."""
-    writer = get_stream_writer()
+async def generate_image_chunks(params: Optional[dict]) -> AsyncGenerator[Union[str, dict], None]:
+    """
+    Generates an image from the router's or planner's parameters. Yields status text and,
+    on success, the image markdown as {"content": ..., "exclude_from_history": True}.
+    """
     try:
-        params = state.get("image_generation_params", {})
         if not params:
-            writer("Error: Missing image generation parameters.")
-            return {"messages": [AIMessage(content="Error: Missing image generation parameters.")]}
-            
-        writer("Generating image based on your specifications...")
-            
+            yield "Error: Missing image generation parameters."
+            return
+
+        yield "Generating image based on your specifications..."
+
         image_generator = ImageGenerator()
-        image_base64 = image_generator.generate_image_from_schema(params)
-        
+        image_base64 = await get_provider_executor().run("openai", image_generator.generate_image_from_schema, params)
+
         if image_base64:
-            image_md = f"![Generated Image](data:image/png;base64,{image_base64})"
-            writer({"content": image_md, "exclude_from_history": True})
-            return {"messages": [AIMessage(content=image_md)], "exclude_from_history": True}
+            yield {"content": f"![Generated Image](data:image/png;base64,{image_base64})", "exclude_from_history": True}
         else:
-            writer("Failed to generate image. Please check parameters and try again.")
-            return {"messages": [AIMessage(content="Failed to generate image. Please check parameters and try again.")]}
+            yield "Failed to generate image. Please check parameters and try again."
     except Exception as e:
-        logging.error(f"Error in image_generator_node: {e}")
-        writer(f"Error generating image: {str(e)}")
-        return {"messages": [AIMessage(content=f"Error generating image: {str(e)}")]}
\ No newline at end of file
+        logging.error(f"Error in image generation: {e}")
+        yield f"Error generating image: {str(e)}"
+
+async def image_generator_node(state: OrchestratorState):
+    """Generate an image based on the parameters."""
+    writer = get_stream_writer()
+    last_chunk = ""
+    async for chunk in generate_image_chunks(state.get("image_generation_params", {})):
+        writer(chunk)
+        last_chunk = chunk
+    if isinstance(last_chunk, dict):
+        return {"messages": [AIMessage(content=last_chunk["content"])], "exclude_from_history": True}
+    return {"messages": [AIMessage(content=last_chunk)]}
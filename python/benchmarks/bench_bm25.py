@@ -0,0 +1,107 @@
+"""
+Benchmark: sparse retrieval over a large mixed English/Arabic corpus.
+
+Compares LangChain's BM25Retriever (rank_bm25, whitespace tokens), which the tutor used
+before it kept its own index, with BM25Index (SciPy sparse scoring) under the simple and
+multilingual tokenizers. Reports index build time, traced memory, query latency and
+precision@k, where a hit is a chunk of the query's topic.
+
+Arabic queries are written the way students type them: without diacritics and with
+bare alefs, while the corpus mixes vocalized and hamza spellings.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_bm25 --chunks 50000 --queries 200
+"""
+import time
+import random
+import argparse
+import tracemalloc
+import statistics
+
+from langchain.schema import Document
+from langchain_community.retrievers import BM25Retriever
+
+from rag_toolkit.bm25_index import BM25Index
+from rag_toolkit.tokenizers import get_tokenizer, normalize_arabic
+from benchmarks.fakes import ARABIC_TOPICS, TOPICS, synthetic_multilingual_chunks
+
+
+def _queries(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        topic = rng.choice(list(TOPICS))
+        arabic = rng.random() < 0.5
+        words = rng.sample((ARABIC_TOPICS if arabic else TOPICS)[topic].split(), 3)
+        text = " ".join(words)
+        queries.append((normalize_arabic(text) if arabic else text, topic, "ar" if arabic else "en"))
+    return queries
+
+
+def _measure_build(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    retriever = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retriever, elapsed, current / 2**20
+
+
+def _measure_queries(search, queries, k):
+    latencies, hits = [], {"en": [], "ar": []}
+    for text, topic, language in queries:
+        start = time.perf_counter()
+        documents = search(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits[language].append(sum(doc.metadata["topic"] == topic for doc in documents[:k]) / k)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    precision = {language: statistics.mean(values) if values else 0.0 for language, values in hits.items()}
+    return statistics.median(latencies), p95, precision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure BM25 build time, memory, latency and precision.")
+    parser.add_argument("--chunks", type=int, default=50_000, help="Chunks in the synthetic corpus.")
+    parser.add_argument("--words-per-chunk", type=int, default=120, help="Words per chunk.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to time.")
+    parser.add_argument("--k", type=int, default=5, help="Results per query.")
+    args = parser.parse_args()
+
+    corpus = synthetic_multilingual_chunks(args.chunks, args.words_per_chunk)
+    documents = [
+        Document(page_content=item["text"], metadata={"chunk_id": item["id"], "source": f"{item['topic']}.pdf", "topic": item["topic"]})
+        for item in corpus
+    ]
+    queries = _queries(args.queries)
+    print(f"{len(documents)} chunks ({args.words_per_chunk} words each), {len(queries)} queries, k={args.k}")
+    print(f"{'retriever':<28} {'build s':>8} {'memory MB':>10} {'p50 ms':>8} {'p95 ms':>8} {'P@k en':>7} {'P@k ar':>7}")
+
+    def _report(name, build, search):
+        retriever, build_seconds, memory = _measure_build(build)
+        p50, p95, precision = _measure_queries(lambda text: search(retriever, text), queries, args.k)
+        print(f"{name:<28} {build_seconds:8.2f} {memory:10.1f} {p50:8.2f} {p95:8.2f} {precision['en']:7.2f} {precision['ar']:7.2f}")
+
+    _report(
+        "BM25Retriever (rank_bm25)",
+        lambda: BM25Retriever.from_documents(documents, k=args.k),
+        lambda retriever, text: retriever.invoke(text),
+    )
+    for tokenizer in ("simple", "multilingual"):
+        def _build(tokenizer=tokenizer):
+            index = BM25Index(tokenizer=get_tokenizer(tokenizer))
+            index.add_documents(documents)
+            # Materialize the weights so the first timed query does not pay for them.
+            index.search(documents[0].page_content, 1)
+            return index
+
+        _report(
+            f"BM25Index ({tokenizer})",
+            _build,
+            lambda index, text: [doc for doc, _ in index.search(text, args.k)],
+        )
+
+
+if __name__ == "__main__":
+    main()
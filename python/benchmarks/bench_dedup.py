@@ -0,0 +1,168 @@
+"""
+Benchmark: near-duplicate chunk elimination at ingestion time.
+
+Teachers upload several versions of the same worksheet, and every file of a
+department repeats the same instructions and rubric. This builds such a corpus
+(per topic, a few versions of one worksheet with small edits, each prefixed with a
+shared boilerplate section), ingests it through AsyncRAGTutor.ingest_stream_async
+with and without the NearDuplicateIndex stage, and reports:
+
+  - chunks created vs indexed, and ingest time (embedding cost is simulated)
+  - top-k diversity: the share of retrieved chunks that are not near-duplicates of a
+    higher-ranked chunk for the same query (exact word 3-gram Jaccard >= threshold)
+  - raw NearDuplicateIndex.deduplicate throughput on synthetic chunks
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_dedup --versions 4 --pages-per-topic 6
+"""
+import os
+import re
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.schema import Document
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from rag_toolkit.dedup import NearDuplicateIndex
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, TOPICS, synthetic_multilingual_chunks, synthetic_pages
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _boilerplate(seed: int = 11, words: int = 420) -> str:
+    """Instructions and rubric shared by every worksheet, long enough to fill its own chunk."""
+    rng = random.Random(seed)
+    vocabulary = ("read each question carefully show your work use complete sentences points rubric "
+                  "name class date teacher homework due submit late penalty criteria excellent good "
+                  "needs improvement accuracy explanation neatness").split()
+    sentences, count = [], 0
+    while count < words:
+        length = rng.randint(8, 16)
+        sentences.append(" ".join(rng.choice(vocabulary) for _ in range(length)).capitalize() + ".")
+        count += length
+    return "GREENFIELD SCHOOL WORKSHEET INSTRUCTIONS AND RUBRIC\n\n" + " ".join(sentences)
+
+
+def _edit(text: str, rng: random.Random, edits: int) -> str:
+    """Replaces a few words, the way a teacher revises a worksheet."""
+    words = text.split(" ")
+    for position in rng.sample(range(len(words)), min(edits, len(words))):
+        words[position] = rng.choice(("revised", "updated", "new", "example", "carefully"))
+    return " ".join(words)
+
+
+def build_corpus(versions: int, pages_per_topic: int, words_per_page: int, edits_per_page: int, seed: int = 3):
+    rng = random.Random(seed)
+    boilerplate = _boilerplate()
+    corpus = synthetic_pages(pages_per_topic=pages_per_topic, words_per_page=words_per_page)
+    files = {}
+    for topic, pages in corpus.items():
+        for version in range(1, versions + 1):
+            body = pages if version == 1 else [_edit(page, rng, edits_per_page) for page in pages]
+            files[f"{topic}_worksheet_v{version}.txt"] = "\n\n".join([boilerplate, *body]).encode("utf-8")
+    return files
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _diversity(documents, threshold: float) -> float:
+    """Share of results that are not a near-duplicate of a higher-ranked result."""
+    if not documents:
+        return 0.0
+    seen, distinct = [], 0
+    for document in documents:
+        shingles = _shingles(document.page_content)
+        if all(len(shingles & other) / len(shingles | other) < threshold for other in seen):
+            distinct += 1
+        seen.append(shingles)
+    return distinct / len(documents)
+
+
+async def _ingest(files, engine: TutorEngine, config: RAGTutorConfig, queries, k: int):
+    tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+    start = time.perf_counter()
+    done = None
+    async for event in tutor.ingest_stream_async(list(files)):
+        if event["type"] == "done":
+            done = event
+    elapsed = time.perf_counter() - start
+
+    diversity, merged = [], 0
+    for query in queries:
+        results = [doc for doc, _ in tutor.state.bm25_index.search(query, k=k)]
+        results += await tutor.retriever.ainvoke(query)
+        results = list({doc.metadata.get("chunk_id"): doc for doc in results}.values())[:k]
+        diversity.append(_diversity(results, config.dedup_threshold))
+        merged += sum(1 for doc in results if "also in:" in tutor._describe_source(doc))
+    await tutor.close_async()
+    return done, elapsed, statistics.mean(diversity), merged
+
+
+def _throughput(count: int, threshold: float):
+    rows = synthetic_multilingual_chunks(count=count, words_per_chunk=300)
+    documents = [Document(page_content=row["text"], metadata={"source": row["topic"], "chunk_id": row["id"]}) for row in rows]
+    index = NearDuplicateIndex(threshold=threshold)
+    start = time.perf_counter()
+    index.deduplicate(documents)
+    return count / (time.perf_counter() - start)
+
+
+async def _run(args):
+    files = build_corpus(args.versions, args.pages_per_topic, args.words_per_page, args.edits_per_page)
+    queries = [" ".join(words.split()[:3]) for words in TOPICS.values()] + ["rubric criteria late penalty"]
+    engine = TutorEngine(RAGTutorConfig(qdrant_url=":memory:"))
+    engine.embeddings = DeterministicEmbeddings(latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens)
+    work_dir = tempfile.mkdtemp(prefix="bench_dedup_")
+
+    print(
+        f"{len(files)} worksheets ({len(TOPICS)} topics x {args.versions} versions, {args.pages_per_topic} pages, "
+        f"{args.edits_per_page} edited words per page), threshold {args.threshold}, top-{args.k}"
+    )
+    print(f"{'dedup':<6} {'chunks':>7} {'indexed':>8} {'dropped':>8} {'ingest s':>9} {'top-k diversity':>16} {'merged hits':>12}")
+    try:
+        for enabled in (False, True):
+            config = RAGTutorConfig(
+                qdrant_url=":memory:", bm25_index_dir=work_dir, retrieval_k=args.k,
+                dedup_enabled=enabled, dedup_threshold=args.threshold,
+            )
+            done, elapsed, diversity, merged = await _ingest(files, engine, config, queries, args.k)
+            print(
+                f"{'on' if enabled else 'off':<6} {done['chunks_created']:7d} {done['chunks_indexed']:8d} "
+                f"{done['duplicates_dropped']:8d} {elapsed:9.2f} {diversity:16.2f} {merged:12d}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    rate = _throughput(args.throughput_chunks, args.threshold)
+    print(f"NearDuplicateIndex.deduplicate: {rate:,.0f} chunks/s over {args.throughput_chunks} 300-word chunks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure near-duplicate chunk elimination at ingestion time.")
+    parser.add_argument("--versions", type=int, default=4, help="Versions of each worksheet.")
+    parser.add_argument("--pages-per-topic", type=int, default=6, help="Pages per worksheet.")
+    parser.add_argument("--words-per-page", type=int, default=350, help="Words per page.")
+    parser.add_argument("--edits-per-page", type=int, default=3, help="Words changed per page in later versions.")
+    parser.add_argument("--threshold", type=float, default=0.85, help="Jaccard similarity treated as a duplicate.")
+    parser.add_argument("--k", type=int, default=5, help="Results per query.")
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=10.0, help="Simulated embedding cost.")
+    parser.add_argument("--throughput-chunks", type=int, default=20000, help="Chunks for the raw throughput run.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
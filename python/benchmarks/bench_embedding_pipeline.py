@@ -0,0 +1,118 @@
+"""
+Benchmark: embedding and upserting a large upload into Qdrant.
+
+Compares QdrantVectorStore.aadd_documents, which VectorStoreManager used to call with
+the whole chunk list (sequential embed-then-upsert batches, no retries), with the
+EmbeddingPipeline (bounded parallel embedding, rate-limit-aware retries, upserts
+overlapping with embedding). Reports throughput in chunks per second.
+
+The simulated provider charges a fixed latency per request plus a per-token cost,
+and can reject every n-th request with a 429 to show how each path copes.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_embedding_pipeline --pages 300 --rate-limit-every 4
+"""
+import time
+import asyncio
+import argparse
+import logging
+
+from langchain.schema import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from rag_toolkit.chunking import DocumentChunker
+from rag_toolkit.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+from benchmarks.fakes import DeterministicEmbeddings, synthetic_pages
+
+VECTOR_SIZE = 1536
+
+
+def _chunks(pages: int, words_per_page: int):
+    corpus = synthetic_pages(pages_per_topic=max(1, pages // 5), words_per_page=words_per_page)
+    documents = [
+        Document(page_content=text, metadata={"source": f"{topic}.pdf", "page": page})
+        for topic, texts in corpus.items()
+        for page, text in enumerate(texts)
+    ]
+    return DocumentChunker().split_documents(documents)
+
+
+def _new_collection(client: QdrantClient, name: str):
+    client.create_collection(collection_name=name, vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE))
+
+
+def _make_embeddings(args) -> DeterministicEmbeddings:
+    return DeterministicEmbeddings(
+        size=VECTOR_SIZE,
+        latency_ms_per_call=args.latency_ms_per_call,
+        latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens,
+        rate_limit_every=args.rate_limit_every,
+        rate_limit_retry_after=args.retry_after,
+    )
+
+
+async def _run(args):
+    chunks = _chunks(args.pages, args.words_per_page)
+    ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+    client = QdrantClient(location=":memory:")
+    print(
+        f"{len(chunks)} chunks from {args.pages} pages; simulated provider: {args.latency_ms_per_call} ms/request "
+        f"+ {args.latency_ms_per_1k_tokens} ms/1k tokens, 429 on every {args.rate_limit_every or 'no'} request(s)"
+    )
+
+    # Before: one call into the vector store with every chunk.
+    _new_collection(client, "before")
+    embeddings = _make_embeddings(args)
+    store = QdrantVectorStore(client=client, collection_name="before", embedding=embeddings)
+    start = time.perf_counter()
+    try:
+        await store.aadd_documents(chunks, ids=ids)
+        elapsed = time.perf_counter() - start
+        print(f"{'vector store (before)':<24} {elapsed:7.2f} s  {len(chunks) / elapsed:8.1f} chunks/s  requests={embeddings.requests}")
+    except Exception as e:
+        stored = client.count("before").count
+        print(f"{'vector store (before)':<24} FAILED after {time.perf_counter() - start:.2f} s with {type(e).__name__}; {stored}/{len(chunks)} chunks stored")
+
+    # After: batched, parallel, retried, pipelined.
+    _new_collection(client, "after")
+    embeddings = _make_embeddings(args)
+    pipeline = EmbeddingPipeline(
+        embeddings=embeddings,
+        qdrant_client=client,
+        collection_name="after",
+        config=EmbeddingPipelineConfig(
+            embed_batch_size=args.batch_size,
+            embed_concurrency=args.concurrency,
+            upsert_batch_size=args.upsert_batch_size,
+        ),
+    )
+    report = await pipeline.run(chunks, ids)
+    stored = client.count("after").count
+    print(
+        f"{'embedding pipeline':<24} {report.total_seconds:7.2f} s  {report.chunks_per_second:8.1f} chunks/s  "
+        f"requests={embeddings.requests} retries={report.retries} upserts={report.upsert_batches}; "
+        f"{stored}/{len(chunks)} chunks stored"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure embedding + upsert throughput.")
+    parser.add_argument("--pages", type=int, default=300, help="Pages in the simulated upload.")
+    parser.add_argument("--words-per-page", type=int, default=500, help="Words per page.")
+    parser.add_argument("--latency-ms-per-call", type=float, default=150.0, help="Simulated request overhead.")
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=20.0, help="Simulated per-token cost.")
+    parser.add_argument("--rate-limit-every", type=int, default=4, help="Reject every n-th request with a 429 (0 disables).")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After carried by simulated 429s.")
+    parser.add_argument("--batch-size", type=int, default=128, help="Chunks per embedding request.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight.")
+    parser.add_argument("--upsert-batch-size", type=int, default=256, help="Points per Qdrant upsert.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
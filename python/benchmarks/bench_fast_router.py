@@ -0,0 +1,123 @@
+"""
+Benchmark: the local fast-path router.
+
+Classifies a hand-written set of teacher messages that are not in the classifier's
+training templates (greetings, fillers, explicit image requests, and ordinary questions
+including look-alikes such as "explain the chart in my report", and bare yes/no
+replies, which answer the tutor's last question) and reports, per class,
+how many are fast-pathed, how many are misrouted, and the classification latency. Then
+runs filler turns through AsyncRAGTutor.run_agent_async against a local LLM stand-in,
+with and without the fast router, to show the LLM calls and time-to-first-token saved.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_fast_router --threshold 0.9
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import warnings
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine, SHORT_RESPONSES
+from serving_toolkit.fast_router import FastRouter, FastRouterConfig, FILLER, GREETING, IMAGE, OTHER
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, ScriptedChatModel, synthetic_curriculum
+
+EVALUATION_SET = {
+    GREETING: [
+        "Hello!", "hi :)", "Good morning everyone", "hey, good afternoon", "Hi there, tutor", "مرحبا!",
+        "السلام عليكم ورحمة الله", "hello hello", "Hey!!", "good evening!",
+    ],
+    FILLER: [
+        "Thanks!", "thank you very much", "ok, got it", "Great, thanks a lot", "perfect", "that's great",
+        "okay thanks!", "Cool, understood", "شكرا لك", "تمام شكرا", "nice, that helps", "awesome thank you",
+    ],
+    IMAGE: [
+        "Draw a diagram of the carbon cycle", "Can you create a chart showing the phases of the moon?",
+        "generate an infographic about healthy eating", "please make a labelled picture of a plant cell",
+        "Sketch a flowchart of the scientific method", "I need a poster about recycling",
+        "ارسم مخططا يوضح دورة حياة الفراشة", "create an illustration of the layers of the earth",
+        "show me a diagram of the human skeleton", "could you draw a mind map about ecosystems",
+    ],
+    OTHER: [
+        "What is the carbon cycle?", "Explain the chart in the uploaded report", "thanks, now summarize chapter 4",
+        "Create a quiz on the phases of the moon", "Which students scored below 50 in science?",
+        "Can you improve my lesson plan on fractions?", "ok but how does evaporation work", "make it simpler",
+        "what does the diagram on page 3 mean", "hi, can you help me plan tomorrow's class",
+        "ما هي دورة الكربون", "Design a group activity about recycling", "is the picture in my slides correct",
+        "write a worksheet with 5 questions about the skeleton", "yeah, go for it", "sure thing", "yes, search the web", "أجل",
+    ],
+}
+
+
+def _evaluate_router(router: FastRouter):
+    print(f"{'class':<10} {'messages':>9} {'fast-pathed':>12} {'misrouted':>10}")
+    latencies = []
+    for label, messages in EVALUATION_SET.items():
+        fast = misrouted = 0
+        for message in messages:
+            start = time.perf_counter()
+            route = router.classify(message)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            if route is not None:
+                fast += 1
+                misrouted += route.label != label
+        print(f"{label:<10} {len(messages):9d} {fast:12d} {misrouted:10d}")
+    print(f"classification latency: p50 {statistics.median(latencies):.0f} us, max {max(latencies):.0f} us")
+
+
+async def _filler_turns(args):
+    files, _ = synthetic_curriculum(units_per_topic=1, pages_per_unit=1, languages=("en",))
+    llm = ScriptedChatModel(first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    engine = TutorEngine(RAGTutorConfig(qdrant_url=":memory:"))
+    engine.llm = llm
+    engine.build_chains()
+    engine.embeddings = DeterministicEmbeddings()
+    history = [{"role": "user", "content": "Explain the key terms of the first unit"}, {"role": "assistant", "content": "..."}]
+    work_dir = tempfile.mkdtemp(prefix="bench_fast_router_")
+    print(f"\nfiller turns ({', '.join(EVALUATION_SET[FILLER][:3])}, ...) without the turn planner:")
+    print(f"{'fast router':<12} {'LLM calls':>9} {'p50 TTFT ms':>12}")
+    try:
+        for enabled in (False, True):
+            engine.fast_router = FastRouter(FastRouterConfig(enabled=enabled, threshold=args.threshold), keywords=SHORT_RESPONSES)
+            config = RAGTutorConfig(qdrant_url=":memory:", bm25_index_dir=work_dir, turn_planner_enabled=False)
+            tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+            await tutor.ingest_async(list(files))
+            calls, ttft = [], []
+            for message in EVALUATION_SET[FILLER]:
+                llm.reset_counters()
+                start = time.perf_counter()
+                first_token = None
+                async for _ in tutor.run_agent_async(message, history, is_knowledge_base_ready=True):
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                calls.append(llm.round_trips)
+                ttft.append(first_token)
+            await tutor.close_async()
+            print(f"{'on' if enabled else 'off':<12} {statistics.mean(calls):9.1f} {statistics.median(ttft) * 1000:12.0f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local fast-path router.")
+    parser.add_argument("--threshold", type=float, default=FastRouterConfig().threshold, help="Classifier confidence threshold.")
+    parser.add_argument("--first-token-ms", type=float, default=350.0, help="Simulated per-call LLM latency to the first token.")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Simulated LLM generation time per token.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="qdrant_client")
+    router = FastRouter(FastRouterConfig(threshold=args.threshold), keywords=SHORT_RESPONSES)
+    print(f"fast router at threshold {args.threshold} ({'model + keywords' if router.classifier else 'keywords only'})")
+    _evaluate_router(router)
+    asyncio.run(_filler_turns(args))
+
+
+if __name__ == "__main__":
+    main()
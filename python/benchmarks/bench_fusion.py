@@ -0,0 +1,108 @@
+"""
+Benchmark: weighted EnsembleRetriever vs reciprocal rank fusion + MMR.
+
+Ingests several versions of the same worksheets (near-duplicate chunks, with the
+dedup stage off so the retrievers see the redundancy), then runs on-topic queries
+and a few off-topic ones through the knowledge-base tool with each retriever.
+Reports chunks and approximate prompt tokens per answer, the share of returned
+chunks from the right topic, the share that are not near-duplicates of a
+higher-ranked chunk, how many off-topic queries still pulled chunks into the
+prompt, and retrieval latency.
+
+Qdrant runs in-process; embeddings are deterministic hashed bag-of-words vectors.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_fusion --versions 3 --min-similarity 0.3
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from rag_toolkit.chunking import approximate_token_count
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, TOPICS
+from benchmarks.bench_dedup import build_corpus, _diversity
+
+OFF_TOPIC_QUERIES = ["capital city of france", "recipe for chocolate cake", "football world cup winners"]
+
+
+async def _evaluate(tutor: AsyncRAGTutor, queries, threshold: float) -> dict:
+    chunks, tokens, precision, diversity, latency = [], [], [], [], []
+    for topic, query in queries:
+        start = time.perf_counter()
+        documents = await tutor.ensemble_retriever.ainvoke(query)
+        latency.append((time.perf_counter() - start) * 1000)
+        chunks.append(len(documents))
+        tokens.append(approximate_token_count(tutor.format_docs(documents)) if documents else 0)
+        if documents:
+            precision.append(sum(doc.metadata["source"].startswith(topic) for doc in documents) / len(documents))
+            diversity.append(_diversity(documents, threshold))
+    off_topic_answers = 0
+    for query in OFF_TOPIC_QUERIES:
+        off_topic_answers += bool(await tutor.ensemble_retriever.ainvoke(query))
+    return {
+        "chunks": statistics.mean(chunks),
+        "tokens": statistics.mean(tokens),
+        "precision": statistics.mean(precision) if precision else 0.0,
+        "diversity": statistics.mean(diversity) if diversity else 0.0,
+        "off_topic": off_topic_answers,
+        "latency_ms": statistics.median(latency),
+    }
+
+
+async def _run(args):
+    files = build_corpus(args.versions, args.pages_per_topic, args.words_per_page, args.edits_per_page)
+    queries = [(topic, " ".join(words.split()[i:i + 3])) for topic, words in TOPICS.items() for i in (0, 3)]
+    engine = TutorEngine(RAGTutorConfig(qdrant_url=":memory:"))
+    engine.embeddings = DeterministicEmbeddings()
+    os.environ["RETRIEVAL_MIN_SIMILARITY"] = str(args.min_similarity)
+    work_dir = tempfile.mkdtemp(prefix="bench_fusion_")
+
+    print(
+        f"{len(files)} worksheets ({len(TOPICS)} topics x {args.versions} versions), {len(queries)} queries "
+        f"+ {len(OFF_TOPIC_QUERIES)} off-topic, retrieval_k={args.k}, min similarity {args.min_similarity}"
+    )
+    print(f"{'retriever':<10} {'chunks':>7} {'tokens':>7} {'precision':>10} {'diversity':>10} {'off-topic hits':>15} {'p50 ms':>7}")
+    try:
+        for fusion in ("ensemble", "rrf"):
+            config = RAGTutorConfig(
+                qdrant_url=":memory:", bm25_index_dir=work_dir, retrieval_k=args.k,
+                dedup_enabled=False, retrieval_fusion=fusion,
+            )
+            tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+            await tutor.ingest_async(list(files))
+            result = await _evaluate(tutor, queries, args.dedup_threshold)
+            await tutor.close_async()
+            print(
+                f"{fusion:<10} {result['chunks']:7.1f} {result['tokens']:7.0f} {result['precision']:10.2f} "
+                f"{result['diversity']:10.2f} {result['off_topic']:>9d}/{len(OFF_TOPIC_QUERIES)}    {result['latency_ms']:7.1f}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the weighted ensemble with RRF + MMR fusion.")
+    parser.add_argument("--versions", type=int, default=3, help="Versions of each worksheet.")
+    parser.add_argument("--pages-per-topic", type=int, default=6, help="Pages per worksheet.")
+    parser.add_argument("--words-per-page", type=int, default=350, help="Words per page.")
+    parser.add_argument("--edits-per-page", type=int, default=3, help="Words changed per page in later versions.")
+    parser.add_argument("--k", type=int, default=5, help="retrieval_k.")
+    parser.add_argument("--min-similarity", type=float, default=0.3,
+                        help="Fusion relevance cutoff, calibrated for the hashed test embeddings.")
+    parser.add_argument("--dedup-threshold", type=float, default=0.85, help="Jaccard similarity counted as redundant.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark: knowledge-base ingestion and retrieval context size.
+
+Compares the previous pipeline, which embedded and indexed whole loaded documents
+(entire TXT/DOCX files, entire PDF pages), with the chunked pipeline used by
+AsyncRAGTutor.ingest_async. Reports ingest time, embedded tokens, inputs over the
+embedding model's input limit, and how much text the knowledge-base tool returns
+per query (and how much of it comes from the right document).
+
+With --images, also ingests phone-photo-sized images twice (the second time as a
+re-upload from another session, half of them re-encoded at a lower resolution) and
+compares the previous image path (full-resolution base64, one vision call per upload)
+with the downscaled, cached ImageDescriber: vision calls, bytes sent and seconds.
+
+No network access is needed: Qdrant runs in-process and embeddings are deterministic
+hashed bag-of-words vectors with a simulated per-token latency.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_ingestion --pages-per-topic 8 --latency-ms-per-1k-tokens 10
+"""
+import io
+import os
+import time
+import shutil
+import tempfile
+import asyncio
+import argparse
+import logging
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from rag_toolkit.chunking import approximate_token_count
+from rag_toolkit.image_ingestion import IMAGE_DESCRIPTION_PROMPT, ImageDescriber, ImageIngestionConfig, VisionDescriptionCache
+from benchmarks.fakes import DeterministicEmbeddings, FakeVisionModel, InMemoryStorage, TOPICS, synthetic_image, synthetic_pages
+
+# text-embedding-3-small rejects inputs longer than this.
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+
+
+def _build_files(pages_per_topic: int, words_per_page: int) -> dict:
+    corpus = synthetic_pages(pages_per_topic=pages_per_topic, words_per_page=words_per_page)
+    return {f"{topic}.txt": "\n\n".join(pages).encode("utf-8") for topic, pages in corpus.items()}
+
+
+async def _measure_retrieval(tutor: AsyncRAGTutor) -> dict:
+    sizes, precisions = [], []
+    for topic, words in TOPICS.items():
+        query = " ".join(words.split()[:3])
+        docs = await tutor.ensemble_retriever.ainvoke(query)
+        context = tutor.format_docs(docs)
+        sizes.append(approximate_token_count(context))
+        precisions.append(sum(doc.metadata.get("source") == f"{topic}.txt" for doc in docs) / max(1, len(docs)))
+    return {"context_tokens": statistics.mean(sizes), "precision": statistics.mean(precisions)}
+
+
+async def _run(args):
+    config = RAGTutorConfig(qdrant_url=":memory:")
+    engine = TutorEngine(config)
+    embeddings = DeterministicEmbeddings(
+        latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens,
+        max_input_tokens=EMBEDDING_MAX_INPUT_TOKENS
+    )
+    engine.embeddings = embeddings
+    files = _build_files(args.pages_per_topic, args.words_per_page)
+    storage = InMemoryStorage(files)
+    results = {}
+
+    # Before: every loaded document is embedded and indexed as-is.
+    tutor = AsyncRAGTutor(storage_manager=storage, config=config, engine=engine)
+    embeddings.reset_counters()
+    start = time.perf_counter()
+    documents = []
+    for key, content in files.items():
+        documents.extend(await tutor._process_document_from_bytes_async(content, key))
+    await tutor.initialize_vectorstore_async(documents)
+    results["whole documents (before)"] = {
+        "seconds": time.perf_counter() - start,
+        "vectors": len(documents),
+        "tokens": embeddings.tokens_embedded,
+        "oversized": embeddings.oversized_inputs,
+        **(await _measure_retrieval(tutor)),
+    }
+
+    # After: the ingestion pipeline chunks documents before embedding them.
+    tutor = AsyncRAGTutor(storage_manager=storage, config=config, engine=engine)
+    embeddings.reset_counters()
+    start = time.perf_counter()
+    await tutor.ingest_async(list(files))
+    results["token chunks (after)"] = {
+        "seconds": time.perf_counter() - start,
+        "vectors": embeddings.texts_embedded,
+        "tokens": embeddings.tokens_embedded,
+        "oversized": embeddings.oversized_inputs,
+        **(await _measure_retrieval(tutor)),
+    }
+
+    print(
+        f"Ingesting {len(files)} files ({args.pages_per_topic} pages x {args.words_per_page} words each), "
+        f"chunk_size={config.chunk_size} overlap={config.chunk_overlap} tokens, "
+        f"simulated embedding latency {args.latency_ms_per_1k_tokens} ms / 1k tokens"
+    )
+    for label, r in results.items():
+        print(
+            f"{label:<26} ingest={r['seconds']:7.2f} s  vectors={r['vectors']:5d}  "
+            f"embedded_tokens={r['tokens']:8d}  over_{EMBEDDING_MAX_INPUT_TOKENS}={r['oversized']:3d}  "
+            f"context_tokens/query={r['context_tokens']:8.0f}  precision={r['precision']:.2f}"
+        )
+    if args.images:
+        await _run_images(args, engine, config)
+
+
+def _reencoded(data: bytes) -> bytes:
+    """The same picture exported again: half the resolution, different JPEG quality."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        buffer = io.BytesIO()
+        image.resize((image.width // 2, image.height // 2)).save(buffer, format="JPEG", quality=75)
+        return buffer.getvalue()
+
+
+async def _run_images(args, engine: TutorEngine, config: RAGTutorConfig):
+    from langchain_core.messages import HumanMessage
+    import base64
+
+    originals = {f"diagram_{index}.jpg": synthetic_image(seed=index) for index in range(args.images)}
+    reuploads = {
+        f"copy_of_diagram_{index}.jpg": data if index % 2 == 0 else _reencoded(data)
+        for index, data in enumerate(originals.values())
+    }
+    uploads = [originals, reuploads]
+    received = sum(len(data) for files in uploads for data in files.values())
+
+    # Before: every upload sends the full-resolution image, with no reuse between uploads.
+    vision = FakeVisionModel(latency_ms_per_call=args.vision_latency_ms)
+    rounds = []
+    for files in uploads:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            vision.ainvoke([HumanMessage(content=[
+                {"type": "text", "text": IMAGE_DESCRIPTION_PROMPT},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64.b64encode(data).decode()}"}},
+            ])])
+            for data in files.values()
+        ))
+        rounds.append(time.perf_counter() - start)
+    before = (rounds, vision.calls, vision.payload_bytes)
+
+    # After: ingest_async with the downscaling, caching ImageDescriber.
+    cache_dir = tempfile.mkdtemp(prefix="vision_cache_")
+    try:
+        vision = FakeVisionModel(latency_ms_per_call=args.vision_latency_ms)
+        engine.image_describer = ImageDescriber(
+            [("fake-vision", vision)],
+            config=ImageIngestionConfig(),
+            cache=VisionDescriptionCache(os.path.join(cache_dir, "vision.sqlite3")),
+        )
+        rounds = []
+        for files in uploads:
+            start = time.perf_counter()
+            # The same teacher re-uploads, so re-encoded copies can match within the session.
+            tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine, session_id="bench-teacher")
+            await tutor.ingest_async(list(files))
+            rounds.append(time.perf_counter() - start)
+            await tutor.close_async()
+        after = (rounds, vision.calls, vision.payload_bytes)
+        stats = engine.image_describer.stats()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(
+        f"\nImages: {args.images} uploads + {args.images} re-uploads ({received / 2**20:.1f} MB received), "
+        f"simulated vision latency {args.vision_latency_ms:.0f} ms/call + 400 ms/MB, "
+        f"{ImageIngestionConfig().concurrency} concurrent vision calls after"
+    )
+    for label, (rounds, calls, payload) in (("full resolution (before)", before), ("downscaled + cached", after)):
+        print(
+            f"{label:<26} upload={rounds[0]:6.2f} s  re-upload={rounds[1]:6.2f} s  "
+            f"vision_calls={calls:3d}  bytes_sent={payload / 2**20:7.2f} MB"
+        )
+    print(f"{'':<26} cache hits={stats['cache_hits']} ({stats['perceptual_hits']} perceptual), coalesced={stats['coalesced']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare whole-document and chunked ingestion.")
+    parser.add_argument("--pages-per-topic", type=int, default=8, help="Pages in each synthetic file.")
+    parser.add_argument("--words-per-page", type=int, default=1800, help="Words per synthetic page.")
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=10.0, help="Simulated embedding cost.")
+    parser.add_argument("--images", type=int, default=0, help="Also benchmark image ingestion with this many images.")
+    parser.add_argument("--vision-latency-ms", type=float, default=1500.0, help="Simulated fixed cost of a vision call.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
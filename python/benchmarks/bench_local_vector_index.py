@@ -0,0 +1,123 @@
+"""
+Benchmark: the embedded LocalVectorIndex used when Qdrant is unavailable.
+
+Builds a clustered synthetic corpus of normalized embeddings and compares exhaustive
+search (float32 and float16, blocked matrix-multiply top-k) with IVF-partitioned search.
+Reports insert time, matrix memory, query latency and recall@k against the exact
+float32 results, plus save time and the time to reopen a persisted index (memory-mapped).
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_local_vector_index --vectors 100000 --dimension 384
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+from langchain.schema import Document
+
+from rag_toolkit.local_vector_index import LocalVectorIndex
+
+
+def _corpus(vectors: int, dimension: int, clusters: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=vectors)
+    matrix = centers[labels] + 0.6 * rng.standard_normal((vectors, dimension)).astype(np.float32)
+    queries = centers[rng.integers(0, clusters, size=200)] + 0.6 * rng.standard_normal((200, dimension)).astype(np.float32)
+    return matrix, queries
+
+
+def _build(matrix: np.ndarray, batch: int = 4096, **options) -> LocalVectorIndex:
+    index = LocalVectorIndex(**options)
+    for start in range(0, len(matrix), batch):
+        rows = range(start, min(start + batch, len(matrix)))
+        index.upsert(
+            [f"chunk-{row}" for row in rows],
+            matrix[start:start + len(rows)],
+            [Document(page_content="", metadata={"row": row}) for row in rows],
+        )
+    return index
+
+
+def _search_all(index: LocalVectorIndex, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({doc.metadata["row"] for doc, _ in hits})
+    latencies.sort()
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the embedded vector index.")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Vectors in the index.")
+    parser.add_argument("--dimension", type=int, default=384, help="Embedding dimension.")
+    parser.add_argument("--clusters", type=int, default=200, help="Topic clusters in the synthetic corpus.")
+    parser.add_argument("--k", type=int, default=10, help="Results per query.")
+    parser.add_argument("--ivf-lists", type=int, default=256, help="IVF partitions for the IVF variant.")
+    parser.add_argument("--ivf-probes", type=int, default=16, help="Partitions scanned per IVF query.")
+    args = parser.parse_args()
+
+    matrix, queries = _corpus(args.vectors, args.dimension, args.clusters)
+    print(f"{args.vectors} vectors x {args.dimension} dims, {len(queries)} queries, k={args.k}")
+
+    # Exact reference: one full float32 matrix multiply per query, no blocking.
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    reference, naive_ms = [], []
+    for query in queries:
+        start = time.perf_counter()
+        scores = normalized @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores)[:args.k]
+        naive_ms.append((time.perf_counter() - start) * 1000)
+        reference.append(set(top.tolist()))
+    naive_ms.sort()
+
+    print(f"{'variant':<30} {'insert s':>9} {'matrix MB':>10} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    print(f"{'full matmul + argsort':<30} {'-':>9} {normalized.nbytes / 2**20:10.1f} {statistics.median(naive_ms):8.2f} {naive_ms[int(len(naive_ms) * 0.95)]:8.2f} {1.0:7.3f}")
+
+    variants = [
+        ("blocked float32", {"dtype": "float32"}),
+        ("blocked float16", {"dtype": "float16"}),
+        (f"IVF {args.ivf_lists} lists / {args.ivf_probes} probes", {
+            "dtype": "float32", "ivf_lists": args.ivf_lists, "ivf_probes": args.ivf_probes, "ivf_min_vectors": 0,
+        }),
+    ]
+    for name, options in variants:
+        start = time.perf_counter()
+        index = _build(matrix, **options)
+        insert_seconds = time.perf_counter() - start
+        index.search(queries[0], args.k)  # trains the IVF partitions, if any
+        latencies, results = _search_all(index, queries, args.k)
+        recall = statistics.mean(len(found & expected) / args.k for found, expected in zip(results, reference))
+        matrix_mb = index._vectors[:len(index)].nbytes / 2**20
+        print(f"{name:<30} {insert_seconds:9.2f} {matrix_mb:10.1f} {statistics.median(latencies):8.2f} {latencies[int(len(latencies) * 0.95)]:8.2f} {recall:7.3f}")
+
+    directory = tempfile.mkdtemp(prefix="local_vectors_")
+    try:
+        index = _build(matrix, dtype="float16", path=directory)
+        start = time.perf_counter()
+        index.save()
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        reopened = LocalVectorIndex.load(directory)
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        reopened.search(queries[0], args.k)
+        first_query_ms = (time.perf_counter() - start) * 1000
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2**20
+        print(
+            f"persistence (float16): save {save_seconds:.2f} s, {size_mb:.1f} MB on disk, reopen {load_seconds * 1000:.1f} ms "
+            f"({type(reopened._vectors).__name__}), first query {first_query_ms:.1f} ms"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: event loop lag while blocking provider calls are in flight.
+
+A probe task sleeps for a short interval in a loop and records how late it wakes up
+(loop lag). Meanwhile slow, blocking "provider" calls and synchronous streams are run
+the way main.py runs them, through the ProviderExecutor. For comparison the same work
+is then run directly on the loop, which is what the endpoints used to do.
+
+The script exits with status 1 if the maximum lag through the ProviderExecutor exceeds
+--max-lag-ms. It only exercises the executor; tests/test_loop_lag.py checks that the
+endpoints themselves keep their provider calls off the loop.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_loop_lag --calls 8 --call-seconds 0.5
+"""
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+from serving_toolkit.provider_executor import ProviderExecutor
+
+PROBE_INTERVAL_SECONDS = 0.005
+
+
+def slow_provider_call(seconds: float) -> str:
+    """Stands in for a blocking SDK call such as ImageGenerator.generate_image_from_schema."""
+    time.sleep(seconds)
+    return "ok"
+
+
+def slow_provider_stream(seconds: float, chunks: int = 10):
+    """Stands in for a synchronous token stream such as get_comprehensive_answer_stream."""
+    for i in range(chunks):
+        time.sleep(seconds / chunks)
+        yield f"chunk-{i}"
+
+
+async def _probe_loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL_SECONDS) * 1000)
+
+
+async def _measure(workload) -> list:
+    lags: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(stop, lags))
+    await asyncio.sleep(PROBE_INTERVAL_SECONDS * 4)
+    await workload()
+    stop.set()
+    await probe
+    return lags
+
+
+async def _run(args) -> int:
+    executor = ProviderExecutor(max_workers={"openai": args.calls})
+
+    async def through_executor():
+        async def consume_stream():
+            return [chunk async for chunk in executor.iterate("openai", lambda: slow_provider_stream(args.call_seconds))]
+
+        calls = [executor.run("openai", slow_provider_call, args.call_seconds) for _ in range(args.calls)]
+        streams = [consume_stream() for _ in range(args.calls)]
+        await asyncio.gather(*calls, *streams)
+
+    async def directly_on_loop():
+        # One call and one stream are enough to show the stall.
+        slow_provider_call(args.call_seconds)
+        for _ in slow_provider_stream(args.call_seconds):
+            await asyncio.sleep(0)
+
+    executor_lags = await _measure(through_executor)
+    blocking_lags = await _measure(directly_on_loop)
+    executor.shutdown(wait=True)
+
+    def _summary(label: str, lags: list):
+        print(
+            f"{label:<22} p50={statistics.median(lags):7.2f} ms  "
+            f"p99={sorted(lags)[int(len(lags) * 0.99) - 1]:7.2f} ms  max={max(lags):7.2f} ms"
+        )
+
+    print(f"Loop lag with {args.calls} calls + {args.calls} streams of {args.call_seconds}s each")
+    _summary("provider executor", executor_lags)
+    _summary("blocking on loop", blocking_lags)
+
+    if max(executor_lags) > args.max_lag_ms:
+        print(f"FAIL: event loop lag {max(executor_lags):.2f} ms exceeds {args.max_lag_ms} ms")
+        return 1
+    print("PASS: event loop stayed responsive")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event loop lag during blocking provider calls.")
+    parser.add_argument("--calls", type=int, default=8, help="Concurrent provider calls (and streams).")
+    parser.add_argument("--call-seconds", type=float, default=0.5, help="Duration of each simulated provider call.")
+    parser.add_argument("--max-lag-ms", type=float, default=50.0, help="Maximum acceptable loop lag.")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: parsing uploaded PDFs through a temp file in a thread vs DocumentParser.
+
+The old path wrote each upload to a NamedTemporaryFile and ran PDFPlumberLoader on it
+with asyncio.to_thread, so the parse competed with the event loop for the GIL. The
+DocumentParser parses the bytes directly in a process pool, splitting large PDFs into
+page ranges. Each variant parses several uploads concurrently while a ticker task
+measures how late the event loop wakes up; reports pages/sec and event-loop lag.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_parsing --files 4 --pages 60
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+from langchain_community.document_loaders import PDFPlumberLoader
+
+from rag_toolkit.parsing import DocumentParser, DocumentParserConfig
+from benchmarks.fakes import synthetic_pdf
+
+
+def _temp_file_parse(data: bytes, filename: str):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+        temp_file.write(data)
+        temp_path = temp_file.name
+    try:
+        documents = PDFPlumberLoader(temp_path).load()
+        for document in documents:
+            document.metadata["source"] = filename
+            # Points at the deleted temp file; DocumentParser never had one.
+            document.metadata.pop("file_path", None)
+        return documents
+    finally:
+        os.unlink(temp_path)
+
+
+async def _ticker(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def _measure(parse, uploads):
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(parse(data, filename) for filename, data in uploads))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    lags.sort()
+    return results, elapsed, lags
+
+
+async def _run(args):
+    data = synthetic_pdf(pages=args.pages)
+    uploads = [(f"upload_{index}.pdf", data) for index in range(args.files)]
+    total_pages = args.files * args.pages
+    print(f"{args.files} concurrent uploads x {args.pages} pages ({len(data) / 1024:.0f} KB each)")
+    print(f"{'variant':<34} {'seconds':>8} {'pages/s':>8} {'lag p50 ms':>11} {'lag max ms':>11}")
+
+    reference, elapsed, lags = await _measure(lambda data, name: asyncio.to_thread(_temp_file_parse, data, name), uploads)
+    print(f"{'temp file + PDFPlumberLoader':<34} {elapsed:8.2f} {total_pages / elapsed:8.1f} {statistics.median(lags):11.2f} {lags[-1]:11.2f}")
+
+    variants = [
+        ("DocumentParser, thread", DocumentParserConfig(processes=0)),
+        ("DocumentParser, 1 process", DocumentParserConfig(processes=1)),
+        (f"DocumentParser, {args.processes} processes + split", DocumentParserConfig(processes=args.processes, pdf_split_min_pages=args.split_min_pages)),
+    ]
+    for name, config in variants:
+        parser = DocumentParser(config).warm_up()
+        try:
+            results, elapsed, lags = await _measure(parser.parse, uploads)
+        finally:
+            parser.shutdown()
+        identical = all(
+            [(doc.page_content, doc.metadata) for doc in ours] == [(doc.page_content, doc.metadata) for doc in theirs]
+            for ours, theirs in zip(results, reference)
+        )
+        print(
+            f"{name:<34} {elapsed:8.2f} {total_pages / elapsed:8.1f} {statistics.median(lags):11.2f} {lags[-1]:11.2f}"
+            f"  {'same output' if identical else 'OUTPUT DIFFERS'}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare temp-file and process-pool PDF parsing.")
+    parser.add_argument("--files", type=int, default=4, help="Uploads parsed concurrently.")
+    parser.add_argument("--pages", type=int, default=60, help="Pages per PDF.")
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1), help="Parser worker processes.")
+    parser.add_argument("--split-min-pages", type=int, default=24, help="Split PDFs with at least this many pages.")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: one Qdrant collection per session vs one shared, payload-filtered collection.
+
+Simulates many teachers each uploading a small file: every session initializes its
+vector store and stores its chunks through VectorStoreManager. Reports the latency of
+each session's first upload (collection setup + embedding + upsert), the latency of a
+retrieval, and Qdrant memory once every session has uploaded.
+
+In-process Qdrant (the default) is measured with tracemalloc. With --qdrant-url the
+benchmark talks to a real server and reads its resident memory from /metrics; collection
+creation is much more expensive there (segments, WAL and HNSW setup on disk).
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_qdrant_storage --sessions 200
+    python -m benchmarks.bench_qdrant_storage --sessions 500 --qdrant-url http://localhost:6333
+"""
+import os
+import re
+import time
+import asyncio
+import argparse
+import logging
+import warnings
+import statistics
+import tracemalloc
+import urllib.request
+from dataclasses import replace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.schema import Document
+
+from AI_tutor import RAGTutorConfig, VectorStoreManager, create_qdrant_client
+from rag_toolkit.chunking import DocumentChunker
+from benchmarks.fakes import DeterministicEmbeddings, synthetic_pages
+
+
+def _session_documents(sessions: int, pages_per_session: int):
+    corpus = synthetic_pages(pages_per_topic=pages_per_session, words_per_page=400)
+    topics = list(corpus)
+    chunker = DocumentChunker()
+    documents = []
+    for index in range(sessions):
+        topic = topics[index % len(topics)]
+        pages = [
+            Document(page_content=text, metadata={"source": f"{topic}_{index}.pdf", "page": page})
+            for page, text in enumerate(corpus[topic])
+        ]
+        documents.append((topic, chunker.split_documents(pages)))
+    return documents
+
+
+def _server_memory_mb(url: str):
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=5) as response:
+            match = re.search(r"^memory_resident_bytes (\d+)", response.read().decode(), re.MULTILINE)
+        return int(match.group(1)) / 2**20 if match else None
+    except OSError:
+        return None
+
+
+async def _upload_sessions(mode: str, config: RAGTutorConfig, client, session_documents, run: str):
+    embeddings = DeterministicEmbeddings()
+    managers, upload_ms = [], []
+    for index, (_, chunks) in enumerate(session_documents):
+        session_config = replace(config, qdrant_collection_name=f"bench_{mode}_{run}_{os.getpid()}_{index}")
+        manager = VectorStoreManager(session_config, embeddings=embeddings, qdrant_client=client)
+        start = time.perf_counter()
+        await manager.initialize_collection()
+        await manager.aadd_documents(chunks)
+        upload_ms.append((time.perf_counter() - start) * 1000)
+        managers.append(manager)
+    return managers, upload_ms
+
+
+async def _drop_sessions(mode: str, config: RAGTutorConfig, client, managers):
+    for manager in managers:
+        await manager.delete_collection_async()
+    if mode == "shared":
+        await asyncio.to_thread(client.delete_collection, config.qdrant_shared_collection)
+        VectorStoreManager._ready_shared_collections.clear()
+
+
+async def _run_mode(mode: str, args, session_documents):
+    config = RAGTutorConfig(qdrant_url=args.qdrant_url, qdrant_storage_mode=mode, qdrant_shared_collection=f"bench_shared_{os.getpid()}")
+    client = create_qdrant_client(config)
+    in_process = args.qdrant_url == ":memory:"
+
+    memory_before = None if in_process else _server_memory_mb(args.qdrant_url)
+    managers, upload_ms = await _upload_sessions(mode, config, client, session_documents, "timed")
+    if in_process:
+        # tracemalloc slows everything down, so memory is measured in a separate pass.
+        await _drop_sessions(mode, config, client, managers)
+        tracemalloc.start()
+        managers, _ = await _upload_sessions(mode, config, client, session_documents, "traced")
+        memory_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+    else:
+        memory_after = _server_memory_mb(args.qdrant_url)
+        memory_mb = memory_after - memory_before if memory_after is not None and memory_before is not None else None
+
+    search_ms, leaked = [], 0
+    for manager, (topic, chunks) in zip(managers[:args.queries], session_documents):
+        retriever = manager.get_retriever(k=5)
+        start = time.perf_counter()
+        results = await retriever.ainvoke(f"{topic} lesson")
+        search_ms.append((time.perf_counter() - start) * 1000)
+        own_sources = {chunk.metadata["source"] for chunk in chunks}
+        leaked += sum(doc.metadata.get("source") not in own_sources for doc in results)
+    await _drop_sessions(mode, config, client, managers)
+
+    upload_ms.sort()
+    memory = f"{memory_mb:10.1f}" if memory_mb is not None else f"{'n/a':>10}"
+    print(
+        f"{mode:<12} {upload_ms[0]:10.2f} {statistics.median(upload_ms):10.2f} {upload_ms[int(len(upload_ms) * 0.95)]:10.2f} "
+        f"{statistics.median(search_ms):10.2f} {memory}  cross-session results={leaked}"
+    )
+
+
+async def _run(args):
+    session_documents = _session_documents(args.sessions, args.pages_per_session)
+    chunks = sum(len(chunks) for _, chunks in session_documents)
+    print(f"{args.sessions} sessions, {chunks} chunks in total, Qdrant at {args.qdrant_url}")
+    print(f"{'mode':<12} {'upload min':>10} {'upload p50':>10} {'upload p95':>10} {'search p50':>10} {'memory MB':>10}  (latencies in ms)")
+    for mode in ("collection", "shared"):
+        await _run_mode(mode, args, session_documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-session and shared Qdrant collections.")
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions that each upload one file.")
+    parser.add_argument("--pages-per-session", type=int, default=4, help="Pages in each session's file.")
+    parser.add_argument("--queries", type=int, default=50, help="Sessions to run a retrieval for.")
+    parser.add_argument("--qdrant-url", default=":memory:", help="Qdrant URL, or :memory: for in-process Qdrant.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: cost of creating a new tutor session.
+
+Compares the previous behaviour, where every session built its own LLM client,
+embeddings client, Qdrant client, executor, chains and orchestrator graph, with
+sessions that borrow those objects from the shared TutorEngine.
+
+No network access is needed: Qdrant runs in-process and no model is called.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_session_creation --sessions 50
+"""
+import os
+import time
+import argparse
+import logging
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+
+
+def _time_sessions(count: int, make_session) -> list:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        make_session()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list):
+    print(
+        f"{label:<28} first={timings[0]:8.2f} ms  "
+        f"median={statistics.median(timings):8.2f} ms  "
+        f"mean={statistics.mean(timings):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tutor session creation cost.")
+    parser.add_argument("--sessions", type=int, default=50, help="Number of sessions to create per mode.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    config = RAGTutorConfig(qdrant_url=":memory:")
+
+    # Before: each session owns a dedicated engine, exactly what __init__ used to build.
+    dedicated = _time_sessions(
+        args.sessions,
+        lambda: AsyncRAGTutor(storage_manager=None, config=config, engine=TutorEngine(config))
+    )
+
+    # After: the engine is built and warmed once, sessions only create their own state.
+    warm_start = time.perf_counter()
+    shared_engine = TutorEngine(config).warm_up()
+    warm_ms = (time.perf_counter() - warm_start) * 1000
+    shared = _time_sessions(
+        args.sessions,
+        lambda: AsyncRAGTutor(storage_manager=None, config=config, engine=shared_engine)
+    )
+
+    print(f"Session creation over {args.sessions} sessions")
+    _report("dedicated engine (before)", dedicated)
+    _report("shared engine (after)", shared)
+    print(f"{'one-time engine warm-up':<28} {warm_ms:8.2f} ms")
+    print(f"Speed-up (median): {statistics.median(dedicated) / statistics.median(shared):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: batch ingestion vs the streaming, page-pipelined ingestion pipeline.
+
+Uploads one large synthetic PDF into a tutor session. The batch path parses every
+page, chunks everything and only then embeds and indexes it, so the session cannot
+answer anything until the end. The streaming path (AsyncRAGTutor.ingest_stream_async)
+parses page ranges lazily and indexes chunks batch by batch. Reports the time until
+the session is first searchable, the total ingest time, and whether a query about
+the first pages succeeds while the rest of the file is still being ingested.
+
+Qdrant runs in-process; embeddings are deterministic with a simulated per-token cost.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_streaming_ingestion --pages 200
+"""
+import os
+import time
+import asyncio
+import argparse
+import logging
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from rag_toolkit.parsing import get_document_parser
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, synthetic_pdf
+
+FILENAME = "textbook.pdf"
+
+
+async def _batch(tutor: AsyncRAGTutor, data: bytes) -> dict:
+    start = time.perf_counter()
+    pages = await get_document_parser().parse(data, FILENAME)
+    chunks = await tutor.chunker.asplit_documents(pages)
+    await tutor.initialize_vectorstore_async(chunks)
+    elapsed = time.perf_counter() - start
+    return {"searchable": elapsed, "total": elapsed, "chunks": len(chunks), "early_hits": None}
+
+
+async def _streaming(tutor: AsyncRAGTutor, query: str) -> dict:
+    start = time.perf_counter()
+    searchable, early_hits, events = None, None, 0
+    async for event in tutor.ingest_stream_async([FILENAME]):
+        events += 1
+        if event.get("searchable") and searchable is None:
+            searchable = time.perf_counter() - start
+            # Ask about the first pages while later pages are still being parsed and indexed.
+            early_hits = len(await tutor.ensemble_retriever.ainvoke(query))
+        if event["type"] == "done":
+            chunks = event["chunks_indexed"]
+    return {"searchable": searchable, "total": time.perf_counter() - start, "chunks": chunks, "early_hits": early_hits, "events": events}
+
+
+async def _run(args):
+    config = RAGTutorConfig(qdrant_url=":memory:")
+    engine = TutorEngine(config)
+    engine.embeddings = DeterministicEmbeddings(latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens)
+    data = synthetic_pdf(pages=args.pages)
+    storage = InMemoryStorage({FILENAME: data})
+    parser = get_document_parser().warm_up()
+    query = "chlorophyll light energy"
+
+    print(
+        f"{FILENAME}: {args.pages} pages ({len(data) / 1024:.0f} KB), {parser.config.processes} parser processes, "
+        f"simulated embedding latency {args.latency_ms_per_1k_tokens} ms / 1k tokens"
+    )
+    print(f"{'pipeline':<12} {'searchable s':>13} {'total s':>9} {'chunks':>7} {'early hits':>11}")
+    for name, ingest in (
+        ("batch", lambda tutor: _batch(tutor, data)),
+        ("streaming", lambda tutor: _streaming(tutor, query)),
+    ):
+        tutor = AsyncRAGTutor(storage_manager=storage, config=config, engine=engine)
+        result = await ingest(tutor)
+        early = "-" if result["early_hits"] is None else str(result["early_hits"])
+        print(f"{name:<12} {result['searchable']:13.2f} {result['total']:9.2f} {result['chunks']:7d} {early:>11}")
+        await tutor.close_async()
+    parser.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batch and streaming ingestion of a large PDF.")
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the synthetic PDF.")
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=10.0, help="Simulated embedding cost.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: concurrent tool calls and speculative knowledge-base retrieval.
+
+A session with an ingested knowledge base answers questions for which the model calls
+the knowledge_base_retriever, and, with web search enabled, the web search tool too. The
+LLM is a local stand-in with a fixed per-call latency, query embeddings take
+--embedding-ms (so a retrieval costs a round trip), and web search is a stand-in tool
+that takes --web-search-ms. Every question is asked once, so the retrieval cache does
+not hide the retrieval cost.
+
+For first messages and follow-ups, with and without web search, the turn planner on
+and off and speculative retrieval on and off, reports the median time to the first
+answer token and the share of speculative retrievals whose result was used.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_tool_concurrency --questions 5 --web-search-ms 800
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import warnings
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from pydantic import BaseModel, Field
+from langchain_core.tools import StructuredTool
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from rag_toolkit.speculative_retrieval import SpeculativeRetrievalConfig, SpeculativeRetrievalMetrics
+import rag_toolkit.speculative_retrieval as speculative_retrieval
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, ScriptedChatModel, synthetic_curriculum
+
+
+class _SearchSchema(BaseModel):
+    query: str = Field(..., description="The search query to execute")
+
+
+def _web_search_tool(latency_ms: float) -> StructuredTool:
+    async def search(query: str) -> str:
+        await asyncio.sleep(latency_ms / 1000)
+        return f"Web results for: {query}"
+    return StructuredTool.from_function(coroutine=search, name="perplexity_search", description="Search the web.", args_schema=_SearchSchema)
+
+
+async def _ttft(tutor: AsyncRAGTutor, query: str, history) -> float:
+    start = time.perf_counter()
+    async for _ in tutor.run_agent_async(query, history, is_knowledge_base_ready=True):
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+async def _run(args):
+    files, queries = synthetic_curriculum(units_per_topic=2, pages_per_unit=2, languages=("en",))
+    questions = [item["query"] for item in queries][:args.questions]
+    engine = TutorEngine(RAGTutorConfig(qdrant_url=":memory:"))
+    engine.llm = ScriptedChatModel(first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    engine.build_chains()
+    engine.embeddings = DeterministicEmbeddings(query_latency_ms=args.embedding_ms)
+    engine._websearch_tool = _web_search_tool(args.web_search_ms)
+    engine._websearch_tool_loaded = True
+    work_dir = tempfile.mkdtemp(prefix="bench_tool_concurrency_")
+
+    print(
+        f"LLM {args.first_token_ms:.0f} ms/call, query embedding {args.embedding_ms:.0f} ms, web search {args.web_search_ms:.0f} ms; "
+        f"{len(questions)} questions per row"
+    )
+    print(f"{'tools':<9} {'planner':<8} {'speculation':<12} {'turn':<14} {'p50 TTFT ms':>12} {'speculation used':>17}")
+    try:
+        for web_search in (False, True):
+            for planner in (False, True):
+                for speculate in (False, True):
+                    engine.speculative_retrieval_config = SpeculativeRetrievalConfig(enabled=speculate)
+                    config = RAGTutorConfig(
+                        qdrant_url=":memory:", bm25_index_dir=work_dir, turn_planner_enabled=planner, web_search_enabled=web_search,
+                    )
+                    tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+                    await tutor.ingest_async(list(files))
+                    for label in ("first message", "follow-up"):
+                        metrics = speculative_retrieval._shared_metrics = SpeculativeRetrievalMetrics()
+                        ttft = []
+                        for question in questions:
+                            history = [] if label == "first message" else [{"role": "user", "content": "Tell me about this unit"}, {"role": "assistant", "content": "..."}]
+                            ttft.append(await _ttft(tutor, f"{question} ({label})", history))
+                        used = f"{metrics.used}/{metrics.started}" if metrics.started else "-"
+                        print(
+                            f"{'kb + web' if web_search else 'kb':<9} {'on' if planner else 'off':<8} {'on' if speculate else 'off':<12} "
+                            f"{label:<14} {statistics.median(ttft) * 1000:12.0f} {used:>17}"
+                        )
+                    await tutor.close_async()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent tool calls and speculative retrieval.")
+    parser.add_argument("--questions", type=int, default=5, help="Questions per row (each asked once).")
+    parser.add_argument("--first-token-ms", type=float, default=350.0, help="Simulated per-call LLM latency to the first token.")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Simulated LLM generation time per token.")
+    parser.add_argument("--embedding-ms", type=float, default=250.0, help="Simulated query embedding round trip.")
+    parser.add_argument("--web-search-ms", type=float, default=800.0, help="Simulated web search latency.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="qdrant_client")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
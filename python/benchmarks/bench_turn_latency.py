@@ -0,0 +1,105 @@
+"""
+Benchmark: LLM round trips and time-to-first-token per chat turn, with the separate
+rephrase / router / tool-selection calls vs. the single-call turn planner.
+
+Runs a short conversation against a session with an ingested knowledge base: a first
+question, knowledge-base follow-ups and a filler ("thanks"), plus a question to a session
+without a knowledge base, which the model answers directly. The LLM is a local stand-in
+with a fixed per-call latency and a per-token generation cost; Qdrant runs in-process and
+embeddings are deterministic. Reports, per turn type, the LLM calls made and the median
+time to the first streamed token and to the end of the answer.
+
+Usage (from the python/ directory):
+    python -m benchmarks.bench_turn_latency --repeats 5 --first-token-ms 350
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import warnings
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, ScriptedChatModel, synthetic_curriculum
+
+FIRST_QUESTION = "Explain the key terms of the first unit in the uploaded notes"
+TURNS = [
+    ("first message", FIRST_QUESTION, []),
+    ("follow-up", "can you give me an example of that?", [{"role": "user", "content": FIRST_QUESTION}, {"role": "assistant", "content": "..."}]),
+    ("follow-up", "how would you explain it to a weaker student?", [{"role": "user", "content": "can you give me an example of that?"}, {"role": "assistant", "content": "..."}]),
+    ("filler", "thanks", [{"role": "user", "content": FIRST_QUESTION}, {"role": "assistant", "content": "..."}]),
+]
+DIRECT_ANSWER_TURN = ("direct answer", "Suggest a warm-up activity for a history class", [])
+
+
+async def _turn(tutor: AsyncRAGTutor, llm: ScriptedChatModel, query: str, history) -> dict:
+    llm.reset_counters()
+    start = time.perf_counter()
+    first_token = None
+    async for _ in tutor.run_agent_async(query, history, is_knowledge_base_ready=True):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+    return {"calls": dict(llm.calls), "round_trips": llm.round_trips, "ttft": first_token, "total": time.perf_counter() - start}
+
+
+async def _run(args):
+    files, _ = synthetic_curriculum(units_per_topic=1, pages_per_unit=2, languages=("en",))
+    llm = ScriptedChatModel(first_token_ms=args.first_token_ms, token_ms=args.token_ms, answer_tokens=args.answer_tokens)
+    engine = TutorEngine(RAGTutorConfig(qdrant_url=":memory:"))
+    engine.llm = llm
+    engine.build_chains()
+    engine.embeddings = DeterministicEmbeddings()
+    work_dir = tempfile.mkdtemp(prefix="bench_turn_latency_")
+
+    print(
+        f"LLM stand-in: {args.first_token_ms:.0f} ms to first token, {args.token_ms:.0f} ms/token, "
+        f"{args.answer_tokens}-token answers; {args.repeats} repeats per turn"
+    )
+    print(f"{'mode':<9} {'turn':<14} {'LLM calls':>9} {'p50 TTFT ms':>12} {'p50 total ms':>13}  calls by kind")
+    try:
+        for planner in (False, True):
+            config = RAGTutorConfig(qdrant_url=":memory:", bm25_index_dir=work_dir, turn_planner_enabled=planner)
+            tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+            await tutor.ingest_async(list(files))
+            without_knowledge_base = AsyncRAGTutor(storage_manager=InMemoryStorage({}), config=config, engine=engine)
+            results = {}
+            for _ in range(args.repeats):
+                for label, query, history in TURNS:
+                    results.setdefault(label, []).append(await _turn(tutor, llm, query, history))
+                label, query, history = DIRECT_ANSWER_TURN
+                results.setdefault(label, []).append(await _turn(without_knowledge_base, llm, query, history))
+            await tutor.close_async()
+            await without_knowledge_base.close_async()
+
+            mode = "planner" if planner else "legacy"
+            for label, runs in results.items():
+                kinds = ", ".join(f"{kind}={count}" for kind, count in sorted(runs[-1]["calls"].items()))
+                print(
+                    f"{mode:<9} {label:<14} {statistics.mean(run['round_trips'] for run in runs):9.1f} "
+                    f"{statistics.median(run['ttft'] for run in runs) * 1000:12.0f} "
+                    f"{statistics.median(run['total'] for run in runs) * 1000:13.0f}  {kinds}"
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chat-turn latency with and without the turn planner.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs of each turn per mode.")
+    parser.add_argument("--first-token-ms", type=float, default=350.0, help="Simulated per-call latency to the first token.")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Simulated generation time per token.")
+    parser.add_argument("--answer-tokens", type=int, default=60, help="Tokens in each streamed answer.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="qdrant_client")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Offline evaluation: Qdrant storage options vs retrieval quality, latency and memory.
+
+For every combination of embedding dimensions (EMBEDDING_DIMENSIONS), quantization
+(QDRANT_QUANTIZATION) and on-disk storage (QDRANT_ON_DISK_VECTORS/_PAYLOAD) this
+reports recall@k against exact full-size float32 search, query latency, and the RAM
+and disk a Qdrant collection needs per 10k chunks.
+
+Embeddings come from the persistent EmbeddingCache, so after the first run nothing is
+re-embedded and no network access is needed. `--provider hashed` (the default) uses the
+deterministic test embeddings and never touches the network; `--provider openai` embeds
+the corpus once with text-embedding-3-small. Reduced dimensions are derived from the
+cached full-size vectors by truncating and re-normalizing, which is what the API's
+`dimensions` parameter does for text-embedding-3 models. The hashed provider's random projections
+lose more under truncation than text-embedding-3's Matryoshka-trained vectors, so base
+the choice of dimensions on an `--provider openai` run.
+
+By default search runs in NumPy: int8 is simulated the way Qdrant does it (quantile
+clipping, 1-byte codes, rescoring `oversampling * k` candidates with the originals), and
+memory is computed from Qdrant's storage layout. With --qdrant-url the same
+collections are also created on a Qdrant server with the tutor's own settings
+(qdrant_vector_params / qdrant_quantization_config / qdrant_search_params) and
+recall and latency are measured there.
+
+Usage (from the python/ directory):
+    python -m benchmarks.eval_vector_storage --chunks 10000 --dimensions 1536,512,256
+    python -m benchmarks.eval_vector_storage --qdrant-url http://localhost:6333
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+import warnings
+import itertools
+import statistics
+from dataclasses import replace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from AI_tutor import (
+    DEFAULT_EMBEDDING_DIMENSIONS, RAGTutorConfig, create_qdrant_client, qdrant_quantization_config,
+    qdrant_search_params, qdrant_vector_params,
+)
+from rag_toolkit.embedding_cache import CachedEmbeddings, EmbeddingCache, EmbeddingCacheConfig
+from benchmarks.fakes import DeterministicEmbeddings
+
+# Qdrant's HNSW graph keeps about 2 * m links of 4 bytes per vector on layer 0 (m=16).
+HNSW_BYTES_PER_VECTOR = 2 * 16 * 4
+# Rough allowance for ids, versions and segment bookkeeping per point.
+POINT_OVERHEAD_BYTES = 64
+
+
+class ProjectedEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words vectors through a fixed Gaussian random projection. Cosine
+    similarities are roughly preserved, but the vectors are dense like real embeddings,
+    so quantization and truncation behave realistically (sparse hashed vectors do not).
+    """
+
+    def __init__(self, size: int = DEFAULT_EMBEDDING_DIMENSIONS, buckets: int = 8192, seed: int = 11):
+        self.hashed = DeterministicEmbeddings(size=buckets)
+        self.projection = np.random.default_rng(seed).standard_normal((buckets, size)).astype(np.float32) / np.sqrt(size)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (np.asarray(self.hashed.embed_documents(texts), dtype=np.float32) @ self.projection).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _embeddings(provider: str, cache: EmbeddingCache) -> CachedEmbeddings:
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        base, model = OpenAIEmbeddings(model="text-embedding-3-small"), "text-embedding-3-small"
+    else:
+        base, model = ProjectedEmbeddings(), "hashed-projected"
+    return CachedEmbeddings(base, cache, model=model)
+
+
+def _corpus(count: int, words_per_chunk: int, vocabulary: int = 30_000, topics: int = 200, seed: int = 3):
+    """
+    Chunks drawn from Zipf-distributed words, each mixing a few topics, so that
+    nearest neighbours are well separated (unlike the small-vocabulary fakes).
+    """
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, vocabulary + 1)
+    background = 1.0 / ranks
+    background /= background.sum()
+    topic_words = [rng.choice(vocabulary, size=60, replace=False) for _ in range(topics)]
+    texts = []
+    for _ in range(count):
+        mixture = rng.choice(topics, size=3, replace=False)
+        topical = rng.random(words_per_chunk) < 0.4
+        words = rng.choice(vocabulary, size=words_per_chunk, p=background)
+        words[topical] = [rng.choice(topic_words[rng.choice(mixture)]) for _ in range(int(topical.sum()))]
+        texts.append(" ".join(f"w{word}" for word in words))
+    return texts
+
+
+async def _embed(embeddings: CachedEmbeddings, texts, batch_size: int = 512) -> np.ndarray:
+    vectors = []
+    for offset in range(0, len(texts), batch_size):
+        vectors.extend(await embeddings.aembed_documents(texts[offset:offset + batch_size]))
+    return _normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _queries(texts, count: int, seed: int = 5):
+    """Short passages cut out of random chunks, like a student quoting a worksheet."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for row in rng.choice(len(texts), size=count, replace=False):
+        words = texts[row].split()
+        start = int(rng.integers(0, max(1, len(words) - 12)))
+        queries.append(" ".join(words[start:start + 12]))
+    return queries
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _quantize(matrix: np.ndarray, quantile: float):
+    low, high = np.quantile(matrix, 1 - quantile), np.quantile(matrix, quantile)
+    scale = (high - low) / 255 or 1.0
+    codes = np.round((np.clip(matrix, low, high) - low) / scale).astype(np.uint8)
+    return codes, low, scale
+
+
+def _search_numpy(corpus: np.ndarray, queries: np.ndarray, k: int, quantization: str, config: RAGTutorConfig):
+    """Returns (top-k rows per query, per-query latencies in ms)."""
+    if quantization == "int8":
+        codes, low, scale = _quantize(corpus, config.qdrant_quantization_quantile)
+        candidates = max(k, int(round(k * config.qdrant_rescore_oversampling)))
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        if quantization == "int8":
+            # Dot products on dequantized codes; the constant offset does not change the ranking.
+            approximate = (codes @ query) * scale + low * query.sum()
+            shortlist = np.argpartition(-approximate, candidates - 1)[:candidates]
+            exact = corpus[shortlist] @ query
+            rows = shortlist[np.argsort(-exact)[:k]]
+        else:
+            rows = _top_k((corpus @ query)[None, :], k)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return results, latencies
+
+
+def _search_qdrant(client, corpus: np.ndarray, queries: np.ndarray, k: int, config: RAGTutorConfig, name: str):
+    from qdrant_client import models
+
+    client.create_collection(
+        collection_name=name,
+        vectors_config=qdrant_vector_params(config),
+        quantization_config=qdrant_quantization_config(config),
+        on_disk_payload=config.qdrant_on_disk_payload or None,
+    )
+    try:
+        for start in range(0, len(corpus), 1024):
+            rows = range(start, min(start + 1024, len(corpus)))
+            client.upsert(name, points=models.Batch(ids=list(rows), vectors=corpus[start:rows.stop].tolist()), wait=True)
+        results, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            response = client.query_points(name, query=query.tolist(), limit=k, search_params=qdrant_search_params(config))
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(np.array([point.id for point in response.points]))
+        return results, latencies
+    finally:
+        client.delete_collection(name)
+
+
+def _memory_per_10k(dimensions: int, quantization: str, on_disk: bool, payload_bytes: float):
+    """Estimated (RAM MB, disk MB) for 10k chunks, following Qdrant's storage layout."""
+    originals = dimensions * 4
+    quantized = dimensions if quantization == "int8" else 0
+    ram = quantized + HNSW_BYTES_PER_VECTOR + POINT_OVERHEAD_BYTES
+    if not on_disk:
+        ram += originals + payload_bytes
+    disk = originals + quantized + payload_bytes + HNSW_BYTES_PER_VECTOR
+    return ram * 10_000 / 2**20, disk * 10_000 / 2**20
+
+
+def _recall(results, truth) -> float:
+    return statistics.mean(len(set(found.tolist()) & set(expected.tolist())) / len(expected) for found, expected in zip(results, truth))
+
+
+async def _run(args):
+    texts = _corpus(args.chunks, args.words_per_chunk)
+    query_texts = _queries(texts, args.queries)
+    cache = EmbeddingCache(EmbeddingCacheConfig(path=args.cache_path))
+
+    start = time.perf_counter()
+    # Queries go through the document path too, so they are cached as well.
+    full = await _embed(_embeddings(args.provider, cache), texts)
+    full_queries = await _embed(_embeddings(args.provider, cache), query_texts)
+    print(
+        f"{len(texts)} chunks + {len(query_texts)} queries embedded in {time.perf_counter() - start:.1f}s "
+        f"({args.provider}; cache hits {cache.metrics.hits}, misses {cache.metrics.misses}, at {args.cache_path})"
+    )
+
+    truth = list(_top_k(full_queries @ full.T, args.k))
+    payload_bytes = statistics.mean(
+        len(json.dumps({"page_content": text, "metadata": {"source": "worksheet.pdf", "chunk_id": f"chunk-{row}"}}).encode("utf-8"))
+        for row, text in enumerate(texts)
+    )
+    client = create_qdrant_client(RAGTutorConfig(qdrant_url=args.qdrant_url)) if args.qdrant_url else None
+
+    header = f"{'dims':>5} {'quant':>6} {'on disk':>8} {'recall@' + str(args.k):>10} {'p50 ms':>7} {'p95 ms':>7} {'RAM MB/10k':>11} {'disk MB/10k':>12}"
+    if client is not None:
+        header += f" {'qdrant recall':>14} {'qdrant p50 ms':>14}"
+    print(header)
+    for dimensions, quantization, on_disk in itertools.product(args.dimensions, ("none", "int8"), (False, True)):
+        config = replace(
+            RAGTutorConfig(),
+            embedding_dimensions=None if dimensions == DEFAULT_EMBEDDING_DIMENSIONS else dimensions,
+            qdrant_quantization=quantization,
+            qdrant_on_disk_vectors=on_disk,
+            qdrant_on_disk_payload=on_disk,
+        )
+        # text-embedding-3 `dimensions` = the full vector truncated and re-normalized.
+        corpus, queries = _normalize(full[:, :dimensions]), _normalize(full_queries[:, :dimensions])
+        results, latencies = _search_numpy(corpus, queries, args.k, quantization, config)
+        latencies.sort()
+        ram_mb, disk_mb = _memory_per_10k(dimensions, quantization, on_disk, payload_bytes)
+        line = (
+            f"{dimensions:5d} {quantization:>6} {'yes' if on_disk else 'no':>8} {_recall(results, truth):10.3f} "
+            f"{statistics.median(latencies):7.2f} {latencies[int(len(latencies) * 0.95)]:7.2f} {ram_mb:11.1f} {disk_mb:12.1f}"
+        )
+        if client is not None:
+            name = f"eval_storage_{os.getpid()}_{dimensions}_{quantization}_{int(on_disk)}"
+            server_results, server_latencies = await asyncio.to_thread(_search_qdrant, client, corpus, queries, args.k, config, name)
+            line += f" {_recall(server_results, truth):14.3f} {statistics.median(server_latencies):14.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate quantized, reduced-dimension and on-disk vector storage.")
+    parser.add_argument("--chunks", type=int, default=10_000, help="Chunks in the corpus.")
+    parser.add_argument("--words-per-chunk", type=int, default=120, help="Words per synthetic chunk.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to evaluate.")
+    parser.add_argument("--k", type=int, default=10, help="Results per query for recall@k.")
+    parser.add_argument("--dimensions", type=lambda value: [int(item) for item in value.split(",")], default=[1536, 512, 256],
+                        help="Comma-separated embedding sizes to compare.")
+    parser.add_argument("--provider", choices=("hashed", "openai"), default="hashed", help="Embeddings to evaluate.")
+    parser.add_argument("--cache-path", default="tutor_session_data/eval_embeddings.sqlite3", help="EmbeddingCache file.")
+    parser.add_argument("--qdrant-url", default=None, help="Also measure on this Qdrant server (or :memory:).")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="qdrant_client")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+Offline stand-ins shared by the benchmarks: deterministic embeddings, an in-memory
+storage manager, vision and chat models and synthetic document and image generators.
+Nothing here calls a network API.
+"""
+import io
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from rag_toolkit.chunking import approximate_token_count
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class FakeRateLimitError(Exception):
+    """Mimics a provider 429: carries a status code and a Retry-After hint."""
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeterministicEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings: texts sharing words get similar vectors, so retrieval
+    quality is meaningful, and the same text always gets the same vector.
+
+    `latency_ms_per_call` and `latency_ms_per_1k_tokens` model the provider's request
+    overhead and per-token cost so that batching and payload size show up in wall-clock
+    timings; every embedded token is counted. `query_latency_ms` is the round trip of a
+    single query embedding. With `rate_limit_every` set, every n-th call fails with
+    FakeRateLimitError before doing any work.
+    """
+
+    def __init__(
+        self,
+        size: int = 1536,
+        latency_ms_per_1k_tokens: float = 0.0,
+        max_input_tokens: Optional[int] = None,
+        latency_ms_per_call: float = 0.0,
+        rate_limit_every: int = 0,
+        rate_limit_retry_after: float = 0.1,
+        query_latency_ms: float = 0.0,
+    ):
+        self.size = size
+        self.latency_ms_per_1k_tokens = latency_ms_per_1k_tokens
+        self.max_input_tokens = max_input_tokens
+        self.latency_ms_per_call = latency_ms_per_call
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_retry_after = rate_limit_retry_after
+        self.query_latency_ms = query_latency_ms
+        self.requests = 0
+        self.rate_limited = 0
+        self.calls = 0
+        self.texts_embedded = 0
+        self.tokens_embedded = 0
+        self.oversized_inputs = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def _account(self, texts: List[str]) -> float:
+        self.requests += 1
+        if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+            self.rate_limited += 1
+            raise FakeRateLimitError(self.rate_limit_retry_after)
+        tokens = 0
+        for text in texts:
+            count = approximate_token_count(text)
+            if self.max_input_tokens and count > self.max_input_tokens:
+                self.oversized_inputs += 1
+            tokens += count
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        self.tokens_embedded += tokens
+        return (self.latency_ms_per_call + tokens * self.latency_ms_per_1k_tokens / 1000) / 1000
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        delay = self._account(texts)
+        if delay:
+            time.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_latency_ms:
+            time.sleep(self.query_latency_ms / 1000)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        delay = self._account(texts)
+        if delay:
+            await asyncio.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.query_latency_ms:
+            await asyncio.sleep(self.query_latency_ms / 1000)
+        return self._vector(text)
+
+    def reset_counters(self):
+        self.calls = self.texts_embedded = self.tokens_embedded = self.oversized_inputs = 0
+        self.requests = self.rate_limited = 0
+
+
+class FakeVisionModel:
+    """
+    Chat-model stand-in for image descriptions. Latency grows with the size of the
+    image payload (upload + decode) on top of a fixed per-call cost; payload bytes are
+    counted so that downscaling shows up in the numbers.
+    """
+
+    def __init__(self, latency_ms_per_call: float = 1500.0, latency_ms_per_mb: float = 400.0):
+        self.latency_ms_per_call = latency_ms_per_call
+        self.latency_ms_per_mb = latency_ms_per_mb
+        self.calls = 0
+        self.payload_bytes = 0
+
+    async def ainvoke(self, messages):
+        parts = messages[0].content
+        url = next(part["image_url"]["url"] for part in parts if part.get("type") == "image_url")
+        payload = len(url)
+        self.calls += 1
+        self.payload_bytes += payload
+        await asyncio.sleep((self.latency_ms_per_call + self.latency_ms_per_mb * payload / 2**20) / 1000)
+        return AIMessage(content=f"A diagram ({hashlib.sha256(url[-4096:].encode()).hexdigest()[:8]}) with labelled boxes.")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Local LLM stand-in for the tutor's chat turns. Every call waits `first_token_ms`
+    (request overhead and prompt processing) plus `token_ms` per generated token, and
+    streamed answers arrive token by token, so round trips and time-to-first-token show
+    up in wall-clock timings. Calls are counted by kind (rephrase, router, planner,
+    tools, answer).
+
+    Responses are scripted from the prompt: the rephrase chain gets the follow-up back,
+    the router answers "use_llm_with_tools", the turn planner and the tool-bound call ask
+    for the knowledge base when it is available and for web search when it is offered (or
+    the image generator for visual requests), and everything else is an
+    `answer_tokens`-word answer.
+    """
+    first_token_ms: float = 350.0
+    token_ms: float = 15.0
+    answer_tokens: int = 60
+    calls: Dict[str, int] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def reset_counters(self):
+        self.calls = {}
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.calls.values())
+
+    @staticmethod
+    def _is_visual(text: str) -> bool:
+        return any(word in text.lower() for word in ("diagram", "draw", "chart", "image", "picture"))
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[dict]]) -> Tuple[str, AIMessage]:
+        system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+        last = messages[-1].content if isinstance(messages[-1].content, str) else messages[-1].content[0]["text"]
+        tool_names = [tool["function"]["name"] for tool in tools or []]
+        call_id = f"call_{hashlib.sha256(last.encode()).hexdigest()[:12]}"
+
+        if "TurnPlan" in tool_names:
+            question = last.rsplit("Latest Message:", 1)[-1].strip()
+            visual = self._is_visual(question)
+            args = {
+                "standalone_query": question,
+                "action": "generate_image" if visual else "answer",
+                "image_parameters": {
+                    "topic": question, "grade_level": "middle school", "preferred_visual_type": "diagram",
+                    "subject": "science", "instructions": question,
+                } if visual else None,
+                "tool_calls": [] if visual else (
+                    ([{"name": "knowledge_base_retriever", "query": question}] if "Knowledge base: AVAILABLE" in system else [])
+                    + ([{"name": "perplexity_search", "query": question}] if "perplexity_search" in system else [])
+                ),
+            }
+            return "planner", AIMessage(content="", tool_calls=[{"name": "TurnPlan", "args": args, "id": call_id}])
+        if tool_names:
+            if any(isinstance(m, ToolMessage) for m in messages):
+                return "answer", AIMessage(content=self._answer())
+            if self._is_visual(last) and "image_generator" in tool_names:
+                args = {"topic": last, "grade_level": "middle school", "preferred_visual_type": "diagram", "subject": "science", "instructions": last}
+                return "tools", AIMessage(content="", tool_calls=[{"name": "image_generator", "args": args, "id": call_id}])
+            tool_calls = []
+            if "Knowledge Base**: AVAILABLE" in system:
+                tool_calls.append({"name": "knowledge_base_retriever", "args": {"__arg1": last}, "id": call_id})
+            if "perplexity_search" in tool_names:
+                tool_calls.append({"name": "perplexity_search", "args": {"query": last}, "id": f"{call_id}_web"})
+            return "tools", AIMessage(content="" if tool_calls else self._answer(), tool_calls=tool_calls)
+        if "intelligent router" in system:
+            return "router", AIMessage(content="use_llm_with_tools")
+        if "Standalone Question:" in last:
+            return "rephrase", AIMessage(content=last.rsplit("Follow-up Question:", 1)[-1].split("Standalone Question:")[0].strip())
+        return "answer", AIMessage(content=self._answer())
+
+    def _answer(self) -> str:
+        return " ".join(f"word{i}" for i in range(self.answer_tokens))
+
+    def _tokens(self, message: AIMessage) -> int:
+        return max(1, len(str(message.content).split()) + 20 * len(message.tool_calls))
+
+    def _count(self, kind: str):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kind, message = self._respond(messages, kwargs.get("tools"))
+        self._count(kind)
+        time.sleep((self.first_token_ms + self.token_ms * self._tokens(message)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kind, message = self._respond(messages, kwargs.get("tools"))
+        self._count(kind)
+        await asyncio.sleep((self.first_token_ms + self.token_ms * self._tokens(message)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        kind, message = self._respond(messages, kwargs.get("tools"))
+        self._count(kind)
+        await asyncio.sleep(self.first_token_ms / 1000)
+        if message.tool_calls:
+            await asyncio.sleep(self.token_ms * self._tokens(message) / 1000)
+            chunks = [{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i} for i, call in enumerate(message.tool_calls)]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=chunks))
+            return
+        for i, word in enumerate(str(message.content).split()):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+
+
+class InMemoryStorage:
+    """Storage manager compatible with AsyncRAGTutor.ingest_async, backed by a dict."""
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None):
+        self.files: Dict[str, bytes] = dict(files or {})
+
+    async def get_file_content_bytes_async(self, storage_key: str) -> Optional[bytes]:
+        return self.files.get(storage_key)
+
+
+TOPICS = {
+    "photosynthesis": "chlorophyll light energy glucose carbon dioxide oxygen leaf stomata chloroplast",
+    "revolution": "colonies independence battle congress treaty militia taxation declaration",
+    "algebra": "equation variable coefficient polynomial factor quadratic solve expression",
+    "volcano": "magma eruption tectonic plate crust lava ash crater pressure",
+    "literature": "novel character narrator theme metaphor plot chapter author",
+}
+
+
+def synthetic_pages(pages_per_topic: int = 8, words_per_page: int = 1800, seed: int = 7) -> Dict[str, List[str]]:
+    """Builds page-sized texts per topic, mixing topic words with common filler words."""
+    rng = random.Random(seed)
+    filler = ("the a of and to in is for that with as on by this are from be it an at which "
+              "students learn lesson teacher class study example question answer").split()
+    corpus = {}
+    for topic, words in TOPICS.items():
+        vocabulary = words.split()
+        pages = []
+        for _ in range(pages_per_topic):
+            sentences, count = [], 0
+            while count < words_per_page:
+                length = rng.randint(8, 18)
+                sentence = [rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(filler) for _ in range(length)]
+                sentences.append(" ".join(sentence).capitalize() + ".")
+                count += length
+                if rng.random() < 0.15:
+                    sentences.append("\n\n")
+            pages.append(" ".join(sentences))
+        corpus[topic] = pages
+    return corpus
+
+
+# Arabic vocabulary per topic, with the prefix/suffix and spelling variants students type.
+ARABIC_TOPICS = {
+    "photosynthesis": "البناء الضوئي الكلوروفيل والضوء الطاقة الجلوكوز ثاني أكسيد الكربون الأكسجين الأوراق الثغور",
+    "revolution": "المستعمرات الاستقلال المعركة الكونغرس المعاهدة الميليشيا الضرائب الإعلان والثورة",
+    "algebra": "المعادلة المتغير المعامل كثيرة الحدود العوامل التربيعية الحل التعبير والمعادلات",
+    "volcano": "الصهارة الثوران الصفائح التكتونية القشرة الحمم الرماد الفوهة الضغط والبراكين",
+    "literature": "الرواية الشخصية الراوي الموضوع الاستعارة الحبكة الفصل الكاتب والروايات",
+}
+
+# Harakat sprinkled on some words, the way vocalized school texts are written.
+_HARAKAT = ("َ", "ُ", "ِ", "ّ", "ْ")
+
+
+def synthetic_multilingual_chunks(count: int = 50_000, words_per_chunk: int = 120, arabic_ratio: float = 0.5, seed: int = 7) -> List[Dict[str, str]]:
+    """
+    Builds chunk-sized English and Arabic texts tagged with their topic. Arabic chunks
+    randomly vocalize words and swap alef/hamza spellings, so exact-match tokenizers miss
+    matches a normalizing tokenizer finds.
+    """
+    rng = random.Random(seed)
+    english_filler = ("the a of and to in is for that with as on by this are from be it an at which "
+                      "students learn lesson teacher class study example question answer").split()
+    arabic_filler = "في من على إلى عن مع هذا هذه الطلاب الدرس المعلم الصف مثال سؤال جواب يتعلم".split()
+    chunks = []
+    for index in range(count):
+        topic = rng.choice(list(TOPICS))
+        arabic = rng.random() < arabic_ratio
+        vocabulary = (ARABIC_TOPICS if arabic else TOPICS)[topic].split()
+        filler = arabic_filler if arabic else english_filler
+        words = []
+        for _ in range(words_per_chunk):
+            word = rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(filler)
+            if arabic and rng.random() < 0.3:
+                word = word.replace("أ", "ا").replace("إ", "ا") if rng.random() < 0.5 else "".join(
+                    char + rng.choice(_HARAKAT) if rng.random() < 0.4 else char for char in word
+                )
+            words.append(word)
+        chunks.append({
+            "id": f"chunk-{index}",
+            "topic": topic,
+            "language": "ar" if arabic else "en",
+            "text": " ".join(words),
+        })
+    return chunks
+
+
+_SYLLABLES = {
+    "en": "ka lo mi nu ra te vi so pe du ga ri ze fo ba".split(),
+    "ar": "كا لو مي نو را تي في سو بي دو غا ري زي فو با".split(),
+}
+
+
+def _key_term(rng: random.Random, language: str) -> str:
+    return "".join(rng.choice(_SYLLABLES[language]) for _ in range(3))
+
+
+def _arabic_variant(word: str, rng: random.Random) -> str:
+    """Spells an Arabic word the way students type it: plain alef or added harakat."""
+    if rng.random() < 0.5:
+        return word.replace("أ", "ا").replace("إ", "ا")
+    return "".join(char + rng.choice(_HARAKAT) if rng.random() < 0.4 else char for char in word)
+
+
+def synthetic_curriculum(
+    units_per_topic: int = 6,
+    pages_per_unit: int = 3,
+    words_per_page: int = 350,
+    languages: Tuple[str, ...] = ("en", "ar"),
+    queries_per_unit: int = 2,
+    seed: int = 7,
+) -> Tuple[Dict[str, bytes], List[Dict[str, Any]]]:
+    """
+    Builds a labelled curriculum: one text file per (language, topic, unit) and queries
+    whose relevant file is known. Units of a topic share its vocabulary, so what tells
+    them apart are a few unit-specific key terms (invented words); a query names one key
+    term with some topic words, Arabic ones with the spelling variants students type.
+
+    Returns (files keyed by filename, queries as {"query", "language", "relevant_sources"}).
+    """
+    rng = random.Random(seed)
+    filler = {
+        "en": ("the a of and to in is for that with as on by this are from be it an at which "
+               "students learn lesson teacher class study example question answer").split(),
+        "ar": "في من على إلى عن مع هذا هذه الطلاب الدرس المعلم الصف مثال سؤال جواب يتعلم".split(),
+    }
+    files: Dict[str, bytes] = {}
+    queries: List[Dict[str, Any]] = []
+    for language in languages:
+        vocabularies = TOPICS if language == "en" else ARABIC_TOPICS
+        for topic, words in vocabularies.items():
+            vocabulary = words.split()
+            for unit in range(1, units_per_topic + 1):
+                key_terms = [_key_term(rng, language) for _ in range(3)]
+                pages = []
+                for _ in range(pages_per_unit):
+                    page = []
+                    for _ in range(words_per_page):
+                        roll = rng.random()
+                        page.append(rng.choice(key_terms) if roll < 0.04 else rng.choice(vocabulary) if roll < 0.34 else rng.choice(filler[language]))
+                    pages.append(" ".join(page))
+                filename = f"{language}_{topic}_unit{unit}.txt"
+                files[filename] = "\n\n".join(pages).encode("utf-8")
+                for _ in range(queries_per_unit):
+                    terms = [rng.choice(key_terms)] + rng.sample(vocabulary, 3)
+                    rng.shuffle(terms)
+                    if language == "ar":
+                        terms = [_arabic_variant(term, rng) for term in terms]
+                    queries.append({"query": " ".join(terms), "language": language, "relevant_sources": [filename]})
+    return files, queries
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(pages: int = 50, words_per_page: int = 450, seed: int = 7) -> bytes:
+    """Builds a text PDF (Helvetica, ~70 lines per page) from synthetic_pages() text."""
+    corpus = synthetic_pages(pages_per_topic=max(1, -(-pages // len(TOPICS))), words_per_page=words_per_page, seed=seed)
+    texts = [text for topic_pages in corpus.values() for text in topic_pages][:pages]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for text in texts:
+        words, lines, line = text.split(), [], []
+        for word in words:
+            line.append(word)
+            if len(line) == 12:
+                lines.append(" ".join(line))
+                line = []
+        lines.append(" ".join(line))
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(item)}) Tj T*" for item in lines[:70]) + " ET"
+        stream = stream.encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        page_refs.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % ref for ref in page_refs), len(page_refs))
+
+    output, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def synthetic_image(seed: int = 0, width: int = 4032, height: int = 3024, image_format: str = "JPEG") -> bytes:
+    """A photographed-whiteboard-sized image: noisy background, boxes and connecting lines."""
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    # Sensor-like noise keeps the encoded size realistic for a phone photo.
+    noise = rng.normal(235, 12, size=(height // 8, width // 8, 3)).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(noise).resize((width, height))
+    draw = ImageDraw.Draw(image)
+    for _ in range(14):
+        x, y = int(rng.integers(0, width - 600)), int(rng.integers(0, height - 400))
+        color = tuple(int(value) for value in rng.integers(0, 200, size=3))
+        draw.rectangle((x, y, x + int(rng.integers(200, 600)), y + int(rng.integers(150, 400))), outline=color, width=12)
+        draw.line((x, y, int(rng.integers(0, width)), int(rng.integers(0, height))), fill=color, width=8)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=92)
+    return buffer.getvalue()
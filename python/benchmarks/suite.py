@@ -0,0 +1,231 @@
+"""
+Offline benchmark suite for the tutor's RAG stack.
+
+Generates a labelled, multilingual (English/Arabic) curriculum with
+benchmarks.fakes.synthetic_curriculum, ingests it end to end through
+AsyncRAGTutor.ingest_stream_async (in-process Qdrant, deterministic hashed
+embeddings with a simulated per-token cost) and runs every labelled query through
+each retrieval mode:
+
+  vector    - the Qdrant vector retriever
+  bm25      - the session's BM25 index
+  ensemble  - the weighted vector + BM25 EnsembleRetriever (truncated to k)
+  fusion    - reciprocal rank fusion + MMR (the default knowledge-base retriever)
+
+Reports ingestion throughput (chunks/s, pages/s, time to first searchable batch) and,
+per mode, recall@k, MRR and p50/p95 query latency, overall and per language.
+
+Results are printed as a table and, with --output, written as JSON. With --baseline the
+run is compared against an earlier JSON result and the process exits with status 1 if
+recall dropped or throughput/latency regressed beyond the tolerances, so it can gate CI.
+
+Usage (from the python/ directory):
+    python -m benchmarks.suite --output results/rag_suite.json
+    python -m benchmarks.suite --baseline results/rag_suite.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import platform
+import tempfile
+import warnings
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine, RETRIEVER_AVAILABLE
+from rag_toolkit.bm25_index import BM25IndexRetriever
+from rag_toolkit.fusion import FusionConfig
+from benchmarks.fakes import DeterministicEmbeddings, InMemoryStorage, synthetic_curriculum
+
+SUITE_VERSION = 1
+RETRIEVAL_MODES = ("vector", "bm25", "ensemble", "fusion")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def _ingest(tutor: AsyncRAGTutor, files: Dict[str, bytes]) -> Dict[str, Any]:
+    done = None
+    async for event in tutor.ingest_stream_async(sorted(files)):
+        if event["type"] == "done":
+            done = event
+    seconds = done["elapsed_seconds"]
+    return {
+        "files": done["files_done"],
+        "pages": done["pages_parsed"],
+        "chunks_created": done["chunks_created"],
+        "chunks_indexed": done["chunks_indexed"],
+        "duplicates_dropped": done["duplicates_dropped"],
+        "seconds": round(seconds, 3),
+        "seconds_to_searchable": done["seconds_to_searchable"],
+        "chunks_per_second": round(done["chunks_created"] / seconds, 1) if seconds else 0.0,
+        "pages_per_second": round(done["pages_parsed"] / seconds, 1) if seconds else 0.0,
+    }
+
+
+def _retrievers(tutor: AsyncRAGTutor, k: int) -> Dict[str, Any]:
+    bm25 = BM25IndexRetriever(index=tutor.state.bm25_index, k=k)
+    retrievers = {"vector": tutor.retriever, "bm25": bm25, "fusion": tutor.ensemble_retriever}
+    if RETRIEVER_AVAILABLE:
+        from langchain.retrievers import EnsembleRetriever
+        retrievers["ensemble"] = EnsembleRetriever(retrievers=[tutor.retriever, bm25], weights=[0.7, 0.3])
+    return retrievers
+
+
+async def _evaluate(retriever, queries: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    latencies, recalls, reciprocal_ranks, by_language = [], [], [], {}
+    for item in queries:
+        start = time.perf_counter()
+        documents = (await retriever.ainvoke(item["query"]))[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        sources = [doc.metadata.get("source") for doc in documents]
+        relevant = set(item["relevant_sources"])
+        recall = len(relevant & set(sources)) / len(relevant)
+        rank = next((position for position, source in enumerate(sources, start=1) if source in relevant), None)
+        recalls.append(recall)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        by_language.setdefault(item["language"], []).append(recall)
+    return {
+        "queries": len(queries),
+        f"recall_at_{k}": round(statistics.mean(recalls), 4),
+        "mrr": round(statistics.mean(reciprocal_ranks), 4),
+        "latency_ms_p50": round(_percentile(latencies, 0.5), 3),
+        "latency_ms_p95": round(_percentile(latencies, 0.95), 3),
+        "recall_by_language": {language: round(statistics.mean(values), 4) for language, values in sorted(by_language.items())},
+    }
+
+
+def _regressions(current: Dict[str, Any], baseline: Dict[str, Any], args) -> List[str]:
+    """Human-readable regressions of `current` against `baseline`."""
+    problems = []
+    rate, base_rate = current["ingestion"]["chunks_per_second"], baseline["ingestion"]["chunks_per_second"]
+    if base_rate and rate < base_rate * (1 - args.throughput_tolerance):
+        problems.append(f"ingestion chunks/s {rate} < baseline {base_rate}")
+    recall_key = f"recall_at_{current['config']['k']}"
+    for mode, result in current["retrieval"].items():
+        base = baseline.get("retrieval", {}).get(mode)
+        if not base or recall_key not in base:
+            continue
+        if result[recall_key] < base[recall_key] - args.recall_tolerance:
+            problems.append(f"{mode} {recall_key} {result[recall_key]} < baseline {base[recall_key]}")
+        if result["latency_ms_p95"] > base["latency_ms_p95"] * (1 + args.latency_tolerance):
+            problems.append(f"{mode} p95 latency {result['latency_ms_p95']} ms > baseline {base['latency_ms_p95']} ms")
+    return problems
+
+
+async def _run(args) -> Dict[str, Any]:
+    files, queries = synthetic_curriculum(
+        units_per_topic=args.units_per_topic, pages_per_unit=args.pages_per_unit,
+        words_per_page=args.words_per_page, seed=args.seed,
+    )
+    if args.min_similarity is not None:
+        os.environ["RETRIEVAL_MIN_SIMILARITY"] = str(args.min_similarity)
+    work_dir = tempfile.mkdtemp(prefix="rag_suite_")
+    config = RAGTutorConfig(qdrant_url=":memory:", bm25_index_dir=work_dir, retrieval_k=args.k)
+    engine = TutorEngine(config)
+    engine.embeddings = DeterministicEmbeddings(latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens)
+    tutor = AsyncRAGTutor(storage_manager=InMemoryStorage(files), config=config, engine=engine)
+    try:
+        ingestion = await _ingest(tutor, files)
+        ingestion["embedded_tokens"] = engine.embeddings.tokens_embedded
+        retrieval = {}
+        for mode, retriever in _retrievers(tutor, args.k).items():
+            if mode in args.modes:
+                retrieval[mode] = await _evaluate(retriever, queries, args.k)
+        await tutor.close_async()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "suite_version": SUITE_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "k": args.k, "seed": args.seed, "files": len(files), "queries": len(queries),
+            "units_per_topic": args.units_per_topic, "pages_per_unit": args.pages_per_unit,
+            "words_per_page": args.words_per_page, "latency_ms_per_1k_tokens": args.latency_ms_per_1k_tokens,
+            "retrieval_fusion": config.retrieval_fusion, "dedup_enabled": config.dedup_enabled,
+            "min_similarity": FusionConfig.from_env().min_similarity,
+        },
+        "ingestion": ingestion,
+        "retrieval": retrieval,
+    }
+
+
+def _print(result: Dict[str, Any]):
+    config, ingestion = result["config"], result["ingestion"]
+    print(f"{config['files']} files, {config['queries']} labelled queries, k={config['k']} (commit {result['git_commit']})")
+    print(
+        f"ingestion: {ingestion['chunks_created']} chunks ({ingestion['chunks_indexed']} indexed) from {ingestion['pages']} pages "
+        f"in {ingestion['seconds']:.2f}s = {ingestion['chunks_per_second']:.1f} chunks/s, searchable after {ingestion['seconds_to_searchable']:.2f}s"
+    )
+    recall_key = f"recall_at_{config['k']}"
+    print(f"{'mode':<10} {recall_key:>12} {'mrr':>7} {'p50 ms':>8} {'p95 ms':>8}  recall by language")
+    for mode, metrics in result["retrieval"].items():
+        languages = ", ".join(f"{language}={value:.3f}" for language, value in metrics["recall_by_language"].items())
+        print(f"{mode:<10} {metrics[recall_key]:12.3f} {metrics['mrr']:7.3f} {metrics['latency_ms_p50']:8.2f} {metrics['latency_ms_p95']:8.2f}  {languages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion and retrieval benchmarks for the tutor's RAG stack.")
+    parser.add_argument("--units-per-topic", type=int, default=6, help="Units (files) per topic and language.")
+    parser.add_argument("--pages-per-unit", type=int, default=3, help="Pages per unit.")
+    parser.add_argument("--words-per-page", type=int, default=350, help="Words per page.")
+    parser.add_argument("--k", type=int, default=5, help="Results per query for recall@k.")
+    parser.add_argument("--seed", type=int, default=7, help="Corpus and query seed.")
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=2.0, help="Simulated embedding cost.")
+    parser.add_argument("--min-similarity", type=float,
+                        help="Fusion relevance cutoff (default: RETRIEVAL_MIN_SIMILARITY or the FusionConfig default).")
+    parser.add_argument("--modes", nargs="+", choices=RETRIEVAL_MODES, default=list(RETRIEVAL_MODES), help="Retrieval modes to run.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against an earlier JSON result; exit 1 on regression.")
+    parser.add_argument("--recall-tolerance", type=float, default=0.02, help="Allowed absolute recall drop.")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed relative p95 latency increase.")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.3, help="Allowed relative chunks/s drop.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="qdrant_client")
+    result = asyncio.run(_run(args))
+    _print(result)
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = _regressions(result, baseline, args)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (commit {baseline.get('git_commit', 'unknown')})")
+
+
+if __name__ == "__main__":
+    main()
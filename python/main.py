@@ -1,15 +1,16 @@
 import os
+import time
 import uuid
 import logging
 from typing import List, Dict, Any, Optional
 
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from fastapi.concurrency import run_in_threadpool
 
 # --- Configure Logging ---
 logging.basicConfig(
@@ -24,7 +25,15 @@ load_dotenv()
 # --- Import functionalities from your scripts ---
 
 # Chatbot imports
-from AI_tutor import AsyncRAGTutor, RAGTutorConfig
+from AI_tutor import AsyncRAGTutor, RAGTutorConfig, TutorEngine
+from serving_toolkit.session_pool import TutorSessionPool, SessionPoolConfig
+from serving_toolkit.session_store import create_session_store
+from serving_toolkit.provider_executor import get_provider_executor
+from serving_toolkit.admission import get_admission_controller, AdmissionRejected, AdmissionLease
+from serving_toolkit.response_cache import get_response_cache
+from rag_toolkit.parsing import get_document_parser
+from rag_toolkit.retrieval_cache import get_retrieval_cache_metrics
+from rag_toolkit.speculative_retrieval import get_speculative_retrieval_metrics
 
 # Assessment generation imports
 from assessment import create_question_generation_chain, generate_test_questions_async
@@ -99,12 +108,61 @@ class SimpleInMemoryStorage:
 logger.info("Initializing global components...")
 
 try:
+    # Start the document-parser worker processes first, while this process has no busy threads
+    document_parser = get_document_parser().warm_up()
+
+    # Initialize the bounded, per-provider executors for blocking SDK calls
+    provider_executor = get_provider_executor()
+
+    # Initialize per-provider admission control (concurrency limits + bounded priority queues)
+    admission = get_admission_controller()
+
+    # Initialize the response cache for the deterministic generation endpoints
+    response_cache = get_response_cache()
+
     # Initialize Storage Manager
     storage_manager = SimpleInMemoryStorage()
     logger.info("✅ In-memory storage manager initialized successfully.")
 
-    # Initialize Tutor Sessions Dictionary
-    tutor_sessions: Dict[str, AsyncRAGTutor] = {}
+    # Initialize the shared, pre-warmed Tutor Engine (LLM, embeddings, Qdrant client, chains, graph)
+    tutor_engine = TutorEngine.for_config(RAGTutorConfig.from_env()).warm_up()
+    logger.info("✅ Tutor engine initialized and warmed up.")
+
+    # Initialize the Session Store that lets any worker rebuild any session (SQLite or Redis)
+    session_store = create_session_store()
+
+    # Initialize the bounded Tutor Session Pool (LRU + idle TTL eviction)
+    async def _create_tutor_session(session_id: str) -> AsyncRAGTutor:
+        tutor_config = RAGTutorConfig.from_env()
+        tutor = AsyncRAGTutor(
+            storage_manager=storage_manager,
+            config=tutor_config,
+            engine=tutor_engine,
+            session_id=session_id,
+            session_store=session_store
+        )
+        await tutor.restore_or_register_async()
+        return tutor
+
+    async def _release_tutor_session(session_id: str, tutor: AsyncRAGTutor, reason: str):
+        # Other workers may still be serving this session, so its collection and record
+        # are only dropped once the session has been idle everywhere.
+        drop_collection = False
+        idle_ttl = tutor_sessions.config.idle_ttl_seconds
+        if reason in ("idle", "lru") and idle_ttl > 0:
+            record = await session_store.get(session_id)
+            idle_for = time.time() - record.last_active if record else float("inf")
+            drop_collection = idle_for > idle_ttl
+        await tutor.close_async(drop_collection=drop_collection)
+        if drop_collection:
+            await session_store.delete(session_id)
+
+    tutor_sessions = TutorSessionPool(
+        factory=_create_tutor_session,
+        config=SessionPoolConfig.from_env(),
+        on_evict=_release_tutor_session
+    )
+    logger.info(f"✅ Tutor session pool initialized (max_size={tutor_sessions.config.max_size}, idle_ttl={tutor_sessions.config.idle_ttl_seconds}s).")
 
     # Initialize other components
     slide_generator = SlideSpeakGenerator()
@@ -124,6 +182,17 @@ except Exception as e:
     logger.error(f"❌ Error initializing global components: {e}", exc_info=True)
     raise
 
+@app.on_event("startup")
+async def start_background_tasks():
+    tutor_sessions.start_reaper()
+
+@app.on_event("shutdown")
+async def release_tutor_sessions():
+    await tutor_sessions.close()
+    await session_store.close()
+    provider_executor.shutdown()
+    document_parser.shutdown()
+
 # ==============================
 # 1. HEALTH CHECK ENDPOINT
 # ==============================
@@ -136,6 +205,54 @@ async def health_check():
         "timestamp": "2024-01-01T00:00:00Z"
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Runtime metrics used to size the service under load."""
+    return {
+        "tutor_sessions": tutor_sessions.stats(),
+        "provider_executors": provider_executor.stats(),
+        "admission": admission.stats(),
+        "response_cache": response_cache.stats(),
+        "embedding_cache": tutor_engine.embedding_cache.stats() if tutor_engine.embedding_cache else None,
+        "document_parser": document_parser.stats(),
+        "image_ingestion": tutor_engine.image_describer.stats(),
+        "retrieval_cache": get_retrieval_cache_metrics().as_dict(),
+        "speculative_retrieval": get_speculative_retrieval_metrics().as_dict()
+    }
+
+async def admit(endpoint: str, *providers: str) -> AdmissionLease:
+    """
+    Acquires slots on the providers an endpoint calls, at the endpoint's priority.
+    Fails fast with a 429 and a Retry-After header when a provider's queue is full.
+    """
+    try:
+        return await admission.acquire(providers, admission.priority_for(endpoint))
+    except AdmissionRejected as e:
+        logger.warning(f"Rejecting {endpoint}: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+# The model behind each cached endpoint. It is part of the cache key, so switching
+# models never serves output generated by the previous one.
+RESPONSE_CACHE_MODELS = {
+    "/assessment_endpoint": "gemini-1.5-pro-latest",
+    "/teaching_content_endpoint": "gpt-4o",
+    "/presentation_endpoint": "slidespeak",
+    "/web_search_endpoint": "sonar",
+}
+
+async def cached_response(endpoint: str, schema: BaseModel, compute):
+    """
+    Serves a generation endpoint from the response cache. `compute` only runs on a
+    miss, or when the request sets force_refresh; failures are never cached.
+    """
+    return await response_cache.get_or_compute(
+        endpoint,
+        schema.model_dump(),
+        RESPONSE_CACHE_MODELS[endpoint],
+        compute,
+        force_refresh=getattr(schema, "force_refresh", False)
+    )
+
 # ==============================
 # 2. VOICE FUNCTIONALITY ENDPOINTS
 # ==============================
@@ -161,7 +278,8 @@ async def voice_transcription_endpoint(audio_file: UploadFile = File(...)):
         audio_io = io.BytesIO(audio_bytes)
         audio_io.name = audio_file.filename
         
-        transcription = await run_in_threadpool(transcribe_audio, audio_io)
+        async with await admit("/voice_transcription_endpoint", "openai"):
+            transcription = await provider_executor.run("openai", transcribe_audio, audio_io)
         
         try:
             os.remove(temp_audio_path)
@@ -228,6 +346,8 @@ async def voice_chat_endpoint(schema: VoiceChatSchema):
     """
     Real-time voice chat using the actual voice functionality.
     """
+    lease = await admit("/voice_chat_endpoint", "openai")
+
     async def event_stream():
         import json
         from AI_voice_functionality import get_comprehensive_answer_stream
@@ -238,8 +358,9 @@ async def voice_chat_endpoint(schema: VoiceChatSchema):
         try:
             full_response = ""
             
-            # Use the real voice functionality for streaming responses
-            for chunk in get_comprehensive_answer_stream(schema.text):
+            # Use the real voice functionality for streaming responses.
+            # The stream is synchronous, so it is consumed on the OpenAI provider pool.
+            async for chunk in provider_executor.iterate("openai", lambda: get_comprehensive_answer_stream(schema.text)):
                 if not chunk:
                     continue
                 full_response += chunk
@@ -254,6 +375,8 @@ async def voice_chat_endpoint(schema: VoiceChatSchema):
             logger.error(f"Error in real-time voice chat: {e}", exc_info=True)
             async for part in send({"type": "error", "message": str(e)}):
                 yield part
+        finally:
+            lease.release()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -261,7 +384,8 @@ async def voice_chat_endpoint(schema: VoiceChatSchema):
         "Content-Type": "text/event-stream",
         "X-Accel-Buffering": "no",
     }
-    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream")
+    # The background task also releases the slot if the client disconnects before streaming starts.
+    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream", background=BackgroundTask(lease.release))
 
 # Add WebSocket support for real-time voice with proper user control
 from fastapi import WebSocket, WebSocketDisconnect
@@ -330,6 +454,20 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                     "message": "Processing speech..."
                 })
                 
+                try:
+                    lease = await admission.acquire(["openai"], admission.priority_for("/ws/voice"))
+                except AdmissionRejected as e:
+                    logger.warning(f"Rejecting voice utterance: {e}")
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": str(e),
+                        "retry_after": e.retry_after
+                    })
+                    audio_buffer = []
+                    is_processing = False
+                    is_listening = True
+                    continue
+
                 try:
                     # Convert buffer to audio file format for OpenAI Whisper
                     audio_data = np.array(audio_buffer, dtype=np.float32)
@@ -360,9 +498,7 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                     # Open the file for transcription
                     with open(temp_file.name, 'rb') as audio_file:
                         # Transcribe the audio using OpenAI Whisper
-                        transcription = await asyncio.get_event_loop().run_in_executor(
-                            None, transcribe_audio, audio_file
-                        )
+                        transcription = await provider_executor.run("openai", transcribe_audio, audio_file)
                     
                     # Clean up temporary file
                     try:
@@ -380,10 +516,9 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                         })
                         
                         # Generate AI response
-                        response_stream = get_comprehensive_answer_stream(transcription)
                         full_response = ""
                         
-                        for chunk in response_stream:
+                        async for chunk in provider_executor.iterate("openai", lambda: get_comprehensive_answer_stream(transcription)):
                             if chunk:
                                 full_response += chunk
                                 await websocket.send_json({
@@ -394,9 +529,7 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                         # Generate TTS audio using OpenAI TTS
                         try:
                             logger.info(f"Generating TTS for response: {full_response[:100]}...")
-                            audio_data = await asyncio.get_event_loop().run_in_executor(
-                                None, text_to_speech, full_response
-                            )
+                            audio_data = await provider_executor.run("openai", text_to_speech, full_response)
                             
                             if audio_data:
                                 logger.info(f"TTS generated successfully, audio size: {len(audio_data)} bytes")
@@ -442,6 +575,7 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                     })
                 
                 finally:
+                    lease.release()
                     is_processing = False
                     is_listening = True
                     user_activated = False  # Reset user activation
@@ -477,20 +611,25 @@ async def chatbot_endpoint(request: ChatbotRequest):
     """
     session_id = request.session_id
     
-    # Get or create a tutor instance for the session
-    if session_id not in tutor_sessions:
-        logger.info(f"Creating new AI Tutor session: {session_id}")
-        tutor_config = RAGTutorConfig.from_env()
-        tutor_sessions[session_id] = AsyncRAGTutor(storage_manager=storage_manager, config=tutor_config)
-    
-    tutor = tutor_sessions[session_id]
+    # Get or create a tutor instance for the session, pinned in the pool until the answer is streamed
+    session_lease = await tutor_sessions.acquire(session_id)
+    tutor = session_lease.session
+    try:
+        # Dynamically update web search status and pick up changes made by other workers
+        await tutor.sync_state_async(web_search_enabled=request.web_search_enabled)
 
-    # Dynamically update web search status for the tutor
-    tutor.update_web_search_status(request.web_search_enabled)
+        # --- Query Processing Logic ---
+        if not request.query:
+            raise HTTPException(status_code=400, detail="A 'query' is required.")
 
-    # --- Query Processing Logic ---
-    if not request.query:
-        raise HTTPException(status_code=400, detail="A 'query' is required.")
+        lease = await admit("/chatbot_endpoint", "openai")
+    except BaseException:
+        session_lease.release()
+        raise
+
+    def finish():
+        lease.release()
+        session_lease.release()
 
     is_kb_ready = tutor.ensemble_retriever is not None
     response_generator = tutor.run_agent_async(
@@ -515,6 +654,8 @@ async def chatbot_endpoint(request: ChatbotRequest):
             logger.error(f"Error in chatbot stream: {e}", exc_info=True)
             async for part in send({"type": "error", "message": str(e)}):
                 yield part
+        finally:
+            finish()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -522,7 +663,62 @@ async def chatbot_endpoint(request: ChatbotRequest):
         "Content-Type": "text/event-stream",
         "X-Accel-Buffering": "no",
     }
-    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream")
+    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream", background=BackgroundTask(finish))
+
+@app.post("/chatbot_upload_endpoint")
+async def chatbot_upload_endpoint(session_id: str = Form(...), files: List[UploadFile] = File(...)):
+    """
+    Adds uploaded files to a session's knowledge base, streaming ingestion progress as
+    SSE events (pages parsed, chunks indexed). The session can be queried as soon as an
+    event reports "searchable": true, while the rest of the upload is still processed.
+    """
+    # Pinned in the pool until ingestion finishes, so the session is not evicted mid-upload.
+    session_lease = await tutor_sessions.acquire(session_id)
+    tutor = session_lease.session
+    # Admit before saving anything, so a 429 leaves no temporary files behind.
+    try:
+        lease = await admit("/chatbot_upload_endpoint", "openai")
+    except BaseException:
+        session_lease.release()
+        raise
+    storage_keys = []
+
+    def finish():
+        # Runs after the stream ends or the client disconnects, even before the first event.
+        lease.release()
+        session_lease.release()
+        for key in storage_keys:
+            try:
+                os.remove(key)
+            except OSError:
+                pass
+
+    try:
+        for file in files:
+            storage_keys.append(await storage_manager.save_file_async(file))
+    except BaseException:
+        finish()
+        raise
+
+    async def event_stream():
+        import json
+        try:
+            async for event in tutor.ingest_stream_async(storage_keys):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.error(f"Error in upload stream: {e}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        finally:
+            lease.release()
+            session_lease.release()
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "Content-Type": "text/event-stream",
+        "X-Accel-Buffering": "no",
+    }
+    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream", background=BackgroundTask(finish))
 
 # ==============================
 # 4. ASSESSMENT ENDPOINT
@@ -543,6 +739,7 @@ class AssessmentSchema(BaseModel):
     anxiety_triggers: Optional[str] = Field("", description="Anxiety considerations to account for.")
     user_prompt: Optional[str] = Field("None.", description="Optional specific instructions for the AI.", example="Focus on the strategic importance of each battle.")
     language: Optional[str] = Field("English", description="The language to generate the assessment in (e.g., English, Arabic)")
+    force_refresh: bool = Field(False, description="Bypass the response cache and generate a fresh result.")
 
 @app.post("/assessment_endpoint", response_model=Dict[str, Any])
 async def assessment_endpoint(schema: AssessmentSchema):
@@ -553,7 +750,7 @@ async def assessment_endpoint(schema: AssessmentSchema):
     """
     try:
         # Convert the schema to dict for processing
-        schema_dict = schema.model_dump()
+        schema_dict = schema.model_dump(exclude={"force_refresh"})
         
         # Validate and process mixed question types
         if schema.assessment_type == "Mixed" and schema.question_types and schema.question_distribution:
@@ -570,8 +767,12 @@ async def assessment_endpoint(schema: AssessmentSchema):
         else:
             logger.info(f"Generating {schema.assessment_type} assessment for topic: {schema.topic}")
         
-        generated_content = await generate_test_questions_async(assessment_chain, schema_dict)
-        return {"assessment": generated_content}
+        async def _generate():
+            async with await admit("/assessment_endpoint", "gemini"):
+                generated_content = await generate_test_questions_async(assessment_chain, schema_dict)
+            return {"assessment": generated_content}
+
+        return await cached_response("/assessment_endpoint", schema, _generate)
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -625,6 +826,7 @@ class TeachingContentSchema(BaseModel):
         "English",
         description="The language for the content (e.g., English, Arabic)."
     )
+    force_refresh: bool = Field(False, description="Bypass the response cache and generate a fresh result.")
 
 @app.post("/teaching_content_endpoint", response_model=Dict[str, Any])
 async def teaching_content_endpoint(schema: TeachingContentSchema):
@@ -633,12 +835,14 @@ async def teaching_content_endpoint(schema: TeachingContentSchema):
     This can create lesson plans, worksheets, presentations, or quizzes,
     optionally enhanced with real-time web search results.
     """
-    try:
-        # Use model_dump() for Pydantic v2+ to avoid deprecation warnings
-        config = schema.model_dump()
+    providers = ["openai", "perplexity"] if schema.web_search_enabled else ["openai"]
+    # Use model_dump() for Pydantic v2+ to avoid deprecation warnings
+    config = schema.model_dump(exclude={"force_refresh"})
+
+    async def _generate():
         logger.info(f"Generating teaching content: {config['content_type']} on {config['lesson_topic']}")
-        
-        generated_content = await generate_teaching_content(config)
+        async with await admit("/teaching_content_endpoint", *providers):
+            generated_content = await generate_teaching_content(config)
         
         # Add a check to ensure the generated content is valid before returning
         if not generated_content or not isinstance(generated_content, str):
@@ -648,6 +852,11 @@ async def teaching_content_endpoint(schema: TeachingContentSchema):
         logger.info(f"Successfully generated content of length {len(generated_content)}.")
         return {"generated_content": generated_content}
 
+    try:
+        return await cached_response("/teaching_content_endpoint", schema, _generate)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in teaching content endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {e}")
@@ -663,6 +872,7 @@ class PresentationSchema(BaseModel):
     language: str = Field("ENGLISH", description="The language of the presentation.", example="ENGLISH", pattern="^(ENGLISH|ARABIC)$")
     fetch_images: bool = Field(True, description="Whether to include stock images in the presentation.")
     verbosity: str = Field("standard", description="The desired text verbosity.", example="standard", pattern="^(concise|standard|text-heavy)$")
+    force_refresh: bool = Field(False, description="Bypass the response cache and generate a fresh result.")
 
 @app.post("/presentation_endpoint", response_model=Dict[str, Any])
 async def presentation_endpoint(schema: PresentationSchema):
@@ -670,7 +880,7 @@ async def presentation_endpoint(schema: PresentationSchema):
     Generates a SlideSpeak presentation based on the provided specifications.
     Returns the complete task result including the presentation URL.
     """
-    try:
+    async def _generate():
         # Instantiate the generator. It will automatically use the API key from the environment.
         try:
             generator = SlideSpeakGenerator()
@@ -681,16 +891,18 @@ async def presentation_endpoint(schema: PresentationSchema):
         logger.info(f"Generating presentation for topic: {schema.plain_text}")
         
         # The generate_presentation method in SlideSpeakGenerator is synchronous (uses requests and time.sleep).
-        # To avoid blocking the server's event loop, we run it in a separate thread pool.
-        result = await run_in_threadpool(
-            generator.generate_presentation,
-            plain_text=schema.plain_text,
-            custom_user_instructions=schema.custom_user_instructions,
-            length=schema.length,
-            language=schema.language,
-            fetch_images=schema.fetch_images,
-            verbosity=schema.verbosity
-        )
+        # To avoid blocking the server's event loop, we run it on the SlideSpeak provider pool.
+        async with await admit("/presentation_endpoint", "slidespeak"):
+            result = await provider_executor.run(
+                "slidespeak",
+                generator.generate_presentation,
+                plain_text=schema.plain_text,
+                custom_user_instructions=schema.custom_user_instructions,
+                length=schema.length,
+                language=schema.language,
+                fetch_images=schema.fetch_images,
+                verbosity=schema.verbosity
+            )
         
         # Check if the result contains an error key from the generator class
         if "error" in result:
@@ -708,7 +920,10 @@ async def presentation_endpoint(schema: PresentationSchema):
         else:
             logger.error(f"Unexpected task status: {result.get('task_status')}")
             raise HTTPException(status_code=500, detail="Presentation generation returned unexpected status")
-        
+
+    try:
+        return await cached_response("/presentation_endpoint", schema, _generate)
+
     except HTTPException:
         # Re-raise HTTP exceptions to be handled by FastAPI
         raise
@@ -733,7 +948,8 @@ async def image_generation_endpoint(schema: ImageGenSchema):
     try:
         generator = ImageGenerator()
         schema_dict = schema.model_dump()
-        image_b64 = generator.generate_image_from_schema(schema_dict)
+        async with await admit("/image_generation_endpoint", "openai"):
+            image_b64 = await provider_executor.run("openai", generator.generate_image_from_schema, schema_dict)
         if not image_b64:
             raise HTTPException(status_code=500, detail="Image generation failed.")
         data_url = f"data:image/png;base64,{image_b64}"
@@ -755,24 +971,27 @@ class WebSearchSchema(BaseModel):
     language: str = Field("English", description="Language")
     comprehension: str = Field("intermediate", description="Comprehension level")
     max_results: int = Field(5, description="Maximum number of results")
+    force_refresh: bool = Field(False, description="Bypass the response cache and generate a fresh result.")
 
 @app.post("/web_search_endpoint", response_model=Dict[str, Any])
 async def web_search_endpoint(schema: WebSearchSchema):
     if not pplx_chat:
         raise HTTPException(status_code=500, detail="Perplexity client not configured. Check PPLX_API_KEY.")
 
-    try:
-        data = schema.model_dump()
-        query = (
-            f"Show me up to {data['max_results']} {data['content_type']} about '{data['topic']}' "
-            f"for a grade {data['grade_level']} {data['subject']} class. "
-            f"The content should be in {data['language']} with a {data['comprehension']} comprehension level. "
-            "Include links in the response with detailed lengthy response content. "
-            "Include the source of the content in the response."
-        )
+    data = schema.model_dump(exclude={"force_refresh"})
+    query = (
+        f"Show me up to {data['max_results']} {data['content_type']} about '{data['topic']}' "
+        f"for a grade {data['grade_level']} {data['subject']} class. "
+        f"The content should be in {data['language']} with a {data['comprehension']} comprehension level. "
+        "Include links in the response with detailed lengthy response content. "
+        "Include the source of the content in the response."
+    )
+
+    async def _generate():
         full_response = ""
-        for chunk in pplx_chat.stream(query):
-            full_response += chunk.content or ""
+        async with await admit("/web_search_endpoint", "perplexity"):
+            async for chunk in pplx_chat.astream(query):
+                full_response += chunk.content or ""
 
         if not full_response.strip():
             raise HTTPException(status_code=500, detail="Web search returned empty response.")
@@ -781,6 +1000,9 @@ async def web_search_endpoint(schema: WebSearchSchema):
             "query": query,
             "content": full_response
         }
+
+    try:
+        return await cached_response("/web_search_endpoint", schema, _generate)
     except HTTPException:
         raise
     except Exception as e:
@@ -811,6 +1033,8 @@ def _parse_panel_prompts(story_text: str):
 
 @app.post("/comics_stream_endpoint")
 async def comics_stream_endpoint(schema: ComicsSchema):
+    lease = await admit("/comics_stream_endpoint", "openai")
+
     async def event_stream():
         import json
         async def send(obj: dict):
@@ -819,7 +1043,8 @@ async def comics_stream_endpoint(schema: ComicsSchema):
 
         try:
             # 1) Generate story/panel prompts
-            story_prompts = await run_in_threadpool(
+            story_prompts = await provider_executor.run(
+                "openai",
                 create_comical_story_prompt,
                 schema.instructions,
                 schema.grade_level,
@@ -848,8 +1073,8 @@ async def comics_stream_endpoint(schema: ComicsSchema):
                 async for chunk in send({"type": "panel_prompt", "index": panel_index, "prompt": prompt}):
                     yield chunk
 
-                # Generate panel image synchronously via threadpool to avoid blocking
-                image_url = await run_in_threadpool(generate_comic_image, prompt, panel_index)
+                # Generate panel image on the OpenAI provider pool to avoid blocking
+                image_url = await provider_executor.run("openai", generate_comic_image, prompt, panel_index)
                 async for chunk in send({
                     "type": "panel_image",
                     "index": panel_index,
@@ -865,6 +1090,8 @@ async def comics_stream_endpoint(schema: ComicsSchema):
             logger.error(f"Error in comics stream: {e}", exc_info=True)
             async for chunk in send({"type": "error", "message": str(e)}):
                 yield chunk
+        finally:
+            lease.release()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -872,7 +1099,7 @@ async def comics_stream_endpoint(schema: ComicsSchema):
         "Content-Type": "text/event-stream",
         "X-Accel-Buffering": "no",  # for some proxies
     }
-    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream")
+    return StreamingResponse(event_stream(), headers=headers, media_type="text/event-stream", background=BackgroundTask(lease.release))
 
 # Add this new endpoint for TTS generation
 class VoiceResponseSchema(BaseModel):
@@ -890,7 +1117,8 @@ async def voice_response_endpoint(schema: VoiceResponseSchema):
         from AI_voice_functionality import text_to_speech
         
         # Generate speech
-        audio_data = await run_in_threadpool(text_to_speech, schema.text)
+        async with await admit("/voice_response_endpoint", "openai"):
+            audio_data = await provider_executor.run("openai", text_to_speech, schema.text)
         
         if audio_data:
             # Convert to hex string for JSON response
@@ -0,0 +1,303 @@
+import os
+import gzip
+import json
+import uuid
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from pydantic import ConfigDict
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+from rag_toolkit.tokenizers import get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+_NO_COLUMNS = np.zeros(0, dtype=np.int32)
+_NO_COUNTS = np.zeros(0, dtype=np.float32)
+
+
+class BM25Index:
+    """
+    An incremental Okapi BM25 index over document chunks, scored with SciPy sparse matrices.
+
+    Term counts live in a CSR matrix with one row per chunk and one column per term.
+    Added chunks are buffered and appended on the next search; removed chunks have their
+    row zeroed and are compacted away once more than `compact_ratio` of rows are dead.
+    The BM25 weight of every (chunk, term) pair is materialized lazily as a CSC matrix,
+    so scoring a query is a column slice and one sparse mat-vec over the whole corpus.
+
+    Documents are added and removed individually or by their `source` metadata. Term
+    counts are persisted with the documents, so reloading an index built with the same
+    tokenizer does not re-tokenize any text. All public methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        tokenizer: Optional[Callable[[str], List[str]]] = None,
+        compact_ratio: float = 0.25,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.compact_ratio = compact_ratio
+        self._vocabulary: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._counts: Optional[sparse.csr_matrix] = None
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Row-aligned; None marks a removed row until the next compaction.
+        self._row_ids: List[Optional[str]] = []
+        self._documents: List[Optional[Document]] = []
+        self._rows: Dict[str, int] = {}
+        self._by_source: Dict[str, Set[str]] = {}
+        self._dead_rows = 0
+        self._weights: Optional[sparse.csc_matrix] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def tokenizer_name(self) -> str:
+        return getattr(self.tokenizer, "name", "custom")
+
+    @property
+    def sources(self) -> List[str]:
+        return sorted(self._by_source)
+
+    def get_documents(self, doc_ids: Iterable[str]) -> List[Optional[Document]]:
+        """The documents indexed under `doc_ids`, with None for ids that are not indexed."""
+        with self._lock:
+            return [self._documents[self._rows[doc_id]] if doc_id in self._rows else None for doc_id in doc_ids]
+
+    def documents(self) -> List[Document]:
+        """Every indexed document, in insertion order."""
+        with self._lock:
+            return [doc for doc in self._documents if doc is not None]
+
+    @staticmethod
+    def document_id(document: Document) -> str:
+        chunk_id = document.metadata.get("chunk_id")
+        if chunk_id:
+            return str(chunk_id)
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document.metadata.get('source', '')}|{document.page_content}"))
+
+    def add_documents(self, documents: Iterable[Document]) -> List[str]:
+        """Indexes documents, replacing any already indexed under the same id."""
+        prepared = [(self.document_id(doc), doc, Counter(self.tokenizer(doc.page_content))) for doc in documents]
+        with self._lock:
+            for doc_id, document, term_counts in prepared:
+                self._insert(doc_id, document, term_counts)
+        return [doc_id for doc_id, _, _ in prepared]
+
+    def _column(self, term: str) -> int:
+        column = self._vocabulary.get(term)
+        if column is None:
+            column = self._vocabulary[term] = len(self._terms)
+            self._terms.append(term)
+        return column
+
+    def _insert(self, doc_id: str, document: Document, term_counts: Dict[str, int]):
+        if doc_id in self._rows:
+            self._delete(doc_id)
+        columns = np.array([self._column(term) for term in term_counts], dtype=np.int32)
+        counts = np.array(list(term_counts.values()), dtype=np.float32)
+        self._pending.append((columns, counts))
+        self._rows[doc_id] = len(self._row_ids)
+        self._row_ids.append(doc_id)
+        self._documents.append(document)
+        self._by_source.setdefault(str(document.metadata.get("source", "")), set()).add(doc_id)
+        self._weights = None
+
+    def _delete(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        document = self._documents[row]
+        self._row_ids[row] = None
+        self._documents[row] = None
+        base_rows = self._counts.shape[0] if self._counts is not None else 0
+        if row < base_rows:
+            self._counts.data[self._counts.indptr[row]:self._counts.indptr[row + 1]] = 0
+        else:
+            self._pending[row - base_rows] = (_NO_COLUMNS, _NO_COUNTS)
+        self._dead_rows += 1
+        source = str(document.metadata.get("source", ""))
+        ids = self._by_source.get(source)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del self._by_source[source]
+        self._weights = None
+        return True
+
+    def remove_ids(self, doc_ids: Iterable[str]) -> int:
+        with self._lock:
+            return sum(1 for doc_id in list(doc_ids) if self._delete(doc_id))
+
+    def remove_source(self, source: str) -> int:
+        """Removes every chunk that came from `source`; returns how many were removed."""
+        with self._lock:
+            return sum(1 for doc_id in list(self._by_source.get(source, ())) if self._delete(doc_id))
+
+    def clear(self):
+        with self._lock:
+            self._vocabulary.clear()
+            self._terms.clear()
+            self._counts = None
+            self._pending.clear()
+            self._row_ids.clear()
+            self._documents.clear()
+            self._rows.clear()
+            self._by_source.clear()
+            self._dead_rows = 0
+            self._weights = None
+
+    def _merge_pending(self):
+        vocabulary_size = len(self._terms)
+        if self._pending:
+            indptr = np.zeros(len(self._pending) + 1, dtype=np.int64)
+            np.cumsum([len(columns) for columns, _ in self._pending], out=indptr[1:])
+            appended = sparse.csr_matrix(
+                (
+                    np.concatenate([counts for _, counts in self._pending]),
+                    np.concatenate([columns for columns, _ in self._pending]),
+                    indptr,
+                ),
+                shape=(len(self._pending), vocabulary_size),
+            )
+            self._pending = []
+            if self._counts is None:
+                self._counts = appended
+            else:
+                self._counts.resize((self._counts.shape[0], vocabulary_size))
+                self._counts = sparse.vstack([self._counts, appended], format="csr")
+        elif self._counts is not None and self._counts.shape[1] != vocabulary_size:
+            self._counts.resize((self._counts.shape[0], vocabulary_size))
+
+        if self._counts is not None and self._dead_rows > self.compact_ratio * len(self._row_ids):
+            self._compact()
+
+    def _compact(self):
+        live = np.fromiter((doc_id is not None for doc_id in self._row_ids), dtype=bool, count=len(self._row_ids))
+        self._counts = self._counts[live]
+        self._counts.eliminate_zeros()
+        self._row_ids = [doc_id for doc_id in self._row_ids if doc_id is not None]
+        self._documents = [doc for doc in self._documents if doc is not None]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._row_ids)}
+        self._dead_rows = 0
+
+    def _ensure_weights(self) -> Optional[sparse.csc_matrix]:
+        """Returns the BM25 weight matrix for the current corpus, rebuilding it if stale."""
+        if self._weights is not None:
+            return self._weights
+        self._merge_pending()
+        if self._counts is None or not self._rows:
+            return None
+        counts = self._counts
+        total_docs = len(self._rows)
+        lengths = np.asarray(counts.sum(axis=1)).ravel()
+        avg_length = lengths.sum() / total_docs or 1.0
+        doc_freq = np.bincount(counts.indices, weights=counts.data > 0, minlength=counts.shape[1])
+        idf = np.log1p((total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        norms = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        tf = counts.data
+        row_of_entry = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        data = (idf[counts.indices] * tf * (self.k1 + 1) / (tf + norms[row_of_entry])).astype(np.float32)
+        self._weights = sparse.csr_matrix((data, counts.indices, counts.indptr), shape=counts.shape).tocsc()
+        return self._weights
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """Returns the top-k documents for `query` with their BM25 scores."""
+        terms = Counter(self.tokenizer(query))
+        with self._lock:
+            columns = [self._vocabulary[term] for term in terms if term in self._vocabulary]
+            if not columns or k <= 0:
+                return []
+            weights = self._ensure_weights()
+            if weights is None:
+                return []
+            query_counts = np.array([terms[self._terms[column]] for column in columns], dtype=np.float32)
+            scores = weights[:, columns] @ query_counts
+            candidates = np.flatnonzero(scores > 0)
+            if candidates.size > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._documents[row], float(scores[row])) for row in ranked]
+
+    def _row_terms(self, row: int) -> Dict[str, int]:
+        base_rows = self._counts.shape[0] if self._counts is not None else 0
+        if row < base_rows:
+            start, end = self._counts.indptr[row], self._counts.indptr[row + 1]
+            columns, counts = self._counts.indices[start:end], self._counts.data[start:end]
+        else:
+            columns, counts = self._pending[row - base_rows]
+        return {self._terms[column]: int(count) for column, count in zip(columns, counts) if count > 0}
+
+    def save(self, path: str):
+        """Writes the index to a gzipped JSON file, atomically."""
+        with self._lock:
+            payload = {
+                "version": INDEX_FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "tokenizer": self.tokenizer_name,
+                "documents": [
+                    {
+                        "id": doc_id,
+                        "text": self._documents[row].page_content,
+                        "metadata": self._documents[row].metadata,
+                        "terms": self._row_terms(row),
+                    }
+                    for row, doc_id in enumerate(self._row_ids)
+                    if doc_id is not None
+                ],
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, tokenizer: Optional[Callable[[str], List[str]]] = None) -> 'BM25Index':
+        """
+        Reads an index written by save(). Stored term counts are reused when they came from
+        the same tokenizer; otherwise the stored texts are re-tokenized.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {payload.get('version')}")
+        index = cls(k1=payload["k1"], b=payload["b"], tokenizer=tokenizer)
+        documents = [Document(page_content=item["text"], metadata=item["metadata"]) for item in payload["documents"]]
+        # Indexes saved before tokenizers were configurable used the simple tokenizer.
+        if payload.get("tokenizer", "simple") != index.tokenizer_name:
+            logger.info(f"Re-tokenizing BM25 index {path} with the '{index.tokenizer_name}' tokenizer.")
+            index.add_documents(documents)
+            return index
+        for item, document in zip(payload["documents"], documents):
+            index._insert(item["id"], document, item["terms"])
+        return index
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """LangChain retriever over a (shared, mutable) BM25Index."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: BM25Index
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [document for document, _ in self.index.search(query, self.k)]
@@ -0,0 +1,105 @@
+import math
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# Namespace for deterministic chunk ids; re-ingesting the same file yields the same ids,
+# so the vector store upserts instead of storing duplicates.
+CHUNK_ID_NAMESPACE = uuid.UUID("8b7c8d2e-5f0a-4d55-9c5e-2f1f0b6a7e11")
+
+# Roughly four characters per token for English text with OpenAI's tokenizers.
+APPROX_CHARS_PER_TOKEN = 4
+
+
+def approximate_token_count(text: str) -> int:
+    """Cheap token estimate used when no tokenizer is available."""
+    return math.ceil(len(text) / APPROX_CHARS_PER_TOKEN)
+
+
+def load_token_counter(encoding_name: str) -> Callable[[str], int]:
+    """
+    Returns a function counting tokens with the given tiktoken encoding, falling back
+    to an estimate when tiktoken (or its encoding file) is unavailable.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizer '{encoding_name}' unavailable ({e}); chunk sizes will be estimated.")
+        return approximate_token_count
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def make_chunk_id(source: str, page: Optional[int], start_index: int, content: str) -> str:
+    """Deterministic, Qdrant-compatible (UUID) id for a chunk."""
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}|{page}|{start_index}|{digest}"))
+
+
+class DocumentChunker:
+    """
+    Splits loaded documents (PDF pages, whole DOCX/TXT files, image descriptions) into
+    token-sized chunks before they are embedded and indexed.
+
+    Every chunk keeps its parent's metadata and gains:
+      - chunk_id: deterministic UUID, also used as the vector store point id
+      - chunk_index / chunk_count: position of the chunk within its parent document
+      - start_index / end_index: character offsets within the parent document
+      - token_count: size of the chunk in tokens
+    PDF loaders already provide a `page` field, which is preserved.
+    """
+
+    def __init__(self, chunk_size_tokens: int = 512, chunk_overlap_tokens: int = 64, encoding_name: str = "cl100k_base"):
+        if chunk_overlap_tokens >= chunk_size_tokens:
+            raise ValueError("chunk_overlap_tokens must be smaller than chunk_size_tokens.")
+        self.chunk_size_tokens = chunk_size_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.count_tokens = load_token_counter(encoding_name)
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size_tokens,
+            chunk_overlap=chunk_overlap_tokens,
+            length_function=self.count_tokens,
+            add_start_index=True,
+        )
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Splits documents into chunks; CPU-bound, so call asplit_documents from async code."""
+        chunks: List[Document] = []
+        for document in documents:
+            if not document.page_content or not document.page_content.strip():
+                continue
+            pieces = self.splitter.split_documents([document])
+            source = str(document.metadata.get("source", ""))
+            page = document.metadata.get("page")
+            for index, piece in enumerate(pieces):
+                start_index = piece.metadata.get("start_index", -1)
+                piece.metadata.update({
+                    "chunk_id": make_chunk_id(source, page, start_index, piece.page_content),
+                    "chunk_index": index,
+                    "chunk_count": len(pieces),
+                    "end_index": start_index + len(piece.page_content) if start_index >= 0 else -1,
+                    "token_count": self.count_tokens(piece.page_content),
+                })
+                chunks.append(piece)
+        return chunks
+
+    async def asplit_documents(self, documents: List[Document]) -> List[Document]:
+        """Splits documents on a worker thread so large uploads do not stall the event loop."""
+        return await asyncio.to_thread(self.split_documents, documents)
+
+    @staticmethod
+    def summarize(documents: List[Document]) -> Dict[str, int]:
+        """Token totals for logging; only meaningful for documents produced by this chunker."""
+        tokens = [doc.metadata.get("token_count", 0) for doc in documents]
+        return {
+            "chunks": len(documents),
+            "tokens": sum(tokens),
+            "max_chunk_tokens": max(tokens, default=0),
+        }
@@ -0,0 +1,350 @@
+import os
+import re
+import gzip
+import json
+import time
+import zlib
+import uuid
+import logging
+import threading
+from functools import lru_cache
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+DEDUP_FORMAT_VERSION = 1
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Shingle hashes are hashed again per permutation in blocks of this many, to bound memory.
+_SIGNATURE_BLOCK = 8192
+# Odd multipliers that make a word's position within a shingle matter.
+_SHINGLE_MIXERS = np.array([0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F, 0x165667B1, 0xD3A2646C | 1, 0xFD7046C5, 0xB55A4F09], dtype=np.uint32)
+# np.trapz was renamed np.trapezoid in NumPy 2.0 (and removed later).
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+@lru_cache(maxsize=200_000)
+def _word_hash(word: str) -> int:
+    return zlib.crc32(word.encode("utf-8"))
+
+
+def document_key(document: Document) -> str:
+    chunk_id = document.metadata.get("chunk_id")
+    if chunk_id:
+        return str(chunk_id)
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document.metadata.get('source', '')}|{document.page_content}"))
+
+
+def lsh_bands(threshold: float, num_perm: int, false_negative_weight: float = 0.95) -> Tuple[int, int]:
+    """
+    Picks (bands, rows) so that the LSH collision curve 1 - (1 - s^rows)^bands steps up
+    just below `threshold`. Every candidate is verified against its signature, so a
+    spurious candidate only costs a comparison and missed duplicates are weighted higher.
+    """
+    similarity = np.linspace(0.0, 1.0, 201)
+    below, above = similarity < threshold, similarity >= threshold
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collision = 1.0 - (1.0 - similarity ** rows) ** bands
+        error = (
+            (1 - false_negative_weight) * _trapezoid(collision[below], similarity[below])
+            + false_negative_weight * _trapezoid(1.0 - collision[above], similarity[above])
+        )
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+@dataclass
+class DedupStats:
+    chunks_seen: int = 0
+    duplicates_dropped: int = 0
+    promoted: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["seconds"] = round(self.seconds, 3)
+        data["chunks_per_second"] = round(self.chunks_seen / self.seconds, 1) if self.seconds else 0.0
+        return data
+
+
+@dataclass
+class DedupPlan:
+    """
+    What NearDuplicateIndex.match decided for one batch: the chunks to index, and the
+    signatures and merges that commit() records once they have been indexed.
+    """
+    kept: List[Document] = field(default_factory=list)
+    new: List[Tuple[str, Document, np.ndarray]] = field(default_factory=list)
+    duplicates: List[Tuple[str, Document]] = field(default_factory=list)
+    chunks_seen: int = 0
+
+
+class NearDuplicateIndex:
+    """
+    Drops near-duplicate chunks at ingestion time with MinHash signatures over word
+    shingles and LSH banding, so repeated headers, footers and re-uploaded versions of
+    the same worksheet are embedded and retrieved once.
+
+    A chunk is a duplicate when its estimated Jaccard similarity to an already kept
+    chunk (from this upload or an earlier one) is at least `threshold`. Dropped chunks
+    are remembered under the chunk that absorbed them, so merged_sources() can report
+    where else the text appears; if the kept chunk's source is removed, a duplicate
+    from a remaining source is promoted and returned for indexing instead of being lost.
+
+    match() only decides; commit() records the decision. Committing after the kept
+    chunks are indexed means a failed upsert leaves no signatures behind for chunks
+    that never made it into the knowledge base. All public methods are thread-safe.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        if not 1 <= shingle_size <= len(_SHINGLE_MIXERS):
+            raise ValueError(f"shingle_size must be between 1 and {len(_SHINGLE_MIXERS)}.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # Random affine maps x -> a * x + b (mod 2^32); odd `a` makes each one a permutation.
+        self._a = rng.integers(0, 2**32, size=num_perm, dtype=np.uint32) | np.uint32(1)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint32)
+        self._buckets: Dict[bytes, List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._sources: Dict[str, str] = {}
+        self._by_source: Dict[str, Set[str]] = {}
+        self._duplicates: Dict[str, List[Document]] = {}
+        self.stats = DedupStats()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        """Hashes of the text's word n-grams, combined from per-word hashes without building strings."""
+        words = _WORD.findall(text.lower())
+        hashes = np.fromiter((_word_hash(word) for word in words), dtype=np.uint32, count=len(words))
+        if len(hashes) <= self.shingle_size:
+            combined = np.bitwise_xor.reduce(hashes * _SHINGLE_MIXERS[:len(hashes)]) if len(hashes) else np.uint32(0)
+            return np.array([combined], dtype=np.uint32)
+        width = len(hashes) - self.shingle_size + 1
+        combined = np.zeros(width, dtype=np.uint32)
+        for offset in range(self.shingle_size):
+            combined ^= hashes[offset:offset + width] * _SHINGLE_MIXERS[offset]
+        return np.unique(combined)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """MinHash signatures (one row of `num_perm` uint32 values per text)."""
+        shingles = [self._shingles(text) for text in texts]
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(texts):
+            # Group texts into blocks of roughly _SIGNATURE_BLOCK shingles for one vectorized pass.
+            end, size = start, 0
+            while end < len(texts) and (end == start or size + len(shingles[end]) <= _SIGNATURE_BLOCK):
+                size += len(shingles[end])
+                end += 1
+            block = np.concatenate(shingles[start:end])
+            hashed = block[:, None] * self._a + self._b
+            offsets = np.cumsum([0] + [len(s) for s in shingles[start:end - 1]])
+            result[start:end] = np.minimum.reduceat(hashed, offsets, axis=0)
+            start = end
+        return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            band.to_bytes(2, "little") + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def _match(
+        self,
+        signature: np.ndarray,
+        buckets: Optional[Dict[bytes, List[str]]] = None,
+        signatures: Optional[Dict[str, np.ndarray]] = None
+    ) -> Optional[str]:
+        buckets = self._buckets if buckets is None else buckets
+        signatures = self._signatures if signatures is None else signatures
+        best, best_similarity = None, self.threshold
+        seen: Set[str] = set()
+        for key in self._band_keys(signature):
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = float(np.mean(signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+        return best
+
+    def _keep(self, doc_id: str, document: Document, signature: np.ndarray):
+        self._signatures[doc_id] = signature
+        source = str(document.metadata.get("source", ""))
+        self._sources[doc_id] = source
+        self._by_source.setdefault(source, set()).add(doc_id)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def _forget(self, doc_id: str):
+        signature = self._signatures.pop(doc_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+        source = self._sources.pop(doc_id)
+        ids = self._by_source.get(source)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del self._by_source[source]
+
+    def match(self, documents: List[Document]) -> DedupPlan:
+        """
+        Decides which chunks are worth indexing, against the committed chunks and the
+        earlier chunks of the same batch, without changing the index.
+        """
+        plan = DedupPlan(chunks_seen=len(documents))
+        if not documents:
+            return plan
+        start = time.perf_counter()
+        signatures = self.signatures([doc.page_content for doc in documents])
+        batch_buckets: Dict[bytes, List[str]] = {}
+        batch_signatures: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for document, signature in zip(documents, signatures):
+                doc_id = document_key(document)
+                if doc_id in self._signatures or doc_id in batch_signatures:
+                    # Re-indexing the same chunk (e.g. a replaced file) is not a duplicate.
+                    plan.kept.append(document)
+                    continue
+                match = self._match(signature) or self._match(signature, batch_buckets, batch_signatures)
+                if match is None:
+                    batch_signatures[doc_id] = signature
+                    for key in self._band_keys(signature):
+                        batch_buckets.setdefault(key, []).append(doc_id)
+                    plan.new.append((doc_id, document, signature))
+                    plan.kept.append(document)
+                else:
+                    plan.duplicates.append((match, document))
+            self.stats.seconds += time.perf_counter() - start
+        return plan
+
+    def commit(self, plan: DedupPlan):
+        """Records a plan from match() once its kept chunks have been indexed."""
+        with self._lock:
+            for doc_id, document, signature in plan.new:
+                if doc_id not in self._signatures:
+                    self._keep(doc_id, document, signature)
+            for kept_id, document in plan.duplicates:
+                self._duplicates.setdefault(kept_id, []).append(document)
+            self.stats.chunks_seen += plan.chunks_seen
+            self.stats.duplicates_dropped += len(plan.duplicates)
+
+    def deduplicate(self, documents: List[Document]) -> List[Document]:
+        """Returns the chunks worth indexing and remembers the near-duplicates it dropped."""
+        plan = self.match(documents)
+        self.commit(plan)
+        return plan.kept
+
+    def add_documents(self, documents: Iterable[Document]):
+        """Indexes already-stored chunks (e.g. when restoring a session) without deduplicating them."""
+        documents = list(documents)
+        signatures = self.signatures([doc.page_content for doc in documents])
+        with self._lock:
+            for document, signature in zip(documents, signatures):
+                doc_id = document_key(document)
+                if doc_id not in self._signatures:
+                    self._keep(doc_id, document, signature)
+
+    def remove_source(self, source: str) -> List[Document]:
+        """
+        Forgets a removed source. Returns the duplicates from other sources that were
+        absorbed by its chunks; they are now kept and must be indexed by the caller.
+        """
+        promoted: List[Document] = []
+        with self._lock:
+            for kept_id in list(self._duplicates):
+                survivors = [doc for doc in self._duplicates[kept_id] if str(doc.metadata.get("source", "")) != source]
+                if survivors:
+                    self._duplicates[kept_id] = survivors
+                else:
+                    del self._duplicates[kept_id]
+            for doc_id in list(self._by_source.get(source, ())):
+                signature = self._signatures[doc_id]
+                self._forget(doc_id)
+                survivors = self._duplicates.pop(doc_id, [])
+                if survivors:
+                    heir = survivors[0]
+                    heir_id = document_key(heir)
+                    self._keep(heir_id, heir, signature)
+                    if survivors[1:]:
+                        self._duplicates[heir_id] = survivors[1:]
+                    promoted.append(heir)
+            self.stats.promoted += len(promoted)
+        return promoted
+
+    def merged_sources(self, document: Document) -> List[str]:
+        """Other sources whose near-identical chunks were merged into this one."""
+        own = str(document.metadata.get("source", ""))
+        with self._lock:
+            duplicates = self._duplicates.get(document_key(document), ())
+            return sorted({str(doc.metadata.get("source", "")) for doc in duplicates} - {own})
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._signatures.clear()
+            self._sources.clear()
+            self._by_source.clear()
+            self._duplicates.clear()
+
+    def save(self, path: str):
+        """
+        Writes the dropped duplicates to a gzipped JSON file, atomically. Signatures are
+        not stored; load() recomputes them from the kept chunks.
+        """
+        with self._lock:
+            payload = {
+                "version": DEDUP_FORMAT_VERSION,
+                "threshold": self.threshold,
+                "num_perm": self.num_perm,
+                "shingle_size": self.shingle_size,
+                "duplicates": {
+                    kept_id: [{"text": doc.page_content, "metadata": doc.metadata} for doc in documents]
+                    for kept_id, documents in self._duplicates.items()
+                },
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, kept_documents: Iterable[Document], threshold: Optional[float] = None) -> 'NearDuplicateIndex':
+        """Rebuilds an index from the stored chunks and the duplicates saved by save()."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != DEDUP_FORMAT_VERSION:
+            raise ValueError(f"Unsupported dedup index format: {payload.get('version')}")
+        index = cls(
+            threshold=threshold if threshold is not None else payload["threshold"],
+            num_perm=payload["num_perm"],
+            shingle_size=payload["shingle_size"],
+        )
+        index.add_documents(kept_documents)
+        index._duplicates = {
+            kept_id: [Document(page_content=item["text"], metadata=item["metadata"]) for item in documents]
+            for kept_id, documents in payload["duplicates"].items()
+            if kept_id in index._signatures
+        }
+        return index
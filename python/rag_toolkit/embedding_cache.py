@@ -0,0 +1,244 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def text_digest(text: str) -> str:
+    """Content address of a chunk: sha256 of its UTF-8 text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheConfig:
+    """Configuration for the persistent embedding cache."""
+    enabled: bool = field(default_factory=lambda: os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true")
+    path: str = field(default_factory=lambda: os.getenv("EMBEDDING_CACHE_PATH", "tutor_session_data/embeddings.sqlite3"))
+    max_bytes: int = field(default_factory=lambda: int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024))
+    # After an eviction pass the cache is trimmed down to this fraction of max_bytes.
+    evict_to_ratio: float = 0.9
+
+    @classmethod
+    def from_env(cls) -> 'EmbeddingCacheConfig':
+        """Create configuration from environment variables."""
+        return cls()
+
+
+@dataclass
+class EmbeddingCacheMetrics:
+    """Counters describing how much embedding work the cache saved."""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["hit_ratio"] = round(self.hit_ratio, 4)
+        return data
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store shared by every session (and every worker on the
+    host), keyed by (model, sha256(text)). Vectors are stored as float32 blobs in SQLite.
+
+    The cache is bounded by `max_bytes`: once exceeded, the least recently used vectors
+    are deleted until it is back under `evict_to_ratio * max_bytes`.
+    """
+
+    def __init__(self, config: Optional[EmbeddingCacheConfig] = None):
+        self.config = config or EmbeddingCacheConfig.from_env()
+        self.metrics = EmbeddingCacheMetrics()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        directory = os.path.dirname(self.config.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._total_bytes = self._stored_bytes()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.config.path, timeout=30.0)
+            self._local.conn = conn
+        return conn
+
+    def _stored_bytes(self) -> int:
+        row = self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        return int(row[0])
+
+    def get_many(self, model: str, digests: Sequence[str]) -> Dict[str, List[float]]:
+        """Returns the cached vectors among `digests`, refreshing their recency."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(digests))
+        conn = self._connect()
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                (model, *batch)
+            ).fetchall()
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+        if found:
+            now = time.time()
+            with self._write_lock, conn:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, digest) for digest in found]
+                )
+        self.metrics.hits += sum(1 for digest in digests if digest in found)
+        self.metrics.misses += sum(1 for digest in digests if digest not in found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]):
+        """Stores vectors by digest and evicts old entries if the cache grew past its limit."""
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for digest, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((model, digest, blob, len(blob), now))
+        conn = self._connect()
+        with self._write_lock:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+            self.metrics.stores += len(rows)
+            self._total_bytes += sum(row[3] for row in rows)
+            if self._total_bytes > self.config.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Other workers write to the same file, so re-read the real size first.
+        self._total_bytes = self._stored_bytes()
+        target = int(self.config.max_bytes * self.config.evict_to_ratio)
+        while self._total_bytes > target:
+            rows = conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            victims, freed = [], 0
+            for model, digest, size in rows:
+                victims.append((model, digest))
+                freed += size
+                if self._total_bytes - freed <= target:
+                    break
+            with conn:
+                conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+            self._total_bytes -= freed
+            self.metrics.evictions += len(victims)
+        logger.info(f"Embedding cache trimmed to {self._total_bytes / 1024 / 1024:.1f} MB.")
+
+    def stats(self) -> Dict[str, Any]:
+        data = self.metrics.as_dict()
+        data["bytes"] = self._total_bytes
+        data["max_bytes"] = self.config.max_bytes
+        data["path"] = self.config.path
+        return data
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings client so that documents already embedded by any session are
+    served from the EmbeddingCache and only unseen texts reach the provider.
+    Queries are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        # Shortened (Matryoshka) vectors must not be confused with full-size ones.
+        dimensions = getattr(embeddings, "dimensions", None)
+        self.model = f"{model}@{dimensions}" if dimensions else model
+
+    def _lookup(self, texts: List[str]):
+        digests = [text_digest(text) for text in texts]
+        try:
+            cached = self.cache.get_many(self.model, digests)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            self.cache.metrics.errors += 1
+            cached = {}
+        missing: Dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+        return digests, cached, missing
+
+    def _store(self, cached: Dict[str, List[float]], missing: Dict[str, str], vectors: List[List[float]]):
+        fresh = dict(zip(missing, vectors))
+        try:
+            self.cache.put_many(self.model, fresh)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+            self.cache.metrics.errors += 1
+        cached.update(fresh)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        digests, cached, missing = self._lookup(texts)
+        if missing:
+            self._store(cached, missing, self.embeddings.embed_documents(list(missing.values())))
+        return [cached[digest] for digest in digests]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        digests, cached, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            await asyncio.to_thread(self._store, cached, missing, vectors)
+        return [cached[digest] for digest in digests]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Returns the process-wide EmbeddingCache, or None when it is disabled."""
+    global _default_cache
+    if _default_cache is None:
+        config = EmbeddingCacheConfig.from_env()
+        if not config.enabled:
+            return None
+        _default_cache = EmbeddingCache(config)
+    return _default_cache
@@ -0,0 +1,246 @@
+import time
+import uuid
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_toolkit.chunking import approximate_token_count
+
+logger = logging.getLogger(__name__)
+
+try:
+    from qdrant_client.models import PointStruct
+except ImportError:
+    PointStruct = None
+
+try:
+    import openai
+    RETRYABLE_PROVIDER_ERRORS = (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+except ImportError:
+    RETRYABLE_PROVIDER_ERRORS = ()
+
+_UPLOAD_DONE = object()
+
+
+@dataclass
+class EmbeddingPipelineConfig:
+    """Batching, parallelism and retry settings for embedding and upserting chunks."""
+    embed_batch_size: int = 128
+    # OpenAI rejects embedding requests above ~300k tokens in total.
+    embed_batch_max_tokens: int = 200_000
+    embed_concurrency: int = 4
+    upsert_batch_size: int = 256
+    max_retries: int = 6
+    initial_backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 60.0
+
+
+@dataclass
+class IngestionReport:
+    """What one pipeline run did and how fast."""
+    chunks: int = 0
+    embed_batches: int = 0
+    upsert_batches: int = 0
+    retries: int = 0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.total_seconds if self.total_seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["chunks_per_second"] = round(self.chunks_per_second, 2)
+        return data
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Reads the provider's Retry-After hint (seconds or milliseconds) from an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header) if hasattr(headers, "get") else None
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except (TypeError, ValueError):
+            continue
+    value = getattr(error, "retry_after", None)
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx responses are worth retrying."""
+    if RETRYABLE_PROVIDER_ERRORS and isinstance(error, RETRYABLE_PROVIDER_ERRORS):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds chunks in bounded batches with limited parallelism and upserts them into a
+    Qdrant collection while later batches are still being embedded.
+
+    Batches are cut by both chunk count and token total. Rate-limit and transient
+    provider errors are retried with exponential backoff, honouring Retry-After.
+    Points are written in the payload layout QdrantVectorStore reads back, plus any
+    `extra_payload` fields (e.g. the owning session in a shared collection). With a
+    `vector_sink` (anything with `upsert(ids, vectors, documents)`, such as a
+    LocalVectorIndex) the batches are written there instead of to Qdrant.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        qdrant_client: Any,
+        collection_name: str,
+        config: Optional[EmbeddingPipelineConfig] = None,
+        content_payload_key: str = "page_content",
+        metadata_payload_key: str = "metadata",
+        extra_payload: Optional[Dict[str, Any]] = None,
+        vector_sink: Any = None,
+    ):
+        self.embeddings = embeddings
+        self.qdrant_client = qdrant_client
+        self.collection_name = collection_name
+        self.config = config or EmbeddingPipelineConfig()
+        self.content_payload_key = content_payload_key
+        self.metadata_payload_key = metadata_payload_key
+        self.extra_payload = extra_payload or {}
+        self.vector_sink = vector_sink
+
+    def make_batches(self, documents: List[Document]) -> List[List[Document]]:
+        batches, current, current_tokens = [], [], 0
+        for document in documents:
+            tokens = document.metadata.get("token_count") or approximate_token_count(document.page_content)
+            if current and (len(current) >= self.config.embed_batch_size or current_tokens + tokens > self.config.embed_batch_max_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(document)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def run(self, documents: List[Document], ids: Optional[List[str]] = None) -> IngestionReport:
+        """Embeds and stores `documents`; ids default to each chunk's chunk_id (or a random UUID)."""
+        if PointStruct is None and self.vector_sink is None:
+            raise RuntimeError("qdrant-client is required for the embedding pipeline.")
+        report = IngestionReport(chunks=len(documents))
+        if not documents:
+            return report
+        if ids is None:
+            ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+        id_by_document = {id(doc): point_id for doc, point_id in zip(documents, ids)}
+
+        start = time.perf_counter()
+        batches = self.make_batches(documents)
+        report.embed_batches = len(batches)
+        # Embedded batches wait here for the uploader. A batch keeps its embedding slot
+        # until it is queued, so at most embed_concurrency + the queue size batches of
+        # vectors are held in memory however large the upload is.
+        uploads: asyncio.Queue = asyncio.Queue(maxsize=self.config.embed_concurrency * 2)
+        semaphore = asyncio.Semaphore(self.config.embed_concurrency)
+
+        async def _embed(batch: List[Document]):
+            async with semaphore:
+                batch_start = time.perf_counter()
+                vectors = await self._embed_with_retries(batch, report)
+                report.embed_seconds += time.perf_counter() - batch_start
+                await uploads.put((batch, vectors))
+
+        async def _upload():
+            pending = []
+            while True:
+                item = await uploads.get()
+                if item is not _UPLOAD_DONE:
+                    batch, vectors = item
+                    pending.extend(zip(batch, vectors))
+                while len(pending) >= self.config.upsert_batch_size or (item is _UPLOAD_DONE and pending):
+                    points, pending = pending[:self.config.upsert_batch_size], pending[self.config.upsert_batch_size:]
+                    upsert_start = time.perf_counter()
+                    await asyncio.to_thread(self._write, points, id_by_document)
+                    report.upsert_seconds += time.perf_counter() - upsert_start
+                    report.upsert_batches += 1
+                if item is _UPLOAD_DONE:
+                    return
+
+        uploader = asyncio.create_task(_upload())
+        embedders = [asyncio.create_task(_embed(batch)) for batch in batches]
+        embedding = asyncio.gather(*embedders)
+        try:
+            # Fail fast: if either side breaks, stop the other instead of waiting it out.
+            done, _ = await asyncio.wait({embedding, uploader}, return_when=asyncio.FIRST_COMPLETED)
+            if uploader in done:
+                uploader.result()
+            await embedding
+            await uploads.put(_UPLOAD_DONE)
+            await uploader
+        finally:
+            for task in embedders + [uploader]:
+                if not task.done():
+                    task.cancel()
+
+        report.total_seconds = time.perf_counter() - start
+        logger.info(
+            f"Embedded and stored {report.chunks} chunks in {report.total_seconds:.2f}s "
+            f"({report.chunks_per_second:.1f} chunks/s, {report.embed_batches} embedding batches, "
+            f"{report.upsert_batches} upserts, {report.retries} retries)."
+        )
+        return report
+
+    def _write(self, points: List[Tuple[Document, List[float]]], id_by_document: Dict[int, str]):
+        if self.vector_sink is not None:
+            self.vector_sink.upsert(
+                [id_by_document[id(doc)] for doc, _ in points],
+                [vector for _, vector in points],
+                [doc for doc, _ in points],
+            )
+            return
+        self.qdrant_client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                PointStruct(
+                    id=id_by_document[id(doc)],
+                    vector=vector,
+                    payload={
+                        **self.extra_payload,
+                        self.content_payload_key: doc.page_content,
+                        self.metadata_payload_key: doc.metadata,
+                    },
+                )
+                for doc, vector in points
+            ],
+            wait=True,
+        )
+
+    async def _embed_with_retries(self, batch: List[Document], report: IngestionReport) -> List[List[float]]:
+        texts = [doc.page_content for doc in batch]
+        backoff = self.config.initial_backoff_seconds
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                return await self.embeddings.aembed_documents(texts)
+            except Exception as e:
+                if attempt >= self.config.max_retries or not is_retryable(e):
+                    raise
+                hint = retry_after_seconds(e)
+                delay = hint if hint is not None else backoff * (1 + random.random() * 0.25)
+                delay = min(delay, self.config.max_backoff_seconds)
+                report.retries += 1
+                logger.warning(f"Embedding batch of {len(texts)} failed ({type(e).__name__}); retrying in {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.config.max_backoff_seconds)
@@ -0,0 +1,212 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ConfigDict, Field
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+
+from rag_toolkit.bm25_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# (query vector, k) -> the k nearest documents with their stored vectors.
+VectorSearch = Callable[[List[float], int], Awaitable[List[Tuple[Document, np.ndarray]]]]
+# documents -> their stored vectors, None where a document has no vector.
+VectorLookup = Callable[[List[Document]], Awaitable[List[Optional[np.ndarray]]]]
+# The blocking equivalents, used by the sync invoke() path.
+SyncVectorSearch = Callable[[List[float], int], List[Tuple[Document, np.ndarray]]]
+SyncVectorLookup = Callable[[List[Document]], List[Optional[np.ndarray]]]
+
+
+@dataclass
+class FusionConfig:
+    """Candidate pool, fusion and diversification settings for the FusionRetriever."""
+    # Candidates fetched from each retriever before fusion.
+    fetch_k: int = 20
+    # The usual RRF damping constant: a document's fused score is sum(1 / (rrf_k + rank)).
+    rrf_k: int = 60
+    # Trade-off between relevance (1.0) and novelty (0.0) when picking the final results.
+    mmr_lambda: float = 0.7
+    # Candidates whose cosine similarity to the query is below this are dropped; 0 disables.
+    min_similarity: float = 0.2
+    # Candidates at least this similar to a result already picked are never picked.
+    max_redundancy: float = 0.95
+
+    @classmethod
+    def from_env(cls) -> 'FusionConfig':
+        defaults = cls()
+        return cls(
+            fetch_k=int(os.getenv("RETRIEVAL_FETCH_K", defaults.fetch_k)),
+            rrf_k=int(os.getenv("RETRIEVAL_RRF_K", defaults.rrf_k)),
+            mmr_lambda=float(os.getenv("RETRIEVAL_MMR_LAMBDA", defaults.mmr_lambda)),
+            min_similarity=float(os.getenv("RETRIEVAL_MIN_SIMILARITY", defaults.min_similarity)),
+            max_redundancy=float(os.getenv("RETRIEVAL_MAX_REDUNDANCY", defaults.max_redundancy)),
+        )
+
+
+def document_id(document: Document) -> str:
+    return BM25Index.document_id(document)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = 60) -> Dict[str, float]:
+    """Fuses ranked id lists into {id: score}, ordered best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    mmr_lambda: float = 0.7,
+    max_redundancy: float = 1.0,
+) -> List[int]:
+    """
+    Greedily picks up to k rows maximizing mmr_lambda * relevance - (1 - mmr_lambda) *
+    (highest cosine similarity to a row already picked). Rows at least `max_redundancy`
+    similar to a picked row are skipped. `vectors` must be L2-normalized.
+    """
+    if not len(relevance) or k <= 0:
+        return []
+    similarity = vectors @ vectors.T
+    selected: List[int] = []
+    redundancy = np.full(len(relevance), -np.inf)
+    available = np.ones(len(relevance), dtype=bool)
+    while len(selected) < k:
+        available &= redundancy < max_redundancy
+        if not available.any():
+            break
+        scores = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * np.maximum(redundancy, 0.0), -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class FusionRetriever(BaseRetriever):
+    """
+    Hybrid retrieval that returns `k` relevant, non-redundant chunks instead of
+    concatenating two result lists.
+
+    The query is embedded once; the vector search returns its candidates together
+    with their stored vectors, BM25 supplies its own candidates, and the two rankings
+    are merged with reciprocal rank fusion. Stored vectors for BM25-only candidates are
+    read back from the vector store (no embedding calls). Candidates below
+    `min_similarity` to the query are dropped, and the final `k` are picked with
+    maximal marginal relevance over the fused scores, computed in NumPy, skipping
+    near-copies (`max_redundancy`) of chunks already picked.
+
+    ainvoke() is the serving path. invoke() uses `sync_vector_search` and
+    `sync_vector_lookup` when given, and otherwise runs the async callables on a
+    private event loop, so it must not be called from a thread running one.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    embeddings: Embeddings
+    vector_search: VectorSearch
+    vector_lookup: VectorLookup
+    sync_vector_search: Optional[SyncVectorSearch] = None
+    sync_vector_lookup: Optional[SyncVectorLookup] = None
+    bm25_index: Optional[BM25Index] = None
+    k: int = 5
+    config: FusionConfig = Field(default_factory=FusionConfig)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        if self.sync_vector_search is not None:
+            vector_hits = self.sync_vector_search(query_vector, self.config.fetch_k)
+        else:
+            vector_hits = asyncio.run(self.vector_search(query_vector, self.config.fetch_k))
+        sparse_hits = self._sparse_hits(query)
+        documents, vectors, missing = self._candidates(vector_hits, sparse_hits)
+        if missing:
+            missing_documents = [documents[doc_id] for doc_id in missing]
+            if self.sync_vector_lookup is not None:
+                found = self.sync_vector_lookup(missing_documents)
+            else:
+                found = asyncio.run(self.vector_lookup(missing_documents))
+            self._add_vectors(vectors, missing, found)
+        return self._select(query_vector, vector_hits, sparse_hits, documents, vectors)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = await self.embeddings.aembed_query(query)
+        vector_hits = await self.vector_search(query_vector, self.config.fetch_k)
+        sparse_hits = self._sparse_hits(query)
+        documents, vectors, missing = self._candidates(vector_hits, sparse_hits)
+        if missing:
+            self._add_vectors(vectors, missing, await self.vector_lookup([documents[doc_id] for doc_id in missing]))
+        return self._select(query_vector, vector_hits, sparse_hits, documents, vectors)
+
+    def _sparse_hits(self, query: str) -> List[Document]:
+        if self.bm25_index is None:
+            return []
+        return [doc for doc, _ in self.bm25_index.search(query, self.config.fetch_k)]
+
+    @staticmethod
+    def _candidates(
+        vector_hits: List[Tuple[Document, np.ndarray]], sparse_hits: List[Document]
+    ) -> Tuple[Dict[str, Document], Dict[str, np.ndarray], List[str]]:
+        """Every candidate by id, the vectors the vector search returned, and the ids still missing one."""
+        documents: Dict[str, Document] = {}
+        vectors: Dict[str, np.ndarray] = {}
+        for document, vector in vector_hits:
+            doc_id = document_id(document)
+            documents[doc_id] = document
+            vectors[doc_id] = vector
+        missing = []
+        for document in sparse_hits:
+            doc_id = document_id(document)
+            documents.setdefault(doc_id, document)
+            if doc_id not in vectors:
+                missing.append(doc_id)
+        return documents, vectors, missing
+
+    @staticmethod
+    def _add_vectors(vectors: Dict[str, np.ndarray], ids: List[str], found: List[Optional[np.ndarray]]):
+        for doc_id, vector in zip(ids, found):
+            if vector is not None:
+                vectors[doc_id] = vector
+
+    def _select(
+        self,
+        query_vector: List[float],
+        vector_hits: List[Tuple[Document, np.ndarray]],
+        sparse_hits: List[Document],
+        documents: Dict[str, Document],
+        vectors: Dict[str, np.ndarray],
+    ) -> List[Document]:
+        """Fuses the two rankings, drops weak candidates and picks the final k with MMR."""
+        fused = reciprocal_rank_fusion(
+            [[document_id(doc) for doc, _ in vector_hits], [document_id(doc) for doc in sparse_hits]],
+            self.config.rrf_k,
+        )
+        # Without a stored vector a candidate can be neither thresholded nor diversified.
+        ids = [doc_id for doc_id in fused if doc_id in vectors]
+        if not ids:
+            return []
+        matrix = _normalize(np.asarray([vectors[doc_id] for doc_id in ids], dtype=np.float32))
+        query_similarity = matrix @ _normalize(np.asarray(query_vector, dtype=np.float32))
+        keep = query_similarity >= self.config.min_similarity
+        ids = [doc_id for doc_id, kept in zip(ids, keep) if kept]
+        if not ids:
+            return []
+        matrix = matrix[keep]
+        relevance = np.asarray([fused[doc_id] for doc_id in ids])
+        relevance = relevance / relevance.max()
+        picked = maximal_marginal_relevance(relevance, matrix, self.k, self.config.mmr_lambda, self.config.max_redundancy)
+        return [documents[ids[row]] for row in picked]
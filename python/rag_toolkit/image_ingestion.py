@@ -0,0 +1,404 @@
+import io
+import os
+import time
+import base64
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import HumanMessage
+
+logger = logging.getLogger(__name__)
+
+# Re-encoded or resized copies of an image differ in a few dHash bits. Unrelated
+# photos differ in about a hundred of the 256, but low-detail images such as text pages
+# can be a bit or two apart, so perceptual matches are only used within one session.
+PERCEPTUAL_BANDS = 8
+PERCEPTUAL_MAX_DISTANCE = 4
+
+IMAGE_DESCRIPTION_PROMPT = (
+    "Describe this image for a search index. Be detailed about any objects, text, people, and the overall scene "
+    "or context. This description will be used to find this image in a knowledge base."
+)
+
+
+@dataclass
+class ImageIngestionConfig:
+    """Downscaling, vision-call concurrency and description-cache settings for image uploads."""
+    # Longest edge sent to the vision model; OpenAI downsamples larger images anyway.
+    max_edge: int = field(default_factory=lambda: int(os.getenv("VISION_IMAGE_MAX_EDGE", "1536")))
+    jpeg_quality: int = field(default_factory=lambda: int(os.getenv("VISION_IMAGE_JPEG_QUALITY", "85")))
+    concurrency: int = field(default_factory=lambda: int(os.getenv("VISION_CONCURRENCY", "4")))
+    cache_enabled: bool = field(default_factory=lambda: os.getenv("VISION_CACHE_ENABLED", "true").lower() == "true")
+    cache_path: str = field(default_factory=lambda: os.getenv("VISION_CACHE_PATH", "tutor_session_data/vision_descriptions.sqlite3"))
+    # Each image takes nine rows: its content hash and the eight perceptual-hash bands.
+    cache_max_entries: int = field(default_factory=lambda: int(os.getenv("VISION_CACHE_MAX_ENTRIES", "50000")))
+
+    @classmethod
+    def from_env(cls) -> 'ImageIngestionConfig':
+        """Create configuration from environment variables."""
+        return cls()
+
+
+@dataclass
+class PreparedImage:
+    """An upload re-encoded for the vision model, plus the keys it is cached under."""
+    data: bytes
+    mime_type: str
+    content_digest: str
+    perceptual_hash: Optional[str] = None
+    original_bytes: int = 0
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+def difference_hash(image, hash_size: int = 16) -> str:
+    """
+    256-bit dHash: the sign of horizontal brightness gradients on a tiny grayscale copy.
+    Re-encoded, resized or recompressed copies of an image get the same hash.
+    """
+    from PIL import Image
+
+    pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + column] < pixels[offset + column + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def image_cache_keys(content_digest: str, perceptual_hash: Optional[str] = None) -> List[str]:
+    """The content-hash key, then one key per perceptual-hash band."""
+    return [f"sha256:{content_digest}", *perceptual_bands(perceptual_hash)]
+
+
+def session_namespace(namespace: str, scope: str) -> str:
+    """The cache namespace for one session's perceptual-hash entries."""
+    return f"{namespace}|session:{scope}"
+
+
+def perceptual_bands(perceptual_hash: Optional[str], bands: int = PERCEPTUAL_BANDS) -> List[str]:
+    """
+    Splits a perceptual hash into bands. Two hashes within `bands - 1` bits of each other
+    always share a band, so near-duplicates are found with exact key lookups.
+    """
+    if not perceptual_hash:
+        return []
+    width = len(perceptual_hash) // bands
+    return [f"dhash{band}:{perceptual_hash[band * width:(band + 1) * width]}" for band in range(bands)]
+
+
+def hamming_distance(first: str, second: str) -> int:
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+
+def prepare_image(data: bytes, max_edge: int = 1536, jpeg_quality: int = 85) -> PreparedImage:
+    """
+    Downscales an image to `max_edge` and re-encodes it as JPEG (or PNG, for lossless
+    uploads such as diagrams where that is smaller), keeping the original bytes when
+    Pillow cannot read them or when they are already smaller. CPU-bound; call it off
+    the event loop.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(data)) as opened:
+            original_format = opened.format
+            # JPEGs are decoded straight at a reduced scale (1/2 to 1/8), which is far cheaper.
+            scale = max_edge / max(opened.size)
+            if scale < 1:
+                opened.draft("RGB", (int(opened.width * scale), int(opened.height * scale)))
+            image = ImageOps.exif_transpose(opened)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            within_bounds = max(image.size) <= max_edge
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            perceptual = difference_hash(image)
+            candidates = [(_encode(image, "JPEG", quality=jpeg_quality, optimize=True), "image/jpeg")]
+            if original_format in ("PNG", "GIF", "BMP", "TIFF"):
+                candidates.append((_encode(image, "PNG", optimize=True), "image/png"))
+    except Exception as e:
+        logger.warning(f"Could not downscale image, sending it as uploaded: {e}")
+        return PreparedImage(data=data, mime_type="image/jpeg", content_digest=digest, original_bytes=len(data))
+
+    if within_bounds and original_format in ("JPEG", "PNG", "WEBP", "GIF"):
+        candidates.append((data, f"image/{original_format.lower()}"))
+    encoded, mime_type = min(candidates, key=lambda candidate: len(candidate[0]))
+    return PreparedImage(data=encoded, mime_type=mime_type, content_digest=digest, perceptual_hash=perceptual, original_bytes=len(data))
+
+
+def _encode(image, image_format: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+class VisionDescriptionCache:
+    """
+    Image descriptions keyed by (namespace, image key). Each description is stored under
+    the image's content hash, shared by every session (and every worker on the host), so
+    a byte-identical upload hits it anywhere. When a session scope is given it is also
+    stored under the bands of its perceptual hash in that session's namespace, so a
+    re-encoded or resized copy uploaded to the same session hits a band whose stored hash
+    is within PERCEPTUAL_MAX_DISTANCE bits. Visually similar images are never matched
+    across sessions. Bounded by entry count, least recently used first.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vision_descriptions ("
+                " namespace TEXT NOT NULL,"
+                " image_key TEXT NOT NULL,"
+                " description TEXT NOT NULL,"
+                " perceptual_hash TEXT,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (namespace, image_key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS vision_descriptions_last_used ON vision_descriptions (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            self._local.conn = conn
+        return conn
+
+    def get(
+        self,
+        namespace: str,
+        content_digest: str,
+        perceptual_hash: Optional[str] = None,
+        scope: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Looks an image up by content hash and, when both a perceptual hash and a session
+        scope are given, by perceptual hash among that session's images.
+        """
+        conn = self._connect()
+        content_key = image_cache_keys(content_digest)[0]
+        row = conn.execute(
+            "SELECT description FROM vision_descriptions WHERE namespace = ? AND image_key = ?",
+            (namespace, content_key)
+        ).fetchone()
+        match = (namespace, content_key, row[0]) if row else None
+        if match is None and perceptual_hash and scope:
+            scoped = session_namespace(namespace, scope)
+            bands = perceptual_bands(perceptual_hash)
+            placeholders = ",".join("?" * len(bands))
+            rows = conn.execute(
+                f"SELECT image_key, description, perceptual_hash FROM vision_descriptions WHERE namespace = ? AND image_key IN ({placeholders})",
+                (scoped, *bands)
+            ).fetchall()
+            near = [
+                (hamming_distance(perceptual_hash, stored), key, description)
+                for key, description, stored in rows if stored
+            ]
+            near = [candidate for candidate in near if candidate[0] <= PERCEPTUAL_MAX_DISTANCE]
+            if near:
+                _, key, description = min(near)
+                match = (scoped, key, description)
+        if match is None:
+            return None
+        with self._write_lock, conn:
+            conn.execute(
+                "UPDATE vision_descriptions SET last_used = ? WHERE namespace = ? AND image_key = ?",
+                (time.time(), match[0], match[1])
+            )
+        return match[2]
+
+    def put(self, namespace: str, image: PreparedImage, description: str, scope: Optional[str] = None):
+        now = time.time()
+        rows = [(namespace, image_cache_keys(image.content_digest)[0], description, None, now)]
+        if scope and image.perceptual_hash:
+            scoped = session_namespace(namespace, scope)
+            rows.extend((scoped, key, description, image.perceptual_hash, now) for key in perceptual_bands(image.perceptual_hash))
+        conn = self._connect()
+        with self._write_lock:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vision_descriptions (namespace, image_key, description, perceptual_hash, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+            count = conn.execute("SELECT COUNT(*) FROM vision_descriptions").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - int(self.max_entries * 0.9)
+                with conn:
+                    conn.execute(
+                        "DELETE FROM vision_descriptions WHERE rowid IN "
+                        "(SELECT rowid FROM vision_descriptions ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+                self.evictions += excess
+
+    def stats(self) -> Dict[str, Any]:
+        return {"evictions": self.evictions, "max_entries": self.max_entries, "path": self.path}
+
+
+@dataclass
+class ImageIngestionMetrics:
+    """How many vision calls, and how many bytes, image ingestion used."""
+    images: int = 0
+    cache_hits: int = 0
+    perceptual_hits: int = 0
+    coalesced: int = 0
+    vision_calls: int = 0
+    failures: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+    vision_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["vision_seconds"] = round(self.vision_seconds, 3)
+        return data
+
+
+class ImageDescriber:
+    """
+    Turns uploaded images into searchable text descriptions with a vision model.
+
+    Images are downscaled and re-encoded off the event loop before they are sent.
+    Descriptions are cached by content hash across sessions and by perceptual hash
+    within the uploading session (`scope`), and concurrent uploads
+    of the same image share a single call. At most `concurrency` vision calls run at
+    once. `models` are tried in order, e.g. OpenAI first with Gemini as the fallback.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[Tuple[str, Any]],
+        config: Optional[ImageIngestionConfig] = None,
+        cache: Optional[VisionDescriptionCache] = None,
+        prompt: str = IMAGE_DESCRIPTION_PROMPT,
+    ):
+        self.models = list(models)
+        self.config = config or ImageIngestionConfig.from_env()
+        self.cache = cache
+        self.prompt = prompt
+        self.metrics = ImageIngestionMetrics()
+        # Changing the primary model or the prompt must not serve stale descriptions.
+        primary = self.models[0][0] if self.models else "none"
+        self.namespace = f"{primary}|{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+        self._semaphore = asyncio.Semaphore(max(1, self.config.concurrency))
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def describe(self, data: bytes, filename: str, scope: Optional[str] = None) -> Optional[str]:
+        """
+        Returns a description of the image, or None if every model failed. `scope` (the
+        session id) enables perceptual-hash matches against that session's earlier images.
+        """
+        self.metrics.images += 1
+        self.metrics.bytes_received += len(data)
+        # Byte-identical re-uploads are answered before paying for any image processing.
+        cached = await self._cached(hashlib.sha256(data).hexdigest())
+        if cached is not None:
+            self.metrics.cache_hits += 1
+            logger.info(f"Using cached description for '{filename}'.")
+            return cached
+        image = await asyncio.to_thread(prepare_image, data, self.config.max_edge, self.config.jpeg_quality)
+        if image.perceptual_hash and scope:
+            cached = await self._cached(image.content_digest, image.perceptual_hash, scope)
+            if cached is not None:
+                self.metrics.cache_hits += 1
+                self.metrics.perceptual_hits += 1
+                logger.info(f"Using the cached description of a visually identical image from this session for '{filename}'.")
+                return cached
+
+        pending = self._in_flight.get(image.content_digest)
+        if pending is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[image.content_digest] = future
+        try:
+            description = await self._call_models(image, filename)
+            future.set_result(description)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; this keeps the loop from logging it as never retrieved.
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(image.content_digest, None)
+
+        if description is not None and self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.put, self.namespace, image, description, scope)
+            except sqlite3.Error as e:
+                logger.warning(f"Vision description cache write failed: {e}")
+        return description
+
+    async def _cached(self, content_digest: str, perceptual_hash: Optional[str] = None, scope: Optional[str] = None) -> Optional[str]:
+        if self.cache is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.cache.get, self.namespace, content_digest, perceptual_hash, scope)
+        except sqlite3.Error as e:
+            logger.warning(f"Vision description cache read failed: {e}")
+            return None
+
+    async def _call_models(self, image: PreparedImage, filename: str) -> Optional[str]:
+        message = HumanMessage(content=[
+            {"type": "text", "text": self.prompt},
+            {"type": "image_url", "image_url": {"url": image.data_url}},
+        ])
+        async with self._semaphore:
+            for name, model in self.models:
+                start = time.perf_counter()
+                try:
+                    logger.info(f"Generating a description for '{filename}' with {name} ({len(image.data)} bytes, was {image.original_bytes}).")
+                    self.metrics.vision_calls += 1
+                    self.metrics.bytes_sent += len(image.data)
+                    response = await model.ainvoke([message])
+                    return response.content
+                except Exception as e:
+                    self.metrics.failures += 1
+                    logger.error(f"Error describing '{filename}' with {name}: {e}")
+                finally:
+                    self.metrics.vision_seconds += time.perf_counter() - start
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        data = self.metrics.as_dict()
+        data["cache"] = self.cache.stats() if self.cache is not None else None
+        return data
+
+
+_default_cache: Optional[VisionDescriptionCache] = None
+
+
+def get_vision_cache() -> Optional[VisionDescriptionCache]:
+    """Returns the process-wide VisionDescriptionCache, or None when it is disabled."""
+    global _default_cache
+    if _default_cache is None:
+        config = ImageIngestionConfig.from_env()
+        if not config.cache_enabled:
+            return None
+        _default_cache = VisionDescriptionCache(config.cache_path, config.cache_max_entries)
+    return _default_cache
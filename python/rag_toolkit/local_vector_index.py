@@ -0,0 +1,397 @@
+import os
+import gzip
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+VECTORS_FILE = "vectors.npy"
+IVF_FILE = "ivf.npz"
+DOCUMENTS_FILE = "documents.json.gz"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized vectors; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=clusters, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters with random vectors instead of dropping them.
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class LocalVectorIndex:
+    """
+    An embedded cosine-similarity index kept in a NumPy matrix, for when no Qdrant server
+    is available.
+
+    Vectors are normalized on insert and stored as float32 or float16. Search multiplies
+    the query against row blocks of `block_size` (upcast to float32 per block) and keeps a
+    running top-k, so memory stays bounded even over a memory-mapped matrix. With
+    `ivf_lists` set, vectors are partitioned by spherical k-means once the index holds
+    `ivf_min_vectors`, and a query only scans the `ivf_probes` closest partitions.
+
+    An index with a `path` persists to that directory: the matrix is saved as .npy and
+    memory-mapped on load, so a reopened session does not read its vectors into memory
+    until it is modified. All public methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dtype: str = "float32",
+        block_size: int = 4096,
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        ivf_min_vectors: int = 20000,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype '{dtype}'; use float32 or float16.")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.ivf_min_vectors = ivf_min_vectors
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[Optional[str]] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+        self._lists: Optional[List[np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    def _reserve(self, rows: int, dimension: int):
+        if self._vectors is None:
+            capacity = max(1024, rows)
+            self._vectors = np.zeros((capacity, dimension), dtype=self.dtype)
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._assignments = np.full(capacity, -1, dtype=np.int32)
+            return
+        if dimension != self._vectors.shape[1]:
+            raise ValueError(f"Vector dimension {dimension} does not match the index ({self._vectors.shape[1]}).")
+        capacity = len(self._vectors)
+        writable = not isinstance(self._vectors, np.memmap)
+        if self._size + rows <= capacity and writable:
+            return
+        capacity = max(capacity * 2, self._size + rows) if self._size + rows > capacity else capacity
+        # Growing (or writing to a memory-mapped matrix) copies the live rows into memory.
+        vectors = np.zeros((capacity, dimension), dtype=self.dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._alive = np.concatenate([self._alive[:self._size], np.zeros(capacity - self._size, dtype=bool)])
+        self._assignments = np.concatenate([self._assignments[:self._size], np.full(capacity - self._size, -1, dtype=np.int32)])
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        """Stores (or replaces) the vectors and documents under `ids`."""
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            self._reserve(len(ids), matrix.shape[1])
+            rows = []
+            for point_id, document in zip(ids, documents):
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = self._rows[point_id] = self._size
+                    self._size += 1
+                    self._ids.append(point_id)
+                    self._payloads.append(None)
+                self._payloads[row] = {"page_content": document.page_content, "metadata": dict(document.metadata)}
+                rows.append(row)
+            rows = np.asarray(rows, dtype=np.int64)
+            self._vectors[rows] = matrix.astype(self.dtype)
+            self._alive[rows] = True
+            if self._centroids is not None:
+                self._assignments[rows] = np.argmax(matrix @ self._centroids.T, axis=1)
+            self._lists = None
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            removed = 0
+            for point_id in list(ids):
+                row = self._rows.pop(point_id, None)
+                if row is None:
+                    continue
+                self._ids[row] = None
+                self._payloads[row] = None
+                self._alive[row] = False
+                removed += 1
+            if removed:
+                self._lists = None
+                if self._size - len(self._rows) > self._size // 4:
+                    self._compact()
+            return removed
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Deletes every document whose metadata matches `predicate`."""
+        with self._lock:
+            return self.delete([
+                point_id for point_id, payload in zip(self._ids, self._payloads)
+                if point_id is not None and predicate(payload["metadata"])
+            ])
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._size = 0
+            self._ids = []
+            self._payloads = []
+            self._rows = {}
+            self._alive = np.zeros(0, dtype=bool)
+            self._centroids = None
+            self._assignments = np.zeros(0, dtype=np.int32)
+            self._trained_size = 0
+            self._lists = None
+
+    def _compact(self):
+        live = np.flatnonzero(self._alive[:self._size])
+        self._vectors = np.array(self._vectors[live], dtype=self.dtype)
+        self._assignments = self._assignments[live].copy()
+        self._alive = np.ones(len(live), dtype=bool)
+        self._ids = [self._ids[row] for row in live]
+        self._payloads = [self._payloads[row] for row in live]
+        self._rows = {point_id: row for row, point_id in enumerate(self._ids)}
+        self._size = len(live)
+        self._lists = None
+
+    def documents(self) -> List[Document]:
+        with self._lock:
+            return [
+                Document(page_content=payload["page_content"], metadata=payload["metadata"])
+                for payload in self._payloads if payload is not None
+            ]
+
+    def _ensure_partitions(self) -> Optional[List[np.ndarray]]:
+        """Trains (or retrains, after the index doubled) the IVF partitions when enabled."""
+        if not self.ivf_lists or len(self) < max(self.ivf_min_vectors, self.ivf_lists):
+            return None
+        if self._centroids is None or len(self) >= 2 * self._trained_size:
+            live = np.flatnonzero(self._alive[:self._size])
+            sample = live if len(live) <= 50 * self.ivf_lists else np.random.default_rng(0).choice(live, 50 * self.ivf_lists, replace=False)
+            self._centroids = _kmeans(np.asarray(self._vectors[sample], dtype=np.float32), self.ivf_lists)
+            for start in range(0, self._size, self.block_size):
+                block = np.asarray(self._vectors[start:start + self.block_size], dtype=np.float32)
+                self._assignments[start:start + len(block)] = np.argmax(block @ self._centroids.T, axis=1)
+            self._trained_size = len(self)
+            self._lists = None
+            logger.info(f"Partitioned {len(self)} vectors into {self.ivf_lists} IVF lists.")
+        if self._lists is None:
+            assignments = np.where(self._alive[:self._size], self._assignments[:self._size], -1)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(self.ivf_lists + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.ivf_lists)]
+        return self._lists
+
+    def vectors(self, ids: Iterable[str]) -> List[Optional[np.ndarray]]:
+        """The stored (normalized) vectors for `ids`, with None for ids that are not indexed."""
+        with self._lock:
+            rows = [self._rows.get(point_id) for point_id in ids]
+            return [None if row is None else np.asarray(self._vectors[row], dtype=np.float32) for row in rows]
+
+    def search(
+        self,
+        vector: List[float],
+        k: int = 5,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Returns the k most similar documents with their cosine similarity."""
+        query = _normalize(np.asarray([vector], dtype=np.float32))[0]
+        with self._lock:
+            if not len(self) or k <= 0:
+                return []
+            partitions = self._ensure_partitions()
+            if partitions is not None:
+                closest = np.argsort(-(self._centroids @ query))[:self.ivf_probes]
+                candidates = np.sort(np.concatenate([partitions[i] for i in closest]))
+            else:
+                candidates = None
+
+            best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            total = self._size if candidates is None else len(candidates)
+            for start in range(0, total, self.block_size):
+                if candidates is None:
+                    rows = np.arange(start, min(start + self.block_size, total))
+                    block = self._vectors[start:start + len(rows)]
+                else:
+                    rows = candidates[start:start + self.block_size]
+                    block = self._vectors[rows]
+                scores = np.asarray(block, dtype=np.float32) @ query
+                mask = self._alive[rows]
+                if predicate is not None:
+                    mask &= np.fromiter(
+                        (self._payloads[row] is not None and predicate(self._payloads[row]["metadata"]) for row in rows),
+                        dtype=bool, count=len(rows)
+                    )
+                rows, scores = rows[mask], scores[mask]
+                if len(scores) > k:
+                    top = np.argpartition(scores, -k)[-k:]
+                    rows, scores = rows[top], scores[top]
+                best_rows = np.concatenate([best_rows, rows])
+                best_scores = np.concatenate([best_scores, scores])
+                if len(best_scores) > k:
+                    top = np.argpartition(best_scores, -k)[-k:]
+                    best_rows, best_scores = best_rows[top], best_scores[top]
+
+            order = np.argsort(-best_scores, kind="stable")
+            return [
+                (Document(page_content=self._payloads[row]["page_content"], metadata=self._payloads[row]["metadata"]), float(best_scores[i]))
+                for i, row in zip(order, best_rows[order])
+            ]
+
+    def save(self, path: Optional[str] = None):
+        """Writes the index to its directory, compacting removed rows away."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the vector index to.")
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._size])
+            vectors = np.asarray(self._vectors[live], dtype=self.dtype) if self._vectors is not None else np.zeros((0, 0), dtype=self.dtype)
+            payload = {
+                "version": INDEX_FORMAT_VERSION,
+                "dtype": self.dtype.name,
+                "ids": [self._ids[row] for row in live],
+                "payloads": [self._payloads[row] for row in live],
+            }
+            centroids = self._centroids
+            assignments = self._assignments[live] if centroids is not None else None
+        os.makedirs(path, exist_ok=True)
+        # The documents file is written last: it names the rows the vector file must hold.
+        with open(os.path.join(path, f"{VECTORS_FILE}.tmp"), "wb") as f:
+            np.save(f, vectors)
+        os.replace(os.path.join(path, f"{VECTORS_FILE}.tmp"), os.path.join(path, VECTORS_FILE))
+        if centroids is not None:
+            with open(os.path.join(path, f"{IVF_FILE}.tmp"), "wb") as f:
+                np.savez(f, centroids=centroids, assignments=assignments)
+            os.replace(os.path.join(path, f"{IVF_FILE}.tmp"), os.path.join(path, IVF_FILE))
+        elif os.path.exists(os.path.join(path, IVF_FILE)):
+            os.unlink(os.path.join(path, IVF_FILE))
+        with gzip.open(os.path.join(path, f"{DOCUMENTS_FILE}.tmp"), "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(os.path.join(path, f"{DOCUMENTS_FILE}.tmp"), os.path.join(path, DOCUMENTS_FILE))
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(os.path.join(path, DOCUMENTS_FILE))
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'LocalVectorIndex':
+        """Opens an index written by save(); its vectors are memory-mapped, not read."""
+        with gzip.open(os.path.join(path, DOCUMENTS_FILE), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format: {payload.get('version')}")
+        index = cls(path=path, **{**kwargs, "dtype": payload["dtype"]})
+        if not payload["ids"]:
+            return index
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        if len(vectors) != len(payload["ids"]):
+            raise ValueError(f"Vector index at {path} is inconsistent: {len(vectors)} vectors for {len(payload['ids'])} documents.")
+        index._vectors = vectors
+        index._size = len(vectors)
+        index._ids = list(payload["ids"])
+        index._payloads = list(payload["payloads"])
+        index._rows = {point_id: row for row, point_id in enumerate(index._ids)}
+        index._alive = np.ones(len(vectors), dtype=bool)
+        index._assignments = np.full(len(vectors), -1, dtype=np.int32)
+        ivf_path = os.path.join(path, IVF_FILE)
+        if index.ivf_lists and os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                if len(ivf["centroids"]) == index.ivf_lists:
+                    index._centroids = ivf["centroids"]
+                    index._assignments = ivf["assignments"].astype(np.int32)
+                    index._trained_size = len(vectors)
+        return index
+
+
+def _metadata_predicate(filter: Optional[Dict[str, Any]]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    if not filter:
+        return None
+    return lambda metadata: all(metadata.get(key) == value for key, value in filter.items())
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain vector store over a LocalVectorIndex; `filter` is a dict of metadata values."""
+
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings):
+        self.index = index
+        self.embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (score + 1) / 2
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        self.index.upsert(ids, vectors, [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)])
+        return ids
+
+    async def aadd_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = await self.embedding.aembed_documents(texts)
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        await asyncio.to_thread(self.index.upsert, ids, vectors, documents)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        return bool(self.index.delete(ids or []))
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.index.search(self.embedding.embed_query(query), k, _metadata_predicate(filter))
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = await self.embedding.aembed_query(query)
+        return await asyncio.to_thread(self.index.search, vector, k, _metadata_predicate(filter))
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.index.search(embedding, k, _metadata_predicate(filter))]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, path: Optional[str] = None, **kwargs: Any) -> 'LocalVectorStore':
+        store = cls(LocalVectorIndex(path=path, **kwargs), embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
@@ -0,0 +1,277 @@
+import io
+import os
+import json
+import time
+import asyncio
+import logging
+import importlib.util
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Parsed output crosses the process boundary as plain (text, metadata) pairs.
+ParsedPage = Tuple[str, Dict[str, Any]]
+
+PDF_EXTENSIONS = (".pdf",)
+DOCX_EXTENSIONS = (".docx",)
+JSON_EXTENSIONS = (".json",)
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+TEXT_EXTENSIONS = (".txt", ".md")
+
+
+def pdf_page_count(data: bytes) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+def parse_pdf_pages(data: bytes, start: int = 0, end: Optional[int] = None) -> List[ParsedPage]:
+    """Extracts pages [start, end) with the same text and metadata as PDFPlumberLoader."""
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        document_metadata = {key: value for key, value in pdf.metadata.items() if type(value) in (str, int)}
+        total_pages = len(pdf.pages)
+        pages = []
+        for page in pdf.pages[start:end]:
+            metadata = {"page": page.page_number - 1, "total_pages": total_pages, **document_metadata}
+            pages.append(((page.extract_text() or "") + "\n", metadata))
+            # pdfplumber caches every parsed layout object on the page; drop them as we go.
+            page.close()
+        return pages
+
+
+def parse_docx(data: bytes) -> List[ParsedPage]:
+    import docx2txt
+
+    return [(docx2txt.process(io.BytesIO(data)), {})]
+
+
+def parse_html(data: bytes) -> List[ParsedPage]:
+    from bs4 import BeautifulSoup
+
+    features = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+    soup = BeautifulSoup(data, features=features)
+    title = str(soup.title.string) if soup.title else ""
+    return [(soup.get_text(""), {"title": title})]
+
+
+def parse_json(data: bytes) -> List[ParsedPage]:
+    """One document per top-level array element (or object value), like JSONLoader with '.[*]'."""
+    content = json.loads(data)
+    items = content.values() if isinstance(content, dict) else content if isinstance(content, list) else [content]
+    parsed = []
+    for seq_num, item in enumerate(items, start=1):
+        if isinstance(item, str):
+            text = item
+        elif isinstance(item, dict):
+            text = json.dumps(item) if item else ""
+        else:
+            text = str(item) if item is not None else ""
+        parsed.append((text, {"seq_num": seq_num}))
+    return parsed
+
+
+def parse_text(data: bytes) -> List[ParsedPage]:
+    try:
+        return [(data.decode("utf-8"), {})]
+    except UnicodeDecodeError:
+        pass
+    try:
+        import chardet
+
+        encoding = chardet.detect(data).get("encoding")
+        if encoding:
+            return [(data.decode(encoding), {})]
+    except (ImportError, LookupError, UnicodeDecodeError):
+        pass
+    return [(data.decode("utf-8", errors="replace"), {})]
+
+
+PARSERS: Dict[Tuple[str, ...], Callable[[bytes], List[ParsedPage]]] = {
+    DOCX_EXTENSIONS: parse_docx,
+    JSON_EXTENSIONS: parse_json,
+    HTML_EXTENSIONS: parse_html,
+    TEXT_EXTENSIONS: parse_text,
+}
+
+
+def _noop(_: int = 0) -> int:
+    return os.getpid()
+
+
+@dataclass
+class DocumentParserConfig:
+    """Process-pool parsing settings; 0 processes parses in a thread instead."""
+    processes: int = min(4, os.cpu_count() or 1)
+    # PDFs with at least this many pages are parsed in page ranges, in parallel.
+    pdf_split_min_pages: int = 24
+    pdf_pages_per_task: int = 8
+    # "spawn"/"forkserver" re-import the entry-point module in every worker, which runs
+    # main.py's global initialization again, so workers are forked where possible.
+    start_method: str = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+    @classmethod
+    def from_env(cls) -> 'DocumentParserConfig':
+        defaults = cls()
+        return cls(
+            processes=int(os.getenv("PARSER_PROCESSES", defaults.processes)),
+            pdf_split_min_pages=int(os.getenv("PARSER_PDF_SPLIT_MIN_PAGES", defaults.pdf_split_min_pages)),
+            pdf_pages_per_task=int(os.getenv("PARSER_PDF_PAGES_PER_TASK", defaults.pdf_pages_per_task)),
+            start_method=os.getenv("PARSER_START_METHOD", defaults.start_method),
+        )
+
+
+class DocumentParser:
+    """
+    Parses uploaded files straight from their bytes in a bounded process pool, so
+    CPU-bound PDF parsing never holds the event loop's GIL. Large PDFs are split into
+    page ranges that are parsed in parallel and reassembled in page order.
+
+    Call warm_up() early, before the server starts its thread pools, so the workers are
+    forked from a quiet process and the first upload does not pay for start-up. If the
+    pool breaks, parsing falls back to a thread and the pool is rebuilt on next use.
+    """
+
+    def __init__(self, config: Optional[DocumentParserConfig] = None):
+        self.config = config or DocumentParserConfig()
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.pages_parsed = 0
+        self.parse_seconds = 0.0
+
+    @staticmethod
+    def supports(filename: str) -> bool:
+        extension = os.path.splitext(filename)[1].lower()
+        return extension in PDF_EXTENSIONS or any(extension in extensions for extensions in PARSERS)
+
+    def _get_pool(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        if self.config.processes <= 0:
+            return None
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.config.processes,
+                mp_context=multiprocessing.get_context(self.config.start_method),
+            )
+        return self._pool
+
+    def warm_up(self) -> 'DocumentParser':
+        """Starts every worker now so the first upload does not pay for process start-up."""
+        pool = self._get_pool()
+        if pool is not None:
+            list(pool.map(_noop, range(self.config.processes)))
+        return self
+
+    async def _run(self, function: Callable, *args):
+        pool = self._get_pool()
+        if pool is None:
+            return await asyncio.to_thread(function, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, function, *args)
+        except BrokenProcessPool:
+            logger.error("Document parser process pool broke; parsing in a thread and restarting the pool.")
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            return await asyncio.to_thread(function, *args)
+
+    async def parse(self, data: bytes, filename: str) -> List[Document]:
+        """Parses one file into Documents tagged with `source=filename`."""
+        extension = os.path.splitext(filename)[1].lower()
+        start = time.perf_counter()
+        if extension in PDF_EXTENSIONS:
+            parsed = await self._parse_pdf(data)
+        else:
+            parser = self._parser_for(extension, filename)
+            if parser is None:
+                return []
+            parsed = await self._run(parser, data)
+        self._record(filename, len(parsed), time.perf_counter() - start)
+        return self._documents(parsed, filename)
+
+    async def iter_parse(self, data: bytes, filename: str) -> AsyncIterator[List[Document]]:
+        """
+        Yields a file's Documents in page order as soon as each page range is parsed, so
+        ingestion can start on the first pages of a large PDF while the rest is parsed.
+        At most `processes` ranges of one file are parsed ahead of the consumer.
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in PDF_EXTENSIONS:
+            documents = await self.parse(data, filename)
+            if documents:
+                yield documents
+            return
+        start = time.perf_counter()
+        total_pages = await self._run(pdf_page_count, data)
+        step = self.config.pdf_pages_per_task
+        in_flight: Deque[asyncio.Future] = deque()
+        try:
+            for first_page in range(0, total_pages, step):
+                in_flight.append(asyncio.ensure_future(self._run(parse_pdf_pages, data, first_page, min(first_page + step, total_pages))))
+                if len(in_flight) >= max(1, self.config.processes):
+                    yield self._documents(await in_flight.popleft(), filename)
+            while in_flight:
+                yield self._documents(await in_flight.popleft(), filename)
+        finally:
+            for future in in_flight:
+                future.cancel()
+        self._record(filename, total_pages, time.perf_counter() - start)
+
+    @staticmethod
+    def _parser_for(extension: str, filename: str) -> Optional[Callable[[bytes], List[ParsedPage]]]:
+        parser = next((parser for extensions, parser in PARSERS.items() if extension in extensions), None)
+        if parser is None:
+            logger.warning(f"No parser available for file extension {extension} of file {filename}")
+        return parser
+
+    @staticmethod
+    def _documents(parsed: List[ParsedPage], filename: str) -> List[Document]:
+        return [Document(page_content=text, metadata={"source": filename, **metadata}) for text, metadata in parsed]
+
+    def _record(self, filename: str, pages: int, elapsed: float):
+        self.pages_parsed += pages
+        self.parse_seconds += elapsed
+        logger.info(f"📄 Parsed {filename}: {pages} page(s) in {elapsed:.2f}s.")
+
+    async def _parse_pdf(self, data: bytes) -> List[ParsedPage]:
+        if self.config.processes <= 1:
+            return await self._run(parse_pdf_pages, data)
+        total_pages = await self._run(pdf_page_count, data)
+        if total_pages < self.config.pdf_split_min_pages:
+            return await self._run(parse_pdf_pages, data)
+        step = self.config.pdf_pages_per_task
+        ranges = await asyncio.gather(*(
+            self._run(parse_pdf_pages, data, start, min(start + step, total_pages))
+            for start in range(0, total_pages, step)
+        ))
+        return [page for pages in ranges for page in pages]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.config.processes,
+            "pages_parsed": self.pages_parsed,
+            "pages_per_second": round(self.pages_parsed / self.parse_seconds, 2) if self.parse_seconds else 0.0,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_document_parser: Optional[DocumentParser] = None
+
+
+def get_document_parser() -> DocumentParser:
+    """Returns the process-wide document parser."""
+    global _document_parser
+    if _document_parser is None:
+        _document_parser = DocumentParser(DocumentParserConfig.from_env())
+    return _document_parser
@@ -0,0 +1,141 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a retrieval query so that queries differing only in letter case,
+    punctuation, whitespace or Unicode presentation forms share a cache entry.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+@dataclass
+class RetrievalCacheConfig:
+    """Configuration for the per-session retrieval cache."""
+    enabled: bool = True
+    # Queries remembered per session, least recently used first out.
+    max_entries: int = 256
+
+    @classmethod
+    def from_env(cls) -> 'RetrievalCacheConfig':
+        """Create configuration from environment variables."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true",
+            max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", defaults.max_entries)),
+        )
+
+
+@dataclass
+class RetrievalCacheMetrics:
+    """Counters for retrieval cache lookups. `invalidations` counts corpus changes that emptied a cache."""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["hit_ratio"] = round(self.hit_ratio, 4)
+        return data
+
+
+class RetrievalCache:
+    """
+    Remembers which chunk ids a session's retriever returned for a normalized query,
+    so a repeated or trivially reworded question skips the query embedding, the
+    vector search and BM25 scoring.
+
+    Entries are tagged with the corpus version they were computed against. Any change
+    to the session's knowledge base bumps the version through invalidate(), which
+    empties the cache; an entry stored by a retrieval that raced with the change
+    carries the old version and is never served. Counters are kept per session and,
+    when `shared_metrics` is given, aggregated there for the whole process.
+    """
+
+    def __init__(self, config: Optional[RetrievalCacheConfig] = None, shared_metrics: Optional[RetrievalCacheMetrics] = None):
+        self.config = config or RetrievalCacheConfig()
+        self.metrics = RetrievalCacheMetrics()
+        self._shared_metrics = shared_metrics
+        self._entries: "OrderedDict[str, Tuple[int, List[str]]]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def version(self) -> int:
+        """The corpus version that new entries must be computed against."""
+        return self._version
+
+    def _count(self, name: str, amount: int = 1):
+        for metrics in (self.metrics, self._shared_metrics):
+            if metrics is not None:
+                setattr(metrics, name, getattr(metrics, name) + amount)
+
+    def get(self, query: str) -> Optional[List[str]]:
+        """Returns the cached chunk ids for `query`, or None on a miss."""
+        if not self.config.enabled:
+            return None
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._version:
+                self._count("misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count("hits")
+            return list(entry[1])
+
+    def put(self, query: str, chunk_ids: List[str], version: int):
+        """Stores the chunk ids retrieved for `query` against corpus `version`."""
+        if not self.config.enabled or self.config.max_entries < 1:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (version, list(chunk_ids))
+            self._entries.move_to_end(key)
+            self._count("stores")
+            while len(self._entries) > self.config.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def invalidate(self):
+        """Called whenever the session's corpus changes."""
+        with self._lock:
+            self._version += 1
+            if self._entries:
+                self._entries.clear()
+                self._count("invalidations")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "corpus_version": self._version, **self.metrics.as_dict()}
+
+
+_shared_metrics: Optional[RetrievalCacheMetrics] = None
+
+
+def get_retrieval_cache_metrics() -> RetrievalCacheMetrics:
+    """Returns the process-wide counters that every session's RetrievalCache also updates."""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = RetrievalCacheMetrics()
+    return _shared_metrics
@@ -0,0 +1,120 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from rag_toolkit.retrieval_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeculativeRetrievalConfig:
+    """Configuration for speculative knowledge-base retrieval."""
+    enabled: bool = True
+    # Minimum Jaccard similarity between the normalized words of the speculated query and
+    # of the model's retrieval query for the speculative result to be used in its place.
+    min_similarity: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> 'SpeculativeRetrievalConfig':
+        """Create configuration from environment variables."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "true").lower() == "true",
+            min_similarity=float(os.getenv("SPECULATIVE_RETRIEVAL_MIN_SIMILARITY", defaults.min_similarity)),
+        )
+
+
+@dataclass
+class SpeculativeRetrievalMetrics:
+    """
+    Outcomes of speculative retrievals. `used` ones answered the model's retrieval call,
+    `mismatched` ones were discarded because the model asked for something else, and
+    `unused` ones were not needed because the model did not retrieve at all.
+    """
+    started: int = 0
+    used: int = 0
+    mismatched: int = 0
+    unused: int = 0
+
+    @property
+    def use_ratio(self) -> float:
+        return self.used / self.started if self.started else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["use_ratio"] = round(self.use_ratio, 4)
+        return data
+
+
+def query_similarity(first: str, second: str) -> float:
+    """Jaccard similarity of the two queries' normalized words."""
+    first_words, second_words = set(normalize_query(first).split()), set(normalize_query(second).split())
+    if not first_words or not second_words:
+        return 0.0
+    return len(first_words & second_words) / len(first_words | second_words)
+
+
+class SpeculativeRetrieval:
+    """
+    One turn's speculative knowledge-base retrieval. The retrieval for the user's message
+    starts as a task as soon as the turn begins, in parallel with query planning and tool
+    selection; if the model then asks the knowledge base for (nearly) the same thing, the
+    running or finished task answers that call instead of a new retrieval. The first
+    claim decides the outcome; close() cancels an unclaimed task and records it as unused.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        retrieve: Callable[[str], Awaitable[str]],
+        config: Optional[SpeculativeRetrievalConfig] = None,
+        metrics: Optional[SpeculativeRetrievalMetrics] = None,
+    ):
+        self.query = query
+        self.config = config or SpeculativeRetrievalConfig()
+        self.metrics = metrics if metrics is not None else SpeculativeRetrievalMetrics()
+        self._task: Optional[asyncio.Task] = asyncio.create_task(retrieve(query))
+        self._outcome: Optional[str] = None
+        self.metrics.started += 1
+
+    def claim(self, requested_query: str) -> Optional[Awaitable[str]]:
+        """The speculative result for the model's retrieval call, or None to retrieve normally."""
+        if self._task is None or self._outcome is not None:
+            return None
+        if query_similarity(self.query, requested_query) < self.config.min_similarity:
+            self._finish("mismatched")
+            return None
+        task = self._task
+        self._finish("used")
+        logger.info(f"Using speculative retrieval for '{self.query}' to answer '{requested_query}'")
+        return task
+
+    def close(self):
+        """Called at the end of the turn."""
+        if self._outcome is None:
+            self._finish("unused")
+
+    def _finish(self, outcome: str):
+        self._outcome = outcome
+        setattr(self.metrics, outcome, getattr(self.metrics, outcome) + 1)
+        if outcome != "used" and self._task is not None:
+            if not self._task.done():
+                self._task.cancel()
+            elif not self._task.cancelled():
+                # Retrieve the exception, if any, so that it is not reported as never retrieved.
+                self._task.exception()
+            self._task = None
+
+
+_shared_metrics: Optional[SpeculativeRetrievalMetrics] = None
+
+
+def get_speculative_retrieval_metrics() -> SpeculativeRetrievalMetrics:
+    """Returns the process-wide speculative retrieval counters."""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = SpeculativeRetrievalMetrics()
+    return _shared_metrics
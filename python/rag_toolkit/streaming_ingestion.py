@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+_STAGE_DONE = object()
+
+
+@dataclass
+class StreamingIngestionConfig:
+    """Queue bounds and batching for the staged ingestion pipeline."""
+    # Page batches waiting to be chunked, and chunk batches waiting to be indexed.
+    queue_size: int = 8
+    # Most chunks handed to the indexer at once. Smaller batches are flushed whenever
+    # nothing else is waiting, so the first pages become searchable quickly.
+    index_batch_chunks: int = 256
+    # Files read and parsed at the same time.
+    file_concurrency: int = 4
+
+    @classmethod
+    def from_env(cls) -> 'StreamingIngestionConfig':
+        defaults = cls()
+        return cls(
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", defaults.queue_size)),
+            index_batch_chunks=int(os.getenv("INGEST_INDEX_BATCH_CHUNKS", defaults.index_batch_chunks)),
+            file_concurrency=int(os.getenv("INGEST_FILE_CONCURRENCY", defaults.file_concurrency)),
+        )
+
+
+@dataclass
+class IngestionProgress:
+    """Running totals for one ingestion; every progress event carries a snapshot."""
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    pages_parsed: int = 0
+    chunks_created: int = 0
+    duplicates_dropped: int = 0
+    chunks_indexed: int = 0
+    searchable: bool = False
+    seconds_to_searchable: Optional[float] = None
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["elapsed_seconds"] = round(self.elapsed_seconds, 3)
+        if self.seconds_to_searchable is not None:
+            data["seconds_to_searchable"] = round(self.seconds_to_searchable, 3)
+        return data
+
+
+class StreamingIngestion:
+    """
+    Ingests files through three stages connected by bounded queues:
+
+      load   - `load_pages(key)` yields each file's pages lazily, a batch at a time
+      chunk  - `chunk(pages)` splits a page batch into chunks
+      index  - `index(chunks)` embeds, upserts and makes a batch of chunks searchable
+
+    An optional `deduplicate(chunks)` runs in the index stage right before `index` and
+    returns the chunks worth indexing; whatever it drops is counted as duplicates_dropped.
+    When it drops a whole batch, `index` is not called for it.
+
+    Files are loaded concurrently and every stage works on the next batch while later
+    stages are busy, so the first pages of a large PDF are searchable long before its
+    last pages are parsed. The bounded queues apply back-pressure: a slow indexer
+    pauses parsing instead of buffering the whole upload in memory.
+
+    run() yields progress events (dicts with a "type" and the current totals). A file
+    that fails to load is reported and skipped; an indexing failure aborts the run.
+    """
+
+    def __init__(
+        self,
+        load_pages: Callable[[str], AsyncIterator[List[Document]]],
+        chunk: Callable[[List[Document]], Awaitable[List[Document]]],
+        index: Callable[[List[Document]], Awaitable[Any]],
+        config: Optional[StreamingIngestionConfig] = None,
+        deduplicate: Optional[Callable[[List[Document]], Awaitable[List[Document]]]] = None,
+    ):
+        self.load_pages = load_pages
+        self.chunk = chunk
+        self.index = index
+        self.deduplicate = deduplicate
+        self.config = config or StreamingIngestionConfig()
+
+    async def run(self, keys: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        progress = IngestionProgress(files_total=len(keys))
+        started = time.perf_counter()
+        events: asyncio.Queue = asyncio.Queue()
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.config.queue_size)
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.config.queue_size)
+        file_slots = asyncio.Semaphore(self.config.file_concurrency)
+
+        def emit(event_type: str, **details):
+            progress.elapsed_seconds = time.perf_counter() - started
+            events.put_nowait({"type": event_type, **details, **progress.as_dict()})
+
+        async def _load(key: str):
+            source = os.path.basename(key)
+            async with file_slots:
+                try:
+                    async for batch in self.load_pages(key):
+                        if batch:
+                            await pages.put(batch)
+                            progress.pages_parsed += len(batch)
+                            emit("pages_parsed", source=source, pages=len(batch))
+                    progress.files_done += 1
+                    emit("file_loaded", source=source)
+                except Exception as e:
+                    progress.files_failed += 1
+                    logger.error(f"Failed to load {key} for ingestion: {e}", exc_info=True)
+                    emit("file_failed", source=source, error=str(e))
+
+        async def _load_all():
+            await asyncio.gather(*(_load(key) for key in keys))
+            await pages.put(_STAGE_DONE)
+
+        async def _chunk():
+            while (batch := await pages.get()) is not _STAGE_DONE:
+                batch_chunks = await self.chunk(batch)
+                if batch_chunks:
+                    progress.chunks_created += len(batch_chunks)
+                    await chunks.put(batch_chunks)
+            await chunks.put(_STAGE_DONE)
+
+        async def _index():
+            # Flush a full batch, or whatever is pending once nothing else is waiting:
+            # small batches while the indexer keeps up, bigger ones when it falls behind.
+            pending: List[Document] = []
+            finished = False
+            while not finished:
+                item = await chunks.get()
+                while True:
+                    if item is _STAGE_DONE:
+                        finished = True
+                        break
+                    pending.extend(item)
+                    if len(pending) >= self.config.index_batch_chunks or chunks.empty():
+                        break
+                    item = chunks.get_nowait()
+                while len(pending) >= self.config.index_batch_chunks or (pending and (finished or chunks.empty())):
+                    batch, pending = pending[:self.config.index_batch_chunks], pending[self.config.index_batch_chunks:]
+                    if self.deduplicate is not None:
+                        unique = await self.deduplicate(batch)
+                        progress.duplicates_dropped += len(batch) - len(unique)
+                        batch = unique
+                        if not batch:
+                            continue
+                    await self.index(batch)
+                    progress.chunks_indexed += len(batch)
+                    if not progress.searchable:
+                        progress.searchable = True
+                        progress.seconds_to_searchable = time.perf_counter() - started
+                    emit("chunks_indexed", sources=sorted(_sources(batch)), chunks=len(batch))
+
+        stages = [asyncio.create_task(stage) for stage in (_load_all(), _chunk(), _index())]
+        pipeline = asyncio.gather(*stages)
+        event_task = None
+        try:
+            while True:
+                event_task = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({event_task, pipeline}, return_when=asyncio.FIRST_COMPLETED)
+                if event_task in done:
+                    yield event_task.result()
+                    continue
+                # Fail fast: a stage error cancels the other stages in the finally below.
+                pipeline.result()
+                while not events.empty():
+                    yield events.get_nowait()
+                break
+        finally:
+            for task in [event_task, *stages]:
+                if task is not None and not task.done():
+                    task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+
+        emit("done")
+        logger.info(
+            f"Streamed {progress.pages_parsed} pages from {progress.files_done}/{progress.files_total} files into "
+            f"{progress.chunks_indexed} indexed chunks ({progress.duplicates_dropped} near-duplicates dropped) in {progress.elapsed_seconds:.2f}s "
+            f"(searchable after {progress.seconds_to_searchable or 0.0:.2f}s)."
+        )
+        yield events.get_nowait()
+
+
+def _sources(documents: List[Document]) -> Set[str]:
+    return {str(doc.metadata.get("source", "")) for doc in documents}
@@ -0,0 +1,136 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+# Harakat (fathatan..sukun), superscript alef, Quranic annotation marks and tatweel.
+_ARABIC_IGNORED = [*range(0x0610, 0x061B), *range(0x064B, 0x0660), 0x0670, *range(0x06D6, 0x06EE), 0x0640]
+_ARABIC_CHAR = re.compile("[\u0600-\u06FF]")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_ARABIC_NORMALIZATION = str.maketrans({
+    **dict.fromkeys(map(chr, _ARABIC_IGNORED)),
+    "آ": "ا",  # alef with madda above -> alef
+    "أ": "ا",  # alef with hamza above -> alef
+    "إ": "ا",  # alef with hamza below -> alef
+    "ٱ": "ا",  # alef wasla -> alef
+    "ى": "ي",  # alef maksura -> yeh
+    "ة": "ه",  # teh marbuta -> heh
+    "ؤ": "ء",  # waw with hamza -> hamza
+    "ئ": "ء",  # yeh with hamza -> hamza
+})
+
+# Light10-style affixes, longest first. Prefixes are only stripped when a stem of at
+# least two letters remains, suffixes when at least two remain.
+_ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_ARABIC_SUFFIXES = (
+    "ها", "ان", "ات", "ون", "ين",
+    "يه", "ه", "ي",
+)
+
+_ENGLISH_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+_ARABIC_STOPWORDS = frozenset(
+    "في من علي الي عن مع هذا هذه ذلك التي الذي ان كان و".split()
+)
+
+
+def normalize_arabic(text: str) -> str:
+    """Strips diacritics and tatweel and folds alef, yeh, teh marbuta and hamza variants."""
+    return text.translate(_ARABIC_NORMALIZATION)
+
+
+def arabic_light_stem(token: str) -> str:
+    """Light stemming: removes one common prefix (and a leading waw) and common suffixes."""
+    if len(token) > 3 and token.startswith("و"):
+        token = token[1:]
+    for prefix in _ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            token = token[len(prefix):]
+            break
+    for suffix in _ARABIC_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[:-len(suffix)]
+    return token
+
+
+def english_light_stem(token: str) -> str:
+    """Folds the most common English plural forms (an extended S-stemmer)."""
+    if len(token) > 4 and token.endswith("ies") and not token.endswith(("eies", "aies")):
+        return token[:-3] + "y"
+    if token.endswith("sses"):
+        return token[:-2]
+    if len(token) > 4 and token.endswith(("ches", "shes", "xes", "zes", "oes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+# Term folding is memoized per token: a corpus repeats a small vocabulary many times over.
+@lru_cache(maxsize=262_144)
+def _arabic_term(token: str, stem: bool, remove_stopwords: bool) -> Optional[str]:
+    if remove_stopwords and token in _ARABIC_STOPWORDS:
+        return None
+    return arabic_light_stem(token) if stem else token
+
+
+@lru_cache(maxsize=262_144)
+def _multilingual_term(token: str, stem: bool, remove_stopwords: bool) -> Optional[str]:
+    if _ARABIC_CHAR.search(token):
+        return _arabic_term(token, stem, remove_stopwords)
+    if remove_stopwords and token in _ENGLISH_STOPWORDS:
+        return None
+    return english_light_stem(token) if stem else token
+
+
+class SimpleTokenizer:
+    """Lower-cased word tokens; punctuation is dropped."""
+    name = "simple"
+
+    def __call__(self, text: str) -> List[str]:
+        return _TOKEN.findall(text.lower())
+
+
+class ArabicTokenizer:
+    """Normalized, optionally light-stemmed Arabic tokens; other scripts are lower-cased."""
+    name = "arabic"
+
+    def __init__(self, stem: bool = True, remove_stopwords: bool = True):
+        self.stem = stem
+        self.remove_stopwords = remove_stopwords
+
+    def __call__(self, text: str) -> List[str]:
+        terms = (_arabic_term(token, self.stem, self.remove_stopwords) for token in _TOKEN.findall(normalize_arabic(text).lower()))
+        return [term for term in terms if term]
+
+
+class MultilingualTokenizer:
+    """
+    Arabic + English tokenizer: each token is normalized and light-stemmed according to
+    its script, and common stopwords of both languages are dropped.
+    """
+    name = "multilingual"
+
+    def __init__(self, stem: bool = True, remove_stopwords: bool = True):
+        self.stem = stem
+        self.remove_stopwords = remove_stopwords
+
+    def __call__(self, text: str) -> List[str]:
+        terms = (_multilingual_term(token, self.stem, self.remove_stopwords) for token in _TOKEN.findall(normalize_arabic(text).lower()))
+        return [term for term in terms if term]
+
+
+TOKENIZERS: Dict[str, Callable[[], Callable[[str], List[str]]]] = {
+    "simple": SimpleTokenizer,
+    "arabic": ArabicTokenizer,
+    "multilingual": MultilingualTokenizer,
+}
+
+
+def get_tokenizer(name: str = "multilingual") -> Callable[[str], List[str]]:
+    """Returns a tokenizer by name: "simple", "arabic" or "multilingual"."""
+    try:
+        return TOKENIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown tokenizer '{name}'. Available: {', '.join(TOKENIZERS)}")
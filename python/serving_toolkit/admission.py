@@ -0,0 +1,245 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from enum import IntEnum
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower values are admitted first when a provider has queued requests."""
+    INTERACTIVE = 0
+    STANDARD = 1
+    BATCH = 2
+
+
+# Interactive, user-facing turns jump ahead of long-running generation jobs.
+ENDPOINT_PRIORITIES: Dict[str, Priority] = {
+    "/chatbot_endpoint": Priority.INTERACTIVE,
+    "/voice_chat_endpoint": Priority.INTERACTIVE,
+    "/voice_transcription_endpoint": Priority.INTERACTIVE,
+    "/voice_response_endpoint": Priority.INTERACTIVE,
+    "/ws/voice": Priority.INTERACTIVE,
+    "/chatbot_upload_endpoint": Priority.STANDARD,
+    "/assessment_endpoint": Priority.STANDARD,
+    "/image_generation_endpoint": Priority.STANDARD,
+    "/web_search_endpoint": Priority.STANDARD,
+    "/teaching_content_endpoint": Priority.BATCH,
+    "/presentation_endpoint": Priority.BATCH,
+    "/comics_stream_endpoint": Priority.BATCH,
+}
+
+# (max concurrent calls, max queued calls) per provider.
+DEFAULT_PROVIDER_LIMITS: Dict[str, tuple] = {
+    "openai": (32, 128),
+    "gemini": (16, 64),
+    "perplexity": (8, 32),
+    "slidespeak": (4, 16),
+    "heygen": (2, 8),
+}
+
+QUEUE_WAIT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a provider's queue is full and the request should be retried later."""
+    def __init__(self, provider: str, retry_after: int):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(f"The {provider} provider is at capacity. Retry after {retry_after}s.")
+
+
+@dataclass
+class ProviderLimits:
+    max_concurrency: int
+    max_queue_depth: int
+
+    @classmethod
+    def from_env(cls, provider: str, default: tuple) -> 'ProviderLimits':
+        """Reads PROVIDER_<NAME>_CONCURRENCY and PROVIDER_<NAME>_QUEUE_DEPTH, falling back to `default`."""
+        prefix = f"PROVIDER_{provider.upper()}"
+        return cls(
+            max_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", default[0])),
+            max_queue_depth=int(os.getenv(f"{prefix}_QUEUE_DEPTH", default[1])),
+        )
+
+
+@dataclass
+class QueueWaitHistogram:
+    """Cumulative histogram of time spent waiting for a provider slot."""
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(QUEUE_WAIT_BUCKETS_MS) + 1))
+
+    def observe(self, wait_ms: float):
+        self.count += 1
+        self.total_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+        for i, bound in enumerate(QUEUE_WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}ms" for bound in QUEUE_WAIT_BUCKETS_MS] + ["gt_10000ms"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class ProviderAdmission:
+    """A priority-aware concurrency limiter with a bounded wait queue for one provider."""
+
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self._in_flight = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._avg_hold_seconds = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_wait = QueueWaitHistogram()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: Priority = Priority.STANDARD):
+        """Waits for a slot, or raises AdmissionRejected immediately if the queue is full."""
+        if self._in_flight < self.limits.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            self._admit(0.0)
+            return
+
+        if len(self._waiters) >= self.limits.max_queue_depth:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after())
+
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = [int(priority), next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on.
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+        self._admit((time.monotonic() - enqueued_at) * 1000)
+
+    def release(self, held_seconds: Optional[float] = None):
+        """Frees a slot, handing it directly to the highest-priority waiter if there is one."""
+        if held_seconds is not None:
+            self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * held_seconds
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight = max(0, self._in_flight - 1)
+
+    def retry_after(self) -> int:
+        """Estimates how long until the current backlog drains, in whole seconds."""
+        backlog = (len(self._waiters) + 1) / max(1, self.limits.max_concurrency)
+        return int(min(60, max(1, math.ceil(self._avg_hold_seconds * backlog))))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.limits.max_concurrency,
+            "max_queue_depth": self.limits.max_queue_depth,
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_hold_seconds": round(self._avg_hold_seconds, 3),
+            "queue_wait": self.queue_wait.as_dict(),
+        }
+
+    def _admit(self, wait_ms: float):
+        self.admitted += 1
+        self.queue_wait.observe(wait_ms)
+
+
+class AdmissionLease:
+    """Holds slots on one or more providers; release() is idempotent."""
+
+    def __init__(self, providers: List[ProviderAdmission]):
+        self._providers = providers
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        held = time.monotonic() - self._acquired_at
+        for provider in reversed(self._providers):
+            provider.release(held)
+
+    async def __aenter__(self) -> 'AdmissionLease':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AdmissionController:
+    """Admission control for every upstream provider the API fans out to."""
+
+    def __init__(self, limits: Optional[Dict[str, ProviderLimits]] = None):
+        self.providers: Dict[str, ProviderAdmission] = {}
+        for name, default in DEFAULT_PROVIDER_LIMITS.items():
+            provider_limits = (limits or {}).get(name) or ProviderLimits.from_env(name, default)
+            self.providers[name] = ProviderAdmission(name, provider_limits)
+
+    @staticmethod
+    def priority_for(endpoint: str) -> Priority:
+        return ENDPOINT_PRIORITIES.get(endpoint, Priority.STANDARD)
+
+    async def acquire(self, providers: Iterable[str], priority: Priority = Priority.STANDARD) -> AdmissionLease:
+        """
+        Acquires a slot on each provider and returns a lease to release them.
+        Providers are always acquired in the same order so concurrent requests
+        needing several providers cannot hold each other up.
+        """
+        acquired: List[ProviderAdmission] = []
+        try:
+            for name in sorted(set(providers)):
+                provider = self.providers[name]
+                await provider.acquire(priority)
+                acquired.append(provider)
+        except BaseException:
+            for provider in reversed(acquired):
+                provider.release()
+            raise
+        return AdmissionLease(acquired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+
+_default_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Returns the process-wide AdmissionController."""
+    global _default_controller
+    if _default_controller is None:
+        _default_controller = AdmissionController()
+    return _default_controller
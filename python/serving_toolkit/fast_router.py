@@ -0,0 +1,225 @@
+import os
+import re
+import zlib
+import logging
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GREETING = "greeting"
+FILLER = "filler"
+IMAGE = "image"
+OTHER = "other"
+LABELS = (GREETING, FILLER, IMAGE, OTHER)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fast_router_model.npz")
+
+_GREETING_WORDS = frozenset({"hello", "hi", "hey", "greetings", "yo", "sup", "good morning", "good afternoon", "good evening"})
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+_ARABIC = re.compile(r"[؀-ۿ]")
+# Leading request phrasing removed to get the topic of an image request.
+_IMAGE_REQUEST_PREFIX = re.compile(
+    r"^(?:(?:please|pls|kindly|can you|could you|would you|i want you to|i need you to|i'd like you to|"
+    r"i want|i need|i'd like)\s+)*"
+    r"(?:draw|generate|create|make|sketch|illustrate|design|produce|show me|give me)\s+"
+    r"(?:me\s+)?(?:an?\s+|the\s+|some\s+)?(?:simple\s+|detailed\s+|labeled\s+|labelled\s+|colou?rful\s+)?"
+    r"(?:diagram|chart|flowchart|flow chart|bar chart|pie chart|graph|infographic|illustration|image|picture|"
+    r"drawing|poster|mind map|visual|map)s?\s*(?:of|about|for|on|showing|that shows|explaining|to explain)?\s*",
+    re.IGNORECASE,
+)
+_VISUAL_TYPES = (
+    ("flow chart", "flowchart"), ("flowchart", "flowchart"), ("bar chart", "bar chart"), ("pie chart", "pie chart"),
+    ("mind map", "mind map"), ("infographic", "infographic"), ("chart", "chart"), ("graph", "chart"),
+    ("poster", "poster"), ("illustration", "illustration"), ("picture", "illustration"), ("image", "illustration"),
+    ("مخطط", "chart"), ("رسم بياني", "chart"), ("خريطة ذهنية", "mind map"), ("صورة", "illustration"),
+)
+
+
+def normalize_text(text: str) -> str:
+    """Case-folds, applies NFKC and collapses punctuation and whitespace."""
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+def hashed_features(text: str, n_features: int) -> Dict[int, float]:
+    """
+    L2-normalized hashed bag of word unigrams, word bigrams and character trigrams.
+    CRC32 is used instead of hash(), which is salted per process.
+    """
+    normalized = normalize_text(text)
+    words = normalized.split()
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    padded = f" {normalized} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    features: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % n_features
+        features[index] = 1.0
+    norm = np.sqrt(len(features)) or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+
+def _matrix(texts: Sequence[str], n_features: int) -> np.ndarray:
+    matrix = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for index, value in hashed_features(text, n_features).items():
+            matrix[row, index] = value
+    return matrix
+
+
+class HashedNgramClassifier:
+    """Multinomial logistic regression over hashed n-gram features, trained and evaluated in NumPy."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: Sequence[str]):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = tuple(labels)
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[1]
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        features = hashed_features(text, self.n_features)
+        if features:
+            indices = np.fromiter(features.keys(), dtype=np.int64)
+            values = np.fromiter(features.values(), dtype=np.float32)
+            logits = self.weights[:, indices] @ values + self.bias
+        else:
+            logits = self.bias.copy()
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        return dict(zip(self.labels, probabilities.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self.predict_proba(text)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        n_features: int = 4096,
+        epochs: int = 400,
+        learning_rate: float = 20.0,
+        l2: float = 1e-4,
+    ) -> 'HashedNgramClassifier':
+        """Full-batch gradient descent on the softmax cross-entropy; deterministic for the same data."""
+        label_names = tuple(label for label in LABELS if label in set(labels))
+        x = _matrix(texts, n_features)
+        y = np.zeros((len(texts), len(label_names)), dtype=np.float32)
+        y[np.arange(len(texts)), [label_names.index(label) for label in labels]] = 1.0
+        weights = np.zeros((len(label_names), n_features), dtype=np.float32)
+        bias = np.zeros(len(label_names), dtype=np.float32)
+        for _ in range(epochs):
+            logits = x @ weights.T + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            error = (probabilities - y) / len(texts)
+            weights -= learning_rate * (error.T @ x + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(weights, bias, label_names)
+
+    def save(self, path: str):
+        np.savez_compressed(path, weights=self.weights.astype(np.float16), bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedNgramClassifier':
+        with np.load(path) as data:
+            return cls(data["weights"].astype(np.float32), data["bias"], [str(label) for label in data["labels"]])
+
+
+@dataclass
+class FastRouterConfig:
+    """Configuration for the local fast-path router."""
+    enabled: bool = True
+    # Below this model confidence the query goes to the LLM router.
+    threshold: float = 0.9
+    # Longer messages always go to the LLM router.
+    max_words: int = 30
+    model_path: str = field(default_factory=lambda: DEFAULT_MODEL_PATH)
+
+    @classmethod
+    def from_env(cls) -> 'FastRouterConfig':
+        """Create configuration from environment variables."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true",
+            threshold=float(os.getenv("FAST_ROUTER_THRESHOLD", defaults.threshold)),
+            max_words=int(os.getenv("FAST_ROUTER_MAX_WORDS", defaults.max_words)),
+            model_path=os.getenv("FAST_ROUTER_MODEL_PATH", defaults.model_path),
+        )
+
+
+@dataclass
+class FastRoute:
+    label: str
+    confidence: float
+    # "keyword" or "model"
+    source: str
+
+
+class FastRouter:
+    """
+    Local classification in front of the LLM router. Greetings, conversational fillers
+    and unambiguous image requests are recognized without an LLM call: first by exact
+    match against the keyword list, then by the hashed n-gram classifier shipped with the
+    package. Anything else, or anything the classifier is not confident about, returns
+    None and takes the LLM path. A missing or unreadable model leaves only the keywords.
+    """
+
+    def __init__(self, config: Optional[FastRouterConfig] = None, keywords: Iterable[str] = ()):
+        self.config = config or FastRouterConfig()
+        self.keywords = frozenset(normalize_text(keyword) for keyword in keywords)
+        self.classifier: Optional[HashedNgramClassifier] = None
+        if self.config.enabled and self.config.model_path:
+            try:
+                self.classifier = HashedNgramClassifier.load(self.config.model_path)
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Fast router model unavailable at {self.config.model_path}, using keywords only: {e}")
+
+    def is_short_response(self, query: str) -> bool:
+        return normalize_text(query) in self.keywords
+
+    def classify(self, query: str) -> Optional[FastRoute]:
+        """The fast route for `query`, or None when the LLM router should decide."""
+        if not self.config.enabled:
+            return None
+        normalized = normalize_text(query)
+        if normalized in self.keywords:
+            return FastRoute(GREETING if normalized in _GREETING_WORDS else FILLER, 1.0, "keyword")
+        if self.classifier is None or not normalized:
+            return None
+        if len(normalized.split()) > self.config.max_words:
+            return None
+        label, confidence = self.classifier.predict(query)
+        if label == OTHER or confidence < self.config.threshold:
+            return None
+        return FastRoute(label, confidence, "model")
+
+
+def image_parameters_from_query(query: str) -> Dict[str, str]:
+    """
+    Image generation parameters for a request routed without the LLM. The prompt
+    enhancer in ImageGenerator infers subject and level from the topic.
+    """
+    text = query.strip().rstrip("?.!")
+    lowered = text.lower()
+    visual_type = next((name for keyword, name in _VISUAL_TYPES if keyword in lowered), "diagram")
+    topic = _IMAGE_REQUEST_PREFIX.sub("", text).strip() or text
+    return {
+        "topic": topic,
+        "grade_level": "not specified",
+        "preferred_visual_type": visual_type,
+        "subject": "general",
+        "language": "Arabic" if _ARABIC.search(text) else "English",
+        "instructions": query.strip(),
+        "difficulty_flag": "false",
+    }
@@ -0,0 +1,156 @@
+"""
+Trains the fast-path router's classifier (serving_toolkit/fast_router_model.npz).
+
+The training set is generated from English and Arabic templates: greetings,
+conversational fillers, explicit requests to draw or generate a visual, and "other"
+messages, including hard negatives that share words with the fast-path classes
+("explain the diagram in chapter 3", "thanks, now summarize the lesson",
+"create a quiz on fractions") and bare yes/no replies, which answer the tutor's last
+question and so need the history. Prints held-out accuracy and, at the configured
+threshold, how many messages are fast-pathed and how many of those are wrong. The
+held-out split is sampled from the same templates, so it measures fit rather than
+generalization to real traffic; the runtime threshold is the safety margin.
+
+Usage (from the python/ directory):
+    python -m serving_toolkit.fast_router_training --output serving_toolkit/fast_router_model.npz
+"""
+import random
+import argparse
+from typing import List, Tuple
+
+from serving_toolkit.fast_router import DEFAULT_MODEL_PATH, FILLER, GREETING, IMAGE, OTHER, HashedNgramClassifier
+
+TOPICS_EN = [
+    "the water cycle", "photosynthesis", "the solar system", "plant cells", "the human heart", "fractions",
+    "the french revolution", "volcanoes", "the food chain", "electric circuits", "the digestive system",
+    "states of matter", "the roman empire", "climate zones", "the nitrogen cycle", "newton's laws",
+    "the life cycle of a butterfly", "world war one", "long division", "the structure of an atom",
+    "student scores this term", "the rock cycle", "magnetism", "the parts of a flower",
+]
+TOPICS_AR = [
+    "دورة الماء", "البناء الضوئي", "المجموعة الشمسية", "الخلية النباتية", "قلب الإنسان", "الكسور",
+    "البراكين", "السلسلة الغذائية", "الدوائر الكهربائية", "الجهاز الهضمي", "حالات المادة", "الصخور",
+]
+
+GREETINGS = [
+    "hi", "hello", "hey", "hey there", "hello there", "hi there", "good morning", "good afternoon", "good evening",
+    "hello tutor", "hi assistant", "hey, how are you?", "hello! how are you today", "morning", "greetings",
+    "hi again", "hello again", "salam", "salaam", "assalamu alaikum", "السلام عليكم", "مرحبا", "أهلا",
+    "صباح الخير", "مساء الخير", "أهلا وسهلا", "مرحبا بك", "hiya", "howdy", "yo", "sup", "hey hey",
+]
+FILLERS = [
+    "ok", "okay", "ok thanks", "okay thank you", "thanks", "thank you", "thank you so much", "thanks a lot",
+    "many thanks", "great", "great thanks", "good", "cool", "nice", "awesome", "perfect", "perfect, thanks",
+    "got it", "got it thanks", "understood", "that helps", "that's helpful", "noted", "makes sense",
+    "that makes sense", "very good", "excellent", "wonderful", "amazing, thanks", "ok cool", "great job", "love it",
+    "شكرا", "شكرا جزيلا", "تمام", "ممتاز", "جميل", "فهمت", "رائع", "أحسنت", "مفهوم",
+]
+# Bare yes/no replies answer the tutor's last question ("Shall I search the web?"), so
+# they need the history and the tools: they are "other", not fillers.
+REPLIES = [
+    "yes", "yes please", "yep", "yeah", "sure", "sure, go ahead", "go ahead", "please do", "do it", "yes do it",
+    "fine", "alright", "all right", "sounds good", "no problem", "no", "no thanks", "nope", "not now",
+    "نعم", "نعم من فضلك", "حسنا", "أكيد", "لا", "لا شكرا",
+]
+IMAGE_VERBS = [
+    "draw", "generate", "create", "make", "sketch", "illustrate", "design", "show me", "can you draw",
+    "could you draw", "please draw", "please generate", "can you create", "could you make", "i want",
+    "i need", "please make", "can you generate", "give me",
+]
+VISUALS = [
+    "a diagram", "a labeled diagram", "a chart", "a bar chart", "a pie chart", "a flowchart", "an infographic",
+    "a picture", "an image", "an illustration", "a poster", "a mind map", "a simple diagram", "a graph",
+    "a drawing", "a visual",
+]
+IMAGE_LINKS = ["of", "about", "showing", "that shows", "explaining", "for", "on"]
+IMAGE_AR = [
+    "ارسم رسما توضيحيا عن {topic}", "ارسم مخططا يوضح {topic}", "أنشئ صورة عن {topic}", "صمم انفوجرافيك عن {topic}",
+    "اصنع رسما بيانيا عن {topic}", "ارسم خريطة ذهنية عن {topic}", "أريد صورة توضح {topic}",
+]
+OTHER_EN = [
+    "what is {topic}", "explain {topic}", "how does {topic} work", "can you explain {topic} simply",
+    "give me three facts about {topic}", "why is {topic} important", "summarize {topic} for grade 5",
+    "create a quiz about {topic}", "make a lesson plan on {topic}", "generate five questions on {topic}",
+    "create a worksheet about {topic}", "design an activity for {topic}", "write a summary of {topic}",
+    "explain the diagram of {topic} in the uploaded notes", "what does the chart about {topic} show",
+    "is the picture of {topic} in my slides accurate", "improve the diagram section of my lesson on {topic}",
+    "thanks, now explain {topic}", "ok so what about {topic}", "great, can you give an example of {topic}",
+    "hi, can you help me teach {topic}", "hello, what are common misconceptions about {topic}",
+    "how do i teach {topic} to struggling students", "which students need help with {topic}",
+    "compare {topic} and {other}", "what is the difference between {topic} and {other}",
+    "can you draw on the uploaded notes to explain {topic}", "list the key terms for {topic}",
+]
+OTHER_FIXED = [
+    "which students are struggling in math", "summarize the uploaded lesson plan", "improve this worksheet",
+    "can you improve this?", "what should i focus on next week", "how is the class doing in science",
+    "who has the lowest score", "translate this into arabic", "make it shorter", "add more examples",
+    "can you explain that again", "what do you mean", "why", "how", "tell me more", "continue",
+    "rewrite it for younger students", "what does the graph in chapter 3 show", "ok but why",
+    "thanks but that is wrong", "no that is not what i asked", "can you check the report for student a",
+    "ما هو {topic}", "اشرح {topic}", "كيف يعمل {topic}", "لماذا {topic} مهم", "لخص الدرس المرفوع",
+    "من هم الطلاب الضعفاء في الرياضيات", "اكتب اختبارا عن {topic}", "شكرا، الآن اشرح {topic}",
+]
+
+
+def generate_examples(per_class: int = 600, seed: int = 7) -> List[Tuple[str, str]]:
+    """Labelled (text, label) pairs from the templates, with case and punctuation noise."""
+    rng = random.Random(seed)
+
+    def noisy(text: str) -> str:
+        if rng.random() < 0.3:
+            text = text.capitalize()
+        if rng.random() < 0.3:
+            text += rng.choice(["!", ".", "?", "!!", " :)", " 🙂"])
+        return text
+
+    examples = []
+    for _ in range(per_class):
+        examples.append((noisy(rng.choice(GREETINGS)), GREETING))
+        examples.append((noisy(rng.choice(FILLERS)), FILLER))
+        if rng.random() < 0.8:
+            text = f"{rng.choice(IMAGE_VERBS)} {rng.choice(VISUALS)} {rng.choice(IMAGE_LINKS)} {rng.choice(TOPICS_EN)}"
+        else:
+            text = rng.choice(IMAGE_AR).format(topic=rng.choice(TOPICS_AR))
+        examples.append((noisy(text), IMAGE))
+        if rng.random() < 0.15:
+            examples.append((noisy(rng.choice(REPLIES)), OTHER))
+            continue
+        template = rng.choice(OTHER_EN + OTHER_FIXED)
+        topics = TOPICS_AR if any("؀" <= ch <= "ۿ" for ch in template) else TOPICS_EN
+        examples.append((noisy(template.format(topic=rng.choice(topics), other=rng.choice(topics))), OTHER))
+    rng.shuffle(examples)
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fast-path router classifier.")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="Where to write the model.")
+    parser.add_argument("--per-class", type=int, default=600, help="Generated examples per class.")
+    parser.add_argument("--n-features", type=int, default=4096, help="Hashed feature dimensions.")
+    parser.add_argument("--epochs", type=int, default=400, help="Gradient descent steps.")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Confidence threshold to report coverage at.")
+    parser.add_argument("--seed", type=int, default=7, help="Template sampling seed.")
+    args = parser.parse_args()
+
+    examples = generate_examples(args.per_class, args.seed)
+    split = int(len(examples) * 0.8)
+    train, held_out = examples[:split], examples[split:]
+    model = HashedNgramClassifier.train([text for text, _ in train], [label for _, label in train], args.n_features, args.epochs)
+
+    predictions = [(model.predict(text), label) for text, label in held_out]
+    accuracy = sum(predicted == label for (predicted, _), label in predictions) / len(predictions)
+    fast = [(predicted, label) for (predicted, confidence), label in predictions if predicted != OTHER and confidence >= args.threshold]
+    wrong = sum(predicted != label for predicted, label in fast)
+    fast_path_classes = sum(label != OTHER for _, label in held_out)
+    print(f"{len(train)} training / {len(held_out)} held-out examples, accuracy {accuracy:.3f}")
+    print(
+        f"at threshold {args.threshold}: {len(fast)}/{fast_path_classes} greetings, fillers and image requests fast-pathed, "
+        f"{wrong} misrouted"
+    )
+
+    model.save(args.output)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import asyncio
+import logging
+import threading
+import contextvars
+import concurrent.futures
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default number of worker threads per provider. Blocking SDK calls for a provider
+# can only ever occupy that provider's threads, so a burst of slow image requests
+# cannot starve transcription, SlideSpeak polling or anything else.
+DEFAULT_PROVIDER_WORKERS: Dict[str, int] = {
+    "openai": 16,
+    "gemini": 8,
+    "perplexity": 8,
+    "slidespeak": 4,
+    "heygen": 2,
+    "default": 4,
+}
+
+_STREAM_DONE = object()
+
+
+class ProviderExecutor:
+    """
+    Runs blocking provider calls off the event loop on bounded, per-provider thread pools.
+
+    Pool sizes default to DEFAULT_PROVIDER_WORKERS and can be overridden per provider
+    with PROVIDER_<NAME>_MAX_WORKERS (e.g. PROVIDER_OPENAI_MAX_WORKERS=32).
+    Providers without a dedicated pool share the "default" pool.
+    """
+
+    def __init__(self, max_workers: Optional[Dict[str, int]] = None):
+        self.max_workers = dict(DEFAULT_PROVIDER_WORKERS)
+        for provider in self.max_workers:
+            env_value = os.getenv(f"PROVIDER_{provider.upper()}_MAX_WORKERS")
+            if env_value:
+                self.max_workers[provider] = int(env_value)
+        if max_workers:
+            self.max_workers.update(max_workers)
+        self._executors: Dict[str, concurrent.futures.ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def executor_for(self, provider: str) -> concurrent.futures.ThreadPoolExecutor:
+        """Returns the thread pool dedicated to `provider`, creating it on first use."""
+        if provider not in self.max_workers:
+            provider = "default"
+        executor = self._executors.get(provider)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(provider)
+                if executor is None:
+                    executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_workers[provider],
+                        thread_name_prefix=f"provider-{provider}"
+                    )
+                    self._executors[provider] = executor
+        return executor
+
+    async def run(self, provider: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a blocking provider call on the provider's pool and awaits its result."""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = partial(ctx.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor_for(provider), call)
+
+    async def iterate(self, provider: str, make_iterable: Callable[[], Iterable[Any]], max_buffered: int = 64) -> AsyncIterator[Any]:
+        """
+        Consumes a blocking (synchronous) stream on the provider's pool and yields its
+        items on the event loop as they arrive. `make_iterable` is called on the worker
+        thread so that creating the stream (which often opens the connection) does not
+        block either. If the consumer stops early, the worker stops pulling items.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+        cancelled = threading.Event()
+
+        def _put(item):
+            # Blocks the worker (not the loop) while the consumer is behind.
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            future.result()
+
+        def _produce():
+            try:
+                for item in make_iterable():
+                    if cancelled.is_set():
+                        break
+                    _put(item)
+            except BaseException as e:
+                if not cancelled.is_set():
+                    _put(_StreamError(e))
+                return
+            if not cancelled.is_set():
+                _put(_STREAM_DONE)
+
+        producer = loop.run_in_executor(self.executor_for(provider), contextvars.copy_context().run, _produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_DONE:
+                    break
+                if isinstance(item, _StreamError):
+                    raise item.error
+                yield item
+        finally:
+            cancelled.set()
+            # Unblock a producer that is waiting on a full queue.
+            while not queue.empty():
+                queue.get_nowait()
+            if not producer.done():
+                producer.add_done_callback(lambda f: f.exception())
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the pool size and current backlog of every provider pool in use."""
+        return {
+            provider: {
+                "max_workers": self.max_workers[provider],
+                "queued": executor._work_queue.qsize(),
+            }
+            for provider, executor in self._executors.items()
+        }
+
+    def shutdown(self, wait: bool = False):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
+        self._executors.clear()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_default_executor: Optional[ProviderExecutor] = None
+
+
+def get_provider_executor() -> ProviderExecutor:
+    """Returns the process-wide ProviderExecutor."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = ProviderExecutor()
+    return _default_executor
@@ -0,0 +1,348 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long a generated response stays valid, per endpoint. Web search results go
+# stale quickly; generated lessons and assessments do not.
+DEFAULT_ENDPOINT_TTLS: Dict[str, float] = {
+    "/assessment_endpoint": 24 * 3600,
+    "/teaching_content_endpoint": 24 * 3600,
+    "/presentation_endpoint": 6 * 3600,
+    "/web_search_endpoint": 3600,
+}
+
+# Request fields that control caching itself and never change the response.
+CACHE_CONTROL_FIELDS = frozenset({"force_refresh"})
+
+# Request fields that pick from a small set of values ("Grade 5", "Biology", "English"),
+# where letter case and spacing carry no meaning. Everything else (topics, instructions,
+# prompts) is free text and is hashed exactly as sent.
+CATEGORICAL_FIELDS = frozenset({
+    "grade", "grade_level", "subject", "language", "content_type", "assessment_type",
+    "question_types", "difficulty_level", "instructional_depth", "content_version",
+    "verbosity", "comprehension",
+})
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_category(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().casefold()
+    if isinstance(value, (list, tuple)):
+        return [_normalize_category(item) for item in value]
+    return value
+
+
+def normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalizes a request payload for the cache key: categorical fields ignore letter
+    case and whitespace, free-text fields are kept exactly, cache-control fields are dropped.
+    """
+    return {
+        str(key): _normalize_category(value) if key in CATEGORICAL_FIELDS else value
+        for key, value in payload.items()
+        if key not in CACHE_CONTROL_FIELDS
+    }
+
+
+def make_cache_key(endpoint: str, payload: Dict[str, Any], model: str) -> str:
+    """Builds the cache key for a request from its endpoint, normalized payload and model."""
+    material = json.dumps(
+        {"endpoint": endpoint, "model": model, "payload": normalize_payload(payload)},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Configuration for the response cache."""
+    enabled: bool = field(default_factory=lambda: os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true")
+    max_entries: int = field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")))
+    # Optional on-disk tier shared by all workers on the host; disabled when empty.
+    disk_path: Optional[str] = field(default_factory=lambda: os.getenv("RESPONSE_CACHE_DISK_PATH") or None)
+    default_ttl_seconds: float = field(default_factory=lambda: float(os.getenv("RESPONSE_CACHE_DEFAULT_TTL_SECONDS", "3600")))
+    endpoint_ttls: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCacheConfig':
+        """
+        Create configuration from environment variables. Per-endpoint TTLs can be
+        overridden with RESPONSE_CACHE_TTL_<ENDPOINT>, e.g. RESPONSE_CACHE_TTL_WEB_SEARCH_ENDPOINT=600.
+        """
+        config = cls()
+        for endpoint, ttl in DEFAULT_ENDPOINT_TTLS.items():
+            env_name = f"RESPONSE_CACHE_TTL_{endpoint.strip('/').upper()}"
+            config.endpoint_ttls[endpoint] = float(os.getenv(env_name, ttl))
+        return config
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.endpoint_ttls.get(endpoint, DEFAULT_ENDPOINT_TTLS.get(endpoint, self.default_ttl_seconds))
+
+
+@dataclass
+class ResponseCacheMetrics:
+    """Counters for one endpoint. `saved_seconds` is generation time not spent thanks to hits."""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    coalesced: int = 0
+    misses: int = 0
+    forced_refreshes: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits + self.coalesced
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["saved_seconds"] = round(self.saved_seconds, 2)
+        data["hits"] = self.hits
+        data["hit_ratio"] = round(self.hit_ratio, 4)
+        return data
+
+
+@dataclass
+class _CacheEntry:
+    endpoint: str
+    value: Any
+    expires_at: float
+    compute_seconds: float
+
+
+class _DiskTier:
+    """SQLite-backed second tier; survives restarts and is shared between workers on a host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " cache_key TEXT PRIMARY KEY,"
+                " endpoint TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " compute_seconds REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS response_cache_expiry ON response_cache (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[_CacheEntry]:
+        row = self._connect().execute(
+            "SELECT endpoint, value, expires_at, compute_seconds FROM response_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _CacheEntry(endpoint=row[0], value=json.loads(row[1]), expires_at=row[2], compute_seconds=row[3])
+
+    def put(self, key: str, entry: _CacheEntry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (cache_key, endpoint, value, expires_at, compute_seconds) VALUES (?, ?, ?, ?, ?)",
+                (key, entry.endpoint, json.dumps(entry.value, ensure_ascii=False), entry.expires_at, entry.compute_seconds)
+            )
+
+    def purge_expired(self, now: float):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+
+
+class ResponseCache:
+    """
+    Two-tier cache for the deterministic generation endpoints.
+
+    Responses are keyed on the endpoint, the model that produces them and the
+    normalized request payload. The in-memory tier is an LRU bounded by
+    `max_entries`; the optional disk tier (SQLite) lets workers on the same host
+    share results. Concurrent identical requests are coalesced so that only one
+    of them reaches the provider. Only successful (returned) results are cached.
+    """
+
+    def __init__(self, config: Optional[ResponseCacheConfig] = None, clock: Callable[[], float] = time.time):
+        self.config = config or ResponseCacheConfig.from_env()
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._metrics: Dict[str, ResponseCacheMetrics] = {}
+        self._disk: Optional[_DiskTier] = None
+        if self.config.enabled and self.config.disk_path:
+            try:
+                self._disk = _DiskTier(self.config.disk_path)
+                self._disk.purge_expired(self._clock())
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache disk tier disabled: {e}")
+
+    def metrics_for(self, endpoint: str) -> ResponseCacheMetrics:
+        metrics = self._metrics.get(endpoint)
+        if metrics is None:
+            metrics = self._metrics[endpoint] = ResponseCacheMetrics()
+        return metrics
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        model: str,
+        compute: Callable[[], Awaitable[Any]],
+        force_refresh: bool = False,
+    ) -> Any:
+        """
+        Returns the cached response for this request, or awaits `compute()` and caches
+        its result. With `force_refresh` the cache is bypassed but the fresh result is stored.
+        Results must be JSON-serializable when the disk tier is enabled.
+        """
+        if not self.config.enabled:
+            return await compute()
+
+        metrics = self.metrics_for(endpoint)
+        key = make_cache_key(endpoint, payload, model)
+
+        if force_refresh:
+            metrics.forced_refreshes += 1
+        else:
+            entry, tier = await self._lookup(key)
+            if entry is not None:
+                if tier == "memory":
+                    metrics.memory_hits += 1
+                else:
+                    metrics.disk_hits += 1
+                metrics.saved_seconds += entry.compute_seconds
+                return entry.value
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                try:
+                    value, compute_seconds = await asyncio.shield(in_flight)
+                except asyncio.CancelledError:
+                    if not in_flight.cancelled():
+                        raise
+                    # The request we were waiting on was cancelled; generate it ourselves.
+                else:
+                    metrics.coalesced += 1
+                    metrics.saved_seconds += compute_seconds
+                    return value
+
+        metrics.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            start = time.perf_counter()
+            value = await compute()
+            compute_seconds = time.perf_counter() - start
+        except Exception as e:
+            future.set_exception(e)
+            # Followers re-raise it; an unobserved failure must not be logged as "never retrieved".
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result((value, compute_seconds))
+            await self._store(key, endpoint, value, compute_seconds)
+            metrics.stores += 1
+            return value
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    async def _lookup(self, key: str) -> Tuple[Optional[_CacheEntry], Optional[str]]:
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry, "memory"
+            del self._entries[key]
+            self.metrics_for(entry.endpoint).expirations += 1
+
+        if self._disk is None:
+            return None, None
+        try:
+            entry = await asyncio.to_thread(self._disk.get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk read failed: {e}")
+            return None, None
+        if entry is None or entry.expires_at <= now:
+            return None, None
+        self._remember(key, entry)
+        return entry, "disk"
+
+    async def _store(self, key: str, endpoint: str, value: Any, compute_seconds: float):
+        entry = _CacheEntry(
+            endpoint=endpoint,
+            value=value,
+            expires_at=self._clock() + self.config.ttl_for(endpoint),
+            compute_seconds=compute_seconds,
+        )
+        self._remember(key, entry)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.put, key, entry)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"Response cache disk write failed for {endpoint}: {e}")
+
+    def _remember(self, key: str, entry: _CacheEntry):
+        if self.config.max_entries < 1:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.metrics_for(evicted.endpoint).evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config.enabled,
+            "size": len(self._entries),
+            "max_entries": self.config.max_entries,
+            "disk_tier": self._disk.path if self._disk else None,
+            "endpoints": {endpoint: metrics.as_dict() for endpoint, metrics in self._metrics.items()},
+        }
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide ResponseCache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
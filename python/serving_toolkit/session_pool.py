@@ -0,0 +1,348 @@
+import os
+import time
+import asyncio
+import logging
+import inspect
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# Called with (session_id, session, reason) whenever a session leaves the pool.
+EvictionHook = Callable[[str, Any, str], Union[Awaitable[None], None]]
+
+
+@dataclass
+class SessionPoolConfig:
+    """Configuration for the tutor session pool."""
+    max_size: int = field(default_factory=lambda: int(os.getenv("TUTOR_SESSION_POOL_MAX_SIZE", "256")))
+    idle_ttl_seconds: float = field(default_factory=lambda: float(os.getenv("TUTOR_SESSION_IDLE_TTL_SECONDS", "1800")))
+    reap_interval_seconds: float = field(default_factory=lambda: float(os.getenv("TUTOR_SESSION_REAP_INTERVAL_SECONDS", "60")))
+
+    @classmethod
+    def from_env(cls) -> 'SessionPoolConfig':
+        """Create configuration from environment variables."""
+        return cls()
+
+
+@dataclass
+class SessionPoolMetrics:
+    """Counters describing how the session pool is behaving under load."""
+    hits: int = 0
+    misses: int = 0
+    # Lookups that waited for a concurrent miss on the same session_id instead of creating.
+    coalesced: int = 0
+    evictions_lru: int = 0
+    evictions_idle: int = 0
+    evictions_explicit: int = 0
+    eviction_hook_errors: int = 0
+
+    @property
+    def evictions(self) -> int:
+        return self.evictions_lru + self.evictions_idle + self.evictions_explicit
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["evictions"] = self.evictions
+        data["hit_ratio"] = round(self.hit_ratio, 4)
+        return data
+
+
+@dataclass
+class _PoolEntry:
+    session: Any
+    last_used: float
+    # Requests currently using the session; a leased session is never evicted under them.
+    leases: int = 0
+    # Set when the session left the pool while leased; its hook runs on the last release.
+    retired: Optional[str] = None
+
+
+class SessionLease:
+    """A session pinned in the pool for the duration of a request; release() is idempotent."""
+
+    def __init__(self, pool: 'TutorSessionPool', session_id: str, entry: _PoolEntry):
+        self._pool = pool
+        self._session_id = session_id
+        self._entry = entry
+        self._released = False
+
+    @property
+    def session(self) -> Any:
+        return self._entry.session
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._session_id, self._entry)
+
+    async def __aenter__(self) -> 'SessionLease':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class TutorSessionPool:
+    """
+    A bounded pool of tutor sessions keyed by session_id.
+
+    Sessions are evicted least-recently-used first once `max_size` is reached,
+    and a background reaper drops any session that has been idle for longer than
+    `idle_ttl_seconds`. Every eviction goes through `on_evict`, which is where the
+    session's heavy resources (Qdrant collection, BM25 index, executors) are released.
+
+    Requests that use a session across awaits (e.g. a streamed answer) hold it with
+    acquire() / lease(). A leased session is skipped by LRU and idle eviction, so the
+    pool may briefly exceed `max_size` when every session is in use; a session removed
+    explicitly while leased runs its eviction hook when the last lease is released.
+
+    The factory (which may restore a session from Qdrant and rebuild its BM25 index)
+    runs outside the pool lock, so a slow creation never blocks lookups of other
+    sessions; concurrent misses for the same session_id share one creation.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Union[Awaitable[Any], Any]],
+        config: Optional[SessionPoolConfig] = None,
+        on_evict: Optional[EvictionHook] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config or SessionPoolConfig()
+        if self.config.max_size < 1:
+            raise ValueError("Session pool max_size must be at least 1.")
+        self._factory = factory
+        self._on_evict = on_evict
+        self._clock = clock
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._creating: Dict[str, asyncio.Future] = {}
+        self._pending_hooks: Set[asyncio.Task] = set()
+        self._reaper_task: Optional[asyncio.Task] = None
+        self.metrics = SessionPoolMetrics()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    async def get_or_create(self, session_id: str) -> Any:
+        """Returns the session for `session_id`, creating it through the factory on a miss."""
+        evicted = []
+        async with self._lock:
+            now = self._clock()
+            entry = self._entries.get(session_id)
+            if entry is not None and not self._is_expired(entry, now):
+                entry.last_used = now
+                self._entries.move_to_end(session_id)
+                self.metrics.hits += 1
+                return entry.session
+
+            if entry is not None:
+                # Expired but not yet reaped: treat it as a miss and retire the stale session.
+                del self._entries[session_id]
+                self.metrics.evictions_idle += 1
+                evicted.append((session_id, entry.session, "idle"))
+
+            pending = self._creating.get(session_id)
+            if pending is None:
+                self.metrics.misses += 1
+                pending = asyncio.get_running_loop().create_future()
+                self._creating[session_id] = pending
+                creating = True
+            else:
+                self.metrics.coalesced += 1
+                creating = False
+
+        for old_id, old_session, reason in evicted:
+            self._schedule_eviction_hook(old_id, old_session, reason)
+        if not creating:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request that was creating the session went away; try again.
+                return await self.get_or_create(session_id)
+        return await self._create(session_id, pending)
+
+    async def acquire(self, session_id: str) -> SessionLease:
+        """Returns the session for `session_id` (creating it on a miss), pinned until released."""
+        while True:
+            session = await self.get_or_create(session_id)
+            async with self._lock:
+                entry = self._entries.get(session_id)
+                if entry is not None and entry.session is session:
+                    entry.leases += 1
+                    entry.last_used = self._clock()
+                    return SessionLease(self, session_id, entry)
+            # Evicted between its lookup and the lease; look it up again.
+
+    @asynccontextmanager
+    async def lease(self, session_id: str) -> AsyncIterator[Any]:
+        """`async with pool.lease(session_id) as session:` keeps the session in the pool until the block exits."""
+        session_lease = await self.acquire(session_id)
+        try:
+            yield session_lease.session
+        finally:
+            session_lease.release()
+
+    def _release(self, session_id: str, entry: _PoolEntry):
+        entry.leases -= 1
+        entry.last_used = self._clock()
+        if entry.leases == 0 and entry.retired is not None:
+            self._schedule_eviction_hook(session_id, entry.session, entry.retired)
+
+    async def _create(self, session_id: str, pending: asyncio.Future) -> Any:
+        """Runs the factory outside the lock, then inserts the session and evicts LRU entries."""
+        try:
+            logger.info(f"Creating new AI Tutor session: {session_id}")
+            session = self._factory(session_id)
+            if inspect.isawaitable(session):
+                session = await session
+        except asyncio.CancelledError:
+            self._creating.pop(session_id, None)
+            pending.cancel()
+            raise
+        except Exception as e:
+            self._creating.pop(session_id, None)
+            pending.set_exception(e)
+            # Waiters re-raise it; this keeps the loop from logging it as never retrieved.
+            pending.exception()
+            raise
+
+        evicted = []
+        try:
+            async with self._lock:
+                while len(self._entries) >= self.config.max_size:
+                    old_id = next((key for key, entry in self._entries.items() if not entry.leases), None)
+                    if old_id is None:
+                        # Every session is serving a request; shrink back on a later insert.
+                        break
+                    old_entry = self._entries.pop(old_id)
+                    self.metrics.evictions_lru += 1
+                    evicted.append((old_id, old_entry.session, "lru"))
+                self._entries[session_id] = _PoolEntry(session=session, last_used=self._clock())
+                self._creating.pop(session_id, None)
+        except asyncio.CancelledError:
+            # Cancelled while waiting for the lock: release the session that was just built.
+            self._creating.pop(session_id, None)
+            pending.cancel()
+            self._schedule_eviction_hook(session_id, session, "cancelled")
+            raise
+        pending.set_result(session)
+
+        for old_id, old_session, reason in evicted:
+            self._schedule_eviction_hook(old_id, old_session, reason)
+        return session
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """Returns the session without touching its recency or the hit/miss counters."""
+        entry = self._entries.get(session_id)
+        return entry.session if entry else None
+
+    async def evict(self, session_id: str) -> bool:
+        """Explicitly removes a session from the pool and runs the eviction hook."""
+        async with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                return False
+            self.metrics.evictions_explicit += 1
+            if entry.leases:
+                entry.retired = "explicit"
+                return True
+        await self._run_eviction_hook(session_id, entry.session, "explicit")
+        return True
+
+    async def evict_idle(self) -> int:
+        """Removes every session that has been idle for longer than the TTL."""
+        evicted = []
+        async with self._lock:
+            now = self._clock()
+            for session_id, entry in list(self._entries.items()):
+                if self._is_expired(entry, now):
+                    del self._entries[session_id]
+                    self.metrics.evictions_idle += 1
+                    evicted.append((session_id, entry.session))
+        for session_id, session in evicted:
+            await self._run_eviction_hook(session_id, session, "idle")
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} idle tutor session(s). {len(self._entries)} remaining.")
+        return len(evicted)
+
+    async def close(self):
+        """Stops the reaper and evicts every remaining session, leased or not (the server is shutting down)."""
+        await self.stop_reaper()
+        async with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            self.metrics.evictions_explicit += len(entries)
+        for session_id, entry in entries:
+            await self._run_eviction_hook(session_id, entry.session, "shutdown")
+        if self._pending_hooks:
+            await asyncio.gather(*self._pending_hooks, return_exceptions=True)
+
+    def start_reaper(self):
+        """Starts the background task that periodically evicts idle sessions."""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_forever())
+
+    async def stop_reaper(self):
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns pool size, configuration and counters for the metrics endpoint."""
+        return {
+            "size": len(self._entries),
+            "leased": sum(1 for entry in self._entries.values() if entry.leases),
+            "max_size": self.config.max_size,
+            "idle_ttl_seconds": self.config.idle_ttl_seconds,
+            **self.metrics.as_dict(),
+        }
+
+    def _is_expired(self, entry: _PoolEntry, now: float) -> bool:
+        ttl = self.config.idle_ttl_seconds
+        return ttl > 0 and not entry.leases and (now - entry.last_used) > ttl
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(self.config.reap_interval_seconds)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error while reaping idle tutor sessions: {e}", exc_info=True)
+
+    def _schedule_eviction_hook(self, session_id: str, session: Any, reason: str):
+        # LRU evictions happen on the request path; releasing the old session's
+        # resources should not delay the request that caused the eviction.
+        task = asyncio.create_task(self._run_eviction_hook(session_id, session, reason))
+        self._pending_hooks.add(task)
+        task.add_done_callback(self._pending_hooks.discard)
+
+    async def _run_eviction_hook(self, session_id: str, session: Any, reason: str):
+        logger.info(f"Evicting tutor session '{session_id}' (reason: {reason}).")
+        if not self._on_evict:
+            return
+        try:
+            result = self._on_evict(session_id, session, reason)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self.metrics.eviction_hook_errors += 1
+            logger.error(f"Eviction hook failed for session '{session_id}': {e}", exc_info=True)
@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict, replace
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionRecord:
+    """
+    Everything a worker needs to rebuild a tutor session it has never seen. `version`
+    counts the writes made through `SessionStore.update`, which only lands a change if
+    nobody else wrote the record since it was read.
+    """
+    session_id: str
+    collection_name: str
+    ingested_files: List[str] = field(default_factory=list)
+    bm25_corpus_ref: Optional[str] = None
+    web_search_enabled: bool = False
+    last_active: float = field(default_factory=time.time)
+    version: int = 0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> 'SessionRecord':
+        return cls(**json.loads(data))
+
+
+class SessionStore(ABC):
+    """Interface for storing SessionRecords outside the worker process."""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        ...
+
+    @abstractmethod
+    async def put(self, record: SessionRecord):
+        """Overwrites the stored record unconditionally; use `update` to change a live session."""
+
+    @abstractmethod
+    async def get_or_create(self, record: SessionRecord) -> SessionRecord:
+        """Stores `record` unless the session already exists, and returns the stored record."""
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    async def compare_and_set(self, record: SessionRecord, expected_version: int) -> bool:
+        """
+        Stores `record` with version `expected_version + 1` if the stored record still has
+        `expected_version`; returns False (and writes nothing) if another writer got there first.
+        """
+
+    async def update(
+        self, session_id: str, mutate: Callable[[SessionRecord], None], max_attempts: int = 20
+    ) -> Optional[SessionRecord]:
+        """
+        Applies `mutate` to the stored record as an optimistic transaction: read, mutate,
+        compare-and-set, and start over from a fresh read if another worker wrote in between.
+        Returns the stored record, or None if the session does not exist.
+        """
+        for _ in range(max_attempts):
+            record = await self.get(session_id)
+            if record is None:
+                return None
+            expected_version = record.version
+            mutate(record)
+            record.last_active = time.time()
+            if await self.compare_and_set(record, expected_version):
+                record.version = expected_version + 1
+                return record
+        raise RuntimeError(f"Session '{session_id}' kept changing; gave up after {max_attempts} attempts.")
+
+    async def touch(self, session_id: str):
+        """Records activity on the session so other workers know it is still in use."""
+        await self.update(session_id, lambda record: None)
+
+    async def close(self):
+        pass
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SessionStore backed by a local SQLite file. Safe to share between uvicorn
+    workers on the same host (WAL mode); use RedisSessionStore across hosts.
+    """
+
+    def __init__(self, path: str = "tutor_session_data/sessions.sqlite3"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tutor_sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " record TEXT NOT NULL,"
+                " last_active REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; asyncio.to_thread may run us on any worker thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            self._local.conn = conn
+        return conn
+
+    def _get(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._connect().execute(
+            "SELECT record FROM tutor_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return SessionRecord.from_json(row[0]) if row else None
+
+    def _put(self, record: SessionRecord):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tutor_sessions (session_id, record, last_active) VALUES (?, ?, ?)",
+                (record.session_id, record.to_json(), record.last_active)
+            )
+
+    def _get_or_create(self, record: SessionRecord) -> SessionRecord:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO tutor_sessions (session_id, record, last_active) VALUES (?, ?, ?)",
+                (record.session_id, record.to_json(), record.last_active)
+            )
+        return self._get(record.session_id)
+
+    def _compare_and_set(self, record: SessionRecord, expected_version: int) -> bool:
+        stored = replace(record, version=expected_version + 1)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tutor_sessions SET record = ?, last_active = ?"
+                " WHERE session_id = ? AND COALESCE(json_extract(record, '$.version'), 0) = ?",
+                (stored.to_json(), stored.last_active, record.session_id, expected_version)
+            )
+        return cursor.rowcount == 1
+
+    def _touch(self, session_id: str):
+        # A single UPDATE, so it cannot overwrite fields another worker changed meanwhile.
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tutor_sessions SET last_active = ?, record = json_set(record, '$.last_active', ?)"
+                " WHERE session_id = ?",
+                (now, now, session_id)
+            )
+
+    def _delete(self, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tutor_sessions WHERE session_id = ?", (session_id,))
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        return await asyncio.to_thread(self._get, session_id)
+
+    async def put(self, record: SessionRecord):
+        await asyncio.to_thread(self._put, record)
+
+    async def get_or_create(self, record: SessionRecord) -> SessionRecord:
+        return await asyncio.to_thread(self._get_or_create, record)
+
+    async def compare_and_set(self, record: SessionRecord, expected_version: int) -> bool:
+        return await asyncio.to_thread(self._compare_and_set, record, expected_version)
+
+    async def touch(self, session_id: str):
+        await asyncio.to_thread(self._touch, session_id)
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._delete, session_id)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    SessionStore backed by any Redis-compatible async client exposing
+    get / set(nx=, ex=) / delete, e.g. redis.asyncio.Redis or InMemoryRedis.
+    Compare-and-set holds a short per-session lock (SET NX EX) while it checks the version.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        key_prefix: str = "tutor_session:",
+        ttl_seconds: Optional[int] = None,
+        lock_seconds: int = 5
+    ):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisSessionStore':
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise ImportError("The 'redis' package is required for RedisSessionStore. Install it with 'pip install redis'.")
+        return cls(redis_asyncio.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        data = await self.client.get(self._key(session_id))
+        if data is None:
+            return None
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return SessionRecord.from_json(data)
+
+    async def put(self, record: SessionRecord):
+        await self.client.set(self._key(record.session_id), record.to_json(), ex=self.ttl_seconds)
+
+    async def get_or_create(self, record: SessionRecord) -> SessionRecord:
+        created = await self.client.set(self._key(record.session_id), record.to_json(), ex=self.ttl_seconds, nx=True)
+        if created:
+            return record
+        return await self.get(record.session_id) or record
+
+    async def compare_and_set(self, record: SessionRecord, expected_version: int) -> bool:
+        lock_key = f"{self._key(record.session_id)}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_seconds
+        while not await self.client.set(lock_key, token, ex=self.lock_seconds, nx=True):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.005)
+        try:
+            current = await self.get(record.session_id)
+            if current is None or current.version != expected_version:
+                return False
+            stored = replace(record, version=expected_version + 1)
+            await self.client.set(self._key(record.session_id), stored.to_json(), ex=self.ttl_seconds)
+            return True
+        finally:
+            holder = await self.client.get(lock_key)
+            if isinstance(holder, bytes):
+                holder = holder.decode("utf-8")
+            if holder == token:
+                await self.client.delete(lock_key)
+
+    async def delete(self, session_id: str):
+        await self.client.delete(self._key(session_id))
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class InMemoryRedis:
+    """A minimal in-process stand-in for redis.asyncio.Redis, for local runs and tests."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    def _live(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and self._live(key) is not None:
+            return False
+        self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+
+def create_session_store() -> SessionStore:
+    """
+    Builds the session store selected by TUTOR_SESSION_STORE ("sqlite" or "redis").
+    The Redis backend reads REDIS_URL; the SQLite backend reads TUTOR_SESSION_STORE_PATH.
+    """
+    backend = os.getenv("TUTOR_SESSION_STORE", "sqlite").lower()
+    if backend == "redis":
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        logger.info(f"Using Redis session store at {url}")
+        return RedisSessionStore.from_url(url)
+    path = os.getenv("TUTOR_SESSION_STORE_PATH", "tutor_session_data/sessions.sqlite3")
+    logger.info(f"Using SQLite session store at {path}")
+    return SQLiteSessionStore(path)
@@ -0,0 +1,175 @@
+"""
+AdmissionController: per-provider concurrency limits, the bounded wait queue (full
+queues reject with a retry hint), priority hand-off on release, cancellation, and
+multi-provider leases acquired in a fixed order.
+"""
+import asyncio
+
+import pytest
+
+from serving_toolkit.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    Priority,
+    ProviderAdmission,
+    ProviderLimits,
+    QueueWaitHistogram,
+)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _controller(concurrency: int = 1, queue_depth: int = 2) -> AdmissionController:
+    limits = ProviderLimits(max_concurrency=concurrency, max_queue_depth=queue_depth)
+    return AdmissionController({"openai": limits, "gemini": limits})
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        provider = ProviderAdmission("openai", ProviderLimits(max_concurrency=1, max_queue_depth=1))
+        await provider.acquire()
+        waiter = asyncio.create_task(provider.acquire())
+        await _settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await provider.acquire()
+        assert rejected.value.provider == "openai"
+        assert 1 <= rejected.value.retry_after <= 60
+
+        provider.release()
+        await waiter
+        provider.release()
+        return provider.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queued"], stats["admitted"], stats["rejected"]) == (0, 0, 2, 1)
+    assert stats["queue_wait"]["count"] == 2
+
+
+def test_release_hands_the_slot_to_the_highest_priority_waiter():
+    async def scenario():
+        provider = ProviderAdmission("openai", ProviderLimits(max_concurrency=1, max_queue_depth=10))
+        await provider.acquire()
+        order = []
+
+        async def request(name, priority):
+            await provider.acquire(priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(request(name, priority))
+            for name, priority in (("batch", Priority.BATCH), ("standard-1", Priority.STANDARD),
+                                   ("interactive", Priority.INTERACTIVE), ("standard-2", Priority.STANDARD))
+        ]
+        await _settle()
+        assert provider.queued == 4
+        for _ in tasks:
+            provider.release()
+            await _settle()
+        await asyncio.gather(*tasks)
+        # The slot handed to the last waiter is still held.
+        assert provider.stats()["in_flight"] == 1
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "standard-1", "standard-2", "batch"]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        provider = ProviderAdmission("openai", ProviderLimits(max_concurrency=1, max_queue_depth=1))
+        await provider.acquire()
+        waiter = asyncio.create_task(provider.acquire())
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert provider.queued == 0
+        # The queue has room again, and releasing the held slot frees it.
+        follower = asyncio.create_task(provider.acquire())
+        await _settle()
+        provider.release()
+        await follower
+        provider.release()
+        return provider.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_lease_releases_every_provider_once():
+    async def scenario():
+        controller = _controller(concurrency=1)
+        lease = await controller.acquire(["openai", "gemini", "openai"], Priority.INTERACTIVE)
+        assert controller.stats()["openai"]["in_flight"] == controller.stats()["gemini"]["in_flight"] == 1
+
+        lease.release()
+        lease.release()
+        async with await controller.acquire(["gemini"]):
+            held = controller.stats()["gemini"]["in_flight"]
+        return held, controller.stats()
+
+    held, stats = asyncio.run(scenario())
+    assert held == 1
+    assert stats["openai"]["in_flight"] == stats["gemini"]["in_flight"] == 0
+
+
+def test_partial_acquisition_is_rolled_back_on_rejection():
+    async def scenario():
+        controller = _controller(concurrency=1, queue_depth=0)
+        openai_lease = await controller.acquire(["openai"])
+        # "gemini" sorts first and is acquired before "openai" rejects.
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(["openai", "gemini"])
+        stats = controller.stats()
+        openai_lease.release()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["gemini"]["in_flight"] == 0
+    assert stats["openai"]["rejected"] == 1
+
+
+def test_opposite_provider_orders_do_not_deadlock():
+    async def scenario():
+        controller = _controller(concurrency=1, queue_depth=20)
+
+        async def request(providers):
+            lease = await controller.acquire(providers)
+            await asyncio.sleep(0)
+            lease.release()
+
+        await asyncio.wait_for(
+            asyncio.gather(*(request(["openai", "gemini"] if i % 2 else ["gemini", "openai"]) for i in range(20))),
+            timeout=5,
+        )
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["openai"]["admitted"] == stats["gemini"]["admitted"] == 20
+    assert stats["openai"]["in_flight"] == stats["gemini"]["in_flight"] == 0
+
+
+def test_priority_for_endpoints():
+    assert AdmissionController.priority_for("/chatbot_endpoint") == Priority.INTERACTIVE
+    assert AdmissionController.priority_for("/presentation_endpoint") == Priority.BATCH
+    assert AdmissionController.priority_for("/unknown") == Priority.STANDARD
+
+
+def test_provider_limits_from_env(monkeypatch):
+    monkeypatch.setenv("PROVIDER_HEYGEN_CONCURRENCY", "7")
+    limits = ProviderLimits.from_env("heygen", (2, 8))
+    assert (limits.max_concurrency, limits.max_queue_depth) == (7, 8)
+
+
+def test_queue_wait_histogram():
+    histogram = QueueWaitHistogram()
+    for wait_ms in (0.0, 7.0, 20000.0):
+        histogram.observe(wait_ms)
+
+    summary = histogram.as_dict()
+    assert summary["count"] == 3
+    assert summary["max_ms"] == 20000.0
+    assert (summary["buckets"]["le_5ms"], summary["buckets"]["le_10ms"], summary["buckets"]["gt_10000ms"]) == (1, 1, 1)
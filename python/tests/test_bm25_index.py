@@ -0,0 +1,118 @@
+"""
+BM25Index: incremental adds and removals (by id and by source), compaction of removed
+rows, and persistence without re-tokenizing.
+"""
+from langchain.schema import Document
+
+from rag_toolkit.bm25_index import BM25Index, BM25IndexRetriever
+from rag_toolkit.tokenizers import SimpleTokenizer
+
+
+def _chunk(text: str, source: str, number: int) -> Document:
+    return Document(page_content=text, metadata={"source": source, "chunk_id": f"{source}-{number}"})
+
+
+CHUNKS = [
+    _chunk("photosynthesis turns light energy into chemical energy", "biology.pdf", 0),
+    _chunk("mitochondria release energy through cellular respiration", "biology.pdf", 1),
+    _chunk("the french revolution began in 1789", "history.pdf", 0),
+    _chunk("napoleon crowned himself emperor in 1804", "history.pdf", 1),
+]
+
+
+def _ids(results) -> list:
+    return [document.metadata["chunk_id"] for document, _ in results]
+
+
+def test_search_ranks_matching_chunks():
+    index = BM25Index()
+    index.add_documents(CHUNKS)
+
+    assert len(index) == 4
+    assert index.sources == ["biology.pdf", "history.pdf"]
+    assert _ids(index.search("cellular respiration energy", k=2)) == ["biology.pdf-1", "biology.pdf-0"]
+    assert index.search("volcano", k=2) == []
+
+
+def test_adding_more_chunks_updates_the_statistics():
+    index = BM25Index()
+    index.add_documents(CHUNKS[:2])
+    assert _ids(index.search("revolution", k=5)) == []
+
+    index.add_documents(CHUNKS[2:])
+    assert _ids(index.search("revolution", k=5)) == ["history.pdf-0"]
+
+
+def test_re_adding_a_chunk_replaces_it():
+    index = BM25Index()
+    index.add_documents(CHUNKS)
+    index.add_documents([_chunk("the storming of the bastille", "history.pdf", 0)])
+
+    assert len(index) == 4
+    assert _ids(index.search("1789", k=5)) == []
+    assert _ids(index.search("bastille", k=5)) == ["history.pdf-0"]
+
+
+def test_remove_source_and_ids():
+    index = BM25Index()
+    index.add_documents(CHUNKS)
+
+    assert index.remove_source("history.pdf") == 2
+    assert index.remove_source("history.pdf") == 0
+    assert index.sources == ["biology.pdf"]
+    assert _ids(index.search("napoleon emperor", k=5)) == []
+
+    assert index.remove_ids(["biology.pdf-0", "missing"]) == 1
+    assert [doc.metadata["chunk_id"] for doc in index.documents()] == ["biology.pdf-1"]
+    assert index.get_documents(["biology.pdf-0", "biology.pdf-1"])[0] is None
+
+
+def test_results_survive_compaction():
+    index = BM25Index(compact_ratio=0.1)
+    filler = [_chunk(f"filler text number {i}", "filler.pdf", i) for i in range(20)]
+    index.add_documents(CHUNKS + filler)
+    index.search("energy")
+    index.remove_source("filler.pdf")
+
+    # The next search compacts the dead rows away and must still see the live ones.
+    assert _ids(index.search("energy", k=5)) == _ids(_fresh_index(CHUNKS).search("energy", k=5))
+    assert len(index) == 4
+    index.add_documents([_chunk("solar energy", "physics.pdf", 0)])
+    assert "physics.pdf-0" in _ids(index.search("solar", k=5))
+
+
+def _fresh_index(chunks) -> BM25Index:
+    index = BM25Index()
+    index.add_documents(chunks)
+    return index
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "bm25.json.gz")
+    index = _fresh_index(CHUNKS)
+    index.remove_ids(["history.pdf-1"])
+    index.save(path)
+
+    restored = BM25Index.load(path)
+
+    assert len(restored) == 3
+    assert restored.search("energy", k=5) == index.search("energy", k=5)
+
+
+def test_load_with_another_tokenizer_re_tokenizes(tmp_path):
+    path = str(tmp_path / "bm25.json.gz")
+    _fresh_index(CHUNKS).save(path)
+
+    # The default tokenizer drops stopwords such as "the"; the simple one keeps them.
+    restored = BM25Index.load(path, tokenizer=SimpleTokenizer())
+
+    assert restored.tokenizer_name == "simple"
+    assert _ids(restored.search("the", k=5)) == ["history.pdf-0"]
+
+
+def test_retriever_reads_the_shared_index():
+    index = _fresh_index(CHUNKS[:1])
+    retriever = BM25IndexRetriever(index=index, k=2)
+    index.add_documents(CHUNKS[1:])
+
+    assert [doc.metadata["chunk_id"] for doc in retriever.invoke("napoleon")] == ["history.pdf-1"]
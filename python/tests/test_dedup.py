@@ -0,0 +1,89 @@
+"""
+NearDuplicateIndex: matching, the match/commit split used by ingestion, and promotion
+of merged duplicates when the source that absorbed them is removed.
+"""
+import random
+
+from langchain.schema import Document
+
+from rag_toolkit.dedup import NearDuplicateIndex
+
+_VOCABULARY = ("photosynthesis light energy plants chlorophyll water carbon dioxide glucose oxygen leaf "
+               "cell membrane nucleus mitochondria protein enzyme reaction sunlight root stem").split()
+
+
+def _text(seed: int, words: int = 120) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _chunk(text: str, source: str, number: int) -> Document:
+    return Document(page_content=text, metadata={"source": source, "chunk_id": f"{source}-{number}"})
+
+
+def test_deduplicate_drops_near_duplicates_across_and_within_batches():
+    index = NearDuplicateIndex(threshold=0.8)
+    original = [_chunk(_text(seed), "a.pdf", seed) for seed in range(3)]
+    assert index.deduplicate(original) == original
+
+    repeated = [_chunk(_text(0), "b.pdf", 0), _chunk(_text(10), "b.pdf", 1), _chunk(_text(10), "b.pdf", 2)]
+    kept = index.deduplicate(repeated)
+
+    assert [doc.metadata["chunk_id"] for doc in kept] == ["b.pdf-1"]
+    assert index.merged_sources(original[0]) == ["b.pdf"]
+    assert index.stats.duplicates_dropped == 2
+
+
+def test_match_does_not_change_the_index_until_commit():
+    index = NearDuplicateIndex(threshold=0.8)
+    plan = index.match([_chunk(_text(1), "a.pdf", 0)])
+    assert len(plan.kept) == 1
+    assert len(index) == 0
+
+    # Indexing the batch failed, so the plan is never committed: the chunk is not a
+    # phantom that swallows the next upload of the same text.
+    retry = index.match([_chunk(_text(1), "b.pdf", 0)])
+    assert len(retry.kept) == 1
+    index.commit(retry)
+    assert len(index) == 1
+    assert not index.match([_chunk(_text(1), "c.pdf", 0)]).kept
+
+
+def test_remove_source_promotes_a_merged_duplicate():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.deduplicate([_chunk(_text(1), "a.pdf", 0)])
+    assert index.deduplicate([_chunk(_text(1), "b.pdf", 0)]) == []
+    assert index.deduplicate([_chunk(_text(1), "c.pdf", 0)]) == []
+
+    promoted = index.remove_source("a.pdf")
+
+    assert [doc.metadata["source"] for doc in promoted] == ["b.pdf"]
+    assert index.merged_sources(promoted[0]) == ["c.pdf"]
+    assert len(index) == 1
+
+
+def test_remove_source_forgets_its_merged_duplicates():
+    index = NearDuplicateIndex(threshold=0.8)
+    kept = _chunk(_text(1), "a.pdf", 0)
+    index.deduplicate([kept])
+    index.deduplicate([_chunk(_text(1), "b.pdf", 0)])
+
+    assert index.remove_source("b.pdf") == []
+    assert index.merged_sources(kept) == []
+    assert index.remove_source("a.pdf") == []
+    assert len(index) == 0
+
+
+def test_save_and_load_keep_the_merge_history(tmp_path):
+    index = NearDuplicateIndex(threshold=0.8)
+    kept = [_chunk(_text(1), "a.pdf", 0), _chunk(_text(2), "a.pdf", 1)]
+    index.deduplicate(kept)
+    index.deduplicate([_chunk(_text(1), "b.pdf", 0)])
+    path = str(tmp_path / "dedup.json.gz")
+    index.save(path)
+
+    restored = NearDuplicateIndex.load(path, kept)
+
+    assert len(restored) == 2
+    assert restored.merged_sources(kept[0]) == ["b.pdf"]
+    assert [doc.metadata["source"] for doc in restored.remove_source("a.pdf")] == ["b.pdf"]
@@ -0,0 +1,138 @@
+"""
+FastRouter: keyword matches, the classifier's confidence threshold (anything below it,
+labelled "other", or too long falls back to the LLM router), a missing model, and the
+parameters it derives for image requests.
+"""
+import numpy as np
+import pytest
+
+from serving_toolkit.fast_router import (
+    FILLER,
+    GREETING,
+    IMAGE,
+    OTHER,
+    FastRoute,
+    FastRouter,
+    FastRouterConfig,
+    HashedNgramClassifier,
+    hashed_features,
+    image_parameters_from_query,
+    normalize_text,
+)
+
+KEYWORDS = ["hello", "Thanks!", "ok"]
+
+
+class FixedClassifier:
+    """Predicts the same label and confidence for every message."""
+
+    def __init__(self, label: str, confidence: float):
+        self.label = label
+        self.confidence = confidence
+        self.calls = []
+
+    def predict(self, text: str):
+        self.calls.append(text)
+        return self.label, self.confidence
+
+
+def _router(classifier=None, **config) -> FastRouter:
+    router = FastRouter(FastRouterConfig(model_path="", **config), keywords=KEYWORDS)
+    router.classifier = classifier
+    return router
+
+
+def test_normalize_text():
+    assert normalize_text("  ＨＥＬＬＯ!!  ") == "hello"
+    assert normalize_text("Thanks,\ttutor.") == "thanks tutor"
+
+
+def test_hashed_features_are_l2_normalized_and_stable():
+    features = hashed_features("draw the water cycle", 512)
+    assert features == hashed_features("Draw the WATER cycle!", 512)
+    assert np.linalg.norm(list(features.values())) == pytest.approx(1.0)
+    assert hashed_features("", 512) == {}
+
+
+def test_keywords_route_without_the_classifier():
+    classifier = FixedClassifier(OTHER, 1.0)
+    router = _router(classifier)
+
+    assert router.classify("Hello!") == FastRoute(GREETING, 1.0, "keyword")
+    assert router.classify("thanks").label == FILLER
+    assert router.is_short_response("OK")
+    assert classifier.calls == []
+
+
+@pytest.mark.parametrize("label, confidence, expected", [
+    (IMAGE, 0.95, IMAGE),
+    (GREETING, 0.9, GREETING),
+    (IMAGE, 0.89, None),
+    (OTHER, 0.99, None),
+])
+def test_threshold_falls_back_to_the_llm_router(label, confidence, expected):
+    route = _router(FixedClassifier(label, confidence), threshold=0.9).classify("draw the water cycle")
+
+    if expected is None:
+        assert route is None
+    else:
+        assert (route.label, route.confidence, route.source) == (expected, confidence, "model")
+
+
+def test_long_messages_and_empty_text_skip_the_classifier():
+    classifier = FixedClassifier(IMAGE, 1.0)
+    router = _router(classifier, max_words=5)
+
+    assert router.classify("please draw me a picture of the water cycle") is None
+    assert router.classify("?!") is None
+    assert classifier.calls == []
+
+
+def test_disabled_router_routes_nothing():
+    router = _router(FixedClassifier(IMAGE, 1.0), enabled=False)
+    assert router.classify("hello") is None
+    assert router.classify("draw the water cycle") is None
+
+
+def test_missing_model_leaves_only_keywords(tmp_path):
+    router = FastRouter(FastRouterConfig(model_path=str(tmp_path / "missing.npz")), keywords=KEYWORDS)
+
+    assert router.classifier is None
+    assert router.classify("hello").source == "keyword"
+    assert router.classify("draw the water cycle") is None
+
+
+def test_shipped_model_routes_clear_cases_and_defers_the_rest():
+    router = FastRouter(FastRouterConfig(), keywords=KEYWORDS)
+    assert router.classifier is not None
+
+    assert router.classify("hello there").label == GREETING
+    assert router.classify("draw a diagram of the water cycle").label == IMAGE
+    assert router.classify("explain photosynthesis") is None
+    assert FastRouter(FastRouterConfig(threshold=1.01), keywords=KEYWORDS).classify("hello there") is None
+
+
+def test_train_save_and_load_round_trip(tmp_path):
+    texts = ["hi", "hello there", "thanks", "ok thank you", "draw a cell", "draw a volcano", "explain fractions", "what is a volcano"]
+    labels = [GREETING, GREETING, FILLER, FILLER, IMAGE, IMAGE, OTHER, OTHER]
+    classifier = HashedNgramClassifier.train(texts, labels, n_features=256, epochs=200)
+    path = str(tmp_path / "model.npz")
+    classifier.save(path)
+
+    restored = HashedNgramClassifier.load(path)
+
+    assert restored.labels == (GREETING, FILLER, IMAGE, OTHER)
+    assert [restored.predict(text)[0] for text in texts] == labels
+    probabilities = restored.predict_proba("draw a plant")
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert max(probabilities, key=probabilities.get) == IMAGE
+
+
+def test_image_parameters_from_query():
+    parameters = image_parameters_from_query("Can you draw a labeled diagram of the water cycle?")
+    assert parameters["topic"] == "the water cycle"
+    assert parameters["preferred_visual_type"] == "diagram"
+    assert parameters["language"] == "English"
+
+    assert image_parameters_from_query("make a pie chart of student scores")["preferred_visual_type"] == "pie chart"
+    assert image_parameters_from_query("ارسم مخطط دورة الماء")["language"] == "Arabic"
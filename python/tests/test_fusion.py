@@ -0,0 +1,148 @@
+"""
+Reciprocal rank fusion, maximal marginal relevance, and the FusionRetriever built on
+them (score threshold, near-copy suppression, BM25-only candidates, sync == async).
+"""
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_toolkit.bm25_index import BM25Index
+from rag_toolkit.fusion import FusionConfig, FusionRetriever, maximal_marginal_relevance, reciprocal_rank_fusion
+from rag_toolkit.local_vector_index import LocalVectorIndex
+
+VOCABULARY = ["photosynthesis", "light", "energy", "water", "cycle", "rain", "revolution", "napoleon"]
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """One dimension per vocabulary word, so similarities are easy to reason about."""
+
+    def embed_query(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(words.count(term)) for term in VOCABULARY]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60)
+
+    assert list(fused) == ["a", "c", "b"]
+    assert fused["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused["b"] == pytest.approx(1 / 62)
+    assert reciprocal_rank_fusion([]) == {}
+
+
+def _unit(*rows) -> np.ndarray:
+    matrix = np.asarray(rows, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_mmr_prefers_novel_rows_over_near_copies():
+    vectors = _unit([1, 0, 0], [0.99, 0.1, 0], [0, 1, 0])
+    relevance = np.array([1.0, 0.95, 0.6])
+
+    assert maximal_marginal_relevance(relevance, vectors, k=2, mmr_lambda=1.0) == [0, 1]
+    assert maximal_marginal_relevance(relevance, vectors, k=2, mmr_lambda=0.5) == [0, 2]
+
+
+def test_mmr_skips_redundant_rows_even_if_fewer_than_k_remain():
+    vectors = _unit([1, 0], [1, 0.01], [1, 0.02])
+
+    assert maximal_marginal_relevance(np.array([1.0, 0.9, 0.8]), vectors, k=3, max_redundancy=0.95) == [0]
+    assert maximal_marginal_relevance(np.array([]), np.zeros((0, 2)), k=3) == []
+
+
+CHUNKS = [
+    "photosynthesis light energy",
+    "photosynthesis light energy",  # a near-copy from another file
+    "light energy water",
+    "water cycle rain",
+    "revolution napoleon",
+]
+
+
+def _retriever(k: int = 3, hidden=(), **config):
+    embeddings = BagOfWordsEmbeddings()
+    documents = [
+        Document(page_content=text, metadata={"source": f"file{i}.pdf", "chunk_id": f"c{i}"})
+        for i, text in enumerate(CHUNKS)
+    ]
+    vectors = LocalVectorIndex()
+    vectors.upsert([doc.metadata["chunk_id"] for doc in documents], embeddings.embed_documents(CHUNKS), documents)
+    bm25 = BM25Index()
+    bm25.add_documents(documents)
+    searches, lookups = [], []
+
+    def search(query_vector, fetch_k):
+        searches.append(fetch_k)
+        hits = vectors.search(query_vector, fetch_k, predicate=lambda metadata: metadata["chunk_id"] not in hidden)
+        stored = vectors.vectors([doc.metadata["chunk_id"] for doc, _ in hits])
+        return [(doc, vector) for (doc, _), vector in zip(hits, stored)]
+
+    def lookup(documents):
+        lookups.extend(doc.metadata["chunk_id"] for doc in documents)
+        return vectors.vectors([doc.metadata["chunk_id"] for doc in documents])
+
+    async def async_search(query_vector, fetch_k):
+        return search(query_vector, fetch_k)
+
+    async def async_lookup(documents):
+        return lookup(documents)
+
+    retriever = FusionRetriever(
+        embeddings=embeddings,
+        vector_search=async_search,
+        vector_lookup=async_lookup,
+        sync_vector_search=search,
+        sync_vector_lookup=lookup,
+        bm25_index=bm25,
+        k=k,
+        config=FusionConfig(**{"fetch_k": 2, **config}),
+    )
+    return retriever, searches, lookups
+
+
+def _ids(documents) -> List[str]:
+    return [doc.metadata["chunk_id"] for doc in documents]
+
+
+def test_fusion_drops_near_copies_and_weak_candidates():
+    retriever, _, _ = _retriever(k=3, fetch_k=5)
+
+    results = _ids(retriever.invoke("photosynthesis light energy"))
+
+    # c1 duplicates c0; c3 and c4 are unrelated to the query and fall under min_similarity.
+    assert results == ["c0", "c2"]
+
+
+def test_bm25_only_candidates_are_looked_up_not_embedded():
+    # The vector store misses "water cycle rain"; only BM25 surfaces it.
+    retriever, searches, lookups = _retriever(k=3, hidden={"c3"}, fetch_k=2, min_similarity=0.3)
+
+    results = _ids(retriever.invoke("rain water"))
+
+    assert searches == [2]
+    assert lookups == ["c3"]
+    assert results == ["c2", "c3"]
+
+
+def test_sync_and_async_paths_agree():
+    retriever, _, _ = _retriever(k=3, fetch_k=5, min_similarity=0.0)
+    for query in ("photosynthesis light energy", "water cycle", "napoleon revolution rain"):
+        assert _ids(retriever.invoke(query)) == _ids(asyncio.run(retriever.ainvoke(query)))
+
+
+def test_sync_path_without_sync_callables_runs_the_async_ones():
+    retriever, searches, lookups = _retriever(k=2, fetch_k=5)
+    retriever.sync_vector_search = None
+    retriever.sync_vector_lookup = None
+
+    assert _ids(retriever.invoke("photosynthesis light energy")) == ["c0", "c2"]
+    assert searches == [5]
+    assert lookups == []
@@ -0,0 +1,142 @@
+"""
+LocalVectorIndex: exact blocked top-k search, filters, upserts and deletes, persistence
+through a memory-mapped matrix, float16 storage and IVF partitions; plus the LangChain
+LocalVectorStore wrapper.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_toolkit.local_vector_index import LocalVectorIndex, LocalVectorStore
+
+DIMENSION = 16
+
+
+def _data(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIMENSION)).astype(np.float32)
+    ids = [f"p{i}" for i in range(count)]
+    documents = [Document(page_content=f"chunk {i}", metadata={"source": f"file{i % 3}.pdf", "n": i}) for i in range(count)]
+    return ids, vectors, documents
+
+
+def _exact(vectors: np.ndarray, query: np.ndarray, k: int, rows=None) -> list:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return [int(row) for row in rows[np.argsort(-scores[rows], kind="stable")][:k]]
+
+
+def _numbers(results) -> list:
+    return [document.metadata["n"] for document, _ in results]
+
+
+def test_blocked_search_matches_brute_force():
+    ids, vectors, documents = _data(300)
+    index = LocalVectorIndex(block_size=32)
+    index.upsert(ids, vectors, documents)
+    query = np.random.default_rng(1).normal(size=DIMENSION)
+
+    results = index.search(query, k=7)
+
+    assert _numbers(results) == _exact(vectors, query, 7)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True) and -1.0 <= scores[-1] <= scores[0] <= 1.0
+
+
+def test_predicate_filters_results():
+    ids, vectors, documents = _data(120)
+    index = LocalVectorIndex(block_size=16)
+    index.upsert(ids, vectors, documents)
+    query = vectors[5]
+
+    results = index.search(query, k=5, predicate=lambda metadata: metadata["source"] == "file2.pdf")
+
+    assert _numbers(results) == _exact(vectors, query, 5, rows=range(2, 120, 3))
+
+
+def test_upsert_replaces_and_delete_compacts():
+    ids, vectors, documents = _data(40)
+    index = LocalVectorIndex()
+    index.upsert(ids, vectors, documents)
+    index.upsert(["p0"], [vectors[1]], [Document(page_content="replaced", metadata={"n": 0})])
+    assert len(index) == 40
+    assert np.allclose(index.vectors(["p0"])[0], index.vectors(["p1"])[0])
+
+    assert index.delete_where(lambda metadata: metadata.get("source") == "file1.pdf") == 13
+    # More than a quarter of the rows were dead, so the matrix was compacted.
+    assert index._size == len(index) == 27
+    assert index.delete(["p0", "missing"]) == 1
+    assert len(index) == 26
+    remaining = [i for i in range(40) if i % 3 != 1 and i != 0]
+    assert _numbers(index.search(vectors[2], k=3)) == [remaining[i] for i in _exact(vectors[remaining], vectors[2], 3)]
+
+
+def test_dimension_mismatch_is_rejected():
+    index = LocalVectorIndex()
+    index.upsert(["a"], [[1.0, 0.0]], [Document(page_content="a")])
+    with pytest.raises(ValueError):
+        index.upsert(["b"], [[1.0, 0.0, 0.0]], [Document(page_content="b")])
+
+
+def test_save_and_load_memory_maps_and_stays_writable(tmp_path):
+    ids, vectors, documents = _data(50)
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(path=path)
+    index.upsert(ids, vectors, documents)
+    index.delete(["p3"])
+    index.save()
+
+    restored = LocalVectorIndex.load(path)
+    assert isinstance(restored._vectors, np.memmap)
+    assert len(restored) == 49
+    assert _numbers(restored.search(vectors[10], k=4)) == _numbers(index.search(vectors[10], k=4))
+
+    _, extra_vectors, extra_documents = _data(5, seed=9)
+    restored.upsert([f"x{i}" for i in range(5)], extra_vectors, extra_documents)
+    assert len(restored) == 54
+    assert not isinstance(restored._vectors, np.memmap)
+    assert restored.search(extra_vectors[0], k=1)[0][0].page_content == "chunk 0"
+
+
+def test_float16_storage_keeps_the_ranking():
+    ids, vectors, documents = _data(200)
+    index = LocalVectorIndex(dtype="float16")
+    index.upsert(ids, vectors, documents)
+    assert index._vectors.dtype == np.float16
+
+    query = vectors[42]
+    assert _numbers(index.search(query, k=1)) == [42]
+    assert index.search(query, k=1)[0][1] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_ivf_with_every_list_probed_is_exact():
+    ids, vectors, documents = _data(400)
+    index = LocalVectorIndex(ivf_lists=8, ivf_probes=8, ivf_min_vectors=100, block_size=64)
+    index.upsert(ids, vectors, documents)
+    query = np.random.default_rng(2).normal(size=DIMENSION)
+
+    assert _numbers(index.search(query, k=10)) == _exact(vectors, query, 10)
+    assert index._centroids is not None and len(index._centroids) == 8
+
+    # With fewer probes the scan is partial but still finds the query vector itself.
+    index.ivf_probes = 2
+    assert _numbers(index.search(vectors[17], k=1)) == [17]
+
+
+def test_vector_store_wrapper():
+    store = LocalVectorStore.from_texts(
+        ["light energy", "water cycle", "french revolution"],
+        DeterministicFakeEmbedding(size=DIMENSION),
+        metadatas=[{"source": "a"}, {"source": "a"}, {"source": "b"}],
+        ids=["1", "2", "3"],
+    )
+
+    assert store.similarity_search("water cycle", k=1)[0].page_content == "water cycle"
+    assert [doc.page_content for doc in store.similarity_search("water cycle", k=3, filter={"source": "b"})] == ["french revolution"]
+    assert asyncio.run(store.asimilarity_search("french revolution", k=1))[0].metadata == {"source": "b"}
+    assert store.delete(["3"])
+    assert len(store.index) == 2
@@ -0,0 +1,131 @@
+"""
+Regression test: the event loop stays responsive while long provider calls are in flight.
+
+Drives /image_generation_endpoint, /web_search_endpoint and /voice_chat_endpoint through
+the ASGI app with slow stand-ins for their providers, while a probe task records how
+late it wakes up (loop lag). Each stand-in blocks its thread for CALL_SECONDS when
+called synchronously, so an endpoint that goes back to calling its provider on the
+event loop stalls the probe for at least that long and fails the lag bound.
+
+Importing main builds the whole service, so this needs the full requirements
+(including the voice dependencies) installed. Run from the python/ directory:
+    python -m pytest -q tests/test_loop_lag.py
+"""
+import os
+import time
+import asyncio
+import tempfile
+
+import pytest
+
+CALL_SECONDS = 0.3
+CONCURRENT_REQUESTS = 4
+MAX_LAG_MS = 100.0
+PROBE_INTERVAL_SECONDS = 0.005
+
+_data_dir = tempfile.mkdtemp(prefix="loop_lag_test_")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SLIDESPEAK_API_KEY", "test")
+os.environ.setdefault("QDRANT_URL", ":memory:")
+os.environ.setdefault("TUTOR_SESSION_STORE_PATH", os.path.join(_data_dir, "sessions.sqlite3"))
+os.environ.setdefault("VISION_CACHE_PATH", os.path.join(_data_dir, "vision.sqlite3"))
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+main = pytest.importorskip("main", reason="main.py needs the full requirements installed")
+httpx = pytest.importorskip("httpx")
+import AI_voice_functionality
+
+
+class SlowImageGenerator:
+    """Stands in for ImageGenerator: a blocking SDK call."""
+
+    def generate_image_from_schema(self, schema: dict) -> str:
+        time.sleep(CALL_SECONDS)
+        return "aW1hZ2U="
+
+
+class _Chunk:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class SlowPerplexityChat:
+    """Stands in for the Perplexity chat model: async streaming, blocking sync calls."""
+
+    async def astream(self, query: str):
+        for i in range(3):
+            await asyncio.sleep(CALL_SECONDS / 3)
+            yield _Chunk(f"result {i} ")
+
+    def stream(self, query: str):
+        for i in range(3):
+            time.sleep(CALL_SECONDS / 3)
+            yield _Chunk(f"result {i} ")
+
+    def invoke(self, query: str):
+        time.sleep(CALL_SECONDS)
+        return _Chunk("result")
+
+
+def slow_answer_stream(text: str, *args, **kwargs):
+    """Stands in for get_comprehensive_answer_stream: a synchronous token stream."""
+    for i in range(3):
+        time.sleep(CALL_SECONDS / 3)
+        yield f"chunk {i} "
+
+
+async def _probe_loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL_SECONDS) * 1000)
+
+
+async def _drive_endpoints() -> tuple:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        async def image(i: int):
+            response = await client.post("/image_generation_endpoint", json={
+                "topic": f"the water cycle {i}", "grade_level": "5", "preferred_visual_type": "diagram",
+                "subject": "Science", "instructions": "Label every stage.", "difficulty_flag": "false",
+            })
+            assert response.status_code == 200, response.text
+
+        async def web_search(i: int):
+            response = await client.post("/web_search_endpoint", json={
+                "topic": f"volcanoes {i}", "grade_level": "7", "subject": "Geography", "content_type": "articles",
+            })
+            assert response.status_code == 200, response.text
+            assert "result 2" in response.json()["content"]
+
+        async def voice_chat(i: int):
+            response = await client.post("/voice_chat_endpoint", json={"text": f"What is photosynthesis? {i}"})
+            assert response.status_code == 200, response.text
+            assert '"type": "done"' in response.text
+
+        lags: list = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_loop_lag(stop, lags))
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS * 4)
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                call(i) for i in range(CONCURRENT_REQUESTS) for call in (image, web_search, voice_chat)
+            ))
+        finally:
+            stop.set()
+            await probe
+        return lags, time.perf_counter() - start
+
+
+def test_event_loop_stays_responsive_during_slow_provider_calls(monkeypatch):
+    monkeypatch.setattr(main, "ImageGenerator", SlowImageGenerator)
+    monkeypatch.setattr(main, "pplx_chat", SlowPerplexityChat())
+    monkeypatch.setattr(AI_voice_functionality, "get_comprehensive_answer_stream", slow_answer_stream)
+
+    lags, elapsed = asyncio.run(_drive_endpoints())
+
+    # The requests overlapped rather than running one after another...
+    assert elapsed < CALL_SECONDS * CONCURRENT_REQUESTS * 3
+    # ...and no provider call held the loop.
+    assert max(lags) < MAX_LAG_MS, f"event loop lag {max(lags):.1f} ms exceeds {MAX_LAG_MS} ms"
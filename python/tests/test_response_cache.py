@@ -0,0 +1,145 @@
+"""
+ResponseCache: cache keys (categorical fields normalized, free text exact), TTLs,
+LRU bound, coalescing of identical in-flight requests, and the shared disk tier.
+"""
+import asyncio
+
+import pytest
+
+from serving_toolkit.response_cache import ResponseCache, ResponseCacheConfig, make_cache_key
+
+ENDPOINT = "/teaching_content_endpoint"
+PAYLOAD = {
+    "subject": "Biology",
+    "grade": "10th Grade",
+    "language": "English",
+    "lesson_topic": "Cellular Respiration",
+    "learning_objective": "Explain how cells release energy.",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(clock=None, max_entries: int = 16, disk_path=None) -> ResponseCache:
+    config = ResponseCacheConfig(enabled=True, max_entries=max_entries, disk_path=disk_path)
+    config.endpoint_ttls[ENDPOINT] = 60.0
+    return ResponseCache(config, clock=clock or FakeClock())
+
+
+def _counting(result="lesson"):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return result
+    return compute, calls
+
+
+def test_categorical_fields_ignore_case_and_whitespace():
+    variant = {**PAYLOAD, "subject": "  biology ", "grade": "10TH   grade", "language": "english", "force_refresh": True}
+    assert make_cache_key(ENDPOINT, variant, "gpt-4o") == make_cache_key(ENDPOINT, PAYLOAD, "gpt-4o")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("lesson_topic", "cellular respiration"),
+    ("learning_objective", "Explain how cells release  energy."),
+])
+def test_free_text_is_hashed_exactly(field, value):
+    assert make_cache_key(ENDPOINT, {**PAYLOAD, field: value}, "gpt-4o") != make_cache_key(ENDPOINT, PAYLOAD, "gpt-4o")
+
+
+def test_differently_cased_free_text_misses_the_cache():
+    async def scenario():
+        cache = _cache()
+        compute, calls = _counting()
+        await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        await cache.get_or_compute(ENDPOINT, {**PAYLOAD, "subject": "BIOLOGY"}, "gpt-4o", compute)
+        await cache.get_or_compute(ENDPOINT, {**PAYLOAD, "lesson_topic": "CELLULAR RESPIRATION"}, "gpt-4o", compute)
+        return cache, calls
+
+    cache, calls = asyncio.run(scenario())
+    assert len(calls) == 2
+    metrics = cache.metrics_for(ENDPOINT)
+    assert (metrics.memory_hits, metrics.misses) == (1, 2)
+
+
+def test_model_is_part_of_the_key():
+    assert make_cache_key(ENDPOINT, PAYLOAD, "gpt-4o") != make_cache_key(ENDPOINT, PAYLOAD, "gpt-4o-mini")
+
+
+def test_entries_expire_after_the_endpoint_ttl():
+    async def scenario():
+        clock = FakeClock()
+        cache = _cache(clock)
+        compute, calls = _counting()
+        await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        clock.now += 59
+        await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        clock.now += 2
+        await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        return cache, calls
+
+    cache, calls = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert cache.metrics_for(ENDPOINT).expirations == 1
+
+
+def test_identical_in_flight_requests_are_coalesced():
+    async def scenario():
+        cache = _cache()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "lesson"
+        results = await asyncio.gather(*(cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", slow) for _ in range(4)))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == ["lesson"] * 4
+    assert cache.metrics_for(ENDPOINT).coalesced == 3
+
+
+def test_failures_are_not_cached():
+    async def scenario():
+        cache = _cache()
+
+        async def failing():
+            raise RuntimeError("provider down")
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", failing)
+        compute, calls = _counting()
+        return await cache.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute), calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == "lesson" and len(calls) == 1
+
+
+def test_memory_tier_is_bounded_and_disk_tier_is_shared(tmp_path):
+    disk_path = str(tmp_path / "responses.sqlite3")
+
+    async def scenario():
+        first = _cache(max_entries=1, disk_path=disk_path)
+        compute, calls = _counting()
+        await first.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        await first.get_or_compute(ENDPOINT, {**PAYLOAD, "lesson_topic": "Photosynthesis"}, "gpt-4o", compute)
+
+        # Another worker on the same host finds the first result on disk.
+        second = _cache(max_entries=1, disk_path=disk_path)
+        result = await second.get_or_compute(ENDPOINT, PAYLOAD, "gpt-4o", compute)
+        return first, second, calls, result
+
+    first, second, calls, result = asyncio.run(scenario())
+    assert first.stats()["size"] == 1
+    assert first.metrics_for(ENDPOINT).evictions == 1
+    assert result == "lesson" and len(calls) == 2
+    assert second.metrics_for(ENDPOINT).disk_hits == 1
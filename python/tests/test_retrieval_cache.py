@@ -0,0 +1,106 @@
+"""
+RetrievalCache: query normalization, LRU bound, and corpus-version tagging, so a
+retrieval that raced with an ingest never serves results from the old corpus.
+"""
+import threading
+
+from rag_toolkit.retrieval_cache import RetrievalCache, RetrievalCacheConfig, RetrievalCacheMetrics, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  What is PHOTOSYNTHESIS?? ") == "what is photosynthesis"
+    assert normalize_query("ﬁrst-order\treactions") == "first order reactions"
+
+
+def test_reworded_query_hits():
+    cache = RetrievalCache()
+    cache.put("What is photosynthesis?", ["c1", "c2"], cache.version)
+
+    assert cache.get("what is   photosynthesis") == ["c1", "c2"]
+    assert cache.get("what is respiration") is None
+    assert (cache.metrics.hits, cache.metrics.misses, cache.metrics.stores) == (1, 1, 1)
+
+
+def test_invalidate_empties_the_cache():
+    cache = RetrievalCache()
+    cache.put("q", ["c1"], cache.version)
+    cache.invalidate()
+
+    assert cache.get("q") is None
+    assert len(cache) == 0
+    assert cache.metrics.invalidations == 1
+    cache.invalidate()
+    assert cache.metrics.invalidations == 1
+
+
+def test_result_computed_before_an_ingest_is_not_stored():
+    cache = RetrievalCache()
+    # The retrieval starts against version 0...
+    version = cache.version
+    # ...an ingest lands while it is in flight...
+    cache.invalidate()
+    # ...and its (stale) result arrives afterwards.
+    cache.put("q", ["old"], version)
+
+    assert cache.get("q") is None
+    assert cache.metrics.stores == 0
+    cache.put("q", ["new"], cache.version)
+    assert cache.get("q") == ["new"]
+
+
+def test_concurrent_invalidations_never_leave_stale_entries():
+    cache = RetrievalCache()
+    stop = threading.Event()
+    stale = []
+
+    def ingest():
+        while not stop.is_set():
+            cache.invalidate()
+
+    def retrieve(worker: int):
+        for i in range(2000):
+            version = cache.version
+            cache.put(f"q{worker}-{i}", [f"v{version}"], version)
+            found = cache.get(f"q{worker}-{i}")
+            if found not in (None, [f"v{version}"]):
+                stale.append(found)
+
+    ingester = threading.Thread(target=ingest)
+    ingester.start()
+    try:
+        workers = [threading.Thread(target=retrieve, args=(n,)) for n in range(4)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        stop.set()
+        ingester.join()
+
+    assert not stale
+    # Every entry that survived was computed against the final corpus.
+    final = cache.version
+    assert all(version == final for version, _ in cache._entries.values())
+
+
+def test_lru_bound_and_shared_metrics():
+    shared = RetrievalCacheMetrics()
+    first = RetrievalCache(RetrievalCacheConfig(max_entries=2), shared_metrics=shared)
+    second = RetrievalCache(RetrievalCacheConfig(max_entries=2), shared_metrics=shared)
+    for query in ("a", "b"):
+        first.put(query, [query], first.version)
+    first.get("a")
+    first.put("c", ["c"], first.version)
+    second.get("a")
+
+    assert first.get("b") is None
+    assert first.get("a") == ["a"]
+    assert first.metrics.evictions == 1
+    assert (shared.stores, shared.hits, shared.misses) == (3, 2, 2)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RetrievalCache(RetrievalCacheConfig(enabled=False))
+    cache.put("q", ["c1"], cache.version)
+    assert cache.get("q") is None
+    assert len(cache) == 0
@@ -0,0 +1,152 @@
+"""
+TutorSessionPool: LRU and idle eviction, coalesced creation, and leases that keep a
+session in the pool (and its eviction hook from running) while a request uses it.
+"""
+import asyncio
+
+from serving_toolkit.session_pool import SessionPoolConfig, TutorSessionPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Session:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.closed = False
+
+
+def _pool(max_size: int = 2, idle_ttl_seconds: float = 60.0, clock=None, factory=None):
+    evicted = []
+
+    def on_evict(session_id, session, reason):
+        session.closed = True
+        evicted.append((session_id, reason))
+
+    pool = TutorSessionPool(
+        factory=factory or Session,
+        config=SessionPoolConfig(max_size=max_size, idle_ttl_seconds=idle_ttl_seconds, reap_interval_seconds=60.0),
+        on_evict=on_evict,
+        clock=clock or FakeClock(),
+    )
+    return pool, evicted
+
+
+async def _settle(pool: TutorSessionPool):
+    # LRU eviction hooks run as background tasks.
+    await asyncio.sleep(0)
+    if pool._pending_hooks:
+        await asyncio.gather(*pool._pending_hooks)
+
+
+def test_lru_eviction_drops_the_least_recently_used_session():
+    async def scenario():
+        pool, evicted = _pool(max_size=2)
+        await pool.get_or_create("a")
+        await pool.get_or_create("b")
+        await pool.get_or_create("a")
+        await pool.get_or_create("c")
+        await _settle(pool)
+        return pool, evicted
+
+    pool, evicted = asyncio.run(scenario())
+    assert evicted == [("b", "lru")]
+    assert "a" in pool and "c" in pool
+    assert pool.metrics.hits == 1 and pool.metrics.misses == 3
+
+
+def test_concurrent_misses_share_one_creation():
+    calls = []
+
+    async def slow_factory(session_id: str):
+        calls.append(session_id)
+        await asyncio.sleep(0.01)
+        return Session(session_id)
+
+    async def scenario():
+        pool, _ = _pool(factory=slow_factory)
+        return pool, await asyncio.gather(*(pool.get_or_create("a") for _ in range(5)))
+
+    pool, sessions = asyncio.run(scenario())
+    assert calls == ["a"]
+    assert all(session is sessions[0] for session in sessions)
+    assert pool.metrics.coalesced == 4
+
+
+def test_leased_session_is_not_evicted_by_lru():
+    async def scenario():
+        pool, evicted = _pool(max_size=1)
+        lease = await pool.acquire("a")
+        await pool.get_or_create("b")
+        await _settle(pool)
+        during = (list(evicted), len(pool), lease.session.closed)
+
+        lease.release()
+        await pool.get_or_create("c")
+        await _settle(pool)
+        return during, evicted, pool
+
+    during, evicted, pool = asyncio.run(scenario())
+    # While "a" streamed, the pool went over max_size rather than closing it.
+    assert during == ([], 2, False)
+    assert evicted == [("a", "lru"), ("b", "lru")]
+    assert len(pool) == 1
+
+
+def test_leased_session_is_not_idle_evicted():
+    async def scenario():
+        clock = FakeClock()
+        pool, evicted = _pool(idle_ttl_seconds=10, clock=clock)
+        async with pool.lease("a") as session:
+            clock.now = 100.0
+            assert await pool.evict_idle() == 0
+            assert await pool.get_or_create("a") is session
+
+        # Released just now, so the lease counts as use.
+        assert await pool.evict_idle() == 0
+        clock.now = 200.0
+        assert await pool.evict_idle() == 1
+        return evicted
+
+    assert asyncio.run(scenario()) == [("a", "idle")]
+
+
+def test_explicit_eviction_of_a_leased_session_waits_for_release():
+    async def scenario():
+        pool, evicted = _pool()
+        lease = await pool.acquire("a")
+        assert await pool.evict("a")
+        await _settle(pool)
+        during = (list(evicted), "a" in pool, lease.session.closed)
+
+        lease.release()
+        lease.release()
+        await _settle(pool)
+        return during, evicted, lease.session
+
+    during, evicted, session = asyncio.run(scenario())
+    assert during == ([], False, False)
+    assert evicted == [("a", "explicit")]
+    assert session.closed
+
+
+def test_lease_is_released_when_the_request_fails():
+    async def scenario():
+        pool, _ = _pool(max_size=1)
+        try:
+            async with pool.lease("a"):
+                raise RuntimeError("stream failed")
+        except RuntimeError:
+            pass
+        await pool.get_or_create("b")
+        await _settle(pool)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert "a" not in pool and len(pool) == 1
+    assert pool.stats()["leased"] == 0
@@ -0,0 +1,94 @@
+"""
+Session store semantics shared by the SQLite and Redis backends: a worker holding a
+stale record can no longer overwrite what another worker wrote, and concurrent writers
+all land their changes. Runs without external services (Redis is InMemoryRedis).
+"""
+import time
+import asyncio
+
+import pytest
+
+from serving_toolkit.session_store import InMemoryRedis, RedisSessionStore, SessionRecord, SQLiteSessionStore
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_store(request, tmp_path):
+    """Returns a factory; every store it makes shares the same backing data, like two workers."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "sessions.sqlite3")
+        return lambda: SQLiteSessionStore(path)
+    client = InMemoryRedis()
+    return lambda: RedisSessionStore(client)
+
+
+def _add_file(name: str):
+    def mutate(record: SessionRecord):
+        if name not in record.ingested_files:
+            record.ingested_files.append(name)
+    return mutate
+
+
+def test_stale_compare_and_set_is_rejected(make_store):
+    async def scenario():
+        worker_a, worker_b = make_store(), make_store()
+        await worker_a.get_or_create(SessionRecord(session_id="s1", collection_name="c1"))
+
+        stale = await worker_a.get("s1")
+        await worker_b.update("s1", _add_file("b.pdf"))
+
+        stale.ingested_files = ["a.pdf"]
+        assert not await worker_a.compare_and_set(stale, stale.version)
+        return await worker_a.get("s1")
+
+    record = asyncio.run(scenario())
+    assert record.ingested_files == ["b.pdf"]
+    assert record.version == 1
+
+
+def test_touch_keeps_other_workers_changes(make_store):
+    async def scenario():
+        worker_a, worker_b = make_store(), make_store()
+        await worker_a.get_or_create(SessionRecord(session_id="s1", collection_name="c1", last_active=0.0))
+        await worker_a.get("s1")
+        await worker_b.update("s1", _add_file("b.pdf"))
+        await worker_a.touch("s1")
+        return await worker_b.get("s1")
+
+    before = time.time()
+    record = asyncio.run(scenario())
+    assert record.ingested_files == ["b.pdf"]
+    assert record.last_active >= before
+
+
+def test_concurrent_updates_all_land(make_store):
+    files_per_worker = 15
+
+    async def worker(store, name: str):
+        for i in range(files_per_worker):
+            await store.update("s1", _add_file(f"{name}-{i}.pdf"))
+
+    async def scenario():
+        stores = [make_store() for _ in range(3)]
+        await stores[0].get_or_create(SessionRecord(session_id="s1", collection_name="c1"))
+        await asyncio.gather(*(worker(store, f"w{n}") for n, store in enumerate(stores)))
+        return await stores[0].get("s1")
+
+    record = asyncio.run(scenario())
+    assert len(record.ingested_files) == 3 * files_per_worker
+    assert record.version == 3 * files_per_worker
+
+
+def test_update_of_unknown_session_returns_none(make_store):
+    assert asyncio.run(make_store().update("missing", _add_file("a.pdf"))) is None
+
+
+def test_records_without_a_version_are_read_as_version_zero(tmp_path):
+    # Records written before versioning existed must still be updatable.
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    legacy = '{"session_id": "s1", "collection_name": "c1", "ingested_files": [], "bm25_corpus_ref": null, "web_search_enabled": false, "last_active": 0.0}'
+    with store._connect() as conn:
+        conn.execute("INSERT INTO tutor_sessions (session_id, record, last_active) VALUES (?, ?, ?)", ("s1", legacy, 0.0))
+
+    record = asyncio.run(store.update("s1", _add_file("a.pdf")))
+    assert record.version == 1
+    assert asyncio.run(store.get("s1")).ingested_files == ["a.pdf"]